@@ -1,6 +1,6 @@
 import streamlit as st
 from config import APP_NAME, APP_LAYOUT, APP_ICON
-from frontend.components.sidebar import render_sidebar
+from frontend.components.sidebar import render_sidebar, render_profiler_overlay
 from frontend.components.header import render_header
 from frontend.components.new_experiment import render_new_experiment
 from frontend.components.view_experiments import render_view_experiments
@@ -11,8 +11,9 @@ from frontend.components.issue_submission import render_issue_submission_form
 from frontend.components.bulk_uploads import render_bulk_uploads_page
 from frontend.components.chemical_additives import render_compound_management, render_edit_compound_form
 from frontend.components.reactor_dashboard import render_reactor_dashboard
-from utils.scheduler import setup_backup_scheduler, shutdown_scheduler
-from utils.database_backup import update_public_db_copy
+from utils.maintenance_daemon import request_job, daemon_running
+from utils.page_profiler import page_profile, is_profiler_admin, requested_profiler, PROFILE_QUERY_PARAM
+from backend.services.upload_jobs import shutdown_upload_job_runner
 from database import SessionLocal
 from database.models import Experiment
 import os
@@ -44,22 +45,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Create an initial public copy of the database
-try:
-    public_path = update_public_db_copy()
-    if public_path:
-        logger.info(f"Created initial public database copy at: {public_path}")
-except Exception as e:
-    logger.error(f"Error creating initial public database copy: {str(e)}")
-
-# Initialize the backup scheduler
-try:
-    backup_scheduler = setup_backup_scheduler()
-    # Register shutdown handler
-    atexit.register(shutdown_scheduler)
-    logger.info("Database backup scheduler initialized successfully")
-except Exception as e:
-    logger.error(f"Error initializing backup scheduler: {str(e)}")
+# Backups, public copies, view refreshes and PRAGMA optimize are owned by the
+# maintenance daemon (utils/maintenance_daemon.py); the app only queues jobs.
+atexit.register(shutdown_upload_job_runner)
 
 def render_compound_management_page():
     """Render the compound management page"""
@@ -86,33 +74,46 @@ def main():
         # Render header after setting the current page
         render_header()
         
-        if page == "Reactor Dashboard":
-            render_reactor_dashboard()
-        elif page == "New Experiment":
-            render_new_experiment()
-        elif page == "View Experiments":
-            render_view_experiments()
-        elif page == "New Rock Sample":
-            render_new_rock_sample()
-        elif page == "View Sample Inventory":
-            render_sample_inventory()
-        elif page == "Compound Management":
-            render_compound_management_page()
-        elif page == "Bulk Uploads":
-            render_bulk_uploads_page()
-        elif page == "Issue Submission":
-            render_issue_submission_form()
-        # elif page == "Settings":
-        #     render_settings()
+        # Time each render (wall time, SQL statements, peak memory); admins can
+        # request a full profile with ?profile=pyinstrument|cprofile
+        user = st.session_state.get('user') or {}
+        profiler = None
+        if is_profiler_admin(user):
+            profiler = requested_profiler(st.query_params.get(PROFILE_QUERY_PARAM))
+        with page_profile(page, profiler=profiler, user=user.get('email')) as render_record:
+            if page == "Reactor Dashboard":
+                render_reactor_dashboard()
+            elif page == "New Experiment":
+                render_new_experiment()
+            elif page == "View Experiments":
+                render_view_experiments()
+            elif page == "New Rock Sample":
+                render_new_rock_sample()
+            elif page == "View Sample Inventory":
+                render_sample_inventory()
+            elif page == "Compound Management":
+                render_compound_management_page()
+            elif page == "Bulk Uploads":
+                render_bulk_uploads_page()
+            elif page == "Issue Submission":
+                render_issue_submission_form()
+            # elif page == "Settings":
+            #     render_settings()
+
+        render_profiler_overlay(render_record)
 
         if st.sidebar.button("Sync Public DB"):
             try:
-                with st.spinner("Syncing public database..."):
-                    public_path = update_public_db_copy()
-                    if public_path:
-                        st.sidebar.success(f"DB synced to {public_path}")
+                request_job("public_copy", requested_by=(st.session_state.get('user') or {}).get('email'))
+                if daemon_running():
+                    st.sidebar.success("Public DB sync queued; it will run within a few seconds.")
+                else:
+                    st.sidebar.warning(
+                        "Public DB sync queued, but the maintenance daemon is not running. "
+                        "Start it with maintenance_daemon.bat."
+                    )
             except Exception as e:
-                logger.error(f"Error syncing public database: {str(e)}")
+                logger.error(f"Error queueing public database sync: {str(e)}")
                 st.sidebar.error("An error occurred while syncing the public database. Please try again later.")
     except Exception as e:
         logger.error(f"Error in main application: {str(e)}", exc_info=True)
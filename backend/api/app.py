@@ -0,0 +1,74 @@
+"""
+ASGI application for the HTTP API (see :mod:`backend.api.routes`).
+
+Serve with uvicorn, either through this module::
+
+    python -m backend.api.app --host 0.0.0.0 --port 8000
+
+or directly::
+
+    uvicorn backend.api.app:app --host 0.0.0.0 --port 8000
+
+Responses larger than ``API_GZIP_MIN_BYTES`` are gzip-compressed for
+clients that send ``Accept-Encoding: gzip``. Queued long-format ingest
+records are flushed on shutdown.
+"""
+
+import os
+import sys
+import argparse
+import logging
+from contextlib import asynccontextmanager
+from typing import Iterable, Optional
+
+from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+
+from backend.api.routes import router
+from backend.services.long_format_ingest import shutdown_long_format_ingestor
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = "/api/v1"
+GZIP_MIN_BYTES = int(os.environ.get("API_GZIP_MIN_BYTES", "1000"))
+DEFAULT_HOST = os.environ.get("API_HOST", "127.0.0.1")
+DEFAULT_PORT = int(os.environ.get("API_PORT", "8000"))
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    yield
+    shutdown_long_format_ingestor()
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="Experiment Tracking API", version="1", lifespan=_lifespan)
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES)
+    app.include_router(router, prefix=API_PREFIX)
+
+    @app.get("/health", include_in_schema=False)
+    def health():
+        return {"status": "ok"}
+
+    return app
+
+
+app = create_app()
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the experiment tracking HTTP API")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Bind address (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    # One process: uploads share the job runner's SQLite write lock
+    uvicorn.run(app, host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+"""
+Read model behind the HTTP API: which columns each resource exposes and how
+pages of them are fetched.
+
+Everything here is framework-free (plain SQLAlchemy Core over the ORM
+columns) so it can be used and tested without the web server.
+
+- **Keyset pagination**: pages are ordered by the resource's unique key and
+  continue from an opaque ``cursor`` (the last key, base64url-encoded), so
+  page N costs the same as page 1 and concurrent inserts never shift rows
+  between pages.
+- **Field projection**: only the requested columns are selected.
+- **Versions**: :func:`collection_version` is a single aggregate query
+  (row count, max key, newest ``updated_at``/``created_at``) used to build
+  ETags without loading the rows themselves.
+"""
+
+import base64
+import enum
+import json
+import hashlib
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import Boolean, Enum as SQLEnum, Float, Integer, func, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from database import Experiment, ExperimentalResults, ScalarResults, ICPResults, SampleInfo, PXRFReading
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Upper bound for unpaginated per-experiment series
+MAX_SERIES_ROWS = 5000
+
+
+@dataclass(frozen=True)
+class Resource:
+    """
+    A collection exposed by the API.
+
+    Args:
+        name: URL segment and ETag namespace
+        key: Field used for keyset ordering; must be unique and non-null
+        fields: Field name -> ORM column, in output order
+        joins: (target, onclause) pairs inner-joined onto the first field's table
+        outer_joins: (target, onclause) pairs left-outer-joined after ``joins``
+        filters: Field names that may be used as exact-match query filters
+        version_columns: Timestamp columns whose maximum changes on every write
+    """
+    name: str
+    key: str
+    fields: Dict[str, Any]
+    joins: Tuple[Tuple[Any, Any], ...] = ()
+    outer_joins: Tuple[Tuple[Any, Any], ...] = ()
+    filters: Tuple[str, ...] = ()
+    version_columns: Tuple[Any, ...] = ()
+
+
+@dataclass
+class Page:
+    rows: List[Dict[str, Any]]
+    next_cursor: Optional[str]
+
+
+def _model_fields(model, exclude: Iterable[str] = ()) -> Dict[str, Any]:
+    """Mapped column attributes of ``model`` by attribute key (``fe``, not the ``Fe`` column name)."""
+    skip = set(exclude)
+    return {attr.key: getattr(model, attr.key) for attr in inspect(model).column_attrs if attr.key not in skip}
+
+
+_RESULT_FIELDS = {
+    "result_id": ExperimentalResults.id,
+    "experiment_id": Experiment.experiment_id,
+    **_model_fields(ExperimentalResults, exclude=("id",)),
+    **_model_fields(ScalarResults, exclude=("id", "result_id", "updated_at")),
+}
+
+RESOURCES: Dict[str, Resource] = {
+    "experiments": Resource(
+        name="experiments",
+        key="id",
+        fields=_model_fields(Experiment),
+        filters=("experiment_id", "sample_id", "researcher", "status", "base_experiment_id"),
+        version_columns=(Experiment.created_at, Experiment.updated_at),
+    ),
+    "results": Resource(
+        name="results",
+        key="result_id",
+        fields=_RESULT_FIELDS,
+        joins=((Experiment, Experiment.id == ExperimentalResults.experiment_fk),),
+        outer_joins=((ScalarResults, ScalarResults.result_id == ExperimentalResults.id),),
+        filters=("experiment_id", "experiment_fk", "is_primary_timepoint_result"),
+        version_columns=(ExperimentalResults.created_at, ExperimentalResults.updated_at, ScalarResults.updated_at),
+    ),
+    "icp": Resource(
+        name="icp",
+        key="icp_id",
+        fields={
+            "icp_id": ICPResults.id,
+            "experiment_id": Experiment.experiment_id,
+            "time_post_reaction_days": ExperimentalResults.time_post_reaction_days,
+            "cumulative_time_post_reaction_days": ExperimentalResults.cumulative_time_post_reaction_days,
+            "is_primary_timepoint_result": ExperimentalResults.is_primary_timepoint_result,
+            **_model_fields(ICPResults, exclude=("id",)),
+        },
+        joins=(
+            (ExperimentalResults, ExperimentalResults.id == ICPResults.result_id),
+            (Experiment, Experiment.id == ExperimentalResults.experiment_fk),
+        ),
+        filters=("experiment_id", "result_id", "is_primary_timepoint_result"),
+        version_columns=(ICPResults.created_at, ICPResults.updated_at),
+    ),
+    "samples": Resource(
+        name="samples",
+        key="sample_id",
+        fields=_model_fields(SampleInfo),
+        filters=("country", "state", "rock_classification", "characterized"),
+        version_columns=(SampleInfo.created_at, SampleInfo.updated_at),
+    ),
+    "pxrf": Resource(
+        name="pxrf",
+        key="reading_no",
+        fields=_model_fields(PXRFReading),
+        version_columns=(PXRFReading.ingested_at, PXRFReading.updated_at),
+    ),
+}
+
+
+# ---------------------------------------------------------------------------
+# Parameters
+# ---------------------------------------------------------------------------
+def encode_cursor(value: Any) -> str:
+    return base64.urlsafe_b64encode(json.dumps([value]).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Any:
+    """Inverse of :func:`encode_cursor`; raises ValueError for malformed cursors."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {token!r}") from e
+    if not isinstance(value, list) or len(value) != 1:
+        raise ValueError(f"Invalid cursor: {token!r}")
+    return value[0]
+
+
+def parse_fields(resource: Resource, fields: Optional[str]) -> List[str]:
+    """
+    Resolve a comma-separated ``fields`` parameter.
+
+    The key field is always included so clients can follow cursors and
+    address single rows.
+
+    Raises:
+        ValueError: if a field is not exposed by the resource
+    """
+    if not fields:
+        return list(resource.fields)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in resource.fields]
+    if unknown:
+        raise ValueError(f"Unknown field(s) for {resource.name}: {', '.join(unknown)}")
+    if resource.key not in requested:
+        requested.insert(0, resource.key)
+    return list(dict.fromkeys(requested))
+
+
+def _coerce(column, value: str):
+    col_type = column.type
+    if isinstance(col_type, SQLEnum) and col_type.enum_class is not None:
+        for member in col_type.enum_class:
+            if value.lower() in (member.name.lower(), str(member.value).lower()):
+                return member
+        raise ValueError(f"Invalid value {value!r} for {column.key}")
+    if isinstance(col_type, Boolean):
+        return value.strip().lower() in ("1", "true", "yes", "y")
+    if isinstance(col_type, Integer):
+        return int(value)
+    if isinstance(col_type, Float):
+        return float(value)
+    return value
+
+
+def parse_filters(resource: Resource, params: Mapping[str, str]) -> Dict[str, Any]:
+    """Pick the resource's filter fields out of ``params`` and coerce them to column types."""
+    filters = {}
+    for name in resource.filters:
+        if params.get(name) not in (None, ""):
+            try:
+                filters[name] = _coerce(resource.fields[name], params[name])
+            except ValueError as e:
+                raise ValueError(f"Invalid value for {name}: {params[name]!r}") from e
+    return filters
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+def _base_table(resource: Resource):
+    return next(iter(resource.fields.values())).class_
+
+
+def _apply_from(resource: Resource, stmt):
+    stmt = stmt.select_from(_base_table(resource))
+    for target, onclause in resource.joins:
+        stmt = stmt.join(target, onclause)
+    for target, onclause in resource.outer_joins:
+        stmt = stmt.outerjoin(target, onclause)
+    return stmt
+
+
+def _apply_where(resource: Resource, stmt, filters: Mapping[str, Any], updated_since: Optional[datetime]):
+    for name, value in filters.items():
+        stmt = stmt.where(resource.fields[name] == value)
+    if updated_since is not None and resource.version_columns:
+        stmt = stmt.where(or_(*(col >= updated_since for col in resource.version_columns)))
+    return stmt
+
+
+def serialize_value(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.name
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _rows(result, fields: Sequence[str]) -> List[Dict[str, Any]]:
+    return [{name: serialize_value(value) for name, value in zip(fields, row)} for row in result]
+
+
+def fetch_page(
+    db: Session,
+    resource: Resource,
+    fields: Optional[Sequence[str]] = None,
+    filters: Optional[Mapping[str, Any]] = None,
+    after: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    updated_since: Optional[datetime] = None,
+) -> Page:
+    """
+    One page of ``resource`` in key order.
+
+    Args:
+        db: Database session
+        resource: Resource definition
+        fields: Fields to select (default: all)
+        filters: Exact-match filters from :func:`parse_filters`
+        after: Cursor from the previous page's ``next_cursor``
+        limit: Page size (clamped to 1..MAX_PAGE_SIZE)
+        updated_since: Only rows created/updated at or after this time
+
+    Returns:
+        Page with the rows and the cursor for the next page (None on the last page).
+    """
+    fields = list(fields or resource.fields)
+    if resource.key not in fields:
+        fields.insert(0, resource.key)
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    key_col = resource.fields[resource.key]
+
+    stmt = _apply_from(resource, select(*(resource.fields[f] for f in fields)))
+    stmt = _apply_where(resource, stmt, filters or {}, updated_since)
+    if after is not None:
+        stmt = stmt.where(key_col > decode_cursor(after))
+    stmt = stmt.order_by(key_col).limit(limit + 1)
+
+    rows = _rows(db.execute(stmt), fields)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][resource.key])
+    return Page(rows=rows, next_cursor=next_cursor)
+
+
+def fetch_rows(
+    db: Session,
+    resource: Resource,
+    fields: Optional[Sequence[str]] = None,
+    filters: Optional[Mapping[str, Any]] = None,
+    order_by: Sequence[str] = (),
+    max_rows: int = MAX_SERIES_ROWS,
+) -> List[Dict[str, Any]]:
+    """All matching rows (up to ``max_rows``) ordered by ``order_by`` then the key."""
+    fields = list(fields or resource.fields)
+    stmt = _apply_from(resource, select(*(resource.fields[f] for f in fields)))
+    stmt = _apply_where(resource, stmt, filters or {}, None)
+    stmt = stmt.order_by(*(resource.fields[f] for f in order_by), resource.fields[resource.key]).limit(max_rows)
+    return _rows(db.execute(stmt), fields)
+
+
+def fetch_one(
+    db: Session,
+    resource: Resource,
+    value: Any,
+    fields: Optional[Sequence[str]] = None,
+    lookup: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """The row whose ``lookup`` field (default: the key) equals ``value``, or None."""
+    rows = fetch_rows(db, resource, fields, {lookup or resource.key: value}, max_rows=1)
+    return rows[0] if rows else None
+
+
+def collection_version(
+    db: Session,
+    resource: Resource,
+    filters: Optional[Mapping[str, Any]] = None,
+    updated_since: Optional[datetime] = None,
+) -> Tuple:
+    """
+    (row count, max key, newest timestamp per version column) for the filtered collection.
+
+    Any insert, delete or ORM update of a matching row changes at least one
+    member, so the tuple can stand in for the collection's content.
+    """
+    stmt = _apply_from(resource, select(
+        func.count(),
+        func.max(resource.fields[resource.key]),
+        *(func.max(col) for col in resource.version_columns),
+    ))
+    stmt = _apply_where(resource, stmt, filters or {}, updated_since)
+    return tuple(serialize_value(v) for v in db.execute(stmt).one())
+
+
+def make_etag(resource: Resource, version: Tuple, *request_parts: Any) -> str:
+    """Weak ETag over the collection version and whatever shapes the response (fields, cursor, ...)."""
+    digest = hashlib.sha1(
+        json.dumps([resource.name, list(version), [str(p) for p in request_parts]], default=str).encode("utf-8")
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 7232 weak comparison of an ``If-None-Match`` header against ``etag``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
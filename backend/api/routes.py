@@ -0,0 +1,470 @@
+"""
+HTTP endpoints for instruments and scripts.
+
+Read endpoints (experiments, per-experiment results, samples, pXRF, ICP)
+share one shape: ``fields`` selects columns, ``cursor``/``limit`` page
+through the collection in key order (keyset pagination) and responses carry
+a weak ``ETag`` derived from the rows' ``created_at``/``updated_at``; a
+matching ``If-None-Match`` is answered with ``304 Not Modified`` before any
+row is loaded. See :mod:`backend.api.resources`.
+
+``GET /timeseries`` returns selected metrics of many experiments aligned on
+one time grid (:mod:`backend.services.time_series`), as JSON or as a
+compressed NumPy ``.npz`` (``format=npz``). ``GET /comparison`` returns the
+cross-experiment comparison matrix (conditions, additives, yields, ICP
+endpoints) as JSON, Excel or Parquet.
+
+``POST /ingest/long-format`` accepts batches of long-format metric records
+(the rows of a long-format upload sheet as JSON); they are validated at once
+and written in coalesced bulk transactions by
+:mod:`backend.services.long_format_ingest`.
+
+Upload endpoints hand the file to the same background job runner the Bulk
+Uploads page uses (:mod:`backend.services.upload_jobs`), so API and UI
+uploads go through identical service code, write lock and job history.
+
+All endpoints require ``Authorization: Bearer <token>`` with a token from
+``API_TOKENS`` (``name:token`` pairs, comma-separated; the name is recorded
+as the job's submitter). With no tokens configured the API only serves
+requests when ``API_ALLOW_ANONYMOUS=true``.
+"""
+
+import os
+import hmac
+import json
+import logging
+from datetime import datetime
+from typing import Annotated, Any, Dict, Optional
+
+from fastapi import APIRouter, Body, Depends, File, Form, Header, HTTPException, Query, Request, UploadFile
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from database import get_db, UploadJobStatus
+from backend.api.resources import (
+    RESOURCES, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, Resource,
+    parse_fields, parse_filters, fetch_page, fetch_rows, fetch_one,
+    collection_version, make_etag, etag_matches, serialize_value,
+)
+from backend.services.upload_jobs import UPLOAD_JOB_HANDLERS, get_upload_job_runner
+from backend.services.long_format_ingest import get_long_format_ingestor
+from backend.services.time_series import get_time_series, TIME_AXES, INTERPOLATIONS
+from backend.services.comparison_matrix import build_comparison_matrix, export_comparison_matrix
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_MB = float(os.environ.get("API_MAX_UPLOAD_MB", "50"))
+UPLOAD_WAIT_TIMEOUT = float(os.environ.get("API_UPLOAD_WAIT_TIMEOUT", "300"))
+MAX_INGEST_RECORDS = int(os.environ.get("API_MAX_INGEST_RECORDS", "10000"))
+MAX_SERIES_EXPERIMENTS = int(os.environ.get("API_MAX_SERIES_EXPERIMENTS", "500"))
+MAX_COMPARISON_EXPERIMENTS = int(os.environ.get("API_MAX_COMPARISON_EXPERIMENTS", "1000"))
+ALLOW_ANONYMOUS = os.environ.get("API_ALLOW_ANONYMOUS", "false").lower() in ("1", "true", "yes")
+
+
+def _load_tokens() -> Dict[str, str]:
+    """token -> client name from ``API_TOKENS``."""
+    tokens = {}
+    for entry in os.environ.get("API_TOKENS", "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, token = entry.partition(":")
+        if sep:
+            tokens[token.strip()] = name.strip() or "api"
+        else:
+            tokens[entry] = "api"
+    return tokens
+
+
+API_TOKENS = _load_tokens()
+
+
+def authenticate(authorization: Optional[str] = Header(default=None)) -> str:
+    """FastAPI dependency returning the calling client's name."""
+    if not API_TOKENS:
+        if ALLOW_ANONYMOUS:
+            return "anonymous"
+        raise HTTPException(status_code=503, detail="API access is not configured (set API_TOKENS)")
+    scheme, _, presented = (authorization or "").partition(" ")
+    if scheme.lower() == "bearer" and presented:
+        for token, name in API_TOKENS.items():
+            if hmac.compare_digest(presented.strip(), token):
+                return name
+    raise HTTPException(status_code=401, detail="Invalid or missing bearer token",
+                        headers={"WWW-Authenticate": "Bearer"})
+
+
+router = APIRouter(dependencies=[Depends(authenticate)])
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+def _bad_request(e: ValueError) -> HTTPException:
+    return HTTPException(status_code=400, detail=str(e))
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def _list_response(
+    request: Request,
+    db: Session,
+    resource: Resource,
+    fields: Optional[str],
+    cursor: Optional[str],
+    limit: int,
+    updated_since: Optional[datetime],
+):
+    try:
+        selected = parse_fields(resource, fields)
+        filters = parse_filters(resource, request.query_params)
+    except ValueError as e:
+        raise _bad_request(e)
+
+    etag = make_etag(resource, collection_version(db, resource, filters, updated_since),
+                     selected, sorted(filters.items(), key=str), cursor, limit, updated_since)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return _not_modified(etag)
+
+    try:
+        page = fetch_page(db, resource, selected, filters, after=cursor, limit=limit, updated_since=updated_since)
+    except ValueError as e:
+        raise _bad_request(e)
+
+    headers = {"ETag": etag}
+    if page.next_cursor:
+        headers["Link"] = f'<{request.url.include_query_params(cursor=page.next_cursor)}>; rel="next"'
+    return JSONResponse({"data": page.rows, "next_cursor": page.next_cursor}, headers=headers)
+
+
+def _item_response(request: Request, db: Session, resource: Resource, value: Any,
+                   fields: Optional[str], lookup: Optional[str] = None):
+    try:
+        selected = parse_fields(resource, fields)
+    except ValueError as e:
+        raise _bad_request(e)
+    row = fetch_one(db, resource, value, selected, lookup=lookup)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"{resource.name} {value!r} not found")
+
+    key_value = row[resource.key]
+    etag = make_etag(resource, collection_version(db, resource, {resource.key: key_value}), selected)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return _not_modified(etag)
+    return JSONResponse({"data": row}, headers={"ETag": etag})
+
+
+FieldsParam = Annotated[Optional[str], Query(description="Comma-separated fields to return (default: all)")]
+CursorParam = Annotated[Optional[str], Query(description="next_cursor from the previous page")]
+LimitParam = Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)]
+UpdatedSinceParam = Annotated[Optional[datetime], Query(description="Only rows created or updated at/after this ISO timestamp")]
+
+
+# ---------------------------------------------------------------------------
+# Read endpoints
+# ---------------------------------------------------------------------------
+@router.get("/experiments")
+def list_experiments(
+    request: Request,
+    fields: FieldsParam = None,
+    cursor: CursorParam = None,
+    limit: LimitParam = DEFAULT_PAGE_SIZE,
+    updated_since: UpdatedSinceParam = None,
+    db: Session = Depends(get_db),
+):
+    """Experiments in ``id`` order; filter with experiment_id, sample_id, researcher, status, base_experiment_id."""
+    return _list_response(request, db, RESOURCES["experiments"], fields, cursor, limit, updated_since)
+
+
+@router.get("/experiments/{experiment_id}")
+def get_experiment(request: Request, experiment_id: str, fields: FieldsParam = None,
+                   db: Session = Depends(get_db)):
+    return _item_response(request, db, RESOURCES["experiments"], experiment_id, fields, lookup="experiment_id")
+
+
+@router.get("/experiments/{experiment_id}/results")
+def get_experiment_results(
+    request: Request,
+    experiment_id: str,
+    fields: FieldsParam = None,
+    primary_only: bool = Query(True, description="Only the primary result per timepoint"),
+    db: Session = Depends(get_db),
+):
+    """The experiment's result time series (scalar data), ordered by time post reaction."""
+    resource = RESOURCES["results"]
+    try:
+        selected = parse_fields(resource, fields)
+    except ValueError as e:
+        raise _bad_request(e)
+    filters: Dict[str, Any] = {"experiment_id": experiment_id}
+    if primary_only:
+        filters["is_primary_timepoint_result"] = True
+
+    if fetch_one(db, RESOURCES["experiments"], experiment_id, ["id"], lookup="experiment_id") is None:
+        raise HTTPException(status_code=404, detail=f"experiment {experiment_id!r} not found")
+    etag = make_etag(resource, collection_version(db, resource, filters), selected, primary_only)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return _not_modified(etag)
+    rows = fetch_rows(db, resource, selected, filters, order_by=["time_post_reaction_days"])
+    return JSONResponse({"data": rows}, headers={"ETag": etag})
+
+
+@router.get("/results")
+def list_results(
+    request: Request,
+    fields: FieldsParam = None,
+    cursor: CursorParam = None,
+    limit: LimitParam = DEFAULT_PAGE_SIZE,
+    updated_since: UpdatedSinceParam = None,
+    db: Session = Depends(get_db),
+):
+    """Results with scalar data in ``result_id`` order; filter with experiment_id, is_primary_timepoint_result."""
+    return _list_response(request, db, RESOURCES["results"], fields, cursor, limit, updated_since)
+
+
+@router.get("/icp")
+def list_icp(
+    request: Request,
+    fields: FieldsParam = None,
+    cursor: CursorParam = None,
+    limit: LimitParam = DEFAULT_PAGE_SIZE,
+    updated_since: UpdatedSinceParam = None,
+    db: Session = Depends(get_db),
+):
+    """ICP-OES results in ``icp_id`` order; filter with experiment_id, result_id, is_primary_timepoint_result."""
+    return _list_response(request, db, RESOURCES["icp"], fields, cursor, limit, updated_since)
+
+
+@router.get("/samples")
+def list_samples(
+    request: Request,
+    fields: FieldsParam = None,
+    cursor: CursorParam = None,
+    limit: LimitParam = DEFAULT_PAGE_SIZE,
+    updated_since: UpdatedSinceParam = None,
+    db: Session = Depends(get_db),
+):
+    """Rock samples in ``sample_id`` order; filter with country, state, rock_classification, characterized."""
+    return _list_response(request, db, RESOURCES["samples"], fields, cursor, limit, updated_since)
+
+
+@router.get("/samples/{sample_id}")
+def get_sample(request: Request, sample_id: str, fields: FieldsParam = None,
+               db: Session = Depends(get_db)):
+    return _item_response(request, db, RESOURCES["samples"], sample_id, fields)
+
+
+@router.get("/pxrf")
+def list_pxrf(
+    request: Request,
+    fields: FieldsParam = None,
+    cursor: CursorParam = None,
+    limit: LimitParam = DEFAULT_PAGE_SIZE,
+    updated_since: UpdatedSinceParam = None,
+    db: Session = Depends(get_db),
+):
+    """pXRF readings in ``reading_no`` order."""
+    return _list_response(request, db, RESOURCES["pxrf"], fields, cursor, limit, updated_since)
+
+
+@router.get("/pxrf/{reading_no}")
+def get_pxrf_reading(request: Request, reading_no: str, fields: FieldsParam = None,
+                     db: Session = Depends(get_db)):
+    return _item_response(request, db, RESOURCES["pxrf"], reading_no, fields)
+
+
+@router.get("/timeseries")
+def get_timeseries(
+    experiment_id: str = Query(..., description="Comma-separated experiment IDs"),
+    metrics: str = Query(..., description="Comma-separated metrics (v_primary_experiment_results columns)"),
+    time_axis: str = Query("actual", description=f"One of {', '.join(TIME_AXES)}"),
+    grid_step: Optional[float] = Query(None, gt=0, description="Regular grid step in days (default: observed times)"),
+    grid: Optional[str] = Query(None, description="Comma-separated grid points (overrides grid_step)"),
+    interpolate: Optional[str] = Query(None, description=f"One of {', '.join(INTERPOLATIONS)}"),
+    max_points: int = Query(0, ge=0, description="Downsample to at most this many time points (0 = all)"),
+    format: str = Query("json", pattern="^(json|npz)$"),
+    db: Session = Depends(get_db),
+):
+    """
+    Metrics of several experiments on a common time grid.
+
+    ``values[i][j][k]`` is metric ``j`` of experiment ``i`` at ``times[k]``
+    (null where there is no value). ``format=npz`` returns the same arrays
+    as a compressed NumPy archive (float32 values).
+    """
+    experiment_ids = [e.strip() for e in experiment_id.split(",") if e.strip()]
+    if len(experiment_ids) > MAX_SERIES_EXPERIMENTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SERIES_EXPERIMENTS} experiments per request")
+    try:
+        grid_value = [float(x) for x in grid.split(",") if x.strip()] if grid else grid_step
+        series = get_time_series(
+            db, experiment_ids, [m.strip() for m in metrics.split(",") if m.strip()],
+            time_axis=time_axis, grid=grid_value, interpolate=interpolate, max_points=max_points,
+        )
+    except ValueError as e:
+        raise _bad_request(e)
+    if format == "npz":
+        return Response(series.to_npz(), media_type="application/octet-stream",
+                        headers={"Content-Disposition": 'attachment; filename="timeseries.npz"'})
+    return {"data": series.to_dict()}
+
+
+_EXPORT_MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+@router.get("/comparison")
+def get_comparison(
+    experiment_id: str = Query(..., description="Comma-separated experiment IDs"),
+    yield_metrics: Optional[str] = Query(None, description="Comma-separated scalar metrics (default: standard yields)"),
+    include_icp: bool = Query(True, description="Add ICP element endpoints"),
+    format: str = Query("json", pattern="^(json|xlsx|parquet)$"),
+    transpose: bool = Query(False, description="xlsx only: fields as rows, experiments as columns"),
+    db: Session = Depends(get_db),
+):
+    """Conditions, additives, final/max yields and ICP endpoints, one row per experiment."""
+    experiment_ids = [e.strip() for e in experiment_id.split(",") if e.strip()]
+    if len(experiment_ids) > MAX_COMPARISON_EXPERIMENTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_COMPARISON_EXPERIMENTS} experiments per request")
+    metrics = [m.strip() for m in yield_metrics.split(",") if m.strip()] if yield_metrics else None
+    try:
+        matrix, missing = build_comparison_matrix(db, experiment_ids, yield_metrics=metrics, include_icp=include_icp)
+    except ValueError as e:
+        raise _bad_request(e)
+    if format != "json":
+        return Response(export_comparison_matrix(matrix, format, transpose=transpose),
+                        media_type=_EXPORT_MEDIA_TYPES[format],
+                        headers={"Content-Disposition": f'attachment; filename="comparison.{format}"'})
+    rows = json.loads(matrix.reset_index().to_json(orient="records", date_format="iso"))
+    return {"data": rows, "missing_experiments": missing}
+
+
+# ---------------------------------------------------------------------------
+# Uploads
+# ---------------------------------------------------------------------------
+def _job_dict(job) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "upload_type": job.upload_type,
+        "file_name": job.file_name,
+        "status": job.status,
+        "progress": job.progress,
+        "message": job.message,
+        "summary": job.summary,
+        "errors": job.errors or [],
+        "warnings": job.warnings or [],
+        "feedbacks": job.feedbacks or [],
+        "submitted_by": job.submitted_by,
+        "created_at": serialize_value(job.created_at),
+        "started_at": serialize_value(job.started_at),
+        "finished_at": serialize_value(job.finished_at),
+    }
+
+
+@router.get("/uploads/types")
+def list_upload_types():
+    return {"data": [{"upload_type": key, "label": handler.label} for key, handler in UPLOAD_JOB_HANDLERS.items()]}
+
+
+@router.post("/uploads/{upload_type}")
+async def create_upload(
+    request: Request,
+    upload_type: str,
+    file: UploadFile = File(...),
+    options: Optional[str] = Form(None, description="JSON object of service options, e.g. {\"overwrite\": true}"),
+    wait: bool = Query(False, description="Block until the job finishes and return its outcome"),
+    client: str = Depends(authenticate),
+):
+    """
+    Run a bulk upload service on the posted file.
+
+    Returns ``202`` with the queued job (poll ``/uploads/jobs/{id}``), or with
+    ``wait=true`` the finished job: ``200`` on success, ``422`` when the
+    service reported errors (nothing was written).
+    """
+    if upload_type not in UPLOAD_JOB_HANDLERS:
+        raise HTTPException(status_code=404, detail=f"Unknown upload type {upload_type!r}; see /uploads/types")
+    try:
+        parsed_options = json.loads(options) if options else {}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"options is not valid JSON: {e}")
+    if not isinstance(parsed_options, dict):
+        raise HTTPException(status_code=400, detail="options must be a JSON object")
+
+    file_bytes = await file.read()
+    if len(file_bytes) > MAX_UPLOAD_MB * 1024 * 1024:
+        raise HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_MB:g} MB")
+    if not file_bytes:
+        raise HTTPException(status_code=400, detail="Uploaded file is empty")
+
+    runner = get_upload_job_runner(mark_interrupted=False)
+    job_id = await run_in_threadpool(
+        runner.submit, upload_type, file_bytes,
+        file_name=file.filename, options=parsed_options, submitted_by=client,
+    )
+    logger.info(f"API upload job {job_id} ({upload_type}) submitted by {client}")
+    location = str(request.url_for("get_upload_job", job_id=job_id))
+
+    job = None
+    if wait:
+        try:
+            job = await run_in_threadpool(runner.wait, job_id, UPLOAD_WAIT_TIMEOUT)
+        except TimeoutError:
+            job = None  # still running; report it as accepted
+    if job is None or job.status not in (UploadJobStatus.SUCCEEDED.value, UploadJobStatus.FAILED.value):
+        job = await run_in_threadpool(runner.get_job, job_id)
+        return JSONResponse({"data": _job_dict(job)}, status_code=202, headers={"Location": location})
+    status_code = 422 if job.status == UploadJobStatus.FAILED.value else 200
+    return JSONResponse({"data": _job_dict(job)}, status_code=status_code, headers={"Location": location})
+
+
+@router.get("/uploads/jobs/{job_id}")
+def get_upload_job(job_id: int):
+    job = get_upload_job_runner(mark_interrupted=False).get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"upload job {job_id} not found")
+    return {"data": _job_dict(job)}
+
+
+# ---------------------------------------------------------------------------
+# Streaming ingest
+# ---------------------------------------------------------------------------
+@router.post("/ingest/long-format")
+def ingest_long_format(
+    payload: Dict[str, Any] = Body(..., examples=[{"records": [
+        {"experiment_id": "HPHT_MH_001", "time_post_reaction": 7, "metric": "final_ph", "value": 8.1},
+    ]}]),
+    flush: bool = Query(False, description="Write pending records before returning"),
+    client: str = Depends(authenticate),
+):
+    """
+    Queue long-format metric records for bulk writing.
+
+    Body: ``{"records": [{experiment_id, time_post_reaction, metric, value, unit?}, ...]}``.
+    Invalid records are rejected individually and listed in ``errors``; the
+    rest are accepted (``202``) and written on the next flush. With
+    ``flush=true`` the pending queue is written first and the flush summary
+    is returned (``200``).
+    """
+    records = payload.get("records") if isinstance(payload, dict) else None
+    if not isinstance(records, list):
+        raise HTTPException(status_code=400, detail="Body must be an object with a 'records' list")
+    if len(records) > MAX_INGEST_RECORDS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_INGEST_RECORDS} records per request")
+
+    ingestor = get_long_format_ingestor()
+    outcome = ingestor.submit(records, source=client)
+    if not flush:
+        return JSONResponse({"data": outcome}, status_code=202)
+    outcome["flush"] = ingestor.flush()
+    return {"data": outcome}
+
+
+@router.get("/ingest/long-format/stats")
+def long_format_ingest_stats():
+    return {"data": get_long_format_ingestor().stats()}
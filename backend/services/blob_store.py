@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from database import StoredBlob, ResultFiles, AnalysisFiles, SamplePhotos
+from database.event_listeners import release_unreferenced_blobs
+from utils.batching import chunked
+from utils.storage import save_files
+
+logger = logging.getLogger(__name__)
+
+BLOB_FOLDER = "blobs"
+GARBAGE_MIN_AGE = timedelta(hours=1)
+
+
+def content_hash(file_data: bytes) -> str:
+    """SHA-256 hex digest used as the blob key."""
+    return hashlib.sha256(file_data).hexdigest()
+
+
+def blob_location(sha256: str, file_name: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Storage (folder, file name) for a blob.
+
+    Blobs are fanned out by the first two hex digits. The original extension
+    is kept so previews and downloads can still infer the format.
+    """
+    ext = os.path.splitext(file_name or "")[1].lower()
+    return f"{BLOB_FOLDER}/{sha256[:2]}", f"{sha256}{ext}"
+
+
+def _insert_missing(db: Session, rows: List[dict]) -> None:
+    """Insert blob rows, ignoring ones another session created in the meantime."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        db.execute(insert(StoredBlob.__table__), rows)
+        return
+    db.execute(dialect_insert(StoredBlob.__table__).on_conflict_do_nothing(), rows)
+
+
+class BlobStore:
+    @staticmethod
+    def store_many(
+        db: Session,
+        files: Iterable[Tuple[bytes, str, Optional[str]]],
+        create_backup: bool = True,
+    ) -> List[Union[StoredBlob, Exception]]:
+        """
+        Store files content-addressed, uploading only content not stored yet.
+
+        Args:
+            db: SQLAlchemy session
+            files: (file_data, file_name, mime_type) tuples
+            create_backup: Whether new blobs also get a backup copy
+
+        Returns:
+            One StoredBlob per input file, in input order, or the exception
+            that prevented that file from being stored. New blobs start with
+            ref_count 0; adding a ResultFiles/AnalysisFiles/SamplePhotos row
+            with ``blob_sha256`` set increments it on flush.
+        """
+        files = list(files)
+        hashes = [content_hash(data) for data, _, _ in files]
+
+        existing = {}
+        for chunk in chunked(set(hashes)):
+            for blob in db.query(StoredBlob).filter(StoredBlob.sha256.in_(chunk)).all():
+                existing[blob.sha256] = blob
+
+        # One upload per new content hash, even if it appears several times in this batch
+        to_upload = {}
+        for sha, (data, name, mime_type) in zip(hashes, files):
+            if sha not in existing and sha not in to_upload:
+                to_upload[sha] = (data, name, mime_type)
+
+        failed = {}
+        if to_upload:
+            shas = list(to_upload)
+            jobs = []
+            for sha in shas:
+                data, name, _ = to_upload[sha]
+                folder, blob_name = blob_location(sha, name)
+                jobs.append((data, blob_name, folder))
+            paths = save_files(jobs, create_backup=create_backup, return_exceptions=True)
+
+            rows = []
+            for sha, path in zip(shas, paths):
+                if isinstance(path, Exception):
+                    failed[sha] = path
+                    continue
+                data, _, mime_type = to_upload[sha]
+                rows.append({
+                    "sha256": sha, "file_path": path, "size_bytes": len(data),
+                    "file_type": mime_type, "ref_count": 0,
+                })
+            if rows:
+                _insert_missing(db, rows)
+                for chunk in chunked([r["sha256"] for r in rows]):
+                    for blob in db.query(StoredBlob).filter(StoredBlob.sha256.in_(chunk)).all():
+                        existing[blob.sha256] = blob
+            logger.info(f"Stored {len(rows)} new blob(s); {len(files) - len(to_upload)} file(s) deduplicated")
+
+        return [failed.get(sha) or existing[sha] for sha in hashes]
+
+    @staticmethod
+    def store(
+        db: Session,
+        file_data: bytes,
+        file_name: str,
+        mime_type: Optional[str] = None,
+        create_backup: bool = True,
+    ) -> StoredBlob:
+        """Store one file content-addressed; raises if the upload fails."""
+        result = BlobStore.store_many(db, [(file_data, file_name, mime_type)], create_backup=create_backup)[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    @staticmethod
+    def recount_references(db: Session) -> int:
+        """
+        Recompute every blob's ref_count from the referencing tables.
+
+        Repairs counts after bulk SQL or database-level cascades that bypass
+        the ORM flush listener. Returns the number of blobs corrected.
+        """
+        counts = {}
+        for model in (ResultFiles, AnalysisFiles, SamplePhotos):
+            for sha, n in (
+                db.query(model.blob_sha256, func.count())
+                .filter(model.blob_sha256.isnot(None))
+                .group_by(model.blob_sha256)
+                .all()
+            ):
+                counts[sha] = counts.get(sha, 0) + n
+
+        fixes = [
+            {"sha256": sha, "ref_count": counts.get(sha, 0)}
+            for sha, current in db.query(StoredBlob.sha256, StoredBlob.ref_count).all()
+            if current != counts.get(sha, 0)
+        ]
+        if fixes:
+            db.execute(update(StoredBlob), fixes)
+        return len(fixes)
+
+    @staticmethod
+    def collect_garbage(db: Session, min_age: timedelta = GARBAGE_MIN_AGE) -> List[str]:
+        """
+        Delete unreferenced blobs and their stored files.
+
+        Counts are recomputed first. Blobs younger than ``min_age`` are kept,
+        since an upload in progress stores its blob before adding the row that
+        references it. File deletion happens after the caller commits (same
+        path as a normal release). Returns the released hashes.
+        """
+        BlobStore.recount_references(db)
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - min_age
+        unreferenced = list(db.execute(
+            select(StoredBlob.sha256).where(StoredBlob.ref_count <= 0, StoredBlob.created_at <= cutoff)
+        ).scalars())
+        release_unreferenced_blobs(db, unreferenced)
+        return unreferenced
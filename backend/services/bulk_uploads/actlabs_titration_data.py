@@ -2,12 +2,17 @@ from __future__ import annotations
 
 import io
 import math
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import pandas as pd
+from sqlalchemy import insert, update
 from sqlalchemy.orm import Session
 
 from database import Analyte, AnalysisType, ElementalAnalysis, ExternalAnalysis, SampleInfo
+from database.event_listeners import update_samples_characterized_status
+from backend.services.upload_cache import upload_cache
+from utils.batching import chunked
+from utils.progress import ProgressCallback, report, scaled, track
 
 
 def _normalize_sample_id_for_match(s: str) -> str:
@@ -29,38 +34,128 @@ def _build_fuzzy_sample_id_lookup(db: Session) -> Dict[str, str]:
     return lookup
 
 
-def _get_or_create_bulk_external_analysis(
+def _resolve_bulk_external_analyses(
     db: Session,
-    sample_id: str,
+    sample_ids: Iterable[str],
     *,
     analysis_type: str,
     laboratory: Optional[str],
     description: str,
-) -> ExternalAnalysis:
+) -> Dict[str, int]:
     """
     One ExternalAnalysis per (sample, type, laboratory) for bulk elemental imports so
-    ElementalAnalysis rows always have a valid external_analysis_id.
+    ElementalAnalysis rows always have a valid external_analysis_id. Returns
+    sample_id -> ExternalAnalysis.id, creating missing parents in a single flush.
     """
-    q = db.query(ExternalAnalysis).filter(
-        ExternalAnalysis.sample_id == sample_id,
-        ExternalAnalysis.analysis_type == analysis_type,
-    )
-    if laboratory is None:
-        q = q.filter(ExternalAnalysis.laboratory.is_(None))
-    else:
-        q = q.filter(ExternalAnalysis.laboratory == laboratory)
-    found = q.first()
-    if found:
-        return found
-    row = ExternalAnalysis(
-        sample_id=sample_id,
+    wanted = set(sample_ids)
+    ext_ids: Dict[str, int] = {}
+    for chunk in chunked(wanted):
+        q = db.query(ExternalAnalysis.sample_id, ExternalAnalysis.id).filter(
+            ExternalAnalysis.sample_id.in_(chunk),
+            ExternalAnalysis.analysis_type == analysis_type,
+        )
+        if laboratory is None:
+            q = q.filter(ExternalAnalysis.laboratory.is_(None))
+        else:
+            q = q.filter(ExternalAnalysis.laboratory == laboratory)
+        for sid, ext_id in q.order_by(ExternalAnalysis.id).all():
+            ext_ids.setdefault(sid, ext_id)
+
+    missing = [
+        ExternalAnalysis(
+            sample_id=sid,
+            analysis_type=analysis_type,
+            laboratory=laboratory,
+            description=description,
+        )
+        for sid in sorted(wanted - set(ext_ids))
+    ]
+    if missing:
+        db.add_all(missing)
+        db.flush()
+        ext_ids.update({row.sample_id: row.id for row in missing})
+    return ext_ids
+
+
+def _bulk_upsert_elemental_cells(
+    db: Session,
+    cells: List[Tuple[str, int, float]],
+    *,
+    analysis_type: str,
+    laboratory: Optional[str],
+    description: str,
+    progress: Optional[ProgressCallback] = None,
+) -> Tuple[int, int]:
+    """
+    Upsert ElementalAnalysis rows for (canonical sample_id, analyte_id, value) cells.
+
+    Parents are resolved up front, existing (external_analysis_id, analyte_id)
+    rows are loaded in one pass and diffed in memory, and the result is written
+    with one bulk INSERT and one bulk UPDATE. A repeated cell in the upload
+    counts as an update (last value wins). Returns (created, updated).
+    """
+    if not cells:
+        return 0, 0
+
+    ext_by_sample = _resolve_bulk_external_analyses(
+        db,
+        (sid for sid, _aid, _v in cells),
         analysis_type=analysis_type,
         laboratory=laboratory,
         description=description,
     )
-    db.add(row)
-    db.flush()
-    return row
+
+    report(progress, 0.1, f"Resolved {len(ext_by_sample)} samples")
+
+    existing: Dict[Tuple[int, int], Tuple[int, Optional[float], Optional[str]]] = {}
+    ext_chunks = list(chunked(set(ext_by_sample.values())))
+    for chunk in track(ext_chunks, scaled(progress, 0.1, 0.6), label="sample batches"):
+        rows = db.query(
+            ElementalAnalysis.external_analysis_id,
+            ElementalAnalysis.analyte_id,
+            ElementalAnalysis.id,
+            ElementalAnalysis.analyte_composition,
+            ElementalAnalysis.sample_id,
+        ).filter(ElementalAnalysis.external_analysis_id.in_(chunk)).all()
+        for ext_id, analyte_id, row_id, value, sid in rows:
+            existing.setdefault((ext_id, analyte_id), (row_id, value, sid))
+
+    inserts: Dict[Tuple[int, int], Dict[str, object]] = {}
+    updates: Dict[int, Dict[str, object]] = {}
+    created = updated = 0
+    for sample_id, analyte_id, value in cells:
+        key = (ext_by_sample[sample_id], analyte_id)
+        if key in existing:
+            row_id, old_value, old_sid = existing[key]
+            if old_value != value or old_sid != sample_id or row_id in updates:
+                updates[row_id] = {"id": row_id, "analyte_composition": value, "sample_id": sample_id}
+            updated += 1
+        elif key in inserts:
+            inserts[key]["analyte_composition"] = value
+            updated += 1
+        else:
+            inserts[key] = {
+                "external_analysis_id": key[0],
+                "sample_id": sample_id,
+                "analyte_id": analyte_id,
+                "analyte_composition": value,
+            }
+            created += 1
+
+    report(progress, 0.7, "Writing results")
+    if inserts:
+        db.execute(insert(ElementalAnalysis), list(inserts.values()))
+    if updates:
+        db.execute(update(ElementalAnalysis), list(updates.values()))
+
+    # Bulk statements bypass the before_flush listener, so refresh flags here
+    touched = {row["sample_id"] for row in inserts.values()}
+    touched.update(row["sample_id"] for row in updates.values())
+    touched.update(sid for row_id, _v, sid in existing.values() if row_id in updates)
+    update_samples_characterized_status(db, touched)
+    report(progress, 1.0, f"Wrote {created + updated} results")
+
+    return created, updated
 
 
 class AnalyteService:
@@ -106,7 +201,11 @@ class AnalyteService:
 
 class ElementalCompositionService:
     @staticmethod
-    def bulk_upsert_wide_from_excel(db: Session, file_bytes: bytes) -> Tuple[int, int, int, List[str]]:
+    def bulk_upsert_wide_from_excel(
+        db: Session,
+        file_bytes: bytes,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Tuple[int, int, int, List[str]]:
         """
         Upsert ElementalAnalysis from a wide Excel file:
           - First column: sample_id
@@ -139,9 +238,15 @@ class ElementalCompositionService:
         all_analytes = db.query(Analyte).all()
         symbol_to_analyte = {a.analyte_symbol.lower(): a for a in all_analytes}
         sample_id_lookup = _build_fuzzy_sample_id_lookup(db)
-        ext_by_sample: Dict[str, ExternalAnalysis] = {}
+        header_analytes = [
+            (symbol, symbol_to_analyte[str(symbol).lower()].id)
+            for symbol in analyte_headers
+            # Unknown analyte headers are ignored; user should upload Analytes first
+            if str(symbol).lower() in symbol_to_analyte
+        ]
+        cells: List[Tuple[str, int, float]] = []
 
-        for idx, row in df.iterrows():
+        for idx, row in track(df.iterrows(), scaled(progress, 0.0, 0.3), total=len(df)):
             try:
                 sample_id_raw = str(row.get(sample_col) or '').strip()
                 if not sample_id_raw:
@@ -153,21 +258,7 @@ class ElementalCompositionService:
                     skipped += 1
                     continue
 
-                if canonical_id not in ext_by_sample:
-                    ext_by_sample[canonical_id] = _get_or_create_bulk_external_analysis(
-                        db,
-                        canonical_id,
-                        analysis_type=AnalysisType.ELEMENTAL.value,
-                        laboratory="Bulk composition",
-                        description="Elemental composition (wide template upload)",
-                    )
-                ext_parent = ext_by_sample[canonical_id]
-
-                for symbol in analyte_headers:
-                    analyte = symbol_to_analyte.get(str(symbol).lower())
-                    if not analyte:
-                        # Unknown analyte header; user should upload Analytes first
-                        continue
+                for symbol, analyte_id in header_analytes:
                     val = row.get(symbol)
                     if val is None or (isinstance(val, float) and pd.isna(val)):
                         continue
@@ -175,43 +266,46 @@ class ElementalCompositionService:
                         fval = float(val)
                     except Exception:
                         continue
-
-                    existing = (
-                        db.query(ElementalAnalysis)
-                        .filter(
-                            ElementalAnalysis.external_analysis_id == ext_parent.id,
-                            ElementalAnalysis.analyte_id == analyte.id,
-                        )
-                        .first()
-                    )
-                    if existing:
-                        existing.analyte_composition = fval
-                        existing.sample_id = canonical_id
-                        updated += 1
-                    else:
-                        db.add(
-                            ElementalAnalysis(
-                                external_analysis_id=ext_parent.id,
-                                sample_id=canonical_id,
-                                analyte_id=analyte.id,
-                                analyte_composition=fval,
-                            )
-                        )
-                        created += 1
+                    cells.append((canonical_id, analyte_id, fval))
             except Exception as e:
                 errors.append(f"Row {idx+2}: {e}")
 
+        try:
+            created, updated = _bulk_upsert_elemental_cells(
+                db,
+                cells,
+                analysis_type=AnalysisType.ELEMENTAL.value,
+                laboratory="Bulk composition",
+                description="Elemental composition (wide template upload)",
+                progress=scaled(progress, 0.3, 1.0),
+            )
+        except Exception as e:
+            errors.append(f"Failed to write elemental composition: {e}")
+
         return created, updated, skipped, errors
 
 
 class ActlabsRockTitrationService:
     """Parser and importer for ActLabs rock titration files (Excel or CSV)."""
 
+    # Bump when the cached table read below changes shape
+    PARSER_VERSION = 1
+
     @staticmethod
     def _read_table_with_mode(file_bytes: bytes) -> Tuple[pd.DataFrame, Optional[str], Optional[str]]:
         """Read file and return (df, mode, error).
         mode is one of {"excel", "csv"} when successful.
+        Cached by content hash so diagnose() and import_excel() share one read.
         """
+        return upload_cache.get_or_compute(
+            "actlabs_titration.read_table",
+            ActlabsRockTitrationService.PARSER_VERSION,
+            file_bytes,
+            lambda: ActlabsRockTitrationService._read_table_uncached(file_bytes),
+        )
+
+    @staticmethod
+    def _read_table_uncached(file_bytes: bytes) -> Tuple[pd.DataFrame, Optional[str], Optional[str]]:
         try:
             df = pd.read_excel(io.BytesIO(file_bytes), header=None)
             return df, "excel", None
@@ -226,17 +320,8 @@ class ActlabsRockTitrationService:
     @staticmethod
     def _read_table(file_bytes: bytes) -> Tuple[pd.DataFrame, Optional[str]]:
         """Try reading as Excel first, then CSV; always return a headerless table (header=None)."""
-        try:
-            df = pd.read_excel(io.BytesIO(file_bytes), header=None)
-            return df, None
-        except Exception:
-            pass
-        try:
-            # Read CSV without headers
-            df = pd.read_csv(io.BytesIO(file_bytes), header=None)
-            return df, None
-        except Exception as e:
-            return pd.DataFrame(), f"Failed to read file as Excel or CSV: {e}"
+        df, _mode, err = ActlabsRockTitrationService._read_table_with_mode(file_bytes)
+        return df, err
 
     @staticmethod
     def _detect_sample_id_col(df_raw: pd.DataFrame) -> int:
@@ -411,7 +496,12 @@ class ActlabsRockTitrationService:
         return diags, warnings
 
     @classmethod
-    def import_excel(cls, db: Session, file_bytes: bytes) -> Tuple[int, int, int, List[str]]:
+    def import_excel(
+        cls,
+        db: Session,
+        file_bytes: bytes,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Tuple[int, int, int, List[str]]:
         """
         Import ActLabs Excel to normalized tables.
         - Upserts analytes (last header wins for units)
@@ -440,25 +530,30 @@ class ActlabsRockTitrationService:
         data = df_raw.iloc[data_start:, :].reset_index(drop=True)
 
         # Upsert analytes (last column wins for unit)
+        symbol_to_analyte = {a.analyte_symbol.lower(): a for a in db.query(Analyte).all()}
         for sym, (_c, unit) in symbol_to_col_unit.items():
-            existing = db.query(Analyte).filter(Analyte.analyte_symbol.ilike(sym)).first()
+            existing = symbol_to_analyte.get(sym.lower())
             if existing:
                 if unit:
                     existing.unit = unit
             else:
-                db.add(Analyte(analyte_symbol=sym, unit=unit or "ppm"))
+                analyte = Analyte(analyte_symbol=sym, unit=unit or "ppm")
+                db.add(analyte)
+                symbol_to_analyte[sym.lower()] = analyte
 
-        # Flush so new Analyte rows are visible when autoflush is disabled (e.g. test sessions)
+        # Flush so new Analyte rows get ids (autoflush may be disabled, e.g. test sessions)
         db.flush()
 
-        # Preload analyte ids
-        all_analytes = db.query(Analyte).all()
-        symbol_to_analyte = {a.analyte_symbol.lower(): a for a in all_analytes}
         sample_id_lookup = _build_fuzzy_sample_id_lookup(db)
-        ext_by_sample: Dict[str, ExternalAnalysis] = {}
+        analyte_columns = [
+            (col_idx, symbol_to_analyte[sym.lower()].id)
+            for sym, (col_idx, _unit) in symbol_to_col_unit.items()
+            if col_idx < data.shape[1]
+        ]
+        cells: List[Tuple[str, int, float]] = []
 
         # Iterate rows
-        for i in range(len(data)):
+        for i in track(range(len(data)), scaled(progress, 0.0, 0.3)):
             sid_raw = data.iat[i, sample_id_col]
             if pd.isna(sid_raw):
                 continue
@@ -470,49 +565,20 @@ class ActlabsRockTitrationService:
                 skipped += 1
                 continue
 
-            if canonical_id not in ext_by_sample:
-                ext_by_sample[canonical_id] = _get_or_create_bulk_external_analysis(
-                    db,
-                    canonical_id,
-                    analysis_type=AnalysisType.TITRATION.value,
-                    laboratory="ActLabs",
-                    description="Rock titration (ActLabs bulk import)",
-                )
-            ext_parent = ext_by_sample[canonical_id]
-
-            for sym, (col_idx, _unit) in symbol_to_col_unit.items():
-                if col_idx >= data.shape[1]:
-                    continue
-                cell = data.iat[i, col_idx]
-                vnum, _vtext = cls._coerce_number(cell)
+            for col_idx, analyte_id in analyte_columns:
+                vnum, _vtext = cls._coerce_number(data.iat[i, col_idx])
                 if vnum is None:
                     continue
-                analyte = symbol_to_analyte.get(sym.lower())
-                if not analyte:
-                    # If misaligned, skip
-                    continue
-                existing = (
-                    db.query(ElementalAnalysis)
-                    .filter(
-                        ElementalAnalysis.external_analysis_id == ext_parent.id,
-                        ElementalAnalysis.analyte_id == analyte.id,
-                    )
-                    .first()
-                )
-                if existing:
-                    existing.analyte_composition = vnum
-                    existing.sample_id = canonical_id
-                    results_updated += 1
-                else:
-                    db.add(
-                        ElementalAnalysis(
-                            external_analysis_id=ext_parent.id,
-                            sample_id=canonical_id,
-                            analyte_id=analyte.id,
-                            analyte_composition=vnum,
-                        )
-                    )
-                    results_created += 1
+                cells.append((canonical_id, analyte_id, vnum))
+
+        results_created, results_updated = _bulk_upsert_elemental_cells(
+            db,
+            cells,
+            analysis_type=AnalysisType.TITRATION.value,
+            laboratory="ActLabs",
+            description="Rock titration (ActLabs bulk import)",
+            progress=scaled(progress, 0.3, 1.0),
+        )
 
         return results_created, results_updated, skipped, errors
 
@@ -1,20 +1,28 @@
 from __future__ import annotations
 
 import io
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
+from sqlalchemy import insert, update
 from sqlalchemy.orm import Session
 
 from database import SampleInfo, ExternalAnalysis, XRDAnalysis
 from database.models import XRDPhase
+from utils.batching import chunked
+from utils.progress import ProgressCallback, report
 
 
 class XRDUploadService:
     @staticmethod
-    def bulk_upsert_from_excel(db: Session, file_bytes: bytes) -> Tuple[int, int, int, int, int, int, int, List[str]]:
+    def bulk_upsert_from_excel(
+        db: Session,
+        file_bytes: bytes,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Tuple[int, int, int, int, int, int, int, List[str]]:
         """
         Upsert XRD mineralogy per sample from an Excel file.
+        ``progress`` (optional) is called after each pass.
         Returns (
           created_ext, updated_ext, created_json, updated_json, created_phase, updated_phase, skipped_rows, errors
         ).
@@ -46,91 +54,150 @@ class XRDUploadService:
         if not mineral_cols:
             return 0, 0, 0, 0, 0, 0, 0, ["No mineral columns detected."]
 
+        # Pass 1: parse rows, skipping blanks and non-numeric cells
+        parsed_rows: List[Tuple[int, str, Dict[str, float], Dict[str, float]]] = []
         for idx, row in df.iterrows():
-            try:
-                sample_id = str(row.get(sample_col) or '').strip()
-                if not sample_id:
-                    skipped += 1
-                    continue
-
-                # Validate sample exists
-                sample = db.query(SampleInfo).filter(SampleInfo.sample_id == sample_id).first()
-                if not sample:
-                    errors.append(f"Row {idx+2}: sample_id '{sample_id}' not found")
-                    continue
-
-                # Build mineral dict from columns, skipping blanks and non-numeric
-                mineral_data = {}
-                for mcol in mineral_cols:
-                    val = row.get(mcol)
-                    try:
-                        if val is None or (isinstance(val, float) and pd.isna(val)):
-                            continue
-                        fval = float(val)
-                    except Exception:
+            sample_id = str(row.get(sample_col) or '').strip()
+            if not sample_id:
+                skipped += 1
+                continue
+
+            # mineral_data keys are lowercased for the JSON model; phases keep
+            # the header as displayed
+            mineral_data: Dict[str, float] = {}
+            phase_amounts: Dict[str, float] = {}
+            for mcol in mineral_cols:
+                val = row.get(mcol)
+                try:
+                    if val is None or (isinstance(val, float) and pd.isna(val)):
                         continue
-                    mineral_data[mcol.strip().lower()] = fval
-
-                # Find or create ExternalAnalysis for this sample/type
-                ext = (
-                    db.query(ExternalAnalysis)
-                    .filter(
-                        ExternalAnalysis.sample_id == sample_id,
-                        ExternalAnalysis.analysis_type == "XRD",
-                    )
-                    .first()
-                )
-                if not ext:
-                    ext = ExternalAnalysis(sample_id=sample_id, analysis_type="XRD")
-                    db.add(ext)
-                    db.flush()
-                    created_ext += 1
+                    fval = float(val)
+                except Exception:
+                    continue
+                mineral_data[mcol.strip().lower()] = fval
+            for mcol in mineral_cols:
+                display_name = str(mcol).strip()
+                if display_name.lower() in mineral_data:
+                    phase_amounts[display_name] = mineral_data[display_name.lower()]
+            parsed_rows.append((idx + 2, sample_id, mineral_data, phase_amounts))
+
+        report(progress, 0.25, f"Parsed {len(parsed_rows)} samples")
+
+        # Pass 2: resolve samples, XRD ExternalAnalysis parents, JSON rows and
+        # existing phases with one query each per chunk of IDs
+        referenced = {sample_id for _r, sample_id, _m, _p in parsed_rows}
+        known_samples = set()
+        for chunk in chunked(referenced):
+            known_samples.update(
+                sid for (sid,) in db.query(SampleInfo.sample_id).filter(SampleInfo.sample_id.in_(chunk)).all()
+            )
+
+        exts: List[ExternalAnalysis] = []
+        for chunk in chunked(known_samples):
+            exts.extend(
+                db.query(ExternalAnalysis)
+                .filter(ExternalAnalysis.sample_id.in_(chunk), ExternalAnalysis.analysis_type == "XRD")
+                .all()
+            )
+        ext_by_sample: Dict[str, ExternalAnalysis] = {}
+        for ext in sorted(exts, key=lambda e: e.id):
+            ext_by_sample.setdefault(ext.sample_id, ext)
+
+        xrds: List[XRDAnalysis] = []
+        for chunk in chunked(e.id for e in ext_by_sample.values()):
+            xrds.extend(db.query(XRDAnalysis).filter(XRDAnalysis.external_analysis_id.in_(chunk)).all())
+        xrd_by_ext: Dict[int, XRDAnalysis] = {}
+        for xrd in sorted(xrds, key=lambda x: x.id):
+            xrd_by_ext.setdefault(xrd.external_analysis_id, xrd)
+
+        phase_rows = []
+        for chunk in chunked(known_samples):
+            phase_rows.extend(
+                db.query(XRDPhase.id, XRDPhase.sample_id, XRDPhase.mineral_name, XRDPhase.external_analysis_id)
+                .filter(XRDPhase.sample_id.in_(chunk))
+                .all()
+            )
+        existing_phases: Dict[Tuple[str, str], Tuple[int, Optional[int]]] = {}
+        for phase_id, sid, mineral_name, ext_id in sorted(phase_rows, key=lambda r: r[0]):
+            existing_phases.setdefault((sid, mineral_name), (phase_id, ext_id))
+
+        # Create missing XRD parents in one flush so new phases can reference them
+        new_exts = [
+            ExternalAnalysis(sample_id=sid, analysis_type="XRD")
+            for sid in sorted({r[1] for r in parsed_rows if r[1] in known_samples} - set(ext_by_sample))
+        ]
+        if new_exts:
+            db.add_all(new_exts)
+            db.flush()
+        new_ext_ids = {ext.id for ext in new_exts}
+        ext_by_sample.update({ext.sample_id: ext for ext in new_exts})
+
+        report(progress, 0.5, "Loaded existing XRD analyses")
+
+        # Pass 3: diff in memory; later rows for the same sample win
+        phase_inserts: Dict[Tuple[str, str], Dict[str, object]] = {}
+        phase_updates: Dict[int, Dict[str, object]] = {}
+        for row_num, sample_id, mineral_data, phase_amounts in parsed_rows:
+            if sample_id not in known_samples:
+                errors.append(f"Row {row_num}: sample_id '{sample_id}' not found")
+                continue
+
+            ext = ext_by_sample[sample_id]
+            if ext.id in new_ext_ids:
+                new_ext_ids.discard(ext.id)
+                created_ext += 1
+            else:
+                updated_ext += 1
+
+            # Upsert JSON model
+            xrd = xrd_by_ext.get(ext.id)
+            if xrd:
+                xrd.mineral_phases = mineral_data or None
+                updated_json += 1
+            else:
+                xrd = XRDAnalysis(external_analysis_id=ext.id, mineral_phases=mineral_data or None)
+                db.add(xrd)
+                xrd_by_ext[ext.id] = xrd
+                created_json += 1
+
+            # Upsert normalized phases per mineral
+            for display_name, amount_val in phase_amounts.items():
+                key = (sample_id, display_name)
+                if key in existing_phases:
+                    phase_id, phase_ext_id = existing_phases[key]
+                    values: Dict[str, object] = {"id": phase_id, "amount": amount_val}
+                    if phase_ext_id is None:
+                        values["external_analysis_id"] = ext.id
+                    phase_updates.setdefault(phase_id, {}).update(values)
+                    updated_phase += 1
+                elif key in phase_inserts:
+                    phase_inserts[key]["amount"] = amount_val
+                    updated_phase += 1
                 else:
-                    updated_ext += 1
+                    phase_inserts[key] = {
+                        "sample_id": sample_id,
+                        "external_analysis_id": ext.id,
+                        "mineral_name": display_name,
+                        "amount": amount_val,
+                    }
+                    created_phase += 1
 
-                # Upsert JSON model
-                xrd = db.query(XRDAnalysis).filter(XRDAnalysis.external_analysis_id == ext.id).first()
-                if xrd:
-                    xrd.mineral_phases = mineral_data or None
-                    updated_json += 1
-                else:
-                    xrd = XRDAnalysis(external_analysis_id=ext.id, mineral_phases=mineral_data or None)
-                    db.add(xrd)
-                    created_json += 1
-
-                # Upsert normalized phases per mineral
-                for mcol in mineral_cols:
-                    display_name = str(mcol).strip()
-                    key = display_name.lower()
-                    if key not in mineral_data:
-                        continue
-                    amount_val = mineral_data[key]
-
-                    phase = (
-                        db.query(XRDPhase)
-                        .filter(
-                            XRDPhase.sample_id == sample_id,
-                            XRDPhase.mineral_name == display_name,
-                        )
-                        .first()
-                    )
-                    if phase:
-                        phase.amount = amount_val
-                        if phase.external_analysis_id is None:
-                            phase.external_analysis_id = ext.id
-                        updated_phase += 1
-                    else:
-                        phase = XRDPhase(
-                            sample_id=sample_id,
-                            external_analysis_id=ext.id,
-                            mineral_name=display_name,
-                            amount=amount_val,
-                        )
-                        db.add(phase)
-                        created_phase += 1
-
-            except Exception as e:
-                errors.append(f"Row {idx+2}: {e}")
+        report(progress, 0.75, "Writing phases")
+
+        # Pass 4: apply phase changes in bulk
+        try:
+            if phase_updates:
+                # Group by column set so each executemany has uniform parameters
+                by_columns: Dict[Tuple[str, ...], List[Dict[str, object]]] = {}
+                for values in phase_updates.values():
+                    by_columns.setdefault(tuple(sorted(values)), []).append(values)
+                for batch in by_columns.values():
+                    db.execute(update(XRDPhase), batch)
+            if phase_inserts:
+                db.execute(insert(XRDPhase), list(phase_inserts.values()))
+        except Exception as e:
+            errors.append(f"Failed to write XRD phases: {e}")
+        report(progress, 1.0, f"Wrote {created_phase + updated_phase} phases")
 
         return created_ext, updated_ext, created_json, updated_json, created_phase, updated_phase, skipped, errors
 
@@ -3,14 +3,16 @@ from __future__ import annotations
 import io
 import re
 from datetime import datetime
-from typing import List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import pandas as pd
-from sqlalchemy import func
+from sqlalchemy import delete, func, insert, update
 from sqlalchemy.orm import Session
 
 from database import Experiment
 from database.models import XRDPhase
+from utils.batching import chunked
+from utils.progress import ProgressCallback, report
 
 
 # Pattern: DATE_ExperimentID-dDAYS_SCAN
@@ -43,28 +45,43 @@ def _normalize_id(raw: str) -> str:
     return "".join(ch for ch in raw.lower() if ch not in ("-", "_", " "))
 
 
-def _find_experiment(db: Session, exp_id_raw: str) -> Optional[Experiment]:
+def _find_experiments(db: Session, exp_ids_raw: Iterable[str]) -> Dict[str, Tuple[int, str]]:
     """
-    Look up an Experiment using delimiter-insensitive matching so that
-    ``HPHT070`` resolves to ``HPHT_070`` etc.
+    Look up Experiments using delimiter-insensitive matching so that
+    ``HPHT070`` resolves to ``HPHT_070`` etc. Raw IDs are resolved in one query
+    per ``IN_CHUNK_SIZE`` normalized IDs.
+
+    Returns raw ID -> (Experiment.id, Experiment.experiment_id) for the IDs
+    that matched; the lowest primary key wins when several normalize alike.
     """
-    norm = _normalize_id(exp_id_raw)
-    return (
-        db.query(Experiment)
-        .filter(
-            func.lower(
-                func.replace(
-                    func.replace(
-                        func.replace(Experiment.experiment_id, "-", ""),
-                        "_", "",
-                    ),
-                    " ", "",
-                )
-            )
-            == norm
+    by_norm: Dict[str, List[str]] = {}
+    for raw in exp_ids_raw:
+        by_norm.setdefault(_normalize_id(raw), []).append(raw)
+    if not by_norm:
+        return {}
+
+    norm_expr = func.lower(
+        func.replace(
+            func.replace(
+                func.replace(Experiment.experiment_id, "-", ""),
+                "_", "",
+            ),
+            " ", "",
         )
-        .first()
     )
+    rows = []
+    for chunk in chunked(by_norm):
+        rows.extend(
+            db.query(norm_expr, Experiment.id, Experiment.experiment_id)
+            .filter(norm_expr.in_(chunk))
+            .all()
+        )
+    rows.sort(key=lambda r: r[1])
+    resolved: Dict[str, Tuple[int, str]] = {}
+    for norm, exp_fk, exp_id_db in rows:
+        for raw in by_norm.get(norm, []):
+            resolved.setdefault(raw, (exp_fk, exp_id_db))
+    return resolved
 
 
 def _clean_mineral_name(col: str) -> str:
@@ -81,6 +98,7 @@ class AerisXRDUploadService:
         db: Session,
         file_bytes: bytes,
         overwrite_existing: bool = True,
+        progress: Optional[ProgressCallback] = None,
     ) -> Tuple[int, int, int, List[str]]:
         """
         Parse an Aeris XRD Excel file and upsert ``XRDPhase`` rows keyed by
@@ -92,6 +110,8 @@ class AerisXRDUploadService:
         exists for (experiment_id, days, mineral_name):
         - If True (default): the existing row is updated in place.
         - If False: the existing row is left unchanged and counted as skipped.
+
+        ``progress`` (optional) is called after each pass.
         """
         created = updated = skipped = 0
         errors: List[str] = []
@@ -128,9 +148,8 @@ class AerisXRDUploadService:
         if not mineral_cols:
             return 0, 0, 0, ["No mineral-phase columns detected."]
 
-        # Cache experiment lookups per raw ID to avoid repeated queries
-        exp_cache: dict[str, Optional[Experiment]] = {}
-
+        # Pass 1: parse every row without touching the database
+        parsed_rows: List[Tuple[int, datetime, str, int, Optional[float], List[Tuple[str, float]]]] = []
         for idx, row in df.iterrows():
             row_num = idx + 2  # 1-indexed header + 1-indexed row
             raw_sample = str(row.get(sample_col, "")).strip()
@@ -149,21 +168,6 @@ class AerisXRDUploadService:
 
             measurement_date, exp_id_raw, days = parsed
 
-            # Resolve experiment (with cache)
-            if exp_id_raw not in exp_cache:
-                exp_cache[exp_id_raw] = _find_experiment(db, exp_id_raw)
-            experiment = exp_cache[exp_id_raw]
-
-            if experiment is None:
-                errors.append(
-                    f"Row {row_num}: Experiment '{exp_id_raw}' not found in "
-                    f"database (tried delimiter-insensitive match)."
-                )
-                continue
-
-            exp_id_db = experiment.experiment_id
-            exp_fk = experiment.id
-
             # Parse Rwp
             rwp_val: Optional[float] = None
             if rwp_col:
@@ -176,7 +180,7 @@ class AerisXRDUploadService:
                 except (ValueError, TypeError):
                     pass
 
-            # Upsert one XRDPhase per mineral column
+            amounts: List[Tuple[str, float]] = []
             for mcol in mineral_cols:
                 raw_val = row.get(mcol)
                 try:
@@ -187,58 +191,92 @@ class AerisXRDUploadService:
                     amount_val = float(raw_val)
                 except (ValueError, TypeError):
                     continue
-
-                mineral_name = _clean_mineral_name(mcol)
-
-                # Fetch ALL matching rows rather than just the first.
-                # With autoflush=False the session won't auto-flush before
-                # this query, so multi-scan Excel files (multiple rows that
-                # share the same experiment_id / days but differ only in scan
-                # number) could previously produce silent duplicate inserts.
-                # Using .all() also lets us remove any duplicates that were
-                # created by earlier uploads before the UniqueConstraint was
-                # enforced in the live database.
-                phases = (
-                    db.query(XRDPhase)
-                    .filter(
-                        XRDPhase.experiment_id == exp_id_db,
-                        XRDPhase.time_post_reaction_days == days,
-                        XRDPhase.mineral_name == mineral_name,
-                    )
-                    .all()
+                amounts.append((_clean_mineral_name(mcol), amount_val))
+
+            parsed_rows.append((row_num, measurement_date, exp_id_raw, days, rwp_val, amounts))
+
+        report(progress, 0.25, f"Parsed {len(parsed_rows)} scans")
+
+        # Pass 2: resolve all referenced experiments (chunked IN lookups)
+        experiments = _find_experiments(db, {r[2] for r in parsed_rows})
+
+        # Load existing phases for those experiments (one query per chunk), keyed by
+        # (experiment_id, days, mineral_name). Keeping every id per key lets
+        # us remove duplicates created by earlier uploads before the
+        # UniqueConstraint was enforced in the live database.
+        existing: Dict[Tuple[str, int, str], List[int]] = {}
+        exp_ids_db = {exp_id_db for _fk, exp_id_db in experiments.values()}
+        phase_rows = []
+        for chunk in chunked(exp_ids_db):
+            phase_rows.extend(
+                db.query(
+                    XRDPhase.id,
+                    XRDPhase.experiment_id,
+                    XRDPhase.time_post_reaction_days,
+                    XRDPhase.mineral_name,
                 )
+                .filter(XRDPhase.experiment_id.in_(chunk))
+                .all()
+            )
+        for phase_id, exp_id_db, days, mineral_name in sorted(phase_rows, key=lambda r: r[0]):
+            existing.setdefault((exp_id_db, days, mineral_name), []).append(phase_id)
+
+        report(progress, 0.5, "Loaded existing phases")
+
+        # Pass 3: diff in memory. Multi-scan files repeat the same
+        # (experiment, days, mineral) key; later scans win like before.
+        inserts: Dict[Tuple[str, int, str], Dict[str, object]] = {}
+        updates: Dict[int, Dict[str, object]] = {}
+        duplicate_ids: List[int] = []
 
-                if phases:
+        for row_num, measurement_date, exp_id_raw, days, rwp_val, amounts in parsed_rows:
+            if exp_id_raw not in experiments:
+                errors.append(
+                    f"Row {row_num}: Experiment '{exp_id_raw}' not found in "
+                    f"database (tried delimiter-insensitive match)."
+                )
+                continue
+            exp_fk, exp_id_db = experiments[exp_id_raw]
+
+            for mineral_name, amount_val in amounts:
+                key = (exp_id_db, days, mineral_name)
+                values = {
+                    "experiment_fk": exp_fk,
+                    "measurement_date": measurement_date,
+                    "rwp": rwp_val,
+                    "amount": amount_val,
+                }
+                if key in existing or key in inserts:
                     if not overwrite_existing:
                         skipped += 1
                         continue
-                    phase = phases[0]
-                    phase.amount = amount_val
-                    phase.rwp = rwp_val
-                    phase.measurement_date = measurement_date
-                    phase.experiment_fk = exp_fk
-                    # Delete any duplicate rows introduced by prior multi-scan
-                    # uploads so the UniqueConstraint is satisfied after commit.
-                    for dup in phases[1:]:
-                        db.delete(dup)
+                    if key in inserts:
+                        inserts[key].update(values)
+                    else:
+                        phase_ids = existing[key]
+                        updates[phase_ids[0]] = {"id": phase_ids[0], **values}
+                        if len(phase_ids) > 1:
+                            duplicate_ids.extend(phase_ids[1:])
+                            existing[key] = phase_ids[:1]
                     updated += 1
                 else:
-                    phase = XRDPhase(
-                        experiment_fk=exp_fk,
-                        experiment_id=exp_id_db,
-                        time_post_reaction_days=days,
-                        measurement_date=measurement_date,
-                        rwp=rwp_val,
-                        mineral_name=mineral_name,
-                        amount=amount_val,
-                    )
-                    db.add(phase)
+                    inserts[key] = {
+                        "experiment_id": exp_id_db,
+                        "time_post_reaction_days": days,
+                        "mineral_name": mineral_name,
+                        **values,
+                    }
                     created += 1
 
-            # Flush after every row so that records added in this row are
-            # visible to queries in subsequent rows (autoflush=False).  This
-            # prevents a second scan of the same mineral/timepoint from missing
-            # the pending insert and attempting a duplicate create.
-            db.flush()
+        report(progress, 0.75, "Writing phases")
+
+        # Pass 4: apply changes in bulk
+        for chunk in chunked(duplicate_ids):
+            db.execute(delete(XRDPhase).where(XRDPhase.id.in_(chunk)))
+        if updates:
+            db.execute(update(XRDPhase), list(updates.values()))
+        if inserts:
+            db.execute(insert(XRDPhase), list(inserts.values()))
+        report(progress, 1.0, f"Wrote {created + updated} phases")
 
         return created, updated, skipped, errors
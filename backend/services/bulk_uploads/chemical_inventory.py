@@ -1,17 +1,22 @@
 from __future__ import annotations
 
 import io
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import pandas as pd
 from sqlalchemy.orm import Session
 
 from database import Compound
+from utils.progress import ProgressCallback, track
 
 
 class ChemicalInventoryService:
     @staticmethod
-    def bulk_upsert_from_excel(db: Session, file_bytes: bytes) -> Tuple[int, int, int, List[str]]:
+    def bulk_upsert_from_excel(
+        db: Session,
+        file_bytes: bytes,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Tuple[int, int, int, List[str]]:
         """
         Upsert compounds from an Excel file using the same columns as the existing UI template.
         Returns (created, updated, skipped, errors).
@@ -46,7 +51,7 @@ class ChemicalInventoryService:
             except Exception:
                 return None
 
-        for idx, row in df.iterrows():
+        for idx, row in track(df.iterrows(), progress, total=len(df)):
             try:
                 name = str(row.get("name") or "").strip()
                 if not name:
@@ -1,18 +1,23 @@
 from __future__ import annotations
 
 import io
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import pandas as pd
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from database import Experiment, ExperimentalConditions, ChemicalAdditive, Compound, AmountUnit
+from utils.progress import ProgressCallback, track
 
 
 class ExperimentAdditivesService:
     @staticmethod
-    def bulk_upsert_from_excel(db: Session, file_bytes: bytes) -> Tuple[int, int, int, List[str]]:
+    def bulk_upsert_from_excel(
+        db: Session,
+        file_bytes: bytes,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Tuple[int, int, int, List[str]]:
         """
         Upsert experiment additives from Excel, without delete/replace behavior.
         Columns: experiment_id*, compound*, amount*, unit*, order (opt), method (opt)
@@ -37,7 +42,7 @@ class ExperimentAdditivesService:
         all_compounds = db.query(Compound).all()
         name_to_compound = {c.name.lower(): c for c in all_compounds}
 
-        for idx, row in df.iterrows():
+        for idx, row in track(df.iterrows(), progress, total=len(df)):
             try:
                 exp_id = str(row.get('experiment_id') or '').strip()
                 comp_name = str(row.get('compound') or '').strip()
@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 from database import Experiment
 from database.models import ExperimentalConditions
 from database.models.enums import ExperimentStatus
+from backend.services.upload_cache import upload_cache
 
 
 @dataclass
@@ -23,6 +24,9 @@ class StatusChangePreview:
 
 class ExperimentStatusService:
     """Service for bulk updating experiment statuses"""
+
+    # Bump when the cached file read below changes shape
+    PARSER_VERSION = 1
     
     @staticmethod
     def preview_status_changes_from_excel(
@@ -46,7 +50,12 @@ class ExperimentStatusService:
         
         # Read Excel file
         try:
-            df = pd.read_excel(io.BytesIO(file_bytes))
+            df = upload_cache.get_or_compute(
+                "experiment_status.read_excel",
+                ExperimentStatusService.PARSER_VERSION,
+                file_bytes,
+                lambda: pd.read_excel(io.BytesIO(file_bytes)),
+            )
         except Exception as e:
             return StatusChangePreview(
                 to_ongoing=[],
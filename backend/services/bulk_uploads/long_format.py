@@ -13,13 +13,18 @@ from __future__ import annotations
 import io
 import math
 import datetime as dt
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 import pandas as pd
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
+from database import Experiment
+from database.lineage_utils import get_or_find_parent_experiment, parse_experiment_id
 from backend.services.scalar_results_service import ScalarResultsService
 from backend.services.bulk_uploads.metric_groups import METRIC_REGISTRY
+from utils.batching import chunked
+from utils.progress import ProgressCallback, track
 
 
 # ---------------------------------------------------------------------------
@@ -102,163 +107,155 @@ def _validate_metric_value(metric: str, value: Any, unit: Optional[str]) -> List
     return errors
 
 
-def long_format_upload_from_excel(
-    db: Session,
-    file_bytes: bytes,
-    *,
-    dry_run: bool = False,
-) -> Tuple[int, int, int, List[str], List[Dict[str, Any]]]:
-    """
-    Parse a long-format Excel upload, pivot to wide-format dicts, and upsert.
+# ---------------------------------------------------------------------------
+# Record-level helpers (shared with the streaming ingest)
+# ---------------------------------------------------------------------------
 
-    Expected columns: ``Experiment ID*, Time (days)*, Metric*, Value*, Unit``
+# (experiment_id, time_post_reaction, db_field, value)
+ParsedRecord = Tuple[str, float, str, float]
 
-    Returns ``(created, updated, skipped, errors, row_feedbacks)``.
-    """
-    # --- Read Excel --------------------------------------------------------
-    try:
-        xls = pd.ExcelFile(io.BytesIO(file_bytes))
-        target_sheet = None
-        if "Data" in xls.sheet_names:
-            target_sheet = "Data"
-        else:
-            for sheet in xls.sheet_names:
-                if "INSTRUCTION" not in sheet.upper():
-                    target_sheet = sheet
-                    break
-        if target_sheet is None and xls.sheet_names:
-            target_sheet = 0
-        df = pd.read_excel(xls, sheet_name=target_sheet)
-    except Exception as exc:
-        return 0, 0, 0, [f"Failed to read Excel: {exc}"], []
 
-    # Normalize headers
-    df.columns = [str(c).replace("*", "").strip() for c in df.columns]
-    col_map = {
-        "Experiment ID": "experiment_id",
-        "Time (days)": "time_post_reaction",
-        "Metric": "metric",
-        "Value": "value",
-        "Unit": "unit",
+def _error_feedback(row_num: int, experiment_id: str, time_val: Optional[float], errors: List[str]) -> Dict[str, Any]:
+    return {
+        "row": row_num, "experiment_id": experiment_id,
+        "time_post_reaction": time_val, "status": "error",
+        "fields_updated": [], "fields_preserved": [],
+        "old_values": {}, "new_values": {},
+        "warnings": [], "errors": errors,
     }
-    df.rename(columns=col_map, inplace=True)
 
-    required_cols = {"experiment_id", "time_post_reaction", "metric", "value"}
-    missing_cols = required_cols - set(df.columns)
-    if missing_cols:
-        return 0, 0, 0, [f"Missing columns: {sorted(missing_cols)}"], []
 
-    # --- Validate rows and group by (experiment_id, time) ------------------
-    errors: List[str] = []
-    input_feedbacks: List[Dict[str, Any]] = []
+def parse_long_format_record(
+    row_num: int,
+    exp_id: Any,
+    time_raw: Any,
+    metric: Any,
+    value: Any,
+    unit: Optional[str] = None,
+) -> Tuple[Optional[ParsedRecord], List[str], Optional[Dict[str, Any]]]:
+    """
+    Validate one ``(experiment_id, time, metric, value, unit)`` record.
 
-    # Group: (experiment_id, time_post_reaction) -> {field: value}
-    groups: Dict[Tuple[str, float], Dict[str, Any]] = {}
-    group_source_rows: Dict[Tuple[str, float], List[int]] = {}
+    Returns ``(parsed, errors, feedback)``: ``parsed`` is set for a valid
+    record; an invalid one yields row-prefixed error messages and an error
+    feedback dict. A fully empty record yields ``(None, [], None)``.
+    """
+    # Skip fully empty rows
+    if pd.isna(exp_id) and pd.isna(metric):
+        return None, [], None
+
+    # Required field checks
+    row_errors: List[str] = []
+    if pd.isna(exp_id) or str(exp_id).strip() == "":
+        row_errors.append("Missing Experiment ID.")
+    if pd.isna(time_raw):
+        row_errors.append("Missing Time (days).")
+    if pd.isna(metric) or str(metric).strip() == "":
+        row_errors.append("Missing Metric.")
+    if pd.isna(value):
+        row_errors.append("Missing Value.")
+
+    if row_errors:
+        return None, [f"Row {row_num}: {e}" for e in row_errors], _error_feedback(
+            row_num, str(exp_id) if pd.notna(exp_id) else "", None, row_errors,
+        )
 
-    for idx, row in df.iterrows():
-        row_num = int(idx) + 2  # Excel row
-        exp_id = row.get("experiment_id")
-        time_raw = row.get("time_post_reaction")
-        metric = row.get("metric")
-        value = row.get("value")
-        unit = row.get("unit") if "unit" in row and pd.notna(row.get("unit")) else None
+    exp_id_str = str(exp_id).strip()
+    try:
+        time_float = float(time_raw)
+    except (ValueError, TypeError):
+        return None, [f"Row {row_num}: Time (days) must be numeric, got '{time_raw}'."], _error_feedback(
+            row_num, exp_id_str, None, [f"Time must be numeric, got '{time_raw}'."],
+        )
 
-        # Skip fully empty rows
-        if pd.isna(exp_id) and pd.isna(metric):
-            continue
+    metric_str = str(metric).strip()
+    info = METRIC_REGISTRY.get(metric_str)
+    if info is None:
+        return None, [
+            f"Row {row_num}: Unknown metric '{metric_str}'. "
+            f"Valid: {sorted(METRIC_REGISTRY.keys())}."
+        ], _error_feedback(row_num, exp_id_str, time_float, [f"Unknown metric '{metric_str}'."])
+
+    # Validate value + unit
+    val_errors = _validate_metric_value(metric_str, value, unit)
+    if val_errors:
+        return None, [f"Row {row_num}: {e}" for e in val_errors], _error_feedback(
+            row_num, exp_id_str, time_float, val_errors,
+        )
 
-        # Required field checks
-        row_errors: List[str] = []
-        if pd.isna(exp_id) or str(exp_id).strip() == "":
-            row_errors.append("Missing Experiment ID.")
-        if pd.isna(time_raw):
-            row_errors.append("Missing Time (days).")
-        if pd.isna(metric) or str(metric).strip() == "":
-            row_errors.append("Missing Metric.")
-        if pd.isna(value):
-            row_errors.append("Missing Value.")
-
-        if row_errors:
-            for e in row_errors:
-                errors.append(f"Row {row_num}: {e}")
-            input_feedbacks.append({
-                "row": row_num,
-                "experiment_id": str(exp_id) if pd.notna(exp_id) else "",
-                "time_post_reaction": None,
-                "status": "error",
-                "fields_updated": [], "fields_preserved": [],
-                "old_values": {}, "new_values": {},
-                "warnings": [], "errors": row_errors,
-            })
-            continue
+    return (exp_id_str, time_float, info["db_field"], float(value)), [], None
 
-        exp_id_str = str(exp_id).strip()
-        try:
-            time_float = float(time_raw)
-        except (ValueError, TypeError):
-            errors.append(f"Row {row_num}: Time (days) must be numeric, got '{time_raw}'.")
-            input_feedbacks.append({
-                "row": row_num, "experiment_id": exp_id_str,
-                "time_post_reaction": None, "status": "error",
-                "fields_updated": [], "fields_preserved": [],
-                "old_values": {}, "new_values": {},
-                "warnings": [], "errors": [f"Time must be numeric, got '{time_raw}'."],
-            })
-            continue
 
-        metric_str = str(metric).strip()
-        info = METRIC_REGISTRY.get(metric_str)
-        if info is None:
-            errors.append(
-                f"Row {row_num}: Unknown metric '{metric_str}'. "
-                f"Valid: {sorted(METRIC_REGISTRY.keys())}."
-            )
-            input_feedbacks.append({
-                "row": row_num, "experiment_id": exp_id_str,
-                "time_post_reaction": time_float, "status": "error",
-                "fields_updated": [], "fields_preserved": [],
-                "old_values": {}, "new_values": {},
-                "warnings": [], "errors": [f"Unknown metric '{metric_str}'."],
-            })
-            continue
+def add_to_group(
+    groups: Dict[Tuple[str, float], Dict[str, Any]],
+    group_source_rows: Dict[Tuple[str, float], List[int]],
+    parsed: ParsedRecord,
+    row_num: int,
+) -> None:
+    """Merge a parsed record into its ``(experiment_id, time)`` group; later values win."""
+    exp_id, time_val, db_field, value = parsed
+    key = (exp_id, time_val)
+    groups.setdefault(key, {})[db_field] = value
+    group_source_rows.setdefault(key, []).append(row_num)
+
+    # H2 concentration is always stored in ppm
+    if db_field == "h2_concentration":
+        groups[key]["h2_concentration_unit"] = "ppm"
+
 
-        # Validate value + unit
-        val_errors = _validate_metric_value(metric_str, value, unit)
-        if val_errors:
-            for e in val_errors:
-                errors.append(f"Row {row_num}: {e}")
-            input_feedbacks.append({
-                "row": row_num, "experiment_id": exp_id_str,
-                "time_post_reaction": time_float, "status": "error",
-                "fields_updated": [], "fields_preserved": [],
-                "old_values": {}, "new_values": {},
-                "warnings": [], "errors": val_errors,
-            })
+def unknown_experiments(db: Session, experiment_ids: Iterable[str]) -> Set[str]:
+    """
+    Return the IDs among ``experiment_ids`` that an upsert could not resolve.
+
+    IDs are matched like ``ScalarResultsService._find_experiment`` (case,
+    hyphens and underscores ignored) in chunked IN queries. Treatment
+    variants whose parent exists are not unknown: the upsert auto-creates
+    them.
+    """
+    normalized = {eid: eid.lower().replace("-", "").replace("_", "") for eid in set(experiment_ids)}
+    key = func.lower(func.replace(func.replace(Experiment.experiment_id, "-", ""), "_", ""))
+    found: Set[str] = set()
+    for chunk in chunked(sorted(set(normalized.values()))):
+        found.update(value for (value,) in db.query(key).filter(key.in_(chunk)))
+
+    unknown = set()
+    for eid, norm in normalized.items():
+        if norm in found:
             continue
+        _base, _derivation, treatment = parse_experiment_id(eid)
+        if treatment is not None and get_or_find_parent_experiment(db, eid) is not None:
+            continue
+        unknown.add(eid)
+    return unknown
 
-        # Accumulate into group
-        key = (exp_id_str, time_float)
-        if key not in groups:
-            groups[key] = {}
-            group_source_rows[key] = []
-        db_field = info["db_field"]
-        groups[key][db_field] = float(value)
-        group_source_rows[key].append(row_num)
 
-        # H2 concentration is always stored in ppm
-        if db_field == "h2_concentration":
-            groups[key]["h2_concentration_unit"] = "ppm"
+def upsert_long_format_groups(
+    db: Session,
+    groups: Dict[Tuple[str, float], Dict[str, Any]],
+    group_source_rows: Dict[Tuple[str, float], List[int]],
+    *,
+    dry_run: bool = False,
+    atomic: bool = False,
+    progress: Optional[ProgressCallback] = None,
+) -> Tuple[int, int, int, List[str], List[Dict[str, Any]]]:
+    """
+    Upsert grouped long-format values as partial scalar-result updates.
 
-    # If we have parse-level errors and no valid groups, return early
-    if errors and not groups:
-        return 0, 0, 0, errors, input_feedbacks
+    With ``atomic`` the experiments of all groups are looked up before
+    anything is written; groups for unknown experiments are reported as
+    errors and skipped. Any error while writing the remaining groups is
+    raised, so the caller can roll back the whole batch in its single
+    transaction. Savepoints are not used: on the app's pysqlite engine the
+    first savepoint opens the transaction and releasing it commits.
 
-    # --- Upsert (or dry run) per group ------------------------------------
+    Returns ``(created, updated, skipped, errors, feedbacks)``.
+    """
     created = updated = skipped = 0
+    errors: List[str] = []
     upsert_feedbacks: List[Dict[str, Any]] = []
+    unknown = unknown_experiments(db, (exp_id for exp_id, _t in groups)) if atomic and not dry_run else set()
 
-    for (exp_id, time_val), field_dict in groups.items():
+    for (exp_id, time_val), field_dict in track(groups.items(), progress, total=len(groups), label="timepoints"):
         source_rows = group_source_rows[(exp_id, time_val)]
         row_label = ", ".join(str(r) for r in source_rows)
 
@@ -278,6 +275,14 @@ def long_format_upload_from_excel(
             upsert_feedbacks.append(fb)
             continue
 
+        if exp_id in unknown:
+            message = f"Experiment with ID '{exp_id}' not found and could not be auto-created."
+            fb["status"] = "error"
+            fb["errors"].append(message)
+            errors.append(f"Rows {row_label}: {message}")
+            upsert_feedbacks.append(fb)
+            continue
+
         try:
             row_data = dict(field_dict)
             row_data["time_post_reaction"] = time_val
@@ -303,15 +308,100 @@ def long_format_upload_from_excel(
                 fb["status"] = "skipped"
                 skipped += 1
         except ValueError as exc:
+            if atomic:
+                raise
             fb["status"] = "error"
             fb["errors"].append(str(exc))
             errors.append(f"Rows {row_label}: {exc}")
         except Exception as exc:
+            if atomic:
+                raise
             fb["status"] = "error"
             fb["errors"].append(f"Unexpected error - {exc}")
             errors.append(f"Rows {row_label}: Unexpected error - {exc}")
 
         upsert_feedbacks.append(fb)
 
+    return created, updated, skipped, errors, upsert_feedbacks
+
+
+def long_format_upload_from_excel(
+    db: Session,
+    file_bytes: bytes,
+    *,
+    dry_run: bool = False,
+    progress: Optional[ProgressCallback] = None,
+) -> Tuple[int, int, int, List[str], List[Dict[str, Any]]]:
+    """
+    Parse a long-format Excel upload, pivot to wide-format dicts, and upsert.
+
+    Expected columns: ``Experiment ID*, Time (days)*, Metric*, Value*, Unit``
+
+    Returns ``(created, updated, skipped, errors, row_feedbacks)``.
+    """
+    # --- Read Excel --------------------------------------------------------
+    try:
+        xls = pd.ExcelFile(io.BytesIO(file_bytes))
+        target_sheet = None
+        if "Data" in xls.sheet_names:
+            target_sheet = "Data"
+        else:
+            for sheet in xls.sheet_names:
+                if "INSTRUCTION" not in sheet.upper():
+                    target_sheet = sheet
+                    break
+        if target_sheet is None and xls.sheet_names:
+            target_sheet = 0
+        df = pd.read_excel(xls, sheet_name=target_sheet)
+    except Exception as exc:
+        return 0, 0, 0, [f"Failed to read Excel: {exc}"], []
+
+    # Normalize headers
+    df.columns = [str(c).replace("*", "").strip() for c in df.columns]
+    col_map = {
+        "Experiment ID": "experiment_id",
+        "Time (days)": "time_post_reaction",
+        "Metric": "metric",
+        "Value": "value",
+        "Unit": "unit",
+    }
+    df.rename(columns=col_map, inplace=True)
+
+    required_cols = {"experiment_id", "time_post_reaction", "metric", "value"}
+    missing_cols = required_cols - set(df.columns)
+    if missing_cols:
+        return 0, 0, 0, [f"Missing columns: {sorted(missing_cols)}"], []
+
+    # --- Validate rows and group by (experiment_id, time) ------------------
+    errors: List[str] = []
+    input_feedbacks: List[Dict[str, Any]] = []
+
+    # Group: (experiment_id, time_post_reaction) -> {field: value}
+    groups: Dict[Tuple[str, float], Dict[str, Any]] = {}
+    group_source_rows: Dict[Tuple[str, float], List[int]] = {}
+
+    for idx, row in df.iterrows():
+        row_num = int(idx) + 2  # Excel row
+        unit = row.get("unit") if "unit" in row and pd.notna(row.get("unit")) else None
+        parsed, row_errors, feedback = parse_long_format_record(
+            row_num, row.get("experiment_id"), row.get("time_post_reaction"),
+            row.get("metric"), row.get("value"), unit,
+        )
+        if feedback is not None:
+            errors.extend(row_errors)
+            input_feedbacks.append(feedback)
+        elif parsed is not None:
+            add_to_group(groups, group_source_rows, parsed, row_num)
+
+    # If we have parse-level errors and no valid groups, return early
+    if errors and not groups:
+        return 0, 0, 0, errors, input_feedbacks
+
+    # --- Upsert (or dry run) per group ------------------------------------
+    created, updated, skipped, upsert_errors, upsert_feedbacks = upsert_long_format_groups(
+        db, groups, group_source_rows, dry_run=dry_run, progress=progress,
+    )
+    errors.extend(upsert_errors)
+
     all_feedbacks = input_feedbacks + upsert_feedbacks
     return created, updated, skipped, errors, all_feedbacks
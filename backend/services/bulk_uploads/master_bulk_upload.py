@@ -1,12 +1,17 @@
 import io
 import pandas as pd
 import datetime as dt
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from backend.services.scalar_results_service import ScalarResultsService
+from backend.services.upload_cache import upload_cache
+from utils.progress import ProgressCallback, scaled, track
 
 class MasterBulkUploadService:
+    # Bump when parse_file output changes so cached parses are not reused
+    PARSER_VERSION = 1
+
     @staticmethod
     def _parse_date(value: Any) -> dt.datetime | None:
         if pd.isna(value) or value is None:
@@ -87,7 +92,8 @@ class MasterBulkUploadService:
     def bulk_upsert(
         db: Session,
         file_bytes: bytes,
-        dry_run: bool = False
+        dry_run: bool = False,
+        progress: Optional[ProgressCallback] = None,
     ) -> Tuple[int, int, int, List[str], List[Dict[str, Any]]]:
         """
         Processes Master Bulk Upload CSV/Excel.
@@ -100,7 +106,12 @@ class MasterBulkUploadService:
         feedbacks = []
         
         try:
-            records = MasterBulkUploadService.parse_file(file_bytes)
+            records = upload_cache.get_or_compute(
+                "master_bulk_upload.parse_file",
+                MasterBulkUploadService.PARSER_VERSION,
+                file_bytes,
+                lambda: MasterBulkUploadService.parse_file(file_bytes),
+            )
         except Exception as e:
             errors.append(str(e))
             return 0, 0, 0, errors, []
@@ -108,7 +119,8 @@ class MasterBulkUploadService:
         cleaned_records = []
         parse_feedbacks = []
         
-        for idx, row in enumerate(records):
+        # Row checks look up experiments/timepoints; the bulk create is the other half
+        for idx, row in enumerate(track(records, scaled(progress, 0.0, 0.5))):
             row_num = idx + 2 # Assuming header is row 1
             
             exp_id = row.get("Experiment ID")
@@ -243,7 +255,9 @@ class MasterBulkUploadService:
                 })
             return 0, 0, skipped, errors, feedbacks
 
-        res_created, svc_errors, svc_feedbacks = ScalarResultsService.bulk_create_scalar_results_ex(db, cleaned_records)
+        res_created, svc_errors, svc_feedbacks = ScalarResultsService.bulk_create_scalar_results_ex(
+            db, cleaned_records, progress=scaled(progress, 0.5, 1.0)
+        )
         errors.extend(svc_errors)
         
         for fb in svc_feedbacks:
@@ -21,6 +21,7 @@ from backend.services.bulk_uploads.chemical_inventory import ChemicalInventorySe
 from backend.services.bulk_uploads.experiment_status import ExperimentStatusService
 from backend.services.experiment_validation import parse_experiment_id as parse_exp_id_validation, validate_experiment_id, extract_lineage_info
 from database.lineage_utils import update_experiment_lineage
+from utils.progress import ProgressCallback, scaled, track
 
 
 def find_parent_for_copy(db: Session, experiment_id: str) -> Optional[Experiment]:
@@ -80,7 +81,11 @@ def find_parent_for_copy(db: Session, experiment_id: str) -> Optional[Experiment
 
 class NewExperimentsUploadService:
     @staticmethod
-    def bulk_upsert_from_excel(db: Session, file_bytes: bytes) -> Tuple[int, int, int, List[str], List[str], List[str]]:
+    def bulk_upsert_from_excel(
+        db: Session,
+        file_bytes: bytes,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Tuple[int, int, int, List[str], List[str], List[str]]:
         """
         Create or update Experiments, ExperimentalConditions, and ChemicalAdditives from a
         multi-sheet Excel workbook.
@@ -111,6 +116,8 @@ class NewExperimentsUploadService:
           - overwrite=True and experiment exists: update provided fields; if additives sheet has
             rows for that experiment, REPLACE all existing additives with the provided set.
 
+        ``progress`` (optional) receives the fraction done across the three sheets.
+
         Returns (created_experiments, updated_experiments, skipped_rows, errors, warnings, info_messages)
         """
         created_exp = updated_exp = skipped = 0
@@ -176,7 +183,7 @@ class NewExperimentsUploadService:
             
             df_exp.columns = [normalize_column(c) for c in df_exp.columns]
 
-            for idx, row in df_exp.iterrows():
+            for idx, row in track(df_exp.iterrows(), scaled(progress, 0.0, 0.4), total=len(df_exp)):
                 try:
                     exp_id = str(row.get('experiment_id') or '').strip()
                     if not exp_id:
@@ -506,7 +513,7 @@ class NewExperimentsUploadService:
                 # Map lowercased column names to actual model column names
                 # (Excel headers are normalized to lowercase, but model columns may have mixed case like water_volume_mL)
                 lower_to_actual = {name.lower(): name for name in updatable_attrs}
-                for idx, row in df_cond.iterrows():
+                for idx, row in track(df_cond.iterrows(), scaled(progress, 0.4, 0.7), total=len(df_cond)):
                     try:
                         exp_id = str(row.get('experiment_id') or '').strip()
                         if not exp_id:
@@ -703,7 +710,7 @@ class NewExperimentsUploadService:
 
                 # Group rows by experiment_id for replace semantics
                 grouped = df_add.groupby(df_add['experiment_id'].map(lambda x: str(x).strip()))
-                for exp_id, group in grouped:
+                for exp_id, group in track(grouped, scaled(progress, 0.7, 1.0), total=grouped.ngroups, label="experiments"):
                     if not exp_id:
                         continue
                     exp_id_norm = ''.join(ch for ch in exp_id.lower() if ch not in ['-', '_', ' '])
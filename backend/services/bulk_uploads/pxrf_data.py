@@ -1,13 +1,14 @@
 from __future__ import annotations
 
 import io
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import pandas as pd
 from sqlalchemy.orm import Session
 
 from database import PXRFReading
 from frontend.config.variable_config import PXRF_REQUIRED_COLUMNS
+from utils.progress import ProgressCallback, track
 from utils.storage import get_file
 
 
@@ -52,12 +53,17 @@ class PXRFUploadService:
         return df, errors
 
     @staticmethod
-    def _upsert_dataframe(db: Session, df: pd.DataFrame, update_existing: bool) -> Tuple[int, int, int, List[str]]:
+    def _upsert_dataframe(
+        db: Session,
+        df: pd.DataFrame,
+        update_existing: bool,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Tuple[int, int, int, List[str]]:
         inserted = updated = skipped = 0
         errors: List[str] = []
         try:
             existing_reading_nos = set(row[0] for row in db.query(PXRFReading.reading_no).all())
-            for _, row in df.iterrows():
+            for _, row in track(df.iterrows(), progress, total=len(df), label="readings"):
                 reading_no = row['Reading No']
                 reading_data = {
                     'reading_no': reading_no,
@@ -91,14 +97,20 @@ class PXRFUploadService:
         return inserted, updated, skipped, errors
 
     @classmethod
-    def ingest_from_bytes(cls, db: Session, file_bytes: bytes, update_existing: bool = False) -> Tuple[int, int, int, List[str]]:
+    def ingest_from_bytes(
+        cls,
+        db: Session,
+        file_bytes: bytes,
+        update_existing: bool = False,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Tuple[int, int, int, List[str]]:
         df, errors = cls._load_excel_from_bytes(file_bytes)
         if errors:
             return 0, 0, 0, errors
         df, clean_errors = cls._clean_dataframe(df)
         if clean_errors:
             return 0, 0, 0, clean_errors
-        inserted, updated, skipped, upsert_errors = cls._upsert_dataframe(db, df, update_existing)
+        inserted, updated, skipped, upsert_errors = cls._upsert_dataframe(db, df, update_existing, progress)
         return inserted, updated, skipped, upsert_errors
 
     @classmethod
@@ -21,6 +21,7 @@ from sqlalchemy.orm import Session
 
 from backend.services.scalar_results_service import ScalarResultsService
 from backend.services.bulk_uploads.metric_groups import METRIC_GROUPS
+from utils.progress import ProgressCallback, track
 
 
 # ---------------------------------------------------------------------------
@@ -160,6 +161,7 @@ def quick_upload_from_excel(
     *,
     overwrite_all: bool = False,
     dry_run: bool = False,
+    progress: Optional[ProgressCallback] = None,
 ) -> Tuple[int, int, int, List[str], List[Dict[str, Any]]]:
     """
     Parse a metric-specific Excel upload and upsert via ScalarResultsService.
@@ -170,6 +172,7 @@ def quick_upload_from_excel(
         group_key: Key into ``METRIC_GROUPS``.
         overwrite_all: Global overwrite flag (default False = partial update).
         dry_run: If True, validate only -- do not persist.
+        progress: Optional callback receiving the fraction of rows persisted.
 
     Returns:
         ``(created, updated, skipped, errors, row_feedback_list)``
@@ -310,7 +313,7 @@ def quick_upload_from_excel(
     created = updated = skipped = 0
     svc_errors: List[str] = []
 
-    for row_num, row_data, fb in cleaned:
+    for row_num, row_data, fb in track(cleaned, progress):
         if dry_run:
             fb.status = "dry_run"
             fb.fields_updated = [
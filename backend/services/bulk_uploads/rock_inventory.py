@@ -9,10 +9,16 @@ from sqlalchemy import func
 
 from database import SampleInfo, SamplePhotos, ExternalAnalysis
 from database.models.analysis import PXRFReading
-from utils.storage import save_file
+from backend.services.blob_store import BlobStore
+from utils.progress import ProgressCallback, report, scaled, track
 from utils.pxrf import split_normalized_pxrf_readings
 
 
+def _normalized_sample_id(value: str) -> str:
+    """Matching key for sample IDs: case-insensitive, ignoring '-', '_' and spaces."""
+    return ''.join(ch for ch in value.lower() if ch not in ['-', '_', ' '])
+
+
 class RockInventoryService:
     @staticmethod
     def _parse_bool(val) -> Optional[bool]:
@@ -31,6 +37,7 @@ class RockInventoryService:
         file_bytes: bytes,
         image_files: List[Tuple[str, bytes, Optional[str]]],
         overwrite_all: bool = False,
+        progress: Optional[ProgressCallback] = None,
     ) -> Tuple[int, int, int, int, List[str], List[str]]:
         """
         Upsert rock samples (SampleInfo) and attach photos.
@@ -41,6 +48,7 @@ class RockInventoryService:
             image_files: list of tuples (file_name, file_bytes, mime_type)
             overwrite_all: If True, overwrite all fields for existing samples. 
                           Per-row 'overwrite' column in Excel takes precedence.
+            progress: Optional callback receiving the fraction of work done
 
         Returns:
             (created, updated, images_attached, skipped, errors, warnings)
@@ -77,7 +85,9 @@ class RockInventoryService:
         # Track samples in this batch by normalized ID to prevent duplicates
         seen_samples = {}
 
-        for idx, row in df.iterrows():
+        # Photo uploads dominate when images are attached
+        rows_share = 0.5 if image_files else 1.0
+        for idx, row in track(df.iterrows(), scaled(progress, 0.0, rows_share), total=len(df)):
             try:
                 sample_id_raw = str(row.get("sample_id") or "").strip()
                 if not sample_id_raw:
@@ -245,57 +255,97 @@ class RockInventoryService:
         # Attach images: file name (without extension) should match a sample_id
         # Save to storage under sample_photos/{sample_id}
         if image_files:
-            # Build existing photos lookup per (sample_id, file_name)
-            for (file_name, data, mime_type) in image_files:
-                try:
-                    base_name = file_name.rsplit('/', 1)[-1]
-                    simple_name = base_name.rsplit('\\', 1)[-1]
-                    name_no_ext = simple_name.rsplit('.', 1)[0]
-                    target_sample_id_raw = name_no_ext.strip()
-                    if not target_sample_id_raw:
-                        continue
-
-                    # Use normalized matching to find sample (handles formatting differences)
-                    target_normalized = ''.join(ch for ch in target_sample_id_raw.lower() 
-                                               if ch not in ['-', '_', ' '])
-                    sample = db.query(SampleInfo).filter(
-                        func.lower(
-                            func.replace(
-                                func.replace(
-                                    func.replace(SampleInfo.sample_id, '-', ''),
-                                    '_', ''
-                                ),
-                                ' ', ''
-                            )
-                        ) == target_normalized
-                    ).first()
-                    
-                    if not sample:
-                        # Skip silently; sample might not be in this batch
-                        continue
-
-                    # Use actual database sample_id (canonical format) for storage
-                    storage_folder = f"sample_photos/{sample.sample_id}"
-                    saved_path = save_file(data, simple_name, folder=storage_folder)
-                    existing_photo = (
-                        db.query(SamplePhotos)
-                        .filter(SamplePhotos.sample_id == sample.sample_id, SamplePhotos.file_name == simple_name)
-                        .first()
-                    )
-                    if existing_photo:
-                        existing_photo.file_path = saved_path
-                        existing_photo.file_type = mime_type
-                    else:
-                        db.add(SamplePhotos(
-                            sample_id=sample.sample_id,
-                            file_path=saved_path,
-                            file_name=simple_name,
-                            file_type=mime_type,
-                        ))
-                    images_attached += 1
-                except Exception as e:
-                    errors.append(f"Image '{file_name}': {e}")
+            report(progress, rows_share, f"Uploading {len(image_files)} photos")
+            images_attached += RockInventoryService._attach_images(db, image_files, seen_samples, errors)
+            report(progress, 1.0, f"Attached {images_attached} photos")
 
         return created, updated, images_attached, skipped, errors, warnings
 
+    @staticmethod
+    def _attach_images(
+        db: Session,
+        image_files: List[Tuple[str, bytes, Optional[str]]],
+        seen_samples: Dict[str, SampleInfo],
+        errors: List[str],
+    ) -> int:
+        """
+        Upload photos concurrently and upsert their SamplePhotos rows.
+
+        Samples are resolved in one query, files are stored content-addressed
+        through ``BlobStore.store_many`` (identical photos are uploaded once,
+        new ones concurrently with retries) and existing photo rows are
+        looked up in one query. Returns the number of images attached.
+        """
+        # Resolve each image to a sample; samples from this batch may not be flushed yet
+        wanted: Dict[str, List[Tuple[str, bytes, Optional[str], str]]] = {}
+        for (file_name, data, mime_type) in image_files:
+            base_name = file_name.rsplit('/', 1)[-1]
+            simple_name = base_name.rsplit('\\', 1)[-1]
+            target_sample_id_raw = simple_name.rsplit('.', 1)[0].strip()
+            if not target_sample_id_raw:
+                continue
+            wanted.setdefault(_normalized_sample_id(target_sample_id_raw), []).append(
+                (file_name, data, mime_type, simple_name)
+            )
+        if not wanted:
+            return 0
+
+        samples = {k: v for k, v in seen_samples.items() if k in wanted}
+        missing = [k for k in wanted if k not in samples]
+        if missing:
+            normalized_col = func.lower(
+                func.replace(
+                    func.replace(
+                        func.replace(SampleInfo.sample_id, '-', ''),
+                        '_', ''
+                    ),
+                    ' ', ''
+                )
+            )
+            for sample in db.query(SampleInfo).filter(normalized_col.in_(missing)).all():
+                samples.setdefault(_normalized_sample_id(sample.sample_id), sample)
+
+        # One upload per (sample, file name); a later file with the same name wins
+        uploads: Dict[Tuple[str, str], Tuple[str, bytes, Optional[str]]] = {}
+        for key, entries in wanted.items():
+            sample = samples.get(key)
+            if sample is None:
+                # Skip silently; sample might not be in this batch
+                continue
+            for file_name, data, mime_type, simple_name in entries:
+                uploads[(sample.sample_id, simple_name)] = (file_name, data, mime_type)
+        if not uploads:
+            return 0
+
+        keys = list(uploads)
+        blobs = BlobStore.store_many(
+            db, [(uploads[k][1], k[1], uploads[k][2]) for k in keys]
+        )
+
+        sample_ids = {sid for sid, _ in keys}
+        existing_photos = {
+            (p.sample_id, p.file_name): p
+            for p in db.query(SamplePhotos).filter(SamplePhotos.sample_id.in_(sample_ids)).all()
+        }
 
+        attached = 0
+        for (sample_id, simple_name), blob in zip(keys, blobs):
+            file_name, _, mime_type = uploads[(sample_id, simple_name)]
+            if isinstance(blob, Exception):
+                errors.append(f"Image '{file_name}': {blob}")
+                continue
+            existing_photo = existing_photos.get((sample_id, simple_name))
+            if existing_photo:
+                existing_photo.file_path = blob.file_path
+                existing_photo.blob_sha256 = blob.sha256
+                existing_photo.file_type = mime_type
+            else:
+                db.add(SamplePhotos(
+                    sample_id=sample_id,
+                    file_path=blob.file_path,
+                    blob_sha256=blob.sha256,
+                    file_name=simple_name,
+                    file_type=mime_type,
+                ))
+            attached += 1
+        return attached
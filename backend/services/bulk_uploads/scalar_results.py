@@ -9,6 +9,7 @@ import pandas as pd
 from sqlalchemy.orm import Session
 
 from backend.services.scalar_results_service import ScalarResultsService
+from utils.progress import ProgressCallback
 from frontend.config.variable_config import SCALAR_RESULTS_TEMPLATE_HEADERS
 
 
@@ -64,6 +65,7 @@ class ScalarResultsUploadService:
         file_bytes: bytes,
         overwrite_all: bool = False,
         dry_run: bool = False,
+        progress: Optional[ProgressCallback] = None,
     ) -> Tuple[int, int, int, List[str], List[Dict[str, Any]]]:
         """
         Extended version that also returns per-row structured feedback and
@@ -259,7 +261,7 @@ class ScalarResultsUploadService:
 
         # --- Persist (row-level savepoints ensure failures are isolated) ---
         results, svc_errors, svc_feedbacks = (
-            ScalarResultsService.bulk_create_scalar_results_ex(db, cleaned_records)
+            ScalarResultsService.bulk_create_scalar_results_ex(db, cleaned_records, progress=progress)
         )
         errors.extend(svc_errors)
         for fb in svc_feedbacks:
@@ -75,6 +75,8 @@ from frontend.config.variable_config import (
     TIMEPOINT_MODIFICATIONS_REQUIRED_COLUMNS,
     TIMEPOINT_MODIFICATIONS_OPTIONAL_COLUMNS,
 )
+from backend.services.upload_cache import upload_cache
+from utils.progress import ProgressCallback, track
 
 # ---------------------------------------------------------------------------
 # Column name aliases so flexible user-supplied headers map to internals
@@ -147,6 +149,9 @@ def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
 class TimepointModificationsUploadService:
     """Service for bulk-populating brine_modification_description on timepoint rows."""
 
+    # Bump when _parse_and_validate's output changes shape (invalidates upload_cache)
+    PARSER_VERSION = 1
+
     # ------------------------------------------------------------------
     # Public entry points
     # ------------------------------------------------------------------
@@ -159,6 +164,7 @@ class TimepointModificationsUploadService:
         overwrite_all: bool = False,
         dry_run: bool = False,
         modified_by: str = "system",
+        progress: Optional[ProgressCallback] = None,
     ) -> Tuple[int, int, List[str], List[Dict[str, Any]]]:
         """
         Parse a CSV or Excel file and update brine_modification_description for
@@ -172,11 +178,56 @@ class TimepointModificationsUploadService:
         overwrite_all Global overwrite toggle; per-row overwrite_existing overrides this.
         dry_run       When True, validate and preview but do NOT persist.
         modified_by   Username for the audit log.
+        progress      Optional callback receiving the fraction of rows written.
 
         Returns
         -------
         (updated, skipped, errors, row_feedbacks)
         """
+        parsed = upload_cache.get_or_compute(
+            "timepoint_modifications.parse",
+            TimepointModificationsUploadService.PARSER_VERSION,
+            file_bytes,
+            lambda: TimepointModificationsUploadService._parse_and_validate(
+                file_bytes, filename, overwrite_all,
+            ),
+            params={"csv": filename.lower().endswith(".csv"), "overwrite_all": overwrite_all},
+        )
+        cleaned, duplicates, all_feedbacks, errors, rejected = parsed
+        if rejected:
+            return 0, 0, errors, all_feedbacks
+
+        # ------------------------------------------------------------------
+        # 5. Dry-run: resolve matches without writing
+        # ------------------------------------------------------------------
+        if dry_run:
+            return TimepointModificationsUploadService._dry_run(
+                db, cleaned, duplicates, all_feedbacks,
+            )
+
+        # ------------------------------------------------------------------
+        # 6. Persist
+        # ------------------------------------------------------------------
+        return TimepointModificationsUploadService._persist(
+            db, cleaned, duplicates, all_feedbacks,
+            filename=filename, modified_by=modified_by,
+            global_errors=errors, progress=progress,
+        )
+
+    @staticmethod
+    def _parse_and_validate(
+        file_bytes: bytes,
+        filename: str,
+        overwrite_all: bool,
+    ) -> Tuple[List[Dict[str, Any]], set, List[Dict[str, Any]], List[str], bool]:
+        """
+        Database-free half of the upload: read the file, clean rows and run the
+        duplicate pre-scan. Cached by content hash so the dry-run preview and the
+        subsequent commit parse the workbook only once.
+
+        Returns (cleaned, duplicates, feedbacks, errors, rejected); when
+        ``rejected`` is True the batch must not proceed.
+        """
         errors: List[str] = []
 
         # ------------------------------------------------------------------
@@ -185,7 +236,7 @@ class TimepointModificationsUploadService:
         try:
             df = TimepointModificationsUploadService._read_file(file_bytes, filename)
         except Exception as exc:
-            return 0, 0, [f"Failed to read file: {exc}"], []
+            return [], set(), [], [f"Failed to read file: {exc}"], True
 
         df = _normalize_columns(df)
 
@@ -197,10 +248,10 @@ class TimepointModificationsUploadService:
             if c not in df.columns
         ]
         if missing:
-            return 0, 0, [
+            return [], set(), [], [
                 f"Missing required column(s): {', '.join(missing)}. "
                 f"Expected: {', '.join(TIMEPOINT_MODIFICATIONS_REQUIRED_COLUMNS)}"
-            ], []
+            ], True
 
         records = df.to_dict("records")
 
@@ -325,24 +376,9 @@ class TimepointModificationsUploadService:
                                 "Duplicate row rejected (set overwrite_existing=true to allow)."
                             ],
                         })
-                return 0, 0, errors, all_feedbacks
-
-        # ------------------------------------------------------------------
-        # 5. Dry-run: resolve matches without writing
-        # ------------------------------------------------------------------
-        if dry_run:
-            return TimepointModificationsUploadService._dry_run(
-                db, cleaned, duplicates, all_feedbacks,
-            )
+                return cleaned, duplicates, all_feedbacks, errors, True
 
-        # ------------------------------------------------------------------
-        # 6. Persist
-        # ------------------------------------------------------------------
-        return TimepointModificationsUploadService._persist(
-            db, cleaned, duplicates, all_feedbacks,
-            filename=filename, modified_by=modified_by,
-            global_errors=errors,
-        )
+        return cleaned, duplicates, all_feedbacks, errors, False
 
     # ------------------------------------------------------------------
     # Internal helpers
@@ -500,6 +536,7 @@ class TimepointModificationsUploadService:
         filename: str,
         modified_by: str,
         global_errors: List[str],
+        progress: Optional[ProgressCallback] = None,
     ) -> Tuple[int, int, List[str], List[Dict[str, Any]]]:
         """Write matching rows and log changes to ModificationsLog."""
         feedbacks = list(existing_feedbacks)
@@ -508,7 +545,7 @@ class TimepointModificationsUploadService:
         skipped = 0
 
         # Keep track of last-row-wins for duplicates: process all, commit once
-        for rec in cleaned:
+        for rec in track(cleaned, progress):
             row_num = rec["_row_num"]
             exp_id = rec["experiment_id"]
             time_point = rec["time_point"]
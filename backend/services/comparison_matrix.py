@@ -0,0 +1,230 @@
+"""
+Cross-experiment comparison matrix.
+
+Builds one wide table for any number of experiments -- one row per
+experiment -- holding
+
+- experiment metadata (number, sample, researcher, date, status, base experiment),
+- experimental conditions (deprecated columns migrated to additives are left out),
+- additives: a ``name amount unit; ...`` summary plus one amount column per
+  compound and unit (``additive: Magnetite (g)``),
+- final and maximum value of each yield metric over the primary timepoints
+  (``grams_per_ton_yield [final]``, ``grams_per_ton_yield [max]``) and the
+  last timepoint (``last_timepoint_days``),
+- ICP endpoints: each element's value at the last timepoint that measured it
+  (``icp_fe_ppm [final]``); elements no selected experiment has are dropped.
+
+Each table is read with a single query for all requested experiments
+(experiments, conditions, additives, and one result query shared with
+:mod:`backend.services.time_series`), so the cost does not grow with one
+round trip per experiment as calling ``get_experiment_by_id`` in a loop does.
+
+Usage
+-----
+    matrix, missing = build_comparison_matrix(db, ["HPHT_MH_001", "HPHT_MH_002"])
+    data = export_comparison_matrix(matrix, "xlsx")     # or "parquet"
+"""
+from __future__ import annotations
+
+import enum
+import io
+from typing import List, Optional, Sequence, Tuple
+
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from database import Experiment, ExperimentalConditions, ChemicalAdditive, Compound
+from backend.services.time_series import get_result_points, ICP_METRICS, SCALAR_METRICS
+from utils.batching import chunked
+
+EXPERIMENT_FIELDS = ["experiment_number", "sample_id", "researcher", "date", "status", "base_experiment_id"]
+
+# Replaced by ChemicalAdditive rows (see ExperimentalConditions)
+DEPRECATED_CONDITION_FIELDS = {
+    "catalyst", "catalyst_mass", "catalyst_percentage", "catalyst_ppm", "buffer_system",
+    "buffer_concentration", "surfactant_type", "surfactant_concentration", "ammonium_chloride_concentration",
+}
+CONDITION_FIELDS = [
+    c.name for c in ExperimentalConditions.__table__.columns
+    if c.name not in {"id", "experiment_id", "experiment_fk", "created_at", "updated_at"}
+    and c.name not in DEPRECATED_CONDITION_FIELDS
+]
+
+DEFAULT_YIELD_METRICS = [
+    "grams_per_ton_yield",
+    "h2_grams_per_ton_yield",
+    "h2_micromoles",
+    "ferrous_iron_yield",
+    "gross_ammonium_concentration_mM",
+    "final_ph",
+    "final_conductivity_mS_cm",
+]
+
+EXPORT_FORMATS = ("xlsx", "parquet")
+
+
+def _plain(value):
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+def _experiments_frame(db: Session, experiment_ids: List[str]) -> pd.DataFrame:
+    rows = [
+        row
+        for chunk in chunked(experiment_ids)
+        for row in db.query(Experiment.experiment_id, *[getattr(Experiment, f) for f in EXPERIMENT_FIELDS])
+        .filter(Experiment.experiment_id.in_(chunk))
+        .all()
+    ]
+    frame = pd.DataFrame([[_plain(v) for v in row] for row in rows], columns=["experiment_id", *EXPERIMENT_FIELDS])
+    return frame.set_index("experiment_id")
+
+
+def _conditions_frame(db: Session, experiment_ids: List[str]) -> pd.DataFrame:
+    rows = [
+        row
+        for chunk in chunked(experiment_ids)
+        for row in db.query(Experiment.experiment_id, *[getattr(ExperimentalConditions, f) for f in CONDITION_FIELDS])
+        .join(ExperimentalConditions, ExperimentalConditions.experiment_fk == Experiment.id)
+        .filter(Experiment.experiment_id.in_(chunk))
+        .order_by(ExperimentalConditions.id)
+        .all()
+    ]
+    frame = pd.DataFrame(rows, columns=["experiment_id", *CONDITION_FIELDS])
+    # One conditions row per experiment; keep the newest if there are strays
+    return frame.drop_duplicates("experiment_id", keep="last").set_index("experiment_id")
+
+
+def _additives_frame(db: Session, experiment_ids: List[str]) -> pd.DataFrame:
+    rows = [
+        row
+        for chunk in chunked(experiment_ids)
+        for row in db.query(Experiment.experiment_id, Compound.name, ChemicalAdditive.amount, ChemicalAdditive.unit)
+        .join(ExperimentalConditions, ExperimentalConditions.experiment_fk == Experiment.id)
+        .join(ChemicalAdditive, ChemicalAdditive.experiment_id == ExperimentalConditions.id)
+        .join(Compound, Compound.id == ChemicalAdditive.compound_id)
+        .filter(Experiment.experiment_id.in_(chunk))
+        .order_by(Experiment.experiment_id, ChemicalAdditive.addition_order, Compound.name)
+        .all()
+    ]
+    if not rows:
+        return pd.DataFrame(index=pd.Index([], name="experiment_id"))
+    additives = pd.DataFrame(
+        [(exp_id, name, amount, _plain(unit)) for exp_id, name, amount, unit in rows],
+        columns=["experiment_id", "compound", "amount", "unit"],
+    )
+    summary = additives.groupby("experiment_id", sort=False).apply(
+        lambda g: "; ".join(f"{c} {a:g} {u}" for c, a, u in zip(g["compound"], g["amount"], g["unit"])),
+        include_groups=False,
+    ).rename("additives_summary")
+    additives["column"] = "additive: " + additives["compound"] + " (" + additives["unit"] + ")"
+    amounts = additives.pivot_table(index="experiment_id", columns="column", values="amount", aggfunc="sum")
+    amounts = amounts[sorted(amounts.columns, key=str.lower)]
+    amounts.columns.name = None
+    return pd.concat([summary, amounts], axis=1)
+
+
+def _results_frame(db: Session, experiment_ids: List[str], yield_metrics: List[str],
+                   include_icp: bool) -> pd.DataFrame:
+    icp_metrics = list(ICP_METRICS) if include_icp else []
+    metrics = yield_metrics + icp_metrics
+    if not metrics:
+        return pd.DataFrame(index=pd.Index([], name="experiment_id"))
+    points = get_result_points(db, experiment_ids, metrics, time_axis="actual")
+    grouped = points.groupby("experiment_id", sort=False)
+
+    parts = [grouped["t"].max().rename("last_timepoint_days")]
+    if yield_metrics:
+        # GroupBy.last() takes the last non-null value, i.e. the latest measurement
+        parts.append(grouped[yield_metrics].last().add_suffix(" [final]"))
+        parts.append(grouped[yield_metrics].max().add_suffix(" [max]"))
+    if icp_metrics:
+        icp = grouped[icp_metrics].last().dropna(axis=1, how="all")
+        parts.append(icp.add_suffix(" [final]"))
+    frame = pd.concat(parts, axis=1)
+    if yield_metrics:
+        # Keep each metric's final/max next to each other
+        ordered = ["last_timepoint_days"]
+        for m in yield_metrics:
+            ordered += [f"{m} [final]", f"{m} [max]"]
+        frame = frame[ordered + [c for c in frame.columns if c not in ordered]]
+    return frame
+
+
+def build_comparison_matrix(
+    db: Session,
+    experiment_ids: Sequence[str],
+    *,
+    yield_metrics: Optional[Sequence[str]] = None,
+    include_icp: bool = True,
+) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Build the comparison matrix for ``experiment_ids``.
+
+    Args:
+        db: Database session
+        experiment_ids: Experiment IDs; rows keep this order (duplicates dropped)
+        yield_metrics: Scalar metrics to summarise as final/max (default ``DEFAULT_YIELD_METRICS``)
+        include_icp: Add ICP element endpoints
+
+    Returns:
+        Tuple of (matrix indexed by experiment_id, experiment IDs that were not found)
+
+    Raises:
+        ValueError: If a yield metric is not a known result metric.
+    """
+    requested = list(dict.fromkeys(str(e) for e in experiment_ids))
+    yield_metrics = list(DEFAULT_YIELD_METRICS if yield_metrics is None else dict.fromkeys(yield_metrics))
+    unknown = [m for m in yield_metrics if m not in SCALAR_METRICS]
+    if unknown:
+        raise ValueError(f"Unknown yield metric(s): {unknown}")
+
+    experiments = _experiments_frame(db, requested)
+    found = [e for e in requested if e in experiments.index]
+    missing = [e for e in requested if e not in experiments.index]
+    if not found:
+        return experiments.reindex(found), missing
+
+    matrix = pd.concat(
+        [
+            experiments,
+            _conditions_frame(db, found),
+            _additives_frame(db, found),
+            _results_frame(db, found, yield_metrics, include_icp),
+        ],
+        axis=1,
+    ).reindex(found)
+    matrix.index.name = "experiment_id"
+    return matrix, missing
+
+
+def export_comparison_matrix(matrix: pd.DataFrame, fmt: str = "xlsx", transpose: bool = False) -> bytes:
+    """
+    Serialize a comparison matrix to Excel or Parquet bytes.
+
+    ``transpose`` (Excel only) writes fields as rows and experiments as
+    columns, the usual layout for reviewing an experimental grid.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {list(EXPORT_FORMATS)}")
+    frame = matrix.copy()
+    for col in frame.columns:
+        if isinstance(frame[col].dtype, pd.DatetimeTZDtype):
+            frame[col] = frame[col].dt.tz_localize(None)  # Excel has no time zones
+
+    buf = io.BytesIO()
+    if fmt == "parquet":
+        # Object columns may mix numbers and text (e.g. particle_size); store them as text
+        for col in frame.columns[frame.dtypes == object]:
+            frame[col] = frame[col].map(lambda v: None if pd.isna(v) else str(v))
+        frame.to_parquet(buf, index=True)
+        return buf.getvalue()
+
+    if transpose:
+        frame = frame.T
+        frame.index.name = "field"
+    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
+        frame.to_excel(writer, sheet_name="Comparison")
+        sheet = writer.sheets["Comparison"]
+        sheet.freeze_panes = "B2"
+        sheet.column_dimensions["A"].width = 38 if transpose else 18
+    return buf.getvalue()
@@ -9,6 +9,7 @@ Experiment IDs encode the type in the leading prefix segment:
   - anything else → ExperimentType.OTHER ("Other")
 """
 
+from database.lineage_utils import parse_experiment_id_parts
 from database.models.enums import ExperimentType
 
 # Map uppercase ID prefixes to ExperimentType enum members.
@@ -25,8 +26,9 @@ def infer_experiment_type_from_id(experiment_id: str) -> ExperimentType:
     """
     Infer the ExperimentType from the leading prefix of an experiment ID.
 
-    The prefix is the segment before the first underscore, compared
-    case-insensitively against the known prefix map. Returns
+    The prefix is the segment before the first underscore (taken from the
+    shared cached parser), compared case-insensitively against the known
+    prefix map. Returns
     ExperimentType.OTHER for unrecognised prefixes.
 
     Args:
@@ -35,10 +37,7 @@ def infer_experiment_type_from_id(experiment_id: str) -> ExperimentType:
     Returns:
         The matching ExperimentType enum member, or ExperimentType.OTHER.
     """
-    if not experiment_id:
-        return ExperimentType.OTHER
-
-    prefix = experiment_id.split("_")[0].upper()
+    prefix = parse_experiment_id_parts(experiment_id).type_prefix
     return _PREFIX_TO_TYPE.get(prefix, ExperimentType.OTHER)
 
 
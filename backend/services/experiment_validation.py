@@ -20,6 +20,7 @@ Format Examples:
 
 from typing import Optional, Tuple, Dict, List
 from dataclasses import dataclass
+from database.lineage_utils import parse_experiment_id_parts
 from database.models.enums import ExperimentType
 import re
 
@@ -87,6 +88,8 @@ def extract_lineage_info(experiment_id: str) -> Tuple[str, Optional[int], Option
     - Underscore-TEXT for treatment variants (e.g., _Desorption)
     
     Supports both 2-part (TYPE_INDEX) and 3-part (TYPE_INITIALS_INDEX) formats.
+    Delegates to database.lineage_utils.parse_experiment_id_parts, so lineage,
+    validation and type inference always agree and share one parse cache.
     
     Args:
         experiment_id: The full experiment ID
@@ -112,56 +115,8 @@ def extract_lineage_info(experiment_id: str) -> Tuple[str, Optional[int], Option
         >>> extract_lineage_info("HPHT_001-2_Desorption")
         ("HPHT_001", 2, "Desorption")
     """
-    if not experiment_id:
-        return "", None, None
-    
-    treatment_variant = None
-    sequential_number = None
-    base_id = experiment_id
-    
-    # First, extract sequential number (hyphen-NUMBER pattern from the end)
-    # This must be done before treatment detection to avoid confusion
-    if '-' in experiment_id:
-        hyphen_parts = experiment_id.rsplit('-', 1)
-        if len(hyphen_parts) == 2 and hyphen_parts[-1].isdigit():
-            sequential_number = int(hyphen_parts[-1])
-            base_id = hyphen_parts[0]
-    
-    # Now check for treatment variant in the remaining base_id
-    # Split by underscore to detect if last part is a treatment
-    parts = base_id.split('_')
-    
-    # Determine expected base format by checking part count
-    # After removing sequential, we should have:
-    # - 2 parts for TYPE_INDEX format (e.g., HPHT_001)
-    # - 3 parts for TYPE_INITIALS_INDEX format (e.g., Serum_MH_101)
-    # If we have more parts than expected, the last part is likely a treatment
-    
-    if len(parts) > 2:
-        # Could be 2-part format with treatment, or 3-part format (with or without treatment)
-        potential_treatment = parts[-1]
-        
-        # Check if last part looks like a treatment (not all numeric)
-        if not potential_treatment.isdigit():
-            # Last part is not numeric, likely a treatment
-            # But we need to distinguish between:
-            # - HPHT_001_Desorption (2-part + treatment, len=3)
-            # - Serum_MH_101_Desorption (3-part + treatment, len=4)
-            # - Serum_MH_101 (3-part base, len=3)
-            
-            # If we have exactly 3 parts and last is non-numeric, it could be:
-            # - TYPE_INDEX + treatment (HPHT_001_Desorption)
-            # - TYPE_INITIALS_INDEX base (Serum_MH_101) - but 101 is numeric, so this won't match
-            
-            # If we have 4+ parts, definitely a treatment (TYPE_INITIALS_INDEX + treatment)
-            # If we have 3 parts and last is non-numeric, it's TYPE_INDEX + treatment
-            if len(parts) >= 3:
-                treatment_variant = potential_treatment
-                base_id = '_'.join(parts[:-1])
-        # If last part is numeric and we have exactly 3 parts, it's TYPE_INITIALS_INDEX base format
-        # If last part is numeric and we have exactly 2 parts, it's TYPE_INDEX base format
-    
-    return base_id, sequential_number, treatment_variant
+    base_id, sequential_number, treatment_variant = parse_experiment_id_parts(experiment_id).lineage_key
+    return base_id or "", sequential_number, treatment_variant
 
 
 def parse_experiment_id(experiment_id: str) -> ParsedExperimentID:
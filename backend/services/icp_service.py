@@ -14,6 +14,7 @@ from backend.services.result_merge_utils import (
     choose_parent_candidate,
     update_cumulative_times_for_chain,
 )
+from utils.progress import ProgressCallback, track
 
 class ICPService:
     """Service for handling ICP elemental analysis data operations."""
@@ -608,13 +609,18 @@ class ICPService:
         return experimental_result, was_update
     
     @staticmethod
-    def bulk_create_icp_results(db: Session, processed_data: List[Dict[str, Any]]) -> Tuple[List[ExperimentalResults], List[str]]:
+    def bulk_create_icp_results(
+        db: Session,
+        processed_data: List[Dict[str, Any]],
+        progress: Optional[ProgressCallback] = None,
+    ) -> Tuple[List[ExperimentalResults], List[str]]:
         """
         Bulk create ICP results with validation and error collection.
         
         Args:
             db: Database session
             processed_data: List of processed ICP data dictionaries
+            progress: Optional callback receiving the fraction of samples processed
             
         Returns:
             Tuple of (successful_results, error_messages)
@@ -622,7 +628,7 @@ class ICPService:
         results_to_add = []
         errors = []
         
-        for idx, data in enumerate(processed_data):
+        for idx, data in enumerate(track(processed_data, progress, label="samples")):
             try:
                 experiment_id = data.get('experiment_id')
                 time_post_reaction = data.get('time_post_reaction')
@@ -0,0 +1,300 @@
+"""
+Streaming ingest for long-format metric records from instrument PCs.
+
+Instruments (GC, NMR, ICP export scripts) post batches of
+``{experiment_id, time_post_reaction, metric, value, unit}`` records. Each
+record is validated on arrival with the same rules as the long-format Excel
+upload (:func:`backend.services.bulk_uploads.long_format.parse_long_format_record`)
+and merged into an in-memory group per ``(experiment_id, time_post_reaction)``
+-- later values for the same metric win, exactly as with duplicate rows in
+one workbook.
+
+Pending groups are written by a background thread in one transaction per
+flush, when either
+
+- ``LONG_FORMAT_FLUSH_GROUPS`` groups are pending, or
+- the oldest pending record has waited ``LONG_FORMAT_FLUSH_SECONDS``.
+
+Each group is upserted as a partial scalar-result update. The experiments of
+all groups are looked up before writing, so a group for an unknown
+experiment is reported without discarding the rest of the batch. If writing
+or committing fails (e.g. SQLite is locked by a long upload), the whole
+transaction is rolled back and the batch is re-queued and retried on the
+next cycle. When more than ``LONG_FORMAT_MAX_PENDING_GROUPS`` groups are pending,
+``submit`` flushes inline so producers slow down instead of growing memory.
+
+Pending records live in memory only; :func:`shutdown_long_format_ingestor`
+flushes them, but a hard crash loses whatever was not yet flushed.
+
+Usage
+-----
+    ingestor = get_long_format_ingestor()
+    outcome = ingestor.submit([
+        {"experiment_id": "HPHT_MH_001", "time_post_reaction": 7,
+         "metric": "final_ph", "value": 8.1},
+    ], source="gc-pc-1")
+"""
+from __future__ import annotations
+
+import os
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy.orm import sessionmaker
+
+from database import SessionLocal
+from backend.services.bulk_uploads.long_format import (
+    parse_long_format_record,
+    add_to_group,
+    upsert_long_format_groups,
+)
+from utils.query_instrumentation import query_scope
+
+logger = logging.getLogger(__name__)
+
+FLUSH_MAX_GROUPS = int(os.environ.get("LONG_FORMAT_FLUSH_GROUPS", "200"))
+FLUSH_MAX_SECONDS = float(os.environ.get("LONG_FORMAT_FLUSH_SECONDS", "5"))
+MAX_PENDING_GROUPS = int(os.environ.get("LONG_FORMAT_MAX_PENDING_GROUPS", "5000"))
+FLUSH_HISTORY = 50
+
+GroupKey = Tuple[str, float]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class LongFormatIngestor:
+    """Validates, coalesces and bulk-writes long-format records."""
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = SessionLocal,
+        max_groups: int = FLUSH_MAX_GROUPS,
+        max_seconds: float = FLUSH_MAX_SECONDS,
+        max_pending_groups: int = MAX_PENDING_GROUPS,
+    ):
+        self._session_factory = session_factory
+        self.max_groups = max_groups
+        self.max_seconds = max_seconds
+        self.max_pending_groups = max(max_pending_groups, max_groups)
+
+        self._lock = threading.Lock()          # guards the pending buffers and counters
+        self._flush_lock = threading.Lock()    # one flush at a time
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._groups: Dict[GroupKey, Dict[str, Any]] = {}
+        self._rows: Dict[GroupKey, List[int]] = {}
+        self._oldest: Optional[float] = None
+        self._sequence = 0
+        self._totals = {"accepted": 0, "rejected": 0, "flushes": 0, "created": 0, "updated": 0,
+                        "skipped": 0, "failed_groups": 0}
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=FLUSH_HISTORY)
+
+    # -- producer side ----------------------------------------------------------
+
+    def submit(self, records: Iterable[Mapping[str, Any]], source: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Validate and queue records.
+
+        Args:
+            records: Dicts with experiment_id, time_post_reaction, metric, value and optional unit
+            source: Free-text producer name used in logs
+
+        Returns:
+            Dict with ``accepted``, ``rejected``, ``errors`` (row-prefixed
+            messages; rows are the ingestor's sequence numbers) and
+            ``pending_groups``.
+        """
+        accepted = 0
+        errors: List[str] = []
+        parsed_records = []
+        with self._lock:
+            for record in records:
+                self._sequence += 1
+                seq = self._sequence
+                if not isinstance(record, Mapping):
+                    errors.append(f"Row {seq}: Record must be an object.")
+                    continue
+                if any(isinstance(v, (list, dict)) for v in record.values()):
+                    errors.append(f"Row {seq}: Record values must be scalars.")
+                    continue
+                parsed, record_errors, feedback = parse_long_format_record(
+                    seq, record.get("experiment_id"), record.get("time_post_reaction"),
+                    record.get("metric"), record.get("value"), record.get("unit") or None,
+                )
+                if feedback is not None:
+                    errors.extend(record_errors)
+                elif parsed is not None:
+                    parsed_records.append((seq, parsed))
+
+            for seq, parsed in parsed_records:
+                add_to_group(self._groups, self._rows, parsed, seq)
+                accepted += 1
+            if parsed_records and self._oldest is None:
+                self._oldest = time.monotonic()
+            rejected = len(errors)
+            self._totals["accepted"] += accepted
+            self._totals["rejected"] += rejected
+            pending = len(self._groups)
+
+        if errors:
+            logger.warning(f"Long-format ingest from {source or 'unknown'}: rejected {rejected} record(s); first: {errors[0]}")
+        if pending >= self.max_pending_groups:
+            # Backpressure: the producer pays for the flush
+            self.flush()
+        elif pending >= self.max_groups:
+            self._wakeup.set()
+        return {"accepted": accepted, "rejected": rejected, "errors": errors, "pending_groups": pending}
+
+    # -- consumer side ----------------------------------------------------------
+
+    def _take_pending(self) -> Tuple[Dict[GroupKey, Dict[str, Any]], Dict[GroupKey, List[int]]]:
+        with self._lock:
+            groups, rows = self._groups, self._rows
+            self._groups, self._rows, self._oldest = {}, {}, None
+        return groups, rows
+
+    def _requeue(self, groups: Dict[GroupKey, Dict[str, Any]], rows: Dict[GroupKey, List[int]]) -> None:
+        """Put a failed batch back without overriding values that arrived since."""
+        with self._lock:
+            for key, fields in groups.items():
+                merged = dict(fields)
+                merged.update(self._groups.get(key, {}))
+                self._groups[key] = merged
+                self._rows[key] = rows.get(key, []) + self._rows.get(key, [])
+            if self._groups and self._oldest is None:
+                self._oldest = time.monotonic()
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """
+        Write all pending groups in one transaction.
+
+        Returns:
+            Flush summary (created, updated, skipped, failed_groups, errors,
+            duration_ms), or None when nothing was pending.
+        """
+        with self._flush_lock:
+            groups, rows = self._take_pending()
+            if not groups:
+                return None
+
+            start = time.perf_counter()
+            db = self._session_factory()
+            try:
+                with query_scope("upload:long_format_stream"):
+                    created, updated, skipped, errors, feedbacks = upsert_long_format_groups(
+                        db, groups, rows, atomic=True,
+                    )
+                    db.commit()
+            except Exception as e:
+                db.rollback()
+                self._requeue(groups, rows)
+                logger.error(f"Long-format ingest flush of {len(groups)} group(s) failed, re-queued: {e}")
+                return {"flushed_at": _now().isoformat(timespec="seconds"), "groups": len(groups),
+                        "created": 0, "updated": 0, "skipped": 0, "failed_groups": 0,
+                        "errors": [f"Flush failed and was re-queued: {e}"], "requeued": True,
+                        "duration_ms": round((time.perf_counter() - start) * 1000.0, 1)}
+            finally:
+                db.close()
+
+            failed = sum(1 for fb in feedbacks if fb["status"] == "error")
+            summary = {
+                "flushed_at": _now().isoformat(timespec="seconds"),
+                "groups": len(groups),
+                "created": created,
+                "updated": updated,
+                "skipped": skipped,
+                "failed_groups": failed,
+                "errors": errors,
+                "requeued": False,
+                "duration_ms": round((time.perf_counter() - start) * 1000.0, 1),
+            }
+            with self._lock:
+                self._totals["flushes"] += 1
+                for k in ("created", "updated", "skipped"):
+                    self._totals[k] += summary[k]
+                self._totals["failed_groups"] += failed
+                self._history.append(summary)
+            log = logger.warning if errors else logger.info
+            log(f"Long-format ingest flushed {len(groups)} group(s): created {created}, updated {updated}, "
+                f"skipped {skipped}, failed {failed} in {summary['duration_ms']} ms")
+            return summary
+
+    def _due(self) -> bool:
+        with self._lock:
+            if not self._groups:
+                return False
+            return (len(self._groups) >= self.max_groups
+                    or time.monotonic() - self._oldest >= self.max_seconds)
+
+    def _run(self) -> None:
+        poll = max(0.05, min(1.0, self.max_seconds / 4))
+        while not self._stopping.is_set():
+            self._wakeup.wait(timeout=poll)
+            self._wakeup.clear()
+            if self._due():
+                try:
+                    self.flush()
+                except Exception as e:  # keep the flusher alive
+                    logger.error(f"Long-format ingest flusher error: {e}", exc_info=True)
+
+    # -- lifecycle ----------------------------------------------------------------
+
+    def start(self) -> "LongFormatIngestor":
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="long-format-ingest", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, flush: bool = True) -> None:
+        """Stop the background flusher, writing pending groups first by default."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        if flush:
+            self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            age = time.monotonic() - self._oldest if self._oldest is not None else None
+            return {
+                **self._totals,
+                "pending_groups": len(self._groups),
+                "pending_records": sum(len(r) for r in self._rows.values()),
+                "oldest_pending_seconds": round(age, 2) if age is not None else None,
+                "recent_flushes": list(self._history)[-10:],
+            }
+
+
+# Global ingestor (one per server process)
+_ingestor: Optional[LongFormatIngestor] = None
+_ingestor_lock = threading.Lock()
+
+
+def get_long_format_ingestor() -> LongFormatIngestor:
+    """Return the process-wide ingestor, starting its flusher on first use."""
+    global _ingestor
+    with _ingestor_lock:
+        if _ingestor is None:
+            _ingestor = LongFormatIngestor().start()
+            logger.info("Started long-format ingestor")
+        return _ingestor
+
+
+def shutdown_long_format_ingestor() -> None:
+    """Flush pending records and stop the flusher."""
+    global _ingestor
+    with _ingestor_lock:
+        if _ingestor is not None:
+            _ingestor.stop(flush=True)
+            _ingestor = None
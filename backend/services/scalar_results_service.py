@@ -9,6 +9,7 @@ from backend.services.result_merge_utils import (
     choose_parent_candidate,
     update_cumulative_times_for_chain,
 )
+from utils.progress import ProgressCallback, track
 
 # All updatable scalar fields -- shared by create and audit-trail logic.
 SCALAR_UPDATABLE_FIELDS = [
@@ -240,10 +241,13 @@ class ScalarResultsService:
     def bulk_create_scalar_results_ex(
         db: Session,
         results_data: List[Dict[str, Any]],
+        progress: Optional[ProgressCallback] = None,
     ) -> Tuple[List[ExperimentalResults], List[str], List[Dict[str, Any]]]:
         """
         Extended bulk create that also returns per-row structured feedback.
 
+        ``progress`` (optional) is called with the fraction of rows processed.
+
         Returns:
             ``(successful_results, error_messages, row_feedbacks)``
             Each feedback dict has keys: row, experiment_id, time_post_reaction,
@@ -254,7 +258,7 @@ class ScalarResultsService:
         errors: List[str] = []
         feedbacks: List[Dict[str, Any]] = []
 
-        for index, row_data in enumerate(results_data):
+        for index, row_data in enumerate(track(results_data, progress)):
             row_num = index + 2  # Excel row (1-indexed header + 1)
             fb: Dict[str, Any] = {
                 "row": row_num,
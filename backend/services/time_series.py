@@ -0,0 +1,367 @@
+"""
+Time-series queries over experiment results.
+
+Returns selected metrics for a set of experiments as one NumPy array of
+shape ``(experiments, metrics, times)`` on a shared time grid, so overlays
+of many experiments do not go through per-row ORM objects or client-side
+resampling.
+
+Rows follow the semantics of ``v_primary_experiment_results``: one row per
+primary result, with scalar and ICP values resolved per
+``(experiment, time bucket)`` (the primary result first, then the newest).
+The query is built directly on the base tables, though, with the experiment
+filter applied inside each ranked subquery; the view's window functions would
+otherwise rank every result in the database on each call.
+
+Time axes:
+
+- ``actual``      ``time_post_reaction_days``
+- ``bucket``      ``time_post_reaction_bucket_days`` (rounded actual time when unset)
+- ``cumulative``  ``cumulative_time_post_reaction_days`` (across the lineage chain)
+
+Grids:
+
+- ``grid=None``: the union of observed times; missing points are NaN.
+- ``grid=<step>`` (float): a regular grid from the earliest to the latest
+  observation; ``grid=<sequence>``: explicit grid points.
+
+Values are placed on the grid with ``interpolate``: ``"linear"`` (default for
+regular and explicit grids), ``"previous"`` (last observation carried
+forward) or ``"none"`` (observed points only). Interpolation never
+extrapolates beyond an experiment's first or last observation.
+``max_points`` then downsamples the grid by averaging (NaN-aware) into at
+most that many bins.
+
+Usage
+-----
+    series = get_time_series(db, ["HPHT_MH_001", "HPHT_MH_002"], ["final_ph", "icp_fe_ppm"],
+                             time_axis="cumulative", grid=1.0)
+    series.values.shape        # (2, 2, n_days)
+    payload = series.to_npz()  # compact binary payload
+"""
+from __future__ import annotations
+
+import io
+import warnings
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Float, and_, func, select
+from sqlalchemy.orm import Session
+
+from database import Experiment, ExperimentalResults, ScalarResults, ICPResults
+from utils.batching import IN_CHUNK_SIZE, chunked
+
+TIME_AXES = ("actual", "bucket", "cumulative")
+INTERPOLATIONS = ("none", "linear", "previous")
+MAX_GRID_POINTS = 100_000
+# The points query binds its experiment FK list up to three times
+POINTS_CHUNK_SIZE = IN_CHUNK_SIZE // 3
+
+_results = ExperimentalResults.__table__
+_scalars = ScalarResults.__table__
+_icp = ICPResults.__table__
+
+# Metric names match the columns of v_primary_experiment_results
+SCALAR_METRICS: Dict[str, str] = {
+    c.name: c.name for c in _scalars.columns
+    if isinstance(c.type, Float) and not c.foreign_keys
+}
+ICP_METRICS: Dict[str, str] = {
+    f"icp_{c.name}_ppm": c.name for c in _icp.columns
+    if isinstance(c.type, Float) and c.name != "dilution_factor"
+}
+METRICS = {**SCALAR_METRICS, **ICP_METRICS}
+
+
+@dataclass
+class TimeSeriesSet:
+    """Aligned time series: ``values[i, j, k]`` is metric j of experiment i at ``times[k]``."""
+    experiment_ids: List[str]
+    metrics: List[str]
+    time_axis: str
+    times: np.ndarray
+    values: np.ndarray
+    missing_experiments: List[str] = field(default_factory=list)
+
+    def to_npz(self, dtype=np.float32) -> bytes:
+        """Serialize to a compressed ``.npz`` (load with ``np.load(io.BytesIO(data))``)."""
+        buf = io.BytesIO()
+        np.savez_compressed(
+            buf,
+            experiment_ids=np.array(self.experiment_ids, dtype=str),
+            metrics=np.array(self.metrics, dtype=str),
+            time_axis=np.array(self.time_axis),
+            times=self.times.astype(np.float64),
+            values=self.values.astype(dtype),
+        )
+        return buf.getvalue()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-friendly form; NaN becomes None."""
+        values = self.values.astype(object)
+        values[np.isnan(self.values)] = None
+        return {
+            "experiment_ids": self.experiment_ids,
+            "metrics": self.metrics,
+            "time_axis": self.time_axis,
+            "times": self.times.tolist(),
+            "values": values.tolist(),
+            "missing_experiments": self.missing_experiments,
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """Long frame ``(experiment_id, time, metric, value)`` without NaN points."""
+        e, m, t = np.nonzero(~np.isnan(self.values))
+        return pd.DataFrame({
+            "experiment_id": np.array(self.experiment_ids, dtype=object)[e],
+            "time": self.times[t],
+            "metric": np.array(self.metrics, dtype=object)[m],
+            "value": self.values[e, m, t],
+        })
+
+
+# ---------------------------------------------------------------------------
+# Query
+# ---------------------------------------------------------------------------
+
+def _bucket_key():
+    return func.coalesce(_results.c.time_post_reaction_bucket_days, func.round(_results.c.time_post_reaction_days, 4))
+
+
+def _ranked(table, columns: List[str], experiment_fks: List[int]):
+    """Values of ``table`` per (experiment, bucket), ranked like the reporting view."""
+    bucket = _bucket_key()
+    return (
+        select(
+            _results.c.experiment_fk,
+            bucket.label("bucket_key"),
+            *[table.c[name] for name in columns],
+            func.row_number().over(
+                partition_by=(_results.c.experiment_fk, bucket),
+                order_by=(_results.c.is_primary_timepoint_result.desc(), _results.c.id.desc()),
+            ).label("rn"),
+        )
+        .select_from(_results.join(table, table.c.result_id == _results.c.id))
+        .where(_results.c.experiment_fk.in_(experiment_fks))
+        .subquery()
+    )
+
+
+def _query_points(db: Session, experiment_fks: List[int], metrics: List[str], time_axis: str) -> pd.DataFrame:
+    """Points for one chunk of experiments (the FK list is bound up to three times)."""
+    bucket = _bucket_key()
+    time_col = {
+        "actual": _results.c.time_post_reaction_days,
+        "bucket": bucket,
+        "cumulative": _results.c.cumulative_time_post_reaction_days,
+    }[time_axis]
+
+    scalar_metrics = [m for m in metrics if m in SCALAR_METRICS]
+    icp_metrics = [m for m in metrics if m in ICP_METRICS]
+    selected = [_results.c.experiment_fk, time_col.label("t")]
+    from_ = _results
+    for table, names, ranked_metrics in ((_scalars, SCALAR_METRICS, scalar_metrics),
+                                         (_icp, ICP_METRICS, icp_metrics)):
+        if not ranked_metrics:
+            continue
+        ranked = _ranked(table, [names[m] for m in ranked_metrics], experiment_fks)
+        from_ = from_.outerjoin(ranked, and_(ranked.c.experiment_fk == _results.c.experiment_fk,
+                                             ranked.c.bucket_key == bucket, ranked.c.rn == 1))
+        selected += [ranked.c[names[m]].label(m) for m in ranked_metrics]
+
+    stmt = (
+        select(*selected)
+        .select_from(from_)
+        .where(_results.c.is_primary_timepoint_result.is_(True),
+               _results.c.experiment_fk.in_(experiment_fks),
+               time_col.isnot(None))
+    )
+    rows = db.execute(stmt).all()
+    return pd.DataFrame(rows, columns=["experiment_fk", "t", *scalar_metrics, *icp_metrics])
+
+
+# ---------------------------------------------------------------------------
+# Alignment
+# ---------------------------------------------------------------------------
+
+def _place(t_obs: np.ndarray, y_obs: np.ndarray, grid: np.ndarray, interpolate: str) -> np.ndarray:
+    """Map one series onto ``grid`` without extrapolating."""
+    out = np.full(grid.shape, np.nan)
+    mask = ~np.isnan(y_obs)
+    t, y = t_obs[mask], y_obs[mask]
+    if t.size == 0:
+        return out
+    if interpolate == "none":
+        idx = np.searchsorted(t, grid)
+        for offset in (0, -1):
+            j = np.clip(idx + offset, 0, t.size - 1)
+            hit = np.isclose(t[j], grid) & np.isnan(out)
+            out[hit] = y[j[hit]]
+        return out
+    inside = (grid >= t[0]) & (grid <= t[-1])
+    if interpolate == "linear":
+        out[inside] = np.interp(grid[inside], t, y)
+    else:  # previous
+        j = np.searchsorted(t, grid[inside], side="right") - 1
+        out[inside] = y[j]
+    return out
+
+
+def _downsample(times: np.ndarray, values: np.ndarray, max_points: int):
+    """Average grid points into at most ``max_points`` equal-width time bins."""
+    if max_points <= 0 or times.size <= max_points:
+        return times, values
+    edges = np.linspace(times[0], times[-1], max_points + 1)
+    bins = np.clip(np.searchsorted(edges, times, side="right") - 1, 0, max_points - 1)
+    used = np.unique(bins)
+    new_times = np.array([times[bins == b].mean() for b in used])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN bins stay NaN
+        new_values = np.stack([np.nanmean(values[..., bins == b], axis=-1) for b in used], axis=-1)
+    return new_times, new_values
+
+
+def _build_grid(observed: np.ndarray, grid: Union[None, float, Sequence[float]]) -> np.ndarray:
+    if grid is None:
+        return np.unique(observed)
+    if np.isscalar(grid):
+        step = float(grid)
+        if step <= 0:
+            raise ValueError("grid step must be positive")
+        if observed.size == 0:
+            return np.array([], dtype=float)
+        lo, hi = float(observed.min()), float(observed.max())
+        n = int(np.floor((hi - lo) / step + 1e-9)) + 1
+        if n > MAX_GRID_POINTS:
+            raise ValueError(f"grid step {step:g} gives {n} points (max {MAX_GRID_POINTS})")
+        return lo + step * np.arange(n)
+    points = np.unique(np.asarray(grid, dtype=float))
+    if points.size > MAX_GRID_POINTS:
+        raise ValueError(f"grid has {points.size} points (max {MAX_GRID_POINTS})")
+    return points
+
+
+def _validate(metrics: Sequence[str], time_axis: str) -> List[str]:
+    if time_axis not in TIME_AXES:
+        raise ValueError(f"time_axis must be one of {list(TIME_AXES)}")
+    metrics = list(dict.fromkeys(metrics))
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown or not metrics:
+        raise ValueError(f"Unknown metric(s): {unknown}" if unknown else "No metrics requested")
+    return metrics
+
+
+def _lookup_experiments(db: Session, experiment_ids: Sequence[str]) -> Tuple[Dict[str, int], List[str]]:
+    """Map requested experiment IDs (in request order, deduplicated) to PKs; also return the missing ones."""
+    requested = list(dict.fromkeys(str(e) for e in experiment_ids))
+    if not requested:
+        return {}, []
+    pks = {}
+    for chunk in chunked(requested):
+        pks.update(db.query(Experiment.experiment_id, Experiment.id).filter(Experiment.experiment_id.in_(chunk)).all())
+    return {e: pks[e] for e in requested if e in pks}, [e for e in requested if e not in pks]
+
+
+def _points(db: Session, fk_by_id: Dict[str, int], metrics: List[str], time_axis: str) -> pd.DataFrame:
+    if fk_by_id:
+        points = pd.concat(
+            [_query_points(db, chunk, metrics, time_axis)
+             for chunk in chunked(list(fk_by_id.values()), size=POINTS_CHUNK_SIZE)],
+            ignore_index=True,
+        )
+    else:
+        points = pd.DataFrame(columns=["experiment_fk", "t", *metrics])
+    id_by_fk = {fk: exp_id for exp_id, fk in fk_by_id.items()}
+    points.insert(0, "experiment_id", points["experiment_fk"].map(id_by_fk).astype(object))
+    points = points.drop(columns="experiment_fk").astype({"t": float, **{m: float for m in metrics}})
+    return points.sort_values(["experiment_id", "t"], kind="mergesort").reset_index(drop=True)
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def get_result_points(
+    db: Session,
+    experiment_ids: Sequence[str],
+    metrics: Sequence[str],
+    time_axis: str = "actual",
+) -> pd.DataFrame:
+    """
+    Observed values of ``metrics`` at each primary timepoint, in one query.
+
+    Returns:
+        DataFrame with columns ``experiment_id, t`` and one float column per
+        metric, sorted by experiment and time; rows without a time on
+        ``time_axis`` are omitted.
+
+    Raises:
+        ValueError: On an unknown metric or time axis.
+    """
+    metrics = _validate(metrics, time_axis)
+    fk_by_id, _missing = _lookup_experiments(db, experiment_ids)
+    return _points(db, fk_by_id, metrics, time_axis)
+
+
+def get_time_series(
+    db: Session,
+    experiment_ids: Sequence[str],
+    metrics: Sequence[str],
+    *,
+    time_axis: str = "actual",
+    grid: Union[None, float, Sequence[float]] = None,
+    interpolate: Optional[str] = None,
+    max_points: int = 0,
+) -> TimeSeriesSet:
+    """
+    Return ``metrics`` for ``experiment_ids`` on a common time grid.
+
+    Args:
+        db: Database session
+        experiment_ids: Experiment IDs; output rows keep this order (duplicates dropped)
+        metrics: Metric names (columns of ``v_primary_experiment_results``, see ``METRICS``)
+        time_axis: ``actual``, ``bucket`` or ``cumulative``
+        grid: None (union of observed times), a step in days, or explicit grid points
+        interpolate: ``none``, ``linear`` or ``previous``; default ``none`` for the
+            union grid and ``linear`` otherwise
+        max_points: Downsample to at most this many time points (0 = no limit)
+
+    Returns:
+        TimeSeriesSet; experiments that do not exist are listed in
+        ``missing_experiments`` and omitted from ``values``.
+
+    Raises:
+        ValueError: On an unknown metric, time axis or interpolation, or an invalid grid.
+    """
+    metrics = _validate(metrics, time_axis)
+    if interpolate is None:
+        interpolate = "none" if grid is None else "linear"
+    if interpolate not in INTERPOLATIONS:
+        raise ValueError(f"interpolate must be one of {list(INTERPOLATIONS)}")
+    fk_by_id, missing = _lookup_experiments(db, experiment_ids)
+    found = list(fk_by_id)
+    points = _points(db, fk_by_id, metrics, time_axis)
+
+    times = _build_grid(points["t"].to_numpy(), grid)
+    values = np.full((len(found), len(metrics), times.size), np.nan)
+    by_id = {exp_id: group for exp_id, group in points.groupby("experiment_id", sort=False)}
+    for i, exp_id in enumerate(found):
+        group = by_id.get(exp_id)
+        if group is None or times.size == 0:
+            continue
+        t_obs = group["t"].to_numpy()
+        for j, metric in enumerate(metrics):
+            y_obs = group[metric].to_numpy()
+            if grid is None and interpolate == "none":
+                # Union grid: every observation lands exactly on a grid point
+                values[i, j, np.searchsorted(times, t_obs)] = y_obs
+            else:
+                # Duplicate times (e.g. two buckets rounding together) keep the last value
+                t_u, last = np.unique(t_obs[::-1], return_index=True)
+                values[i, j] = _place(t_u, y_obs[::-1][last], times, interpolate)
+
+    times, values = _downsample(times, values, max_points)
+    return TimeSeriesSet(found, metrics, time_axis, times, values, missing)
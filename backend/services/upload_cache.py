@@ -0,0 +1,128 @@
+"""
+Content-addressed cache for parsed bulk-upload files.
+
+Streamlit reruns the whole script on every widget interaction, so an uploader
+that previews a file (dry run) and then commits it would otherwise read and
+validate the same workbook two or three times. Parsers wrap their database-free
+work in ``upload_cache.get_or_compute`` so identical bytes are parsed once.
+
+Cache key: ``(parser name, parser version, SHA-256 of the file, params)``.
+Bump a parser's version constant whenever its output shape changes so stale
+entries are never served after a code update.
+
+The cache is bounded by entry count and by the total size of the source files
+it holds, evicting least-recently-used entries first. Values are deep-copied on
+the way in and out because parsers hand back DataFrames and record dicts that
+callers mutate in place.
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CACHE_MAX_ENTRIES = int(os.getenv("UPLOAD_CACHE_MAX_ENTRIES", "64"))
+UPLOAD_CACHE_MAX_BYTES = int(os.getenv("UPLOAD_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+CacheKey = Tuple[str, str, str, Hashable]
+
+
+def fingerprint(file_bytes: bytes) -> str:
+    """Return the SHA-256 hex digest identifying an uploaded file's content."""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def _freeze(params: Optional[Dict[str, Any]]) -> Hashable:
+    if not params:
+        return ()
+    return tuple(sorted((k, repr(v)) for k, v in params.items()))
+
+
+class UploadPreviewCache:
+    """Thread-safe LRU cache of parser output keyed by file content hash."""
+
+    def __init__(self, max_entries: int = UPLOAD_CACHE_MAX_ENTRIES, max_bytes: int = UPLOAD_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, Tuple[Any, int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(
+        self,
+        parser: str,
+        version: Any,
+        file_bytes: bytes,
+        compute: Callable[[], Any],
+        *,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """
+        Return the cached result of ``compute()`` for this file and parser,
+        computing and storing it on a miss. Exceptions from ``compute`` propagate
+        and are not cached.
+        """
+        key: CacheKey = (parser, str(version), fingerprint(file_bytes), _freeze(params))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[0])
+            self.misses += 1
+
+        value = compute()
+        self._store(key, copy.deepcopy(value), len(file_bytes))
+        return value
+
+    def _store(self, key: CacheKey, value: Any, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._total_bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+            ):
+                _evicted_key, (_value, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+
+    def invalidate(self, file_bytes: Optional[bytes] = None, parser: Optional[str] = None) -> int:
+        """Drop entries for a file and/or parser (all entries when both are None)."""
+        digest = fingerprint(file_bytes) if file_bytes is not None else None
+        with self._lock:
+            doomed = [
+                k for k in self._entries
+                if (digest is None or k[2] == digest) and (parser is None or k[0] == parser)
+            ]
+            for k in doomed:
+                self._total_bytes -= self._entries.pop(k)[1]
+            return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+
+# Shared process-wide cache used by upload services and the Bulk Uploads page
+upload_cache = UploadPreviewCache()
@@ -0,0 +1,552 @@
+"""
+Background job runner for bulk uploads.
+
+Bulk uploads normally run inside the Streamlit script thread, which blocks the
+user's session and dies with the script on a browser reconnect. This module
+runs any registered upload service on a thread pool instead and persists the
+job's status, progress and row feedback in the ``upload_jobs`` table so the
+Bulk Uploads page can poll for results across reruns.
+
+Usage
+-----
+    runner = get_upload_job_runner()
+    job_id = runner.submit("aeris_xrd", file_bytes, file_name="scan.xlsx",
+                           options={"overwrite_existing": True})
+    ...
+    job = runner.get_job(job_id)   # UploadJob row (detached)
+
+Each handler in ``UPLOAD_JOB_HANDLERS`` adapts one upload service to a common
+outcome dict: ``created, updated, skipped, errors, warnings, info, feedbacks``.
+As in the synchronous UI, a job whose outcome contains errors is rolled back;
+otherwise it is committed.
+
+Concurrency
+-----------
+Parsing runs concurrently. SQLite allows a single writer, so the database
+portion of each job runs under a process-wide write lock; this keeps
+concurrent ICP, XRD and new-experiment imports from failing with
+"database is locked" while still overlapping their file parsing.
+
+Several processes (Streamlit, the watch-folder daemon, the API) run their
+own runner against the same table. Each job records the host and PID of the
+process that runs it, and a new runner only marks queued/running jobs as
+interrupted when that process no longer exists.
+
+Services report row/pass progress through their ``progress`` callback. While
+a job holds the write lock that progress is kept in memory and overlaid on
+the rows returned by ``get_job``/``list_jobs`` instead of being written to
+``upload_jobs``.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from database import SessionLocal, UploadJob, UploadJobStatus
+from utils.file_lock import pid_running
+from utils.progress import ProgressCallback
+from utils.query_instrumentation import query_scope
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 3
+# Substrings ICPService uses for non-blocking overwrite notifications
+_ICP_OVERWRITE_MARKERS = ("Updated existing ICP data", "Updated existing ICP-OES data")
+
+# Share of the progress bar covered by ``apply`` (parsing/waiting come before)
+_APPLY_PROGRESS_RANGE = (0.4, 0.95)
+
+_HOST = socket.gethostname()
+
+
+@dataclass(frozen=True)
+class UploadJobHandler:
+    """
+    Adapter between the job runner and one bulk upload service.
+
+    ``prepare`` (optional) does database-free work such as parsing and runs
+    outside the write lock. ``apply`` receives a session plus the prepared
+    payload and returns the normalized outcome dict; it forwards ``progress``
+    to the service, which reports the fraction of its own rows or passes done.
+    """
+    label: str
+    apply: Callable[..., Dict[str, Any]]
+    prepare: Optional[Callable[..., Any]] = None
+
+
+def _outcome(
+    created: int = 0,
+    updated: int = 0,
+    skipped: int = 0,
+    errors: Optional[List[str]] = None,
+    warnings: Optional[List[str]] = None,
+    info: Optional[List[str]] = None,
+    feedbacks: Optional[List[Dict[str, Any]]] = None,
+    **extra_counts: int,
+) -> Dict[str, Any]:
+    summary = {"created": int(created), "updated": int(updated), "skipped": int(skipped)}
+    summary.update({k: int(v) for k, v in extra_counts.items()})
+    return {
+        "summary": summary,
+        "errors": list(errors or []),
+        "warnings": list(warnings or []),
+        "info": list(info or []),
+        "feedbacks": list(feedbacks or []),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Service adapters
+# ---------------------------------------------------------------------------
+
+def _apply_master_bulk_upload(db: Session, payload: bytes, progress: ProgressCallback, **options) -> Dict[str, Any]:
+    from backend.services.bulk_uploads.master_bulk_upload import MasterBulkUploadService
+    created, updated, skipped, errors, feedbacks = MasterBulkUploadService.bulk_upsert(
+        db, payload, progress=progress, **options
+    )
+    return _outcome(created, updated, skipped, errors, feedbacks=feedbacks)
+
+
+def _apply_new_experiments(db: Session, payload: bytes, progress: ProgressCallback, **options) -> Dict[str, Any]:
+    from backend.services.bulk_uploads.new_experiments import NewExperimentsUploadService
+    created, updated, skipped, errors, warnings, info = NewExperimentsUploadService.bulk_upsert_from_excel(
+        db, payload, progress=progress
+    )
+    return _outcome(created, updated, skipped, errors, warnings, info)
+
+
+def _apply_solution_chemistry(db: Session, payload: bytes, progress: ProgressCallback, **options) -> Dict[str, Any]:
+    from backend.services.bulk_uploads.scalar_results import ScalarResultsUploadService
+    created, updated, skipped, errors, feedbacks = ScalarResultsUploadService.bulk_upsert_from_excel_ex(
+        db, payload, progress=progress, **options
+    )
+    return _outcome(created, updated, skipped, errors, feedbacks=feedbacks)
+
+
+def _apply_quick_upload(db: Session, payload: bytes, progress: ProgressCallback, **options) -> Dict[str, Any]:
+    from backend.services.bulk_uploads.quick_upload import quick_upload_from_excel
+    group_key = options.pop("group_key")
+    created, updated, skipped, errors, feedbacks = quick_upload_from_excel(
+        db, payload, group_key, progress=progress, **options
+    )
+    return _outcome(created, updated, skipped, errors, feedbacks=feedbacks)
+
+
+def _apply_long_format(db: Session, payload: bytes, progress: ProgressCallback, **options) -> Dict[str, Any]:
+    from backend.services.bulk_uploads.long_format import long_format_upload_from_excel
+    created, updated, skipped, errors, feedbacks = long_format_upload_from_excel(
+        db, payload, progress=progress, **options
+    )
+    return _outcome(created, updated, skipped, errors, feedbacks=feedbacks)
+
+
+def _prepare_icp(file_bytes: bytes, progress: ProgressCallback, manual_header_row: int = 0, **options) -> Dict[str, Any]:
+    from backend.services.icp_service import ICPService
+    processed_data, processing_errors = ICPService.parse_and_process_icp_file(file_bytes, manual_header_row)
+    return {
+        "processed_data": processed_data,
+        "processing_errors": processing_errors,
+        "force_upload": bool(options.get("force_upload", False)),
+    }
+
+
+def _apply_icp(db: Session, payload: Dict[str, Any], progress: ProgressCallback, **options) -> Dict[str, Any]:
+    from backend.services.icp_service import ICPService
+    processing_errors = payload["processing_errors"]
+    if processing_errors and not payload["force_upload"]:
+        return _outcome(errors=processing_errors)
+    if not payload["processed_data"]:
+        return _outcome(errors=["No valid ICP-OES data found to upload."])
+
+    results, upload_errors = ICPService.bulk_create_icp_results(db, payload["processed_data"], progress=progress)
+    overwrites = [msg for msg in upload_errors if any(m in msg for m in _ICP_OVERWRITE_MARKERS)]
+    errors = [msg for msg in upload_errors if msg not in overwrites]
+    return _outcome(
+        created=len(results) - len(overwrites),
+        updated=len(overwrites),
+        errors=errors,
+        warnings=list(processing_errors),
+        info=overwrites,
+    )
+
+
+def _apply_aeris_xrd(db: Session, payload: bytes, progress: ProgressCallback, **options) -> Dict[str, Any]:
+    from backend.services.bulk_uploads.aeris_xrd import AerisXRDUploadService
+    created, updated, skipped, errors = AerisXRDUploadService.bulk_upsert_from_excel(
+        db, payload, progress=progress, **options
+    )
+    return _outcome(created, updated, skipped, errors)
+
+
+def _apply_actlabs_xrd(db: Session, payload: bytes, progress: ProgressCallback, **options) -> Dict[str, Any]:
+    from backend.services.bulk_uploads.actlabs_xrd_report import XRDUploadService
+    (created_ext, updated_ext, created_json, updated_json,
+     created_phase, updated_phase, skipped, errors) = XRDUploadService.bulk_upsert_from_excel(
+        db, payload, progress=progress
+    )
+    return _outcome(
+        created_phase, updated_phase, skipped, errors,
+        created_external_analyses=created_ext,
+        updated_external_analyses=updated_ext,
+        created_xrd_json=created_json,
+        updated_xrd_json=updated_json,
+    )
+
+
+def _apply_actlabs_titration(db: Session, payload: bytes, progress: ProgressCallback, **options) -> Dict[str, Any]:
+    from backend.services.bulk_uploads.actlabs_titration_data import ActlabsRockTitrationService
+    created, updated, skipped, errors = ActlabsRockTitrationService.import_excel(db, payload, progress=progress)
+    return _outcome(created, updated, skipped, errors)
+
+
+def _apply_elemental_composition(db: Session, payload: bytes, progress: ProgressCallback, **options) -> Dict[str, Any]:
+    from backend.services.bulk_uploads.actlabs_titration_data import ElementalCompositionService
+    created, updated, skipped, errors = ElementalCompositionService.bulk_upsert_wide_from_excel(
+        db, payload, progress=progress
+    )
+    return _outcome(created, updated, skipped, errors)
+
+
+def _apply_rock_inventory(db: Session, payload: bytes, progress: ProgressCallback, **options) -> Dict[str, Any]:
+    from backend.services.bulk_uploads.rock_inventory import RockInventoryService
+    image_files = options.pop("image_files", None) or []
+    created, updated, images_attached, skipped, errors, warnings = RockInventoryService.bulk_upsert_samples(
+        db, payload, image_files, progress=progress, **options
+    )
+    return _outcome(created, updated, skipped, errors, warnings, images_attached=images_attached)
+
+
+def _apply_pxrf(db: Session, payload: bytes, progress: ProgressCallback, **options) -> Dict[str, Any]:
+    from backend.services.bulk_uploads.pxrf_data import PXRFUploadService
+    inserted, updated, skipped, errors = PXRFUploadService.ingest_from_bytes(db, payload, progress=progress, **options)
+    return _outcome(inserted, updated, skipped, errors)
+
+
+def _apply_chemical_inventory(db: Session, payload: bytes, progress: ProgressCallback, **options) -> Dict[str, Any]:
+    from backend.services.bulk_uploads.chemical_inventory import ChemicalInventoryService
+    created, updated, skipped, errors = ChemicalInventoryService.bulk_upsert_from_excel(db, payload, progress=progress)
+    return _outcome(created, updated, skipped, errors)
+
+
+def _apply_experiment_additives(db: Session, payload: bytes, progress: ProgressCallback, **options) -> Dict[str, Any]:
+    from backend.services.bulk_uploads.experiment_additives import ExperimentAdditivesService
+    created, updated, skipped, errors = ExperimentAdditivesService.bulk_upsert_from_excel(
+        db, payload, progress=progress
+    )
+    return _outcome(created, updated, skipped, errors)
+
+
+def _apply_timepoint_modifications(db: Session, payload: bytes, progress: ProgressCallback, **options) -> Dict[str, Any]:
+    from backend.services.bulk_uploads.timepoint_modifications import TimepointModificationsUploadService
+    updated, skipped, errors, feedbacks = TimepointModificationsUploadService.bulk_upsert_from_file(
+        db=db, file_bytes=payload, progress=progress, **options
+    )
+    return _outcome(updated=updated, skipped=skipped, errors=errors, feedbacks=feedbacks)
+
+
+UPLOAD_JOB_HANDLERS: Dict[str, UploadJobHandler] = {
+    "master_bulk_upload": UploadJobHandler("Master Bulk Upload", _apply_master_bulk_upload),
+    "new_experiments": UploadJobHandler("New Experiments", _apply_new_experiments),
+    "solution_chemistry": UploadJobHandler("Solution Chemistry", _apply_solution_chemistry),
+    "quick_upload": UploadJobHandler("Quick Upload", _apply_quick_upload),
+    "long_format": UploadJobHandler("Long-format Results", _apply_long_format),
+    "icp": UploadJobHandler("ICP-OES", _apply_icp, prepare=_prepare_icp),
+    "aeris_xrd": UploadJobHandler("Aeris XRD", _apply_aeris_xrd),
+    "actlabs_xrd": UploadJobHandler("ActLabs XRD", _apply_actlabs_xrd),
+    "actlabs_titration": UploadJobHandler("ActLabs Rock Titration", _apply_actlabs_titration),
+    "elemental_composition": UploadJobHandler("Elemental Composition", _apply_elemental_composition),
+    "rock_inventory": UploadJobHandler("Rock Inventory", _apply_rock_inventory),
+    "pxrf": UploadJobHandler("pXRF Readings", _apply_pxrf),
+    "chemical_inventory": UploadJobHandler("Chemical Inventory", _apply_chemical_inventory),
+    "experiment_additives": UploadJobHandler("Experiment Additives", _apply_experiment_additives),
+    "timepoint_modifications": UploadJobHandler("Timepoint Brine Modifications", _apply_timepoint_modifications),
+}
+
+
+def _jsonable(value: Any) -> Any:
+    """Round-trip through JSON so feedback with dates/numpy scalars fits a JSON column."""
+    return json.loads(json.dumps(value, default=str))
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class UploadJobRunner:
+    """Thread-pool executor for bulk uploads with status persisted in ``upload_jobs``."""
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = SessionLocal,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        handlers: Optional[Dict[str, UploadJobHandler]] = None,
+        mark_interrupted: bool = True,
+    ):
+        self._session_factory = session_factory
+        self._handlers = handlers if handlers is not None else UPLOAD_JOB_HANDLERS
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload-job")
+        self._write_lock = threading.Lock()
+        self._futures: Dict[int, Any] = {}
+        # (progress, message) reported while a job holds the write lock. Kept in
+        # memory: a status UPDATE from another connection would block on the
+        # job's own open SQLite write transaction.
+        self._live_progress: Dict[int, Tuple[float, str]] = {}
+        # Only touches jobs whose owning process is gone; off for the API, which
+        # never resumes anything and should leave other processes' rows alone
+        if mark_interrupted:
+            self._mark_interrupted_jobs()
+
+    # -- persistence helpers ------------------------------------------------
+
+    def _update_job(self, job_id: int, retries: int = 5, **fields: Any) -> None:
+        """Best-effort status write; retries briefly if another writer holds the SQLite lock."""
+        for attempt in range(retries):
+            db = self._session_factory()
+            try:
+                db.query(UploadJob).filter(UploadJob.id == job_id).update(fields, synchronize_session=False)
+                db.commit()
+                return
+            except OperationalError as e:
+                db.rollback()
+                if attempt == retries - 1:
+                    logger.error(f"Failed to update upload job {job_id}: {e}")
+                    return
+                time.sleep(0.5 * (attempt + 1))
+            finally:
+                db.close()
+
+    def _mark_interrupted_jobs(self) -> None:
+        """
+        Jobs left queued/running by a process that has exited lost their
+        in-memory payload; mark them interrupted.
+
+        Jobs of live processes (including this one) and of other hosts, whose
+        processes cannot be checked, are left alone. Rows without an owner
+        predate owner tracking and are treated as orphaned.
+        """
+        db = self._session_factory()
+        try:
+            unfinished = db.query(UploadJob.id, UploadJob.owner_host, UploadJob.owner_pid).filter(
+                UploadJob.status.in_([UploadJobStatus.QUEUED.value, UploadJobStatus.RUNNING.value])
+            ).all()
+            orphaned = [
+                job_id for job_id, host, pid in unfinished
+                if pid is None or (host == _HOST and not pid_running(pid))
+            ]
+            if not orphaned:
+                return
+            db.query(UploadJob).filter(UploadJob.id.in_(orphaned)).update(
+                {
+                    "status": UploadJobStatus.INTERRUPTED.value,
+                    "message": "The process running this job exited before it finished; please resubmit.",
+                    "finished_at": _now(),
+                },
+                synchronize_session=False,
+            )
+            db.commit()
+            logger.info(f"Marked {len(orphaned)} orphaned upload job(s) as interrupted")
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not mark interrupted upload jobs: {e}")
+        finally:
+            db.close()
+
+    def _apply_live_progress(self, job: UploadJob) -> None:
+        live = self._live_progress.get(job.id)
+        if live is not None and job.status == UploadJobStatus.RUNNING.value:
+            job.progress, job.message = live
+
+    # -- public API -----------------------------------------------------------
+
+    def submit(
+        self,
+        upload_type: str,
+        file_bytes: bytes,
+        *,
+        file_name: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+        submitted_by: Optional[str] = None,
+    ) -> int:
+        """
+        Queue an upload and return the new ``UploadJob.id``.
+
+        ``options`` are passed as keyword arguments to the service. Raw bytes
+        (e.g. rock inventory photos) are accepted but are not persisted.
+        """
+        if upload_type not in self._handlers:
+            raise ValueError(f"Unknown upload type: {upload_type}")
+        options = dict(options or {})
+
+        db = self._session_factory()
+        try:
+            job = UploadJob(
+                upload_type=upload_type,
+                file_name=file_name,
+                status=UploadJobStatus.QUEUED.value,
+                progress=0.0,
+                message="Queued",
+                options={k: v for k, v in options.items() if k != "image_files"},
+                submitted_by=submitted_by,
+                owner_host=_HOST,
+                owner_pid=os.getpid(),
+            )
+            db.add(job)
+            db.commit()
+            job_id = job.id
+        finally:
+            db.close()
+
+        future = self._executor.submit(self._run, job_id, upload_type, file_bytes, options)
+        self._futures[job_id] = future
+        future.add_done_callback(lambda _f: self._futures.pop(job_id, None))
+        logger.info(f"Queued upload job {job_id} ({upload_type}, file={file_name})")
+        return job_id
+
+    def get_job(self, job_id: int) -> Optional[UploadJob]:
+        db = self._session_factory()
+        try:
+            job = db.query(UploadJob).filter(UploadJob.id == job_id).first()
+            if job is not None:
+                db.expunge(job)
+                self._apply_live_progress(job)
+            return job
+        finally:
+            db.close()
+
+    def list_jobs(self, limit: int = 20, submitted_by: Optional[str] = None) -> List[UploadJob]:
+        db = self._session_factory()
+        try:
+            q = db.query(UploadJob)
+            if submitted_by:
+                q = q.filter(UploadJob.submitted_by == submitted_by)
+            jobs = q.order_by(UploadJob.id.desc()).limit(limit).all()
+            for job in jobs:
+                db.expunge(job)
+                self._apply_live_progress(job)
+            return jobs
+        finally:
+            db.close()
+
+    def wait(self, job_id: int, timeout: Optional[float] = None) -> Optional[UploadJob]:
+        """Block until the job finishes (used by scripts and tests)."""
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout=timeout)
+        return self.get_job(job_id)
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait)
+
+    # -- worker -----------------------------------------------------------------
+
+    def _run(self, job_id: int, upload_type: str, file_bytes: bytes, options: Dict[str, Any]) -> None:
+        handler = self._handlers[upload_type]
+
+        def progress(fraction: float, message: str) -> None:
+            self._update_job(job_id, progress=max(0.0, min(1.0, float(fraction))), message=message)
+
+        def apply_progress(fraction: float, message: str) -> None:
+            start, end = _APPLY_PROGRESS_RANGE
+            fraction = max(0.0, min(1.0, float(fraction)))
+            self._live_progress[job_id] = (start + (end - start) * fraction, message)
+
+        self._update_job(
+            job_id,
+            status=UploadJobStatus.RUNNING.value,
+            started_at=_now(),
+            progress=0.05,
+            message="Parsing file",
+        )
+        try:
+            payload: Any = file_bytes
+            if handler.prepare is not None:
+                payload = handler.prepare(file_bytes, progress, **options)
+            progress(0.3, "Waiting for database")
+
+            with self._write_lock:
+                progress(0.4, "Writing to database")
+                db = self._session_factory()
+                try:
+                    with query_scope(f"upload:{upload_type}"):
+                        outcome = handler.apply(db, payload, apply_progress, **dict(options))
+                        failed = bool(outcome["errors"])
+                        if failed or options.get("dry_run"):
+                            db.rollback()
+                        else:
+                            db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+                finally:
+                    db.close()
+
+                summary = outcome["summary"]
+                if failed:
+                    message = f"Failed with {len(outcome['errors'])} error(s); no changes were applied."
+                elif options.get("dry_run"):
+                    message = "Dry run complete -- no changes were saved."
+                else:
+                    message = ", ".join(f"{k}: {v}" for k, v in summary.items())
+                self._update_job(
+                    job_id,
+                    status=(UploadJobStatus.FAILED if failed else UploadJobStatus.SUCCEEDED).value,
+                    progress=1.0,
+                    message=message,
+                    summary=summary,
+                    errors=_jsonable(outcome["errors"]),
+                    warnings=_jsonable(outcome["warnings"] + outcome["info"]),
+                    feedbacks=_jsonable(outcome["feedbacks"]),
+                    finished_at=_now(),
+                )
+        except Exception as e:
+            logger.error(f"Upload job {job_id} ({upload_type}) crashed: {e}", exc_info=True)
+            self._update_job(
+                job_id,
+                status=UploadJobStatus.FAILED.value,
+                progress=1.0,
+                message=f"Unexpected error: {e}",
+                errors=[str(e)],
+                finished_at=_now(),
+            )
+        finally:
+            self._live_progress.pop(job_id, None)
+
+
+# Global runner instance (one per Streamlit server process, survives reruns)
+_runner: Optional[UploadJobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_upload_job_runner(mark_interrupted: bool = True) -> UploadJobRunner:
+    """
+    Return the process-wide runner, creating it on first use.
+
+    Args:
+        mark_interrupted: Whether creating the runner marks jobs of exited
+            processes as interrupted (see ``UploadJobRunner``)
+    """
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = UploadJobRunner(mark_interrupted=mark_interrupted)
+            logger.info("Created upload job runner")
+        return _runner
+
+
+def shutdown_upload_job_runner() -> None:
+    global _runner
+    with _runner_lock:
+        if _runner is not None:
+            _runner.shutdown(wait=False)
+            _runner = None
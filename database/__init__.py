@@ -10,10 +10,14 @@ from .models import (
     SampleInfo, SamplePhotos,
     # Analysis
     AnalysisFiles, ExternalAnalysis, XRDAnalysis, XRDPhase, PXRFReading, Analyte, ElementalAnalysis,
+    # Background jobs
+    UploadJob,
+    # File storage
+    StoredBlob,
     # Enums
     ExperimentStatus, ExperimentType, FeedstockType, ComponentType,
     AnalysisType, AmmoniumQuantMethod, TitrationType, CharacterizationStatus,
-    ConcentrationUnit, PressureUnit, AmountUnit
+    ConcentrationUnit, PressureUnit, AmountUnit, UploadJobStatus
 )
 # Import chemicals after other models to avoid circular imports
 from .models import Compound, ChemicalAdditive
@@ -47,8 +51,12 @@ __all__ = [
     'AnalysisFiles', 'ExternalAnalysis', 'XRDAnalysis', 'XRDPhase', 'PXRFReading', 'Analyte', 'ElementalAnalysis',
     # Chemicals
     'Compound', 'ChemicalAdditive',
+    # Background jobs
+    'UploadJob',
+    # File storage
+    'StoredBlob',
     # Enums
     'ExperimentStatus', 'ExperimentType', 'FeedstockType', 'ComponentType',
     'AnalysisType', 'AmmoniumQuantMethod', 'TitrationType', 'CharacterizationStatus',
-    'ConcentrationUnit', 'PressureUnit', 'AmountUnit'
+    'ConcentrationUnit', 'PressureUnit', 'AmountUnit', 'UploadJobStatus'
 ] 
\ No newline at end of file
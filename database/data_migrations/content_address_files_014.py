@@ -0,0 +1,180 @@
+"""
+Move existing uploaded files into the content-addressed blob store.
+
+Background
+----------
+Result files, analysis reports and sample photos used to be stored under
+their original names (``results/<experiment>/<result>/report.pdf`` etc.),
+so the same PDF or XRD pattern uploaded twice was stored twice.  New uploads
+go through ``BlobStore`` and are keyed by SHA-256; rows point at the blob via
+``blob_sha256`` and ``stored_blobs.ref_count`` tracks how many rows share it.
+
+This script converts legacy rows (``blob_sha256 IS NULL``):
+
+  Pass 1 – store blobs
+    Reads each legacy file, stores it content-addressed (duplicates are
+    uploaded once) and points the row at the blob.  Files that can no longer
+    be read are reported and left untouched.
+
+  Pass 2 – remove originals
+    After the commit, deletes the original per-upload files, except paths
+    still referenced by a row that was not converted.  Skipped with
+    ``--keep-originals``.
+
+Usage
+-----
+    # Preview (no changes saved):
+    python database/data_migrations/content_address_files_014.py
+
+    # Apply:
+    python database/data_migrations/content_address_files_014.py --apply
+    python database/data_migrations/content_address_files_014.py --apply --keep-originals
+"""
+
+import sys
+import os
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from database.models import ResultFiles, AnalysisFiles, SamplePhotos
+from backend.services.blob_store import BlobStore, content_hash
+from utils.batching import chunked
+from utils.storage import get_file, delete_file
+
+BATCH_SIZE = 100
+
+
+# ---------------------------------------------------------------------------
+# Pass 1 – store blobs
+# ---------------------------------------------------------------------------
+
+def convert_legacy_files(db: Session, dry_run: bool) -> dict:
+    """Point legacy file rows at content-addressed blobs. Returns stats and the original paths."""
+    stats = {"rows": 0, "converted": 0, "unreadable": 0, "distinct_contents": 0, "bytes_saved": 0,
+             "kept_shared": 0, "originals": set()}
+    hashes = set()
+
+    for model in (ResultFiles, AnalysisFiles, SamplePhotos):
+        rows = db.query(model).filter(model.blob_sha256.is_(None)).order_by(model.id).all()
+        stats["rows"] += len(rows)
+
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch, contents = [], []
+            for row in rows[start:start + BATCH_SIZE]:
+                try:
+                    data = get_file(row.file_path)
+                except Exception as e:
+                    stats["unreadable"] += 1
+                    print(f"  [{model.__tablename__} {row.id}] cannot read {row.file_path}: {e}")
+                    continue
+                sha = content_hash(data)
+                if sha in hashes:
+                    stats["bytes_saved"] += len(data)
+                hashes.add(sha)
+                batch.append(row)
+                contents.append((data, row.file_name or os.path.basename(row.file_path), row.file_type))
+
+            if dry_run or not batch:
+                stats["converted"] += len(batch)
+                continue
+
+            for row, blob in zip(batch, BlobStore.store_many(db, contents, create_backup=False)):
+                if isinstance(blob, Exception):
+                    print(f"  [{model.__tablename__} {row.id}] store failed: {blob}")
+                    continue
+                stats["originals"].add(row.file_path)
+                row.file_path = blob.file_path
+                row.blob_sha256 = blob.sha256
+                stats["converted"] += 1
+            db.flush()
+
+    stats["distinct_contents"] = len(hashes)
+    if not dry_run:
+        db.commit()
+        # A path shared with a row that could not be read or stored is still
+        # that row's only copy; keep it
+        still_referenced = legacy_paths(db, stats["originals"])
+        stats["originals"] -= still_referenced
+        stats["kept_shared"] = len(still_referenced)
+    return stats
+
+
+def legacy_paths(db: Session, paths) -> set:
+    """Subset of ``paths`` still referenced by an unconverted (``blob_sha256 IS NULL``) row."""
+    referenced = set()
+    for model in (ResultFiles, AnalysisFiles, SamplePhotos):
+        for chunk in chunked(paths):
+            referenced.update(
+                path for (path,) in
+                db.query(model.file_path).filter(model.blob_sha256.is_(None), model.file_path.in_(chunk)).all()
+            )
+    return referenced
+
+
+# ---------------------------------------------------------------------------
+# Pass 2 – remove originals
+# ---------------------------------------------------------------------------
+
+def remove_originals(paths) -> int:
+    removed = 0
+    for path in sorted(paths):
+        try:
+            delete_file(path)
+            removed += 1
+        except Exception as e:
+            print(f"  could not delete {path}: {e}")
+    return removed
+
+
+def run_migration(dry_run: bool = True, keep_originals: bool = False) -> bool:
+    db: Session = SessionLocal()
+    try:
+        mode_label = "DRY RUN (no changes saved)" if dry_run else "APPLY MODE"
+        print("=" * 65)
+        print(f"CONTENT-ADDRESS UPLOADED FILES  --  {mode_label}")
+        print("=" * 65)
+
+        # ------------------------------------------------------------------
+        print("\n--- Pass 1: Store legacy files as blobs ---")
+        stats = convert_legacy_files(db, dry_run)
+        print(f"\n  Legacy rows          : {stats['rows']}")
+        print(f"  Rows converted       : {stats['converted']}")
+        print(f"  Unreadable files     : {stats['unreadable']}")
+        print(f"  Distinct contents    : {stats['distinct_contents']}")
+        print(f"  Duplicate bytes saved: {stats['bytes_saved']:,}")
+        if stats["kept_shared"]:
+            print(f"  Originals kept (shared with unconverted rows): {stats['kept_shared']}")
+
+        # ------------------------------------------------------------------
+        if not dry_run and not keep_originals:
+            print("\n--- Pass 2: Remove original files ---")
+            print(f"\n  Files removed : {remove_originals(stats['originals'])}")
+
+        print("\n" + "=" * 65)
+        if dry_run:
+            print("DRY RUN complete -- re-run with --apply to save changes.")
+        else:
+            print("Migration complete — changes committed.")
+        print("=" * 65)
+
+        return True
+
+    except Exception as exc:
+        print(f"\nCritical error: {exc}")
+        db.rollback()
+        raise
+
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    apply = "--apply" in sys.argv
+    if not apply:
+        print("Running in DRY RUN mode (pass --apply to save changes)\n")
+    run_migration(dry_run=not apply, keep_originals="--keep-originals" in sys.argv)
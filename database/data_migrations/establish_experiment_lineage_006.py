@@ -21,7 +21,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 
 from database import SessionLocal
 from database.models import Experiment
-from database.lineage_utils import parse_experiment_id, get_or_find_parent_experiment
+from database.lineage_utils import parse_experiment_id, get_or_find_parent_experiment, LineageIndex
 
 
 def establish_experiment_lineage(dry_run: bool = False) -> dict:
@@ -88,10 +88,12 @@ def establish_experiment_lineage(dry_run: bool = False) -> dict:
         derivations = db.query(Experiment).filter(
             Experiment.base_experiment_id.isnot(None)
         ).all()
+        # Parse every ID once up front rather than re-querying candidates per derivation
+        index = LineageIndex(experiments)
         
         for deriv in derivations:
             try:
-                parent = get_or_find_parent_experiment(db, deriv.experiment_id)
+                parent = get_or_find_parent_experiment(db, deriv.experiment_id, index=index)
                 
                 if parent:
                     deriv.parent_experiment_fk = parent.id
@@ -1,62 +1,94 @@
-from sqlalchemy import event, text
+import logging
+from collections import Counter
+from sqlalchemy import event, text, select, update, delete
 from sqlalchemy.orm import Session, attributes
 from .models import ExternalAnalysis, SampleInfo, ChemicalAdditive, ElementalAnalysis, Experiment, ExperimentalConditions
+from .models import StoredBlob, ResultFiles, AnalysisFiles, SamplePhotos
 from .database import engine
-from .lineage_utils import update_experiment_lineage, update_orphaned_derivations
+from .lineage_utils import (
+    LineageIndex, parse_experiment_id_parts, update_experiment_lineage, update_orphaned_derivations,
+)
+from utils.batching import chunked
 
-def update_sample_characterized_status(session: Session, sample_id: str):
+logger = logging.getLogger(__name__)
+
+# Flushes inserting at least this many derived experiments resolve parents from a LineageIndex
+LINEAGE_INDEX_MIN_BATCH = 25
+
+
+def _samples_with_rows(session: Session, model, sample_ids, *criteria):
     """
-    Updates the 'characterized' status of a SampleInfo record based on
-    the existence of XRD analyses or titration (elemental) data. This should be called
-    within a 'before_flush' event.
+    Return the subset of ``sample_ids`` that have at least one ``model`` row,
+    taking pending session state into account.
+
+    Persistent rows that are modified or deleted in this flush are excluded from
+    the grouped database query and judged by their in-memory state instead, so
+    a changed sample_id/analysis_type or a pending delete is reflected exactly
+    as the per-sample implementation did.
     """
-    if not sample_id:
-        return
+    overridden_ids = {
+        obj.id for obj in session.dirty.union(session.deleted)
+        if isinstance(obj, model) and obj.id is not None
+    }
 
-    # Combine all known instances in the session for this sample_id
-    all_instances = (
-        session.query(ExternalAnalysis)
-        .filter(ExternalAnalysis.sample_id == sample_id)
-        .all()
-    )
+    found = set()
+    for chunk in chunked(sample_ids):
+        query = (
+            session.query(model.sample_id)
+            .filter(model.sample_id.in_(chunk), *criteria)
+            .group_by(model.sample_id)
+        )
+        if overridden_ids:
+            query = query.filter(model.id.notin_(overridden_ids))
+        found.update(row[0] for row in query.all())
 
-    # Add newly created instances that are not yet in the query result
-    for obj in session.new:
-        if isinstance(obj, ExternalAnalysis) and obj.sample_id == sample_id:
-            if obj not in all_instances:
-                all_instances.append(obj)
+    return found
 
-    # Filter out instances marked for deletion
-    final_instances = [
-        instance for instance in all_instances if instance not in session.deleted
-    ]
 
-    # XRD via ExternalAnalysis entries
-    has_xrd = any(instance.analysis_type == 'XRD' for instance in final_instances)
+def update_samples_characterized_status(session: Session, sample_ids):
+    """
+    Batched version of :func:`update_sample_characterized_status`.
+
+    Computes has_xrd and has_titration for every sample in ``sample_ids`` with
+    one grouped query per table, then loads the affected SampleInfo rows in a
+    single query and flips only the flags that changed. Intended to be called
+    within a 'before_flush' event.
+    """
+    sample_ids = {sid for sid in sample_ids if sid}
+    if not sample_ids:
+        return
 
-    # Titration/elemental data via ElementalAnalysis normalized table
-    # Start with DB state
-    titration_instances = (
-        session.query(ElementalAnalysis)
-        .filter(ElementalAnalysis.sample_id == sample_id)
-        .all()
+    with_xrd = _samples_with_rows(
+        session, ExternalAnalysis, sample_ids, ExternalAnalysis.analysis_type == 'XRD'
     )
-    # Remove any that are being deleted this flush
-    titration_final = [ea for ea in titration_instances if ea not in session.deleted]
-    # Include any new ones not yet persisted
-    for obj in session.new:
-        if isinstance(obj, ElementalAnalysis) and obj.sample_id == sample_id:
-            if obj not in titration_final:
-                titration_final.append(obj)
+    with_titration = _samples_with_rows(session, ElementalAnalysis, sample_ids)
 
-    has_titration = len(titration_final) > 0
+    # Overlay in-memory state of new and modified rows
+    for obj in session.new.union(session.dirty):
+        if obj in session.deleted or getattr(obj, 'sample_id', None) not in sample_ids:
+            continue
+        if isinstance(obj, ExternalAnalysis) and obj.analysis_type == 'XRD':
+            with_xrd.add(obj.sample_id)
+        elif isinstance(obj, ElementalAnalysis):
+            with_titration.add(obj.sample_id)
 
-    is_characterized = has_xrd or has_titration
+    characterized = with_xrd | with_titration
+    for chunk in chunked(sample_ids):
+        for sample_info in session.query(SampleInfo).filter(SampleInfo.sample_id.in_(chunk)):
+            is_characterized = sample_info.sample_id in characterized
+            if sample_info.characterized != is_characterized:
+                sample_info.characterized = is_characterized
 
-    sample_info = session.query(SampleInfo).filter(SampleInfo.sample_id == sample_id).first()
 
-    if sample_info and sample_info.characterized != is_characterized:
-        sample_info.characterized = is_characterized
+def update_sample_characterized_status(session: Session, sample_id: str):
+    """
+    Updates the 'characterized' status of a SampleInfo record based on
+    the existence of XRD analyses or titration (elemental) data. This should be called
+    within a 'before_flush' event.
+    """
+    if not sample_id:
+        return
+    update_samples_characterized_status(session, [sample_id])
 
 @event.listens_for(Session, 'before_flush')
 def before_flush_handler(session, flush_context, instances):
@@ -85,14 +117,126 @@ def before_flush_handler(session, flush_context, instances):
         if isinstance(obj, ElementalAnalysis):
             samples_to_update.add(obj.sample_id)
 
-    # Process all collected sample_ids
-    for sample_id in samples_to_update:
-        if sample_id:
-            update_sample_characterized_status(session, sample_id)
+    # Recompute all collected sample_ids in one batch
+    update_samples_characterized_status(session, samples_to_update)
 
-# Ensure additives summary view exists (SQLite) at import time
-try:
-    with engine.connect() as conn:
+# ---------------------------------------------------------------------------
+# Content-addressed file blobs: reference counting
+# ---------------------------------------------------------------------------
+
+BLOB_REFERENCING_MODELS = (ResultFiles, AnalysisFiles, SamplePhotos)
+_BLOB_DELETIONS_KEY = "blob_files_to_delete"
+
+
+def _blob_ref_deltas(session: Session) -> Counter:
+    """Net change in references per blob sha256 from the pending flush."""
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, BLOB_REFERENCING_MODELS) and obj.blob_sha256:
+            deltas[obj.blob_sha256] += 1
+    for obj in session.dirty:
+        if isinstance(obj, BLOB_REFERENCING_MODELS):
+            history = attributes.get_history(obj, 'blob_sha256')
+            if history.has_changes():
+                for old in history.deleted:
+                    if old:
+                        deltas[old] -= 1
+                for new in history.added:
+                    if new:
+                        deltas[new] += 1
+    for obj in session.deleted:
+        if isinstance(obj, BLOB_REFERENCING_MODELS):
+            # Use the committed value; the attribute may have been changed before delete
+            history = attributes.get_history(obj, 'blob_sha256')
+            old = (history.deleted or history.unchanged or [None])[0]
+            if old:
+                deltas[old] -= 1
+    return deltas
+
+
+def release_unreferenced_blobs(session: Session, sha256s) -> None:
+    """
+    Delete the given blobs if nothing references them any more.
+
+    Their files are queued for removal once the transaction commits (see
+    ``delete_released_blob_files``), so a rollback never loses data.
+    """
+    table = StoredBlob.__table__
+    for chunk in chunked(sha256s):
+        rows = session.execute(
+            select(table.c.sha256, table.c.file_path)
+            .where(table.c.sha256.in_(chunk), table.c.ref_count <= 0)
+        ).all()
+        if not rows:
+            continue
+        session.execute(delete(table).where(table.c.sha256.in_([r.sha256 for r in rows])))
+        session.info.setdefault(_BLOB_DELETIONS_KEY, {}).update({r.sha256: r.file_path for r in rows})
+
+
+def apply_blob_ref_deltas(session: Session, deltas) -> None:
+    """Apply reference count changes to stored_blobs, releasing blobs that drop to zero."""
+    table = StoredBlob.__table__
+    released = []
+    for sha, delta in deltas.items():
+        if delta:
+            session.execute(
+                update(table)
+                .where(table.c.sha256 == sha)
+                .values(ref_count=table.c.ref_count + delta)
+            )
+            if delta < 0:
+                released.append(sha)
+    release_unreferenced_blobs(session, released)
+
+
+@event.listens_for(Session, 'before_flush')
+def update_blob_ref_counts(session, flush_context, instances):
+    """Keep StoredBlob.ref_count equal to the number of file rows pointing at it."""
+    deltas = _blob_ref_deltas(session)
+    if deltas:
+        apply_blob_ref_deltas(session, deltas)
+
+
+@event.listens_for(Session, 'after_commit')
+def delete_released_blob_files(session):
+    """Remove files of blobs whose last reference was deleted in the committed transaction."""
+    pending = session.info.pop(_BLOB_DELETIONS_KEY, None)
+    if not pending:
+        return
+    from utils.storage import delete_file
+
+    # The session can't emit SQL here; re-check on a fresh connection in case
+    # the same content was stored again by another session since our commit.
+    table = StoredBlob.__table__
+    try:
+        with session.get_bind().connect() as conn:
+            revived = set(conn.execute(
+                select(table.c.sha256).where(table.c.sha256.in_(list(pending)))
+            ).scalars())
+    except Exception as e:
+        logger.warning(f"Could not re-check released blobs, keeping their files: {e}")
+        return
+    for sha, file_path in pending.items():
+        if sha in revived:
+            continue
+        try:
+            delete_file(file_path)
+        except Exception as e:
+            logger.warning(f"Failed to delete released blob file {file_path}: {e}")
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_released_blob_files(session, previous_transaction):
+    """A rolled-back transaction released nothing."""
+    session.info.pop(_BLOB_DELETIONS_KEY, None)
+
+def refresh_reporting_views(bind=None):
+    """
+    (Re)create the reporting views (additives summary, primary results and
+    results-with-modifications). Runs at import and from the maintenance daemon.
+    """
+    bind = bind or engine
+    with bind.connect() as conn:
         conn.execute(text("DROP VIEW IF EXISTS v_experiment_additives_summary;"))
         conn.execute(text(
             """
@@ -257,6 +401,10 @@ try:
             """
         ))
         conn.commit()
+
+# Ensure reporting views exist (SQLite) at import time
+try:
+    refresh_reporting_views()
 except Exception:
     # Safe to ignore at import; view creation isn't critical at this moment
     pass
@@ -286,17 +434,23 @@ def update_experiment_lineage_on_flush(session, flush_context, instances):
     # Track base experiments being inserted to update their derivations
     new_base_experiments = []
     
+    new_experiments = [
+        obj for obj in session.new if isinstance(obj, Experiment) and obj.experiment_id
+    ]
+    # Large batches (bulk uploads) resolve parents from one prebuilt index
+    # instead of querying candidates per experiment
+    index = None
+    if sum(parse_experiment_id_parts(e.experiment_id).is_derivation for e in new_experiments) >= LINEAGE_INDEX_MIN_BATCH:
+        index = LineageIndex.from_session(session)
+    
     # Process new experiments
-    for obj in session.new:
-        if isinstance(obj, Experiment) and obj.experiment_id:
-            # Update lineage for this experiment
-            update_experiment_lineage(session, obj)
-            
-            # Track if this is a potential base experiment (no derivation number)
-            from .lineage_utils import parse_experiment_id
-            _, derivation_num, _ = parse_experiment_id(obj.experiment_id)
-            if derivation_num is None:
-                new_base_experiments.append(obj.experiment_id)
+    for obj in new_experiments:
+        # Update lineage for this experiment
+        update_experiment_lineage(session, obj, index=index)
+        
+        # Track if this is a potential base experiment (no derivation number)
+        if parse_experiment_id_parts(obj.experiment_id).derivation_num is None:
+            new_base_experiments.append(obj.experiment_id)
     
     # After processing new experiments, update any orphaned derivations
     # This handles the case where a derivation was created before its base
@@ -10,7 +10,9 @@ Supports hybrid delimiter system:
 - Hyphen-NUMBER for sequential lineage (e.g., -2, -3)
 - Underscore-TEXT for treatment variants (e.g., _Desorption)
 """
-from typing import Optional, Tuple, TYPE_CHECKING
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple, TYPE_CHECKING
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
@@ -18,10 +20,112 @@ if TYPE_CHECKING:
     from .models import Experiment
 
 
+PARSE_CACHE_SIZE = 8192
+
+
+def _normalize_id(experiment_id: str) -> str:
+    """Case-insensitive, delimiter-free form used to match experiment IDs."""
+    return ''.join(ch for ch in experiment_id.lower() if ch not in ['-', '_', ' '])
+
+
+@dataclass(frozen=True)
+class ExperimentIDParts:
+    """Immutable result of parsing an experiment ID."""
+    original_id: str
+    base_id: Optional[str]
+    derivation_num: Optional[int]
+    treatment_variant: Optional[str]
+    type_prefix: str  # Uppercased segment before the first underscore
+
+    @property
+    def lineage_key(self) -> Tuple[Optional[str], Optional[int], Optional[str]]:
+        """The (base_id, derivation_num, treatment_variant) triple."""
+        return self.base_id, self.derivation_num, self.treatment_variant
+
+    @property
+    def is_derivation(self) -> bool:
+        return self.derivation_num is not None or self.treatment_variant is not None
+
+
+_EMPTY_PARTS = ExperimentIDParts("", None, None, None, "")
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_stripped_id(experiment_id: str) -> ExperimentIDParts:
+    treatment_variant = None
+    derivation_num = None
+    base_id = experiment_id
+    
+    # First, extract sequential number (hyphen-NUMBER pattern from the end)
+    # This must be done before treatment detection to avoid confusion
+    if '-' in experiment_id:
+        hyphen_parts = experiment_id.rsplit('-', 1)
+        if len(hyphen_parts) == 2 and hyphen_parts[-1].isdigit():
+            derivation_num = int(hyphen_parts[-1])
+            base_id = hyphen_parts[0]
+    
+    # Now check for treatment variant in the remaining base_id
+    # Split by underscore to detect if last part is a treatment
+    parts = base_id.split('_')
+    
+    # Determine expected base format by checking part count
+    # After removing sequential, we should have:
+    # - 2 parts for TYPE_INDEX format (e.g., HPHT_001)
+    # - 3 parts for TYPE_INITIALS_INDEX format (e.g., Serum_MH_101)
+    # If we have more parts than expected, the last part is likely a treatment
+    
+    if len(parts) > 2:
+        # Could be 2-part format with treatment, or 3-part format (with or without treatment)
+        potential_treatment = parts[-1]
+        
+        # Check if last part looks like a treatment (not all numeric)
+        if not potential_treatment.isdigit():
+            # Last part is not numeric, likely a treatment
+            # If we have 3+ parts and last is non-numeric, it's a treatment
+            if len(parts) >= 3:
+                treatment_variant = potential_treatment
+                base_id = '_'.join(parts[:-1])
+    
+    return ExperimentIDParts(
+        original_id=experiment_id,
+        base_id=base_id,
+        derivation_num=derivation_num,
+        treatment_variant=treatment_variant,
+        type_prefix=experiment_id.split('_')[0].upper(),
+    )
+
+
+def parse_experiment_id_parts(experiment_id: str) -> ExperimentIDParts:
+    """
+    Canonical experiment ID parser shared by lineage, validation and type inference.
+    
+    Results are memoized in a bounded LRU cache (PARSE_CACHE_SIZE entries), so
+    bulk uploads and lineage backfills that see the same IDs repeatedly only
+    pay for parsing once. The returned value object is immutable and safe to share.
+    
+    Args:
+        experiment_id: The experiment ID to parse (surrounding whitespace is ignored)
+        
+    Returns:
+        ExperimentIDParts; empty or non-string input yields parts with base_id None
+    """
+    if not experiment_id or not isinstance(experiment_id, str):
+        return _EMPTY_PARTS
+    
+    experiment_id = experiment_id.strip()
+    if not experiment_id:
+        return _EMPTY_PARTS
+    
+    return _parse_stripped_id(experiment_id)
+
+
 def parse_experiment_id(experiment_id: str) -> Tuple[Optional[str], Optional[int], Optional[str]]:
     """
     Parse an experiment ID to extract the base ID, derivation number, and treatment variant.
     
+    Thin tuple wrapper around parse_experiment_id_parts(), which does the actual
+    (cached) parsing.
+    
     Uses hybrid delimiter system:
     - Hyphen-NUMBER for sequential lineage (e.g., -2, -3)
     - Underscore-TEXT for treatment variants (e.g., _Desorption)
@@ -60,51 +164,70 @@ def parse_experiment_id(experiment_id: str) -> Tuple[Optional[str], Optional[int
         >>> parse_experiment_id("HPHT_001-2_Desorption")
         ("HPHT_001", 2, "Desorption")
     """
-    if not experiment_id or not isinstance(experiment_id, str):
-        return None, None, None
-    
-    experiment_id = experiment_id.strip()
-    if not experiment_id:
-        return None, None, None
-    
-    treatment_variant = None
-    derivation_num = None
-    base_id = experiment_id
-    
-    # First, extract sequential number (hyphen-NUMBER pattern from the end)
-    # This must be done before treatment detection to avoid confusion
-    if '-' in experiment_id:
-        hyphen_parts = experiment_id.rsplit('-', 1)
-        if len(hyphen_parts) == 2 and hyphen_parts[-1].isdigit():
-            derivation_num = int(hyphen_parts[-1])
-            base_id = hyphen_parts[0]
-    
-    # Now check for treatment variant in the remaining base_id
-    # Split by underscore to detect if last part is a treatment
-    parts = base_id.split('_')
-    
-    # Determine expected base format by checking part count
-    # After removing sequential, we should have:
-    # - 2 parts for TYPE_INDEX format (e.g., HPHT_001)
-    # - 3 parts for TYPE_INITIALS_INDEX format (e.g., Serum_MH_101)
-    # If we have more parts than expected, the last part is likely a treatment
+    return parse_experiment_id_parts(experiment_id).lineage_key
+
+
+class LineageIndex:
+    """
+    Precomputed (base, seq, treatment) index over a set of experiments.
     
-    if len(parts) > 2:
-        # Could be 2-part format with treatment, or 3-part format (with or without treatment)
-        potential_treatment = parts[-1]
-        
-        # Check if last part looks like a treatment (not all numeric)
-        if not potential_treatment.isdigit():
-            # Last part is not numeric, likely a treatment
-            # If we have 3+ parts and last is non-numeric, it's a treatment
-            if len(parts) >= 3:
-                treatment_variant = potential_treatment
-                base_id = '_'.join(parts[:-1])
+    Each experiment ID is parsed once when the index is built, so resolving parents
+    for many experiments (bulk uploads, lineage backfills) is a dictionary lookup
+    rather than a query plus a re-parse of every candidate.
     
-    return base_id, derivation_num, treatment_variant
+    Matching follows get_or_find_parent_experiment(): IDs and bases are compared
+    case-insensitively with '-', '_' and spaces ignored, and the first experiment
+    seen wins when several normalize to the same key.
+    """
+
+    def __init__(self, experiments: Iterable['Experiment'] = ()):
+        self._by_id: Dict[str, 'Experiment'] = {}
+        # normalized base -> {derivation number (base = 0): experiment}, treatments excluded
+        self._sequences: Dict[str, Dict[int, 'Experiment']] = {}
+        for experiment in experiments:
+            self.add(experiment)
+
+    @classmethod
+    def from_session(cls, db: Session) -> 'LineageIndex':
+        """Build an index over every experiment currently in the database."""
+        from .models import Experiment
+        return cls(db.query(Experiment).order_by(Experiment.id).all())
+
+    def add(self, experiment: 'Experiment') -> None:
+        parts = parse_experiment_id_parts(experiment.experiment_id)
+        if parts.base_id is None:
+            return
+        self._by_id.setdefault(_normalize_id(parts.original_id), experiment)
+        if parts.treatment_variant is None:
+            chain = self._sequences.setdefault(_normalize_id(parts.base_id), {})
+            chain.setdefault(parts.derivation_num or 0, experiment)
+
+    def get(self, experiment_id: str) -> Optional['Experiment']:
+        """Look up an experiment by (normalized) experiment ID."""
+        return self._by_id.get(_normalize_id(experiment_id))
+
+    def sequential_parent(self, base_id: str, derivation_num: int) -> Optional['Experiment']:
+        """Highest sequential run (or the base itself) below derivation_num."""
+        chain = self._sequences.get(_normalize_id(base_id))
+        if not chain:
+            return None
+        lower = [seq for seq in chain if seq < derivation_num]
+        return chain[max(lower)] if lower else None
+
+    def find_parent(self, experiment_id: str) -> Optional['Experiment']:
+        """Resolve the parent of experiment_id using only the index."""
+        base_id, derivation_num, treatment_variant = parse_experiment_id(experiment_id)
+        if treatment_variant is not None:
+            # EXP-001_Desorption -> EXP-001, EXP-001-2_Desorption -> EXP-001-2
+            if derivation_num is None:
+                return self.get(base_id)
+            return self.get(f"{base_id}-{derivation_num}")
+        if derivation_num is not None:
+            return self.sequential_parent(base_id, derivation_num)
+        return None
 
 
-def get_or_find_parent_experiment(db: Session, experiment_id: str):
+def get_or_find_parent_experiment(db: Session, experiment_id: str, index: Optional[LineageIndex] = None):
     """
     Find the parent experiment for a given experiment ID.
     
@@ -118,6 +241,7 @@ def get_or_find_parent_experiment(db: Session, experiment_id: str):
     Args:
         db: Database session
         experiment_id: The experiment ID to find the parent for
+        index: Optional prebuilt LineageIndex; when given no queries are issued
         
     Returns:
         The parent Experiment object if found, None otherwise
@@ -127,30 +251,16 @@ def get_or_find_parent_experiment(db: Session, experiment_id: str):
     """
     from .models import Experiment
     
+    if index is not None:
+        return index.find_parent(experiment_id)
+    
     base_id, derivation_num, treatment_variant = parse_experiment_id(experiment_id)
     
     # For treatment variants: find the direct parent (base with or without sequential)
-    if treatment_variant is not None and derivation_num is None:
+    if treatment_variant is not None:
         # Simple treatment: EXP-001_Desorption -> find EXP-001
-        parent_id_to_find = base_id
-        parent_id_norm = ''.join(ch for ch in parent_id_to_find.lower() if ch not in ['-', '_', ' '])
-        parent = db.query(Experiment).filter(
-            func.lower(
-                func.replace(
-                    func.replace(
-                        func.replace(Experiment.experiment_id, '-', ''),
-                        '_', ''
-                    ),
-                    ' ', ''
-                )
-            ) == parent_id_norm
-        ).first()
-        return parent
-    
-    elif treatment_variant is not None and derivation_num is not None:
         # Combined treatment: EXP-001-2_Desorption -> find EXP-001-2
-        parent_id_to_find = f"{base_id}-{derivation_num}"
-        parent_id_norm = ''.join(ch for ch in parent_id_to_find.lower() if ch not in ['-', '_', ' '])
+        parent_id_to_find = base_id if derivation_num is None else f"{base_id}-{derivation_num}"
         parent = db.query(Experiment).filter(
             func.lower(
                 func.replace(
@@ -160,14 +270,13 @@ def get_or_find_parent_experiment(db: Session, experiment_id: str):
                     ),
                     ' ', ''
                 )
-            ) == parent_id_norm
+            ) == _normalize_id(parent_id_to_find)
         ).first()
         return parent
     
     # For sequential experiments: find highest sequential < derivation_num, or base
     elif derivation_num is not None:
         # Query all experiments with the same base_experiment_id
-        base_id_norm = ''.join(ch for ch in base_id.lower() if ch not in ['-', '_', ' '])
         candidates = db.query(Experiment).filter(
             func.lower(
                 func.replace(
@@ -177,43 +286,24 @@ def get_or_find_parent_experiment(db: Session, experiment_id: str):
                     ),
                     ' ', ''
                 )
-            ) == base_id_norm
+            ) == _normalize_id(base_id)
         ).all()
         
-        # Parse sequential numbers and find the highest one < derivation_num
-        best_parent = None
-        best_seq_num = -1
-        
-        for candidate in candidates:
-            cand_base, cand_seq, cand_treatment = parse_experiment_id(candidate.experiment_id)
-            
-            # Skip if this is a treatment variant (we only want sequential or base)
-            if cand_treatment is not None:
-                continue
-            
-            # Check if this is the base (no sequential number)
-            if cand_seq is None:
-                if best_seq_num < 0:
-                    best_parent = candidate
-                    best_seq_num = 0  # Base has implicit seq 0
-            # Check if sequential number is less than current and higher than best so far
-            elif cand_seq < derivation_num and cand_seq > best_seq_num:
-                best_parent = candidate
-                best_seq_num = cand_seq
-        
-        return best_parent
+        # Treatment variants are excluded by the index; the base counts as sequence 0
+        return LineageIndex(candidates).sequential_parent(base_id, derivation_num)
     
     # Not a derivation (no sequential or treatment)
     return None
 
 
-def update_experiment_lineage(db: Session, experiment):
+def update_experiment_lineage(db: Session, experiment, index: Optional[LineageIndex] = None):
     """
     Update the lineage fields (base_experiment_id, parent_experiment_fk) for an experiment.
     
     Args:
         db: Database session
         experiment: The Experiment object to update
+        index: Optional prebuilt LineageIndex used for the parent lookup
         
     Returns:
         True if lineage was updated, False if no update was needed
@@ -243,7 +333,7 @@ def update_experiment_lineage(db: Session, experiment):
     experiment.base_experiment_id = base_id
     
     # Try to find and set the parent
-    parent = get_or_find_parent_experiment(db, experiment.experiment_id)
+    parent = get_or_find_parent_experiment(db, experiment.experiment_id, index=index)
     if parent:
         experiment.parent_experiment_fk = parent.id
     else:
@@ -272,7 +362,7 @@ def update_orphaned_derivations(db: Session, base_experiment_id: str):
         return 0
     
     # Find the base experiment
-    base_id_norm = ''.join(ch for ch in base_experiment_id.lower() if ch not in ['-', '_', ' '])
+    base_id_norm = _normalize_id(base_experiment_id)
     base_experiment = db.query(Experiment).filter(
         func.lower(
             func.replace(
@@ -0,0 +1,51 @@
+"""Add updated_at to scalar_results for incremental analytics snapshots
+
+Revision ID: 3f9a6c1e8b27
+Revises: 8b41f0c2d7e5
+Create Date: 2026-10-18 23:41:09.215370
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a6c1e8b27'
+down_revision: Union[str, None] = '8b41f0c2d7e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add updated_at column to scalar_results - SQLite compatible and idempotent."""
+    inspector = sa.inspect(op.get_bind())
+    columns = [col['name'] for col in inspector.get_columns('scalar_results')]
+
+    # Existing rows stay NULL; snapshots fall back to the parent result's timestamps
+    if 'updated_at' not in columns:
+        op.add_column('scalar_results', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove updated_at column from scalar_results - SQLite compatible and idempotent."""
+    inspector = sa.inspect(op.get_bind())
+    all_tables = inspector.get_table_names()
+    columns = [col['name'] for col in inspector.get_columns('scalar_results')]
+
+    if 'updated_at' not in columns:
+        return  # Nothing to drop
+
+    # Clean up leftover temp tables from failed migrations
+    temp_table = '_alembic_tmp_scalar_results'
+    if temp_table in all_tables:
+        op.drop_table(temp_table)
+
+    # Drop views that reference scalar_results before batch mode
+    op.execute("DROP VIEW IF EXISTS v_primary_experiment_results")
+
+    with op.batch_alter_table('scalar_results', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
+
+    # v_primary_experiment_results is recreated by event_listeners.py on app startup
@@ -0,0 +1,62 @@
+"""upload jobs table for background bulk uploads
+
+Revision ID: 5c2e7a9d1f34
+Revises: d4139241b412
+Create Date: 2026-10-18 09:12:41.318206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e7a9d1f34'
+down_revision: Union[str, None] = 'd4139241b412'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create upload_jobs - SQLite compatible and idempotent."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'upload_jobs' in set(inspector.get_table_names()):
+        return
+
+    op.create_table(
+        'upload_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('upload_type', sa.String(), nullable=False),
+        sa.Column('file_name', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('progress', sa.Float(), nullable=False),
+        sa.Column('message', sa.Text(), nullable=True),
+        sa.Column('options', sa.JSON(), nullable=True),
+        sa.Column('summary', sa.JSON(), nullable=True),
+        sa.Column('errors', sa.JSON(), nullable=True),
+        sa.Column('warnings', sa.JSON(), nullable=True),
+        sa.Column('feedbacks', sa.JSON(), nullable=True),
+        sa.Column('submitted_by', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_upload_jobs_id'), 'upload_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_upload_jobs_upload_type'), 'upload_jobs', ['upload_type'], unique=False)
+    op.create_index(op.f('ix_upload_jobs_status'), 'upload_jobs', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop upload_jobs - SQLite compatible and idempotent."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'upload_jobs' not in set(inspector.get_table_names()):
+        return
+
+    op.drop_index(op.f('ix_upload_jobs_status'), table_name='upload_jobs')
+    op.drop_index(op.f('ix_upload_jobs_upload_type'), table_name='upload_jobs')
+    op.drop_index(op.f('ix_upload_jobs_id'), table_name='upload_jobs')
+    op.drop_table('upload_jobs')
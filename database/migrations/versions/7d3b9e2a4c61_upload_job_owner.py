@@ -0,0 +1,53 @@
+"""Record the owning process of upload jobs
+
+Revision ID: 7d3b9e2a4c61
+Revises: 3f9a6c1e8b27
+Create Date: 2026-10-19 00:12:37.480215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3b9e2a4c61'
+down_revision: Union[str, None] = '3f9a6c1e8b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add owner_host/owner_pid columns to upload_jobs - SQLite compatible and idempotent."""
+    inspector = sa.inspect(op.get_bind())
+    if 'upload_jobs' not in inspector.get_table_names():
+        return
+    columns = [col['name'] for col in inspector.get_columns('upload_jobs')]
+
+    # Existing rows stay NULL and are treated as orphaned once they are unfinished
+    if 'owner_host' not in columns:
+        op.add_column('upload_jobs', sa.Column('owner_host', sa.String(), nullable=True))
+    if 'owner_pid' not in columns:
+        op.add_column('upload_jobs', sa.Column('owner_pid', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove owner_host/owner_pid columns from upload_jobs - SQLite compatible and idempotent."""
+    inspector = sa.inspect(op.get_bind())
+    all_tables = inspector.get_table_names()
+    if 'upload_jobs' not in all_tables:
+        return
+    columns = [col['name'] for col in inspector.get_columns('upload_jobs')]
+    to_drop = [name for name in ('owner_pid', 'owner_host') if name in columns]
+    if not to_drop:
+        return  # Nothing to drop
+
+    # Clean up leftover temp tables from failed migrations
+    temp_table = '_alembic_tmp_upload_jobs'
+    if temp_table in all_tables:
+        op.drop_table(temp_table)
+
+    with op.batch_alter_table('upload_jobs', schema=None) as batch_op:
+        for name in to_drop:
+            batch_op.drop_column(name)
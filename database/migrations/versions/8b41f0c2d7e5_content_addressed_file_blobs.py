@@ -0,0 +1,71 @@
+"""content-addressed file blobs with reference counts
+
+Revision ID: 8b41f0c2d7e5
+Revises: 5c2e7a9d1f34
+Create Date: 2026-10-18 22:05:17.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b41f0c2d7e5'
+down_revision: Union[str, None] = '5c2e7a9d1f34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FILE_TABLES = ('result_files', 'analysis_files', 'sample_photos')
+
+
+def upgrade() -> None:
+    """Create stored_blobs and add blob_sha256 to the file tables - SQLite compatible and idempotent."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'stored_blobs' not in set(inspector.get_table_names()):
+        op.create_table(
+            'stored_blobs',
+            sa.Column('sha256', sa.String(length=64), nullable=False),
+            sa.Column('file_path', sa.String(), nullable=False),
+            sa.Column('size_bytes', sa.Integer(), nullable=False),
+            sa.Column('file_type', sa.String(), nullable=True),
+            sa.Column('ref_count', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+            sa.PrimaryKeyConstraint('sha256')
+        )
+
+    for table in FILE_TABLES:
+        if 'blob_sha256' in {c['name'] for c in inspector.get_columns(table)}:
+            continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('blob_sha256', sa.String(length=64), nullable=True))
+            batch_op.create_index(batch_op.f(f'ix_{table}_blob_sha256'), ['blob_sha256'], unique=False)
+            batch_op.create_foreign_key(f'fk_{table}_blob_sha256', 'stored_blobs', ['blob_sha256'], ['sha256'])
+
+
+def downgrade() -> None:
+    """Drop blob_sha256 and stored_blobs - SQLite compatible and idempotent."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    for table in FILE_TABLES:
+        if 'blob_sha256' not in {c['name'] for c in inspector.get_columns(table)}:
+            continue
+        # Tables built by create_all have an unnamed FK; batch mode drops it with the column
+        fk_names = [
+            fk['name'] for fk in inspector.get_foreign_keys(table)
+            if fk['constrained_columns'] == ['blob_sha256'] and fk.get('name')
+        ]
+        index_names = {ix['name'] for ix in inspector.get_indexes(table)}
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for name in fk_names:
+                batch_op.drop_constraint(name, type_='foreignkey')
+            if f'ix_{table}_blob_sha256' in index_names:
+                batch_op.drop_index(batch_op.f(f'ix_{table}_blob_sha256'))
+            batch_op.drop_column('blob_sha256')
+
+    if 'stored_blobs' in set(inspector.get_table_names()):
+        op.drop_table('stored_blobs')
@@ -6,11 +6,13 @@ from .samples import SampleInfo, SamplePhotos
 from .analysis import AnalysisFiles, ExternalAnalysis, PXRFReading
 from .xrd import XRDAnalysis, XRDPhase
 from .chemicals import Compound, ChemicalAdditive
+from .jobs import UploadJob
+from .blobs import StoredBlob
 from .characterization import *  # Future characterization models
 from .enums import (
     ExperimentStatus, ExperimentType, FeedstockType, ComponentType,
     AnalysisType, AmmoniumQuantMethod, TitrationType, CharacterizationStatus,
-    ConcentrationUnit, PressureUnit, AmountUnit
+    ConcentrationUnit, PressureUnit, AmountUnit, UploadJobStatus
 )
 
 # Ensure all models are available at package level
@@ -28,8 +30,12 @@ __all__ = [
     'Analyte', 'ElementalAnalysis',
     # Chemicals
     'Compound', 'ChemicalAdditive',
+    # Background jobs
+    'UploadJob',
+    # File storage
+    'StoredBlob',
     # Enums
     'ExperimentStatus', 'ExperimentType', 'FeedstockType', 'ComponentType',
     'AnalysisType', 'AmmoniumQuantMethod', 'TitrationType', 'CharacterizationStatus',
-    'ConcentrationUnit', 'PressureUnit', 'AmountUnit',
+    'ConcentrationUnit', 'PressureUnit', 'AmountUnit', 'UploadJobStatus',
 ]
@@ -10,6 +10,7 @@ class AnalysisFiles(Base):
     id = Column(Integer, primary_key=True, index=True)
     external_analysis_id = Column(Integer, ForeignKey("external_analyses.id", ondelete="CASCADE"), nullable=False)
     file_path = Column(String, nullable=False)
+    blob_sha256 = Column(String(64), ForeignKey("stored_blobs.sha256"), nullable=True, index=True)  # Content-addressed blob (NULL for legacy files)
     file_name = Column(String)
     file_type = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from ..database import Base
+
+class StoredBlob(Base):
+    """
+    One stored file, keyed by the SHA-256 of its content.
+
+    ResultFiles, AnalysisFiles and SamplePhotos reference a blob through
+    ``blob_sha256`` so identical uploads are stored once. ``ref_count`` is the
+    number of referencing rows; it is maintained by the flush listener in
+    database/event_listeners.py and the stored file is removed when it reaches 0.
+    """
+    __tablename__ = "stored_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    file_path = Column(String, nullable=False)  # Path/URL returned by utils.storage
+    size_bytes = Column(Integer, nullable=False)
+    file_type = Column(String, nullable=True)  # MIME type of the first upload
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<StoredBlob(sha256='{self.sha256[:12]}', ref_count={self.ref_count})>"
@@ -88,6 +88,15 @@ class TitrationType(enum.Enum):
 #     METAMORPHIC = "Metamorphic"
 #     UNKNOWN = "Unknown"
 
+# === Background Job Enums ===
+class UploadJobStatus(enum.Enum):
+    """Lifecycle status of a background bulk-upload job"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    INTERRUPTED = "interrupted"  # Process exited before the job finished
+
 class CharacterizationStatus(enum.Enum):
     """Status of sample characterization"""
     NOT_STARTED = "not_started"
@@ -0,0 +1,42 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, JSON, Text
+from sqlalchemy.sql import func
+from ..database import Base
+from .enums import UploadJobStatus
+
+class UploadJob(Base):
+    """
+    A bulk upload executed in the background by the upload job runner.
+
+    Status and progress are persisted so the Bulk Uploads page can poll for
+    results across Streamlit reruns and browser reconnects.
+    """
+    __tablename__ = "upload_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    upload_type = Column(String, nullable=False, index=True)  # Key into UPLOAD_JOB_HANDLERS (e.g. "icp", "aeris_xrd")
+    file_name = Column(String, nullable=True)
+    status = Column(String, nullable=False, default=UploadJobStatus.QUEUED.value, index=True)  # UploadJobStatus value
+    progress = Column(Float, nullable=False, default=0.0)  # 0.0 - 1.0
+    message = Column(Text, nullable=True)  # Current stage or final summary
+    options = Column(JSON)  # Keyword options passed to the upload service
+    summary = Column(JSON)  # e.g. {"created": 3, "updated": 1, "skipped": 0}
+    errors = Column(JSON)  # List[str]
+    warnings = Column(JSON)  # List[str]
+    feedbacks = Column(JSON)  # Row-level feedback dicts returned by the service
+    submitted_by = Column(String, nullable=True)
+    owner_host = Column(String, nullable=True)  # Host of the process running the job
+    owner_pid = Column(Integer, nullable=True)  # PID of that process; its jobs are interrupted once it is gone
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (
+            UploadJobStatus.SUCCEEDED.value,
+            UploadJobStatus.FAILED.value,
+            UploadJobStatus.INTERRUPTED.value,
+        )
+
+    def __repr__(self):
+        return f"<UploadJob(id={self.id}, upload_type='{self.upload_type}', status='{self.status}')>"
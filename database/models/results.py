@@ -99,6 +99,8 @@ class ScalarResults(Base):
 
     background_experiment_id = Column(String, nullable=True)
     background_experiment_fk = Column(Integer, ForeignKey("experiments.id", ondelete="SET NULL"), nullable=True)
+    # Set on insert too (no created_at here) so analytics snapshots see new rows
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
     background_experiment = relationship("Experiment", back_populates="scalar_data", foreign_keys=[background_experiment_fk])
     # Relationship back to the main entry using result_id
     result_entry = relationship(
@@ -352,6 +354,7 @@ class ResultFiles(Base):
     id = Column(Integer, primary_key=True, index=True)
     result_id = Column(Integer, ForeignKey("experimental_results.id", ondelete="CASCADE"), nullable=False)
     file_path = Column(String, nullable=False)
+    blob_sha256 = Column(String(64), ForeignKey("stored_blobs.sha256"), nullable=True, index=True)  # Content-addressed blob (NULL for legacy files)
     file_name = Column(String)
     file_type = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
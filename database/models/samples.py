@@ -9,6 +9,7 @@ class SamplePhotos(Base):
     id = Column(Integer, primary_key=True, index=True)
     sample_id = Column(String, ForeignKey("sample_info.sample_id"), nullable=False) # Added FK to SampleInfo.sample_id
     file_path = Column(String, nullable=False)
+    blob_sha256 = Column(String(64), ForeignKey("stored_blobs.sha256"), nullable=True, index=True)  # Content-addressed blob (NULL for legacy files)
     file_name = Column(String)
     file_type = Column(String)
     description = Column(Text)
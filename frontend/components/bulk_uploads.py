@@ -31,6 +31,11 @@ from backend.services.bulk_uploads.metric_groups import METRIC_GROUPS
 from sqlalchemy.exc import IntegrityError
 
 from backend.services.bulk_uploads.master_bulk_upload import MasterBulkUploadService
+from backend.services.upload_jobs import get_upload_job_runner, UPLOAD_JOB_HANDLERS
+from backend.services.upload_cache import upload_cache, fingerprint
+
+# Bump when ICPService parsing output changes shape (invalidates upload_cache)
+ICP_PARSER_VERSION = 1
 
 EXPERIMENTAL_RESULTS_REQUIRED_COLS = {
     "experiment_id", "description", "time_post_reaction"
@@ -43,6 +48,8 @@ def render_bulk_uploads_page():
     """
     st.title("Bulk Uploads")
 
+    _render_upload_jobs_panel()
+
     upload_option = st.selectbox(
         "Select data type to upload:",
         (
@@ -94,6 +101,82 @@ def render_bulk_uploads_page():
         handle_timepoint_modifications_upload()
 
 
+
+def _run_in_background_toggle(key: str) -> bool:
+    """Checkbox offering to run the upload through the background job runner."""
+    return st.checkbox(
+        "Run in background",
+        value=False,
+        help=(
+            "Queue the import as a background job. You can keep working or reload "
+            "the page; progress and results appear under 'Background upload jobs'."
+        ),
+        key=key,
+    )
+
+
+def _submit_background_job(upload_type: str, uploaded, options: dict | None = None) -> None:
+    """Queue an uploaded file with the background job runner and report the job id."""
+    submit_key = f"bg_job_submitted_{upload_type}"
+    file_signature = f"{uploaded.name}:{uploaded.size}"
+    # Streamlit reruns on every widget interaction; only queue each file once.
+    if st.session_state.get(submit_key) == file_signature:
+        st.info("This file has already been queued. See 'Background upload jobs' above for progress.")
+        return
+    try:
+        job_id = get_upload_job_runner().submit(
+            upload_type,
+            uploaded.getvalue(),
+            file_name=uploaded.name,
+            options=options,
+            submitted_by=st.session_state.get("user", {}).get("email"),
+        )
+    except Exception as e:
+        st.error(f"Could not queue background upload: {e}")
+        return
+    st.session_state[submit_key] = file_signature
+    st.success(f"Queued background job #{job_id}. See 'Background upload jobs' above for progress.")
+
+
+def _render_upload_jobs_panel():
+    """Show recent background upload jobs with status, progress and row feedback."""
+    try:
+        jobs = get_upload_job_runner().list_jobs(limit=10)
+    except Exception as e:
+        st.caption(f"Background jobs unavailable: {e}")
+        return
+    if not jobs:
+        return
+
+    active = [job for job in jobs if not job.is_finished]
+    with st.expander(f"Background upload jobs ({len(active)} active)", expanded=bool(active)):
+        if st.button("Refresh job status", key="refresh_upload_jobs"):
+            st.rerun()
+        for job in jobs:
+            label = UPLOAD_JOB_HANDLERS.get(job.upload_type)
+            label = label.label if label else job.upload_type
+            icon = {
+                "queued": "⏳", "running": "🔄", "succeeded": "✅",
+                "failed": "❌", "interrupted": "⚠️",
+            }.get(job.status, "❓")
+            st.markdown(f"**#{job.id} {label}** — {job.file_name or ''} {icon} {job.status}")
+            if not job.is_finished:
+                st.progress(float(job.progress or 0.0), text=job.message or "")
+                continue
+            if job.message:
+                st.caption(job.message)
+            for msg in (job.errors or [])[:20]:
+                st.error(msg)
+            if job.errors and len(job.errors) > 20:
+                st.info(f"...and {len(job.errors) - 20} more errors")
+            if job.warnings:
+                st.caption(f"{len(job.warnings)} warning/info message(s)")
+                for msg in job.warnings[:20]:
+                    st.caption(f"  {msg}")
+            if job.feedbacks:
+                st.dataframe(pd.DataFrame(job.feedbacks), use_container_width=True, height=200)
+
+
 def handle_xrd_upload():
     """
     Bulk upload of XRD mineralogy per sample.
@@ -134,11 +217,16 @@ def handle_xrd_upload():
     )
 
     st.markdown("---")
+    run_in_background = _run_in_background_toggle("xrd_run_in_background")
     uploaded = st.file_uploader("Upload filled XRD template (xlsx)", type=["xlsx"])
 
     if not uploaded:
         return
 
+    if run_in_background:
+        _submit_background_job("actlabs_xrd", uploaded)
+        return
+
     db = SessionLocal()
     try:
         created_ext, updated_ext, created_json, updated_json, created_phase, updated_phase, skipped, errors = XRDUploadService.bulk_upsert_from_excel(db, uploaded.read())
@@ -207,6 +295,7 @@ def handle_aeris_xrd_upload():
         key="aeris_xrd_overwrite_existing",
     )
 
+    run_in_background = _run_in_background_toggle("aeris_xrd_run_in_background")
     uploaded = st.file_uploader(
         "Upload refined Aeris XRD data (xlsx)", type=["xlsx"], key="aeris_xrd_upload"
     )
@@ -214,6 +303,12 @@ def handle_aeris_xrd_upload():
     if not uploaded:
         return
 
+    if run_in_background:
+        _submit_background_job(
+            "aeris_xrd", uploaded, {"overwrite_existing": overwrite_existing}
+        )
+        return
+
     db = SessionLocal()
     try:
         created, updated, skipped, errors = (
@@ -293,7 +388,12 @@ def handle_master_bulk_upload():
         key="master_dry_run",
     )
     
+    run_in_background = _run_in_background_toggle("master_run_in_background")
     uploaded_file = st.file_uploader("Upload your data file (CSV or Excel)", type=["csv", "xlsx", "xls"], key="master_upload")
+
+    if uploaded_file and run_in_background:
+        _submit_background_job("master_bulk_upload", uploaded_file, {"dry_run": dry_run})
+        return
     
     if uploaded_file:
         db = SessionLocal()
@@ -612,11 +712,16 @@ def handle_new_experiments_upload():
     )
 
     st.markdown("---")
+    run_in_background = _run_in_background_toggle("new_experiments_run_in_background")
     uploaded = st.file_uploader("Upload filled New Experiments template (xlsx)", type=["xlsx"])
 
     if not uploaded:
         return
 
+    if run_in_background:
+        _submit_background_job("new_experiments", uploaded)
+        return
+
     db = SessionLocal()
     try:
         created, updated, skipped, errors, warnings, info_messages = NewExperimentsUploadService.bulk_upsert_from_excel(db, uploaded.read())
@@ -681,10 +786,15 @@ def handle_pxrf_upload():
     )
 
     update_existing = st.checkbox("Update existing readings if present", value=False)
+    run_in_background = _run_in_background_toggle("pxrf_run_in_background")
     uploaded = st.file_uploader("Upload pXRF Excel", type=["xlsx", "xlsm", "xls"])
     if not uploaded:
         return
 
+    if run_in_background:
+        _submit_background_job("pxrf", uploaded, {"update_existing": update_existing})
+        return
+
     db = SessionLocal()
     try:
         inserted, updated, skipped, errors = PXRFUploadService.ingest_from_bytes(db, uploaded.read(), update_existing=update_existing)
@@ -1641,8 +1751,19 @@ def handle_icp_upload():
     **Note:** No template is provided as this processes direct instrument output files. This is for ICP-OES data only.
     """)
 
+    run_in_background = _run_in_background_toggle("icp_run_in_background")
     uploaded_file = st.file_uploader("Upload your CSV file", type=["csv"])
 
+    if uploaded_file and run_in_background:
+        force_upload = st.checkbox(
+            "Upload even if processing warnings are found",
+            value=False,
+            key="icp_background_force_upload",
+        )
+        if st.button("Queue ICP Upload", key="queue_icp_upload_btn"):
+            _submit_background_job("icp", uploaded_file, {"force_upload": force_upload})
+        return
+
     if uploaded_file:
         state_sig_key = "icp_upload_file_signature"
         state_data_key = "icp_upload_processed_data"
@@ -1652,7 +1773,7 @@ def handle_icp_upload():
         # Show CSV analysis and allow manual header row specification
         file_content = uploaded_file.read()
         uploaded_file.seek(0)  # Reset for potential re-reading
-        file_signature = f"{uploaded_file.name}:{uploaded_file.size}:{hash(file_content)}"
+        file_signature = f"{uploaded_file.name}:{fingerprint(file_content)}"
 
         # Reset cached processing state when the uploaded file changes
         if st.session_state.get(state_sig_key) != file_signature:
@@ -1662,7 +1783,12 @@ def handle_icp_upload():
             st.session_state.pop(state_header_key, None)
         
         # Quick analysis
-        diagnosis = ICPService.diagnose_csv_structure(file_content)
+        diagnosis = upload_cache.get_or_compute(
+            "icp.diagnose_csv_structure",
+            ICP_PARSER_VERSION,
+            file_content,
+            lambda: ICPService.diagnose_csv_structure(file_content),
+        )
         
         if 'error' not in diagnosis:
             st.subheader("📋 CSV File Analysis")
@@ -1695,7 +1821,7 @@ def handle_icp_upload():
         if st.button("Process ICP Data", key="process_icp_data_btn"):
             try:
                 st.info("Processing ICP-OES data file...")
-                processed_data, processing_errors = ICPService.parse_and_process_icp_file(file_content, manual_header)
+                processed_data, processing_errors = _parse_icp_cached(file_content, manual_header)
                 st.session_state[state_data_key] = processed_data
                 st.session_state[state_errors_key] = processing_errors
                 st.session_state[state_header_key] = manual_header
@@ -1721,6 +1847,16 @@ def handle_icp_upload():
                 force_upload=upload_despite_warnings
             )
 
+def _parse_icp_cached(file_content: bytes, manual_header_row: int = 0):
+    """Parse an ICP file once per (content, header row); reruns reuse the result."""
+    return upload_cache.get_or_compute(
+        "icp.parse_and_process_icp_file",
+        ICP_PARSER_VERSION,
+        file_content,
+        lambda: ICPService.parse_and_process_icp_file(file_content, manual_header_row),
+        params={"manual_header_row": int(manual_header_row)},
+    )
+
 def _process_icp_csv(
     file_content: bytes,
     manual_header_row: int = 0,
@@ -1736,7 +1872,7 @@ def _process_icp_csv(
         # Step 1: Parse and process the ICP file (if not already cached in session state)
         if processed_data is None or processing_errors is None:
             st.info("Processing ICP-OES data file...")
-            processed_data, processing_errors = ICPService.parse_and_process_icp_file(file_content, manual_header_row)
+            processed_data, processing_errors = _parse_icp_cached(file_content, manual_header_row)
         
         if processing_errors:
             st.subheader("⚠️ Processing Issues Found")
@@ -1,6 +1,6 @@
 import streamlit as st
 from database import SessionLocal, ExternalAnalysis, SampleInfo, AnalysisFiles, SamplePhotos
-from .utils import log_modification, delete_file_if_exists, save_uploaded_file, coerce_to_bool
+from .utils import log_modification, delete_file_if_exists, delete_record_file, store_uploaded_file, coerce_to_bool
 import json
 import datetime
 from sqlalchemy.orm import selectinload
@@ -46,7 +46,7 @@ def delete_external_analysis(analysis_id):
         # --- Delete associated files from storage --- 
         files_deleted_info = []
         for file_record in analysis.analysis_files:
-            deleted = delete_file_if_exists(file_record.file_path)
+            deleted = delete_record_file(file_record)
             files_deleted_info.append({
                 'name': file_record.file_name,
                 'path': file_record.file_path,
@@ -99,7 +99,6 @@ def add_external_analysis(user_sample_id, analysis_data, uploaded_files: list =
         bool: True if successful, False otherwise.
     """
     db = SessionLocal()
-    saved_file_paths = [] # Keep track of files saved in this run for cleanup
     try:
         # --- Step 1: Find SampleInfo record ---
         sample_info_record = db.query(SampleInfo).filter(SampleInfo.sample_id == user_sample_id).first()
@@ -174,25 +173,21 @@ def add_external_analysis(user_sample_id, analysis_data, uploaded_files: list =
             if idx == 0 and uploaded_files:
                 for uploaded_file in uploaded_files:
                     if uploaded_file:
-                        storage_folder = f"analysis_reports/sample_{user_sample_id}/analysis_{new_analysis.id}"
-                        file_path = save_uploaded_file(
-                            file=uploaded_file,
-                            storage_folder=storage_folder
-                        )
+                        # Content-addressed: identical reports are stored once and shared
+                        blob = store_uploaded_file(db, uploaded_file)
 
-                        if not file_path:
+                        if not blob:
                             st.error(f"Failed to save uploaded analysis file: {uploaded_file.name}. Aborting analysis entry.")
                             db.rollback()
-                            for saved_path in saved_file_paths:
-                                delete_file_if_exists(saved_path)
                             return False
-                        saved_file_paths.append(file_path)
+                        file_path = blob.file_path
                         file_name = uploaded_file.name
                         file_type = uploaded_file.type
 
                         analysis_file_entry = AnalysisFiles(
                             external_analysis_id=new_analysis.id,
                             file_path=file_path,
+                            blob_sha256=blob.sha256,
                             file_name=file_name,
                             file_type=file_type
                         )
@@ -231,9 +226,6 @@ def add_external_analysis(user_sample_id, analysis_data, uploaded_files: list =
     except Exception as e:
         db.rollback()
         st.error(f"Error adding external analysis: {str(e)}")
-        # Clean up any saved files if rollback occurs
-        for saved_path in saved_file_paths:
-            delete_file_if_exists(saved_path)
         return False
     finally:
         db.close() 
@@ -256,22 +248,19 @@ def add_sample_photo(sample_info_id, photo_file, description=None):
              st.error(f"Sample with ID {sample_info_id} not found.")
              return False
 
-        # Save the file using utility, creating a subfolder for the sample
-        storage_folder = f"sample_photos/{sample.sample_id}"
-        file_path = save_uploaded_file(
-            file=photo_file,
-            storage_folder=storage_folder
-        )
+        # Save the file content-addressed (identical photos are stored once)
+        blob = store_uploaded_file(db, photo_file)
 
-        if not file_path:
+        if not blob:
             st.error("Failed to save photo file.")
-            # No need to rollback if nothing was added yet
+            db.rollback()
             return False
 
         # Create new SamplePhotos object
         new_photo = SamplePhotos(
             sample_id=sample_info_id,  # Use string sample_id
-            file_path=file_path,
+            file_path=blob.file_path,
+            blob_sha256=blob.sha256,
             file_name=photo_file.name,
             file_type=photo_file.type,
             description=description
@@ -304,9 +293,6 @@ def add_sample_photo(sample_info_id, photo_file, description=None):
     except Exception as e:
         if db: db.rollback() # Rollback if exception occurs after adding
         st.error(f"Error adding sample photo: {str(e)}")
-        # Attempt to delete the file if it was saved before the error
-        if 'file_path' in locals() and file_path and os.path.exists(file_path):
-            delete_file_if_exists(file_path)
         return False
     finally:
         if db and db.is_active:
@@ -334,7 +320,8 @@ def delete_sample_photo(photo_id):
             'file_path': photo.file_path,
             'file_name': photo.file_name
         }
-        file_path_to_delete = photo.file_path # Store path before deleting object
+        # Store path before deleting object; blob-backed files are released by ref count on commit
+        file_path_to_delete = None if photo.blob_sha256 else photo.file_path
 
         # Log modification
         log_modification(
@@ -386,7 +373,7 @@ def delete_analysis_file(analysis_file_id):
             'file_path': analysis_file.file_path,
             'file_name': analysis_file.file_name
         }
-        file_path_to_delete = analysis_file.file_path
+        file_path_to_delete = None if analysis_file.blob_sha256 else analysis_file.file_path
 
         # Log modification before delete
         log_modification(
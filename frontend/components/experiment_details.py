@@ -15,7 +15,9 @@ from frontend.config.variable_config import (
 from frontend.components.utils import (
     split_conditions_for_display,
     get_condition_display_dict,
-    format_value
+    format_value,
+    render_file_thumbnail,
+    render_lazy_download,
 )
 from frontend.components.load_info import get_sample_info, get_external_analyses
 
@@ -290,23 +292,15 @@ def display_experiment_details(experiment):
                             file_col1, file_col2 = st.columns([3, 1]) # Adjust columns if needed
                             with file_col1:
                                 st.write(f"- {file['file_name']}")
+                                # Cached thumbnail; the original is fetched only on download
+                                render_file_thumbnail(file['file_path'], file['file_name'], blob_sha256=file.get('blob_sha256'))
                             with file_col2:
-                                # Use centralized storage utils to check existence/get download URL?
-                                # For now, assume local path check is sufficient
-                                if file['file_path'] and os.path.exists(file['file_path']):
-                                    try:
-                                        with open(file['file_path'], 'rb') as fp:
-                                            st.download_button(
-                                                f"Download", # Simpler label
-                                                fp.read(),
-                                                file_name=file['file_name'],
-                                                mime=file.get('file_type', 'application/octet-stream'), # Default MIME type
-                                                key=f"download_analysis_{file['id']}" # Unique key
-                                            )
-                                    except Exception as e:
-                                        st.warning(f"Could not read analysis file {file['file_name']}: {e}")
-                                else:
-                                    st.warning(f"File not found: {file['file_name']}")
+                                render_lazy_download(
+                                    file['file_path'],
+                                    file['file_name'],
+                                    mime=file.get('file_type'),
+                                    key=f"analysis_{file['id']}",
+                                )
                     else:
                         # Only show this if not pXRF or if pXRF has no files either
                         # Note: get_external_analyses needs to provide 'pxrf_readings' if this check is needed
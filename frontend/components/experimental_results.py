@@ -5,7 +5,7 @@ import json
 from sqlalchemy.orm import Session, selectinload # Import Session and selectinload for type hinting and eager loading
 from database import SessionLocal, Experiment, ExperimentalResults, ResultFiles, ModificationsLog, ScalarResults
 # Import utilities and config
-from frontend.components.utils import log_modification, save_uploaded_file, delete_file_if_exists
+from frontend.components.utils import log_modification, store_uploaded_file, delete_record_file
 from frontend.config.variable_config import SCALAR_RESULTS_CONFIG# Import the main config mapping
 from backend.services.result_merge_utils import (
     normalize_timepoint,
@@ -191,8 +191,6 @@ def save_results(experiment_id, time_post_reaction, result_description, scalar_d
 
         # --- Handle File Uploads ---
         if files_to_save:
-            # Define storage folder outside the loop, as it's the same for all files in this result
-            storage_folder = f"results/{result.experiment.experiment_id}/{result.id}"
             for file_info in files_to_save:
                 uploaded_file = file_info['file']
                 # Check if file already exists for this result to prevent duplicates
@@ -202,16 +200,14 @@ def save_results(experiment_id, time_post_reaction, result_description, scalar_d
                 ).first()
 
                 if not file_exists:
-                    # Save the file to disk/cloud storage
-                    file_path = save_uploaded_file(
-                        file=uploaded_file,
-                        storage_folder=storage_folder
-                    )
-                    if file_path:
+                    # Save the file content-addressed (re-uploaded reports are stored once)
+                    blob = store_uploaded_file(db, uploaded_file)
+                    if blob:
                         # Create a new ResultFiles entry without description
                         new_file = ResultFiles(
                             result_id=result.id,
-                            file_path=file_path,
+                            file_path=blob.file_path,
+                            blob_sha256=blob.sha256,
                             file_name=uploaded_file.name,
                             file_type=uploaded_file.type
                         )
@@ -280,7 +276,7 @@ def delete_experimental_results(result_id):
         deleted_file_info = []
         if associated_files:
             for file_record in associated_files:
-                deleted = delete_file_if_exists(file_record.file_path)
+                deleted = delete_record_file(file_record)
                 deleted_file_info.append({
                     'name': file_record.file_name,
                     'path': file_record.file_path,
@@ -358,7 +354,7 @@ def delete_result_file(file_id):
 
 
         # --- Delete the actual file from storage FIRST ---
-        file_deleted_from_storage = delete_file_if_exists(file_record.file_path)
+        file_deleted_from_storage = delete_record_file(file_record)
 
         if not file_deleted_from_storage:
             st.warning(f"Could not delete file from storage: {file_record.file_path}. Proceeding to remove database record.")
@@ -62,6 +62,7 @@ def get_external_analyses(sample_id, db=None):
                 'analysis_files': [{
                     'id': file.id,
                     'file_path': file.file_path,
+                    'blob_sha256': file.blob_sha256,
                     'file_name': file.file_name,
                     'file_type': file.file_type
                 } for file in analysis.analysis_files],
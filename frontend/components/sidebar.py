@@ -1,74 +1,42 @@
+import os
 import streamlit as st
-import pandas as pd
-import io
-from database import SessionLocal, Experiment, SampleInfo, ExperimentalConditions, ExperimentNotes, ExperimentalResults, ScalarResults, ExternalAnalysis, PXRFReading
-from sqlalchemy import text, inspect
+from database import SessionLocal, Experiment
+from sqlalchemy import text
+from utils.database_export import DOWNLOAD_FORMATS, EXCEL_FORMAT, export_file, export_file_name, new_export_path
+from utils.page_profiler import is_profiler_admin, load_records, records_to_csv, summarize
 
-def download_database_as_excel():
+def prepare_database_export(fmt):
     """
-    Fetches data from specified tables and returns it as an Excel file
-    in a BytesIO buffer.
+    Stream the whole database into a zip archive (or Excel workbook) in the
+    managed export directory.
+
+    Tables are read and written in chunks (see utils.database_export), so the
+    archive formats work for databases of any size; Excel is refused when a
+    table does not fit on a sheet. The export path is kept in session state
+    and replaced when a new export is prepared; exports left behind by
+    abandoned sessions are evicted by age.
     """
-    db = SessionLocal()
+    previous = st.session_state.pop("database_export_path", None)
+    if previous and os.path.exists(previous):
+        os.remove(previous)
+    path = str(new_export_path(fmt))
     try:
-        # Define tables to fetch and their corresponding models and sheet names
-        tables_to_fetch = {
-            "Experiments": Experiment,
-            "ExperimentalConditions": ExperimentalConditions,
-            "ExperimentNotes": ExperimentNotes,
-            "ExperimentalResults": ExperimentalResults,
-            "ScalarResults": ScalarResults,
-            "SampleInfo": SampleInfo,
-            "ExternalAnalyses": ExternalAnalysis,
-            "PXRFReadings": PXRFReading,
-        }
-
-        inspector = inspect(db.get_bind())
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            sheets_written = 0
-            for sheet_name, model in tables_to_fetch.items():
-                table_name = model.__tablename__
-                try:
-                    if table_name not in inspector.get_table_names():
-                        df_placeholder = pd.DataFrame({"Message": [f"Table {table_name} not found"]})
-                        df_placeholder.to_excel(writer, sheet_name=sheet_name, index=False)
-                        sheets_written += 1
-                        continue
-
-                    columns = [col["name"] for col in inspector.get_columns(table_name)]
-                    if not columns:
-                        df_placeholder = pd.DataFrame({"Message": [f"No columns found for {table_name}"]})
-                        df_placeholder.to_excel(writer, sheet_name=sheet_name, index=False)
-                        sheets_written += 1
-                        continue
-
-                    quoted_columns = ", ".join([f'"{col}"' for col in columns])
-                    query = text(f'SELECT {quoted_columns} FROM "{table_name}"')
-                    df = pd.read_sql_query(query, db.get_bind())
-
-                    if df.empty:
-                        df_placeholder = pd.DataFrame({"Message": [f"No data in {sheet_name} table"]})
-                        df_placeholder.to_excel(writer, sheet_name=sheet_name, index=False)
-                    else:
-                        df.to_excel(writer, sheet_name=sheet_name, index=False)
-                    sheets_written += 1
-                except Exception as table_error:
-                    df_placeholder = pd.DataFrame({"Message": [f"Failed to export {sheet_name}: {table_error}"]})
-                    df_placeholder.to_excel(writer, sheet_name=sheet_name, index=False)
-                    sheets_written += 1
-
-            # Ensure at least one sheet exists
-            if sheets_written == 0:
-                pd.DataFrame({"Message": ["No data available"]}).to_excel(writer, sheet_name="Info", index=False)
-
-        output.seek(0)  # Reset buffer position to the beginning
-        return output
+        progress = st.progress(0.0, text="Exporting database...")
+        manifest = export_file(
+            path,
+            fmt=fmt,
+            progress=lambda name, i, n: progress.progress(i / n, text=f"Exporting {name}..."),
+        )
+        progress.empty()
     except Exception as e:
-        st.error(f"Error generating Excel file: {str(e)}")
+        if os.path.exists(path):
+            os.remove(path)
+        st.error(f"Error exporting database: {str(e)}")
         return None
-    finally:
-        db.close()
+    st.session_state["database_export_path"] = path
+    st.session_state["database_export_fmt"] = fmt
+    st.session_state["database_export_rows"] = sum(t["rows"] for t in manifest["tables"])
+    return path
 
 def render_sidebar():
     with st.sidebar:
@@ -186,12 +154,65 @@ def render_sidebar():
 
         st.markdown("---") # Separator
         
-        excel_data = download_database_as_excel()
-        if excel_data:
-            st.download_button(
-                label="Download Database as Excel",
-                data=excel_data,
-                file_name="database_export.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        st.markdown("### Export Database")
+        export_format = st.selectbox(
+            "Format",
+            list(DOWNLOAD_FORMATS),
+            format_func=DOWNLOAD_FORMATS.get,
+            key="database_export_format",
+        )
+        if st.button("Prepare Export"):
+            prepare_database_export(export_format)
+
+        export_path = st.session_state.get("database_export_path")
+        if export_path and os.path.exists(export_path):
+            export_fmt = st.session_state.get('database_export_fmt')
+            st.caption(f"{st.session_state.get('database_export_rows', 0):,} rows exported")
+            with open(export_path, "rb") as fh:
+                st.download_button(
+                    label="Download Database Export",
+                    data=fh,
+                    file_name=export_file_name(export_fmt),
+                    mime=(
+                        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        if export_fmt == EXCEL_FORMAT else "application/zip"
+                    ),
+                )
+        return page
+
+
+def render_profiler_overlay(last_record=None):
+    """
+    Admin-only sidebar panel with page render timings.
+
+    Shows the render that just finished, per-page statistics from the rolling
+    profile store (utils.page_profiler) and a CSV export of the raw records.
+    Add ?profile=pyinstrument (or ?profile=cprofile) to the URL to profile
+    the next renders in detail.
+    """
+    if not is_profiler_admin(st.session_state.get('user')):
+        return
+
+    with st.sidebar.expander("⏱️ Page Profiling", expanded=False):
+        if last_record and last_record.get('wall_ms') is not None:
+            st.caption(
+                f"Last render: **{last_record['page']}** — {last_record['wall_ms']:.0f} ms"
+                + (f", {last_record['query_count']} queries ({last_record['query_ms']:.0f} ms)"
+                   if last_record.get('query_count') is not None else "")
+                + (f", peak {last_record['peak_memory_mb']:.1f} MB" if last_record.get('peak_memory_mb') is not None else "")
             )
-        return page
\ No newline at end of file
+            if last_record.get('profile_path'):
+                st.caption(f"{last_record['profiler']} report: `{last_record['profile_path']}`")
+
+        records = load_records()
+        if not records:
+            st.info("No renders recorded yet. Set PAGE_PROFILING=true to time every render.")
+            return
+        st.dataframe(summarize(records), hide_index=True, use_container_width=True)
+        st.download_button(
+            label="Download Profiles (CSV)",
+            data=records_to_csv(records),
+            file_name="page_profiles.csv",
+            mime="text/csv",
+        )
+        st.caption("Add `?profile=pyinstrument` or `?profile=cprofile` to the URL to profile renders.")
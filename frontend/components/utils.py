@@ -130,6 +130,133 @@ def save_uploaded_file(file, storage_folder):
         logger.error(f"Error in save_uploaded_file: {e}", exc_info=True)
         return None
 
+def store_uploaded_file(db, file):
+    """
+    Stores an uploaded file content-addressed via BlobStore.
+
+    Identical content is stored once. Point the ResultFiles, AnalysisFiles or
+    SamplePhotos row at the returned blob (``blob_sha256=blob.sha256``,
+    ``file_path=blob.file_path``); the reference count follows that row.
+
+    Args:
+        db (Session): Session the referencing row will be added to.
+        file (UploadedFile): The file object from st.file_uploader.
+
+    Returns:
+        StoredBlob or None: The stored blob, or None if error.
+    """
+    if not file:
+        return None
+
+    try:
+        from backend.services.blob_store import BlobStore
+        from utils.preview_cache import preview_cache
+        file_bytes = file.getvalue()
+        blob = BlobStore.store(db, file_bytes, os.path.basename(file.name), mime_type=file.type)
+        try:
+            # Render previews while the bytes are in memory so detail pages never fetch the original
+            preview_cache.warm(blob.sha256, file_bytes, file.name)
+        except Exception as e:
+            logger.warning(f"Could not pre-render preview for {file.name}: {e}")
+        return blob
+    except Exception as e:
+        st.error(f"Error saving file {file.name}: {str(e)}")
+        logger.error(f"Error in store_uploaded_file: {e}", exc_info=True)
+        return None
+
+def delete_record_file(file_record):
+    """
+    Deletes the stored file behind a ResultFiles, AnalysisFiles or SamplePhotos row.
+
+    Blob-backed rows are released by reference counting when the row's
+    deletion is committed, so only legacy per-upload files are deleted here.
+
+    Returns:
+        bool: True if deletion was successful or not needed, False otherwise.
+    """
+    if getattr(file_record, "blob_sha256", None):
+        return True
+    return delete_file_if_exists(file_record.file_path)
+
+def _file_cache_key(file_path, blob_sha256=None):
+    from utils.preview_cache import legacy_cache_key
+    return blob_sha256 or legacy_cache_key(file_path)
+
+def render_file_thumbnail(file_path, file_name, blob_sha256=None, caption=None, large=False):
+    """
+    Shows a cached, downscaled preview of a stored file (image or PDF first page).
+
+    The original is fetched through utils.storage only when the preview isn't
+    cached yet; later renders read the small cached image.
+
+    Args:
+        file_path (str): Storage path/URL of the original.
+        file_name (str): Original file name (used to detect the format).
+        blob_sha256 (str, optional): Content hash of the file, if blob-backed.
+        caption (str, optional): Caption shown under the image.
+        large (bool): Use the larger preview size instead of the thumbnail.
+
+    Returns:
+        bool: True if a preview was shown.
+    """
+    if not file_path:
+        return False
+    from utils.preview_cache import preview_cache
+    try:
+        key = _file_cache_key(file_path, blob_sha256)
+        load = lambda: get_file(file_path)
+        path = preview_cache.preview(key, load, file_name) if large else preview_cache.thumbnail(key, load, file_name)
+    except FileNotFoundError:
+        st.warning(f"File not found: {file_name}")
+        return False
+    except Exception as e:
+        logger.warning(f"Preview failed for {file_path}: {e}")
+        return False
+    if path is None:
+        return False
+    st.image(str(path), caption=caption)
+    return True
+
+def render_lazy_download(file_path, file_name, mime=None, key=None, label="Download"):
+    """
+    Download button that fetches the original only when the user asks for it.
+
+    The first click fetches the file through utils.storage and replaces the
+    button with a real download button for the rest of the session.
+
+    Args:
+        file_path (str): Storage path/URL of the original.
+        file_name (str): File name offered to the browser.
+        mime (str, optional): MIME type of the file.
+        key (str): Unique widget key.
+        label (str): Button label.
+    """
+    if not file_path:
+        st.info("No file path recorded.")
+        return
+    state_key = f"lazy_download_{key}"
+    if not st.session_state.get(state_key):
+        if st.button(label, key=f"fetch_{key}"):
+            st.session_state[state_key] = True
+        else:
+            return
+    try:
+        data = get_file(file_path)
+    except FileNotFoundError:
+        st.warning(f"File not found: {file_name}")
+        return
+    except Exception as e:
+        st.warning(f"Could not read file {file_name}: {e}")
+        return
+    st.download_button(
+        f"Save {file_name}",
+        data,
+        file_name=file_name,
+        mime=mime or "application/octet-stream",
+        key=f"download_{key}",
+        on_click="ignore",
+    )
+
 def delete_file_if_exists(file_path):
     """
     Deletes a file using the centralized utils.storage.delete_file.
@@ -603,6 +603,7 @@ def get_experiment_by_id(experiment_id):
                         result_item['files'].append({
                             'id': file_obj.id,
                             'file_path': file_obj.file_path,
+                            'blob_sha256': file_obj.blob_sha256,
                             'file_name': file_obj.file_name,
                             'file_type': file_obj.file_type,
                             'created_at': file_obj.created_at
@@ -11,7 +11,9 @@ from frontend.config.variable_config import (
 )
 from frontend.components.utils import (
     generate_form_fields,
-    format_value # Assuming format_value is moved or duplicated here/in utils
+    format_value, # Assuming format_value is moved or duplicated here/in utils
+    render_file_thumbnail,
+    render_lazy_download,
 )
 from frontend.components.experimental_results import (
     save_results,
@@ -211,20 +213,13 @@ def display_single_result(result, experiment_db_id):
                 with file_col1:
                     st.write(f"- {file_record.file_name}")
                 with file_col2:
-                    if os.path.exists(file_record.file_path):
-                        try:
-                            with open(file_record.file_path, 'rb') as fp:
-                                st.download_button(
-                                    label="Download",
-                                    data=fp.read(),
-                                    file_name=file_record.file_name,
-                                    mime=file_record.file_type,
-                                    key=f"download_file_{file_record.id}"
-                                )
-                        except Exception as e:
-                            st.warning(f"Could not read file {file_record.file_name}: {e}")
-                    else:
-                        st.warning(f"File not found: {file_record.file_name}")
+                    render_file_thumbnail(file_record.file_path, file_record.file_name, blob_sha256=file_record.blob_sha256)
+                    render_lazy_download(
+                        file_record.file_path,
+                        file_record.file_name,
+                        mime=file_record.file_type,
+                        key=f"file_{file_record.id}",
+                    )
                 with file_col3:
                      if st.button("❌", key=f"delete_file_{file_record.id}", help="Delete this file"):
                          delete_success = delete_result_file(file_record.id)
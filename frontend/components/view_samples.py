@@ -9,7 +9,9 @@ from frontend.components.utils import (
     log_modification, 
     save_uploaded_file, 
     delete_file_if_exists,
-    generate_form_fields
+    generate_form_fields,
+    render_file_thumbnail,
+    render_lazy_download,
 )
 from frontend.config.variable_config import (
     ANALYSIS_TYPES,
@@ -424,22 +426,19 @@ def display_sample_details(sample_id):
                                     file_key = f"analysis_file_{analysis_file.id}"
                                     file_col1, file_col2 = st.columns([4, 1])
                                     with file_col1:
-                                        if analysis_file.file_path and os.path.exists(analysis_file.file_path):
-                                            try:
-                                                with open(analysis_file.file_path, 'rb') as fp:
-                                                    st.download_button(
-                                                        f"Download {analysis_file.file_name}",
-                                                        fp.read(),
-                                                        file_name=analysis_file.file_name,
-                                                        mime=analysis_file.file_type,
-                                                        key=f"download_{file_key}"
-                                                    )
-                                            except Exception as e:
-                                                st.warning(f"Could not read file {analysis_file.file_name}: {e}")
-                                        elif analysis_file.file_path:
-                                            st.warning(f"File not found: {analysis_file.file_name}")
-                                        else:
-                                            st.info("No file path recorded.")
+                                        # Cached thumbnail; the original is fetched only on download
+                                        render_file_thumbnail(
+                                            analysis_file.file_path,
+                                            analysis_file.file_name,
+                                            blob_sha256=analysis_file.blob_sha256,
+                                        )
+                                        render_lazy_download(
+                                            analysis_file.file_path,
+                                            analysis_file.file_name,
+                                            mime=analysis_file.file_type,
+                                            key=file_key,
+                                            label=f"Download {analysis_file.file_name}",
+                                        )
                                     with file_col2:
                                         if st.button("Del", key=f"delete_{file_key}", help="Delete this specific file"):
                                             delete_analysis_file(analysis_file.id)
@@ -467,13 +466,21 @@ def display_sample_details(sample_id):
                     # Expand the first photo by default
                     is_expanded = (i == 0)
                     with st.expander(f"Photo {photo.id} ({photo.file_name or 'details'}) - Added: {photo.created_at.strftime('%Y-%m-%d')}", expanded=is_expanded):
-                        if photo.file_path and os.path.exists(photo.file_path):
-                            try:
-                                st.image(photo.file_path, caption=f"ID: {photo.id} - {photo.file_name}")
-                            except Exception as e:
-                                st.warning(f"Could not load image {photo.file_name}: {e}")
-                        else:
-                            st.warning(f"Photo file not found: {photo.file_name}")
+                        if not render_file_thumbnail(
+                            photo.file_path,
+                            photo.file_name,
+                            blob_sha256=photo.blob_sha256,
+                            caption=f"ID: {photo.id} - {photo.file_name}",
+                            large=True,
+                        ):
+                            st.warning(f"Could not load image {photo.file_name}")
+                        render_lazy_download(
+                            photo.file_path,
+                            photo.file_name,
+                            mime=photo.file_type,
+                            key=photo_key,
+                            label="Download original",
+                        )
                         if photo.description:
                             st.write("Description:")
                             st.write(photo.description)
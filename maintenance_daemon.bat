@@ -0,0 +1,43 @@
+@echo off
+REM =========================================================================
+REM  maintenance_daemon.bat
+REM
+REM  Maintenance daemon for the Experiment Tracking application. Owns
+REM  database backups, incremental snapshots, the public (Power BI) copy,
+REM  reporting-view refreshes and PRAGMA optimize.
+REM
+REM  Usage:
+REM    maintenance_daemon.bat                      - Run the daemon
+REM    maintenance_daemon.bat --run public_copy    - Run one job now and exit
+REM    maintenance_daemon.bat --request backup     - Queue a job for the daemon
+REM =========================================================================
+
+:: Change to the project directory (where this bat file lives)
+cd /d "%~dp0"
+
+:: Check if Python is available
+python --version >nul 2>&1
+if errorlevel 1 (
+    echo [ERROR] Python is not installed or not on PATH.
+    pause
+    exit /b 1
+)
+
+:: Activate virtual environment
+if exist .venv\Scripts\activate.bat (
+    call .venv\Scripts\activate
+) else (
+    echo [WARNING] Virtual environment not found at .venv - using system Python
+)
+
+python -m utils.maintenance_daemon %*
+
+:: Capture exit code
+set EXIT_CODE=%ERRORLEVEL%
+
+if %EXIT_CODE% neq 0 (
+    echo [ERROR] Maintenance daemon exited with code %EXIT_CODE%. Check logs\maintenance_daemon.log for details.
+)
+
+pause
+exit /b %EXIT_CODE%
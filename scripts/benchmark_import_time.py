@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Measure the import cost of the application entry points.
+
+Each entry point's top-level imports are extracted from its source and
+executed in a fresh interpreter with ``-X importtime``, so the numbers are
+the cold-start import cost only (no Streamlit page is rendered, no migration
+is run). For each target the script reports wall time, cumulative import
+time, the slowest top-level packages and whether any cloud storage SDK was
+pulled in.
+
+Usage:
+    python scripts/benchmark_import_time.py
+    python scripts/benchmark_import_time.py --repeat 5 --top 15
+    python scripts/benchmark_import_time.py --migration recalculate_yields_002
+"""
+
+import os
+import ast
+import sys
+import time
+import argparse
+import subprocess
+import statistics
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+DEFAULT_TARGETS = ["app.py", "run.py", "scripts/run_data_migration.py"]
+DEFAULT_MIGRATION = "recompute_calculated_fields_005"
+CLOUD_SDKS = ["boto3", "botocore", "google.cloud.storage", "azure.storage.blob"]
+
+
+def top_level_imports(path):
+    """Return the source of the module-level import statements in ``path``."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def _target_imports(target, migration):
+    statements = top_level_imports(os.path.join(project_root, target))
+    if os.path.basename(target) == "run_data_migration.py" and migration:
+        # The migration runner imports its migration module dynamically
+        migration_path = os.path.join(project_root, "database", "data_migrations", f"{migration}.py")
+        statements += top_level_imports(migration_path)
+    return statements
+
+
+def _probe_source(statements):
+    sdk_check = (
+        "import sys, json\n"
+        f"print('__SDKS__' + json.dumps([m for m in {CLOUD_SDKS!r} if m in sys.modules]))\n"
+    )
+    return f"import sys\nsys.path.insert(0, {project_root!r})\n" + "\n".join(statements) + "\n" + sdk_check
+
+
+def _parse_importtime(stderr):
+    """Map top-level package -> cumulative microseconds from ``-X importtime`` output."""
+    packages = {}
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        parts = line.split("|")
+        if len(parts) != 3:
+            continue
+        _, cumulative_us, name = parts
+        raw_name = name.rstrip()
+        depth = (len(raw_name) - len(raw_name.lstrip())) // 2
+        if depth == 0:
+            cumulative = int(cumulative_us.strip())
+            pkg = raw_name.strip().split(".")[0]
+            packages[pkg] = packages.get(pkg, 0) + cumulative
+            total += cumulative
+    return total, packages
+
+
+def measure(target, migration=DEFAULT_MIGRATION, repeat=3):
+    """Import ``target``'s dependencies ``repeat`` times in fresh interpreters.
+
+    Returns:
+        dict: wall/import timings (median, seconds), slowest packages and loaded SDKs.
+    """
+    source = _probe_source(_target_imports(target, migration))
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    walls, totals, packages, sdks = [], [], {}, []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", source],
+            cwd=project_root, env=env, capture_output=True, text=True,
+        )
+        walls.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            raise RuntimeError(f"Importing {target} failed:\n{proc.stderr[-2000:]}")
+        total, packages = _parse_importtime(proc.stderr)
+        totals.append(total / 1e6)
+        for line in proc.stdout.splitlines():
+            if line.startswith("__SDKS__"):
+                sdks = ast.literal_eval(line[len("__SDKS__"):])
+    return {
+        "target": target,
+        "wall_seconds": statistics.median(walls),
+        "import_seconds": statistics.median(totals),
+        "packages": sorted(packages.items(), key=lambda kv: kv[1], reverse=True),
+        "cloud_sdks": sdks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark entry point import time")
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS, help="Scripts relative to the project root")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per target (median is reported)")
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to list per target")
+    parser.add_argument("--migration", default=DEFAULT_MIGRATION, help="Migration module imported for run_data_migration.py")
+    args = parser.parse_args()
+
+    failed = False
+    for target in args.targets:
+        try:
+            result = measure(target, migration=args.migration, repeat=args.repeat)
+        except RuntimeError as e:
+            print(f"\n{target}: ERROR\n{e}")
+            failed = True
+            continue
+        print(f"\n{target}")
+        print(f"  wall time:   {result['wall_seconds'] * 1000:8.1f} ms (interpreter start included)")
+        print(f"  import time: {result['import_seconds'] * 1000:8.1f} ms")
+        print(f"  cloud SDKs loaded: {', '.join(result['cloud_sdks']) or 'none'}")
+        for pkg, us in result["packages"][:args.top]:
+            print(f"    {pkg:<30} {us / 1000:8.1f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
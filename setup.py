@@ -85,6 +85,9 @@ setup(
         "boto3>=1.37.38",
         "azure-storage-blob>=12.25.1",
         "apscheduler>=3.11.0",
+        "fastapi>=0.115.0",
+        "uvicorn>=0.34.0",
+        "python-multipart>=0.0.20",
     ],
     python_requires=">=3.8",
     classifiers=[
@@ -10,10 +10,12 @@ REM
 REM  Tasks created:
 REM    1. ExperimentTracker_App       - Starts Streamlit on user logon
 REM    2. ExperimentTracker_Updater   - Polls for GitHub updates every 5 min
+REM    3. ExperimentTracker_Maintenance - Backups, public DB copy, view refresh
 REM
 REM  To remove these tasks later:
 REM    schtasks /Delete /TN "ExperimentTracker_App" /F
 REM    schtasks /Delete /TN "ExperimentTracker_Updater" /F
+REM    schtasks /Delete /TN "ExperimentTracker_Maintenance" /F
 REM =========================================================================
 
 :: Check for administrator privileges
@@ -37,7 +39,7 @@ echo =========================================================================
 echo.
 
 :: --- Task 1: Start the Streamlit app on logon ---
-echo [1/2] Creating task: ExperimentTracker_App (runs on logon)...
+echo [1/3] Creating task: ExperimentTracker_App (runs on logon)...
 
 schtasks /Create /TN "ExperimentTracker_App" ^
     /TR "\"%PROJECT_DIR%\start_app.bat\"" ^
@@ -55,7 +57,7 @@ echo [OK] ExperimentTracker_App task created.
 echo.
 
 :: --- Task 2: Auto-updater polling every 5 minutes ---
-echo [2/2] Creating task: ExperimentTracker_Updater (runs on logon, polls)...
+echo [2/3] Creating task: ExperimentTracker_Updater (runs on logon, polls)...
 
 schtasks /Create /TN "ExperimentTracker_Updater" ^
     /TR "\"%PROJECT_DIR%\auto_update.bat\" --poll" ^
@@ -72,15 +74,35 @@ if errorlevel 1 (
 echo [OK] ExperimentTracker_Updater task created.
 echo.
 
+:: --- Task 3: Maintenance daemon (backups, public copy, view refresh) ---
+echo [3/3] Creating task: ExperimentTracker_Maintenance (runs on logon)...
+
+schtasks /Create /TN "ExperimentTracker_Maintenance" ^
+    /TR "\"%PROJECT_DIR%\maintenance_daemon.bat\"" ^
+    /SC ONLOGON ^
+    /RL HIGHEST ^
+    /DELAY 0001:30 ^
+    /F
+
+if errorlevel 1 (
+    echo [ERROR] Failed to create ExperimentTracker_Maintenance task.
+    pause
+    exit /b 1
+)
+echo [OK] ExperimentTracker_Maintenance task created.
+echo.
+
 echo =========================================================================
-echo  Setup complete! Both tasks will run automatically on next logon.
+echo  Setup complete! All tasks will run automatically on next logon.
 echo.
 echo  To verify:
 echo    schtasks /Query /TN "ExperimentTracker_App"
 echo    schtasks /Query /TN "ExperimentTracker_Updater"
+echo    schtasks /Query /TN "ExperimentTracker_Maintenance"
 echo.
 echo  To remove:
 echo    schtasks /Delete /TN "ExperimentTracker_App" /F
 echo    schtasks /Delete /TN "ExperimentTracker_Updater" /F
+echo    schtasks /Delete /TN "ExperimentTracker_Maintenance" /F
 echo =========================================================================
 pause
\ No newline at end of file
@@ -0,0 +1,16 @@
+from pathlib import Path
+
+import pytest
+
+_HERE = Path(__file__).resolve().parent
+
+
+def pytest_collection_modifyitems(config, items):
+    # The suite builds full-size synthetic databases; keep it out of the
+    # regular test run and only time it when asked to
+    if config.getoption("benchmark_only", default=False):
+        return
+    skip = pytest.mark.skip(reason="benchmarks only run with --benchmark-only")
+    for item in items:
+        if _HERE in Path(item.fspath).resolve().parents:
+            item.add_marker(skip)
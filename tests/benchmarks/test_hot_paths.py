@@ -0,0 +1,59 @@
+"""
+pytest-benchmark suite for the ingest, lineage and read hot paths.
+
+Times every benchmark registered in utils.benchmarks against the cached
+synthetic database for ``BENCHMARK_SCALE`` (default 1) and ``BENCHMARK_SEED``.
+Writing benchmarks get a fresh copy of the database per round; read
+benchmarks share one copy after a warm-up round. The SQL statement count and
+the number of processed items are stored in each result's ``extra_info``.
+
+Only runs with ``--benchmark-only`` (requires pytest-benchmark):
+
+    pytest tests/benchmarks --benchmark-only --benchmark-save=baseline
+    pytest tests/benchmarks --benchmark-only --benchmark-compare --benchmark-compare-fail=median:20%
+"""
+import os
+from contextlib import ExitStack
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from utils import benchmarks, query_instrumentation
+from utils.synthetic_db import build_cached_database
+
+SCALE = float(os.environ.get("BENCHMARK_SCALE", "1"))
+SEED = int(os.environ.get("BENCHMARK_SEED", "0"))
+
+
+@pytest.fixture(scope="module")
+def source_db():
+    return build_cached_database(SCALE, SEED)
+
+
+@pytest.mark.parametrize("name", list(benchmarks.BENCHMARKS))
+def test_hot_path(benchmark, name, source_db, tmp_path):
+    bench = benchmarks.BENCHMARKS[name]
+    statements = []
+
+    def run(ctx, payload):
+        with query_instrumentation.query_scope(f"bench:{name}") as stats:
+            items = bench.run(ctx, payload)
+        statements.append(stats.statement_count)
+        return items
+
+    with ExitStack() as copies:
+        ctx = copies.enter_context(benchmarks.working_copy(source_db, tmp_path))
+        payload = bench.prepare(ctx.session)
+        ctx.session.rollback()
+        if bench.writes:
+            def fresh_copy():
+                return (copies.enter_context(benchmarks.working_copy(source_db, tmp_path)), payload), {}
+
+            items = benchmark.pedantic(run, setup=fresh_copy, rounds=benchmarks.DEFAULT_REPEAT)
+        else:
+            items = benchmark.pedantic(run, args=(ctx, payload), rounds=benchmarks.DEFAULT_REPEAT,
+                                       warmup_rounds=1)
+
+    benchmark.extra_info.update(scale=SCALE, seed=SEED, statements=max(statements), items=items)
+    assert items > 0
@@ -1,11 +1,12 @@
-import os, sys
+import os, sys, tempfile
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Keep the slow-query log written by utils.query_instrumentation out of the repo
+os.environ.setdefault('QUERY_SLOW_LOG', os.path.join(tempfile.mkdtemp(prefix='slow_queries_'), 'slow_queries.log'))
 
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
-from azure.storage.blob import BlobServiceClient, BlobClient
 import datetime
 
 from database import Base, PXRFReading, Experiment, ExperimentalConditions, ExperimentalResults, ScalarResults, ICPResults
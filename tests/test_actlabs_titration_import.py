@@ -3,7 +3,10 @@ import pandas as pd
 import numpy as np
 
 from database import SampleInfo, Analyte, ElementalAnalysis
-from backend.services.bulk_uploads.actlabs_titration_data import ActlabsRockTitrationService
+from backend.services.bulk_uploads.actlabs_titration_data import (
+    ActlabsRockTitrationService,
+    ElementalCompositionService,
+)
 
 
 def _build_actlabs_like_csv_bytes():
@@ -125,3 +128,46 @@ def test_actlabs_import_skips_unknown_sample_ids(test_db):
     assert len(results) >= 2
 
 
+
+
+def test_actlabs_reimport_updates_in_place_and_flags_samples(test_db):
+    for sid in ("Rock_1", "Rock_2"):
+        test_db.add(SampleInfo(sample_id=sid))
+    test_db.commit()
+
+    payload = _build_actlabs_like_csv_bytes()
+    ActlabsRockTitrationService.import_excel(test_db, payload)
+    test_db.commit()
+    created, updated, skipped, errors = ActlabsRockTitrationService.import_excel(test_db, payload)
+    test_db.commit()
+
+    assert errors == []
+    assert (created, updated) == (0, 4)
+    assert test_db.query(ElementalAnalysis).count() == 4
+    assert all(s.characterized for s in test_db.query(SampleInfo).all())
+
+
+def test_wide_composition_upload_creates_then_updates(test_db):
+    test_db.add(SampleInfo(sample_id="Rock_1"))
+    test_db.add_all([Analyte(analyte_symbol="FeO", unit="%"), Analyte(analyte_symbol="SiO2", unit="%")])
+    test_db.commit()
+
+    def _wide_bytes(feo):
+        buf = io.BytesIO()
+        pd.DataFrame(
+            {"sample_id": ["ROCK1", "Unknown"], "FeO": [feo, 1.0], "SiO2": [np.nan, 2.0], "Bogus": [1, 1]}
+        ).to_excel(buf, index=False)
+        return buf.getvalue()
+
+    created, updated, skipped, errors = ElementalCompositionService.bulk_upsert_wide_from_excel(test_db, _wide_bytes(3.5))
+    test_db.commit()
+    assert (created, updated, skipped, errors) == (1, 0, 1, [])
+
+    created, updated, skipped, errors = ElementalCompositionService.bulk_upsert_wide_from_excel(test_db, _wide_bytes(4.0))
+    test_db.commit()
+    assert (created, updated, skipped, errors) == (0, 1, 1, [])
+
+    rows = test_db.query(ElementalAnalysis).all()
+    assert len(rows) == 1
+    assert rows[0].sample_id == "Rock_1"
+    assert rows[0].analyte_composition == 4.0
@@ -0,0 +1,116 @@
+import datetime
+import json
+
+import pyarrow.dataset as pads
+import pytest
+
+from database import (
+    Experiment, ExperimentalConditions, ExperimentalResults, ScalarResults, ICPResults,
+    ChemicalAdditive, Compound, XRDPhase, PXRFReading,
+)
+from database.event_listeners import refresh_reporting_views
+from database.models.enums import AmountUnit
+from utils.analytics_snapshot import build_snapshot, NULL_PARTITION
+
+PAST = datetime.datetime(2025, 1, 1, 12, 0, 0)
+
+
+def _experiment(db, n, prefix, date):
+    # experiment_type is inferred from the ID prefix on insert
+    exp = Experiment(experiment_id=f"{prefix}_MH_{n:03d}", experiment_number=n, date=date, created_at=PAST)
+    exp.conditions = ExperimentalConditions(experiment_id=exp.experiment_id, rock_mass_g=10.0,
+                                            water_volume_mL=100.0, created_at=PAST)
+    db.add(exp)
+    db.flush()
+    for day in (1.0, 7.0):
+        result = ExperimentalResults(experiment_fk=exp.id, time_post_reaction_days=day,
+                                     time_post_reaction_bucket_days=day, description=f"Day {day}", created_at=PAST)
+        result.scalar_data = ScalarResults(final_ph=7.0 + n, updated_at=PAST)
+        result.icp_data = ICPResults(fe=1.5 * n, all_elements={"fe": 1.5 * n, "li": 0.2}, created_at=PAST)
+        db.add(result)
+    return exp
+
+
+@pytest.fixture
+def snapshot_db(test_db):
+    compound = Compound(name="Nickel chloride", formula="NiCl2", created_at=PAST)
+    test_db.add(compound)
+    exp1 = _experiment(test_db, 1, "HPHT", datetime.datetime(2025, 3, 4))
+    exp2 = _experiment(test_db, 2, "SERUM", datetime.datetime(2025, 4, 9))
+    _experiment(test_db, 3, "MISC", None)
+    test_db.flush()
+    test_db.add(ChemicalAdditive(experiment_id=exp1.conditions.id, compound_id=compound.id, amount=5.0,
+                                 unit=AmountUnit.GRAM, created_at=PAST))
+    test_db.add(XRDPhase(experiment_fk=exp2.id, experiment_id=exp2.experiment_id, mineral_name="Quartz",
+                         amount=40.0, created_at=PAST))
+    test_db.add(XRDPhase(mineral_name="Olivine", amount=60.0, measurement_date=datetime.datetime(2024, 11, 2),
+                         created_at=PAST))  # sample-only phase, no experiment type
+    test_db.add(PXRFReading(reading_no="R1", fe=3.2, ingested_at=PAST))
+    test_db.commit()
+    refresh_reporting_views(bind=test_db.get_bind())
+    return test_db
+
+
+def _read(root, name):
+    return pads.dataset(root / name, partitioning="hive").to_table().to_pylist()
+
+
+def test_full_build_writes_typed_hive_partitions(snapshot_db, tmp_path):
+    summaries = build_snapshot(tmp_path, bind=snapshot_db.get_bind())
+
+    assert {s["mode"] for s in summaries.values()} == {"full"}
+    assert (tmp_path / "primary_results" / "experiment_type=HPHT" / "month=2025-03" / "part-0.parquet").exists()
+    assert (tmp_path / "primary_results" / "experiment_type=Other" / "month=2025-01").exists()
+    assert (tmp_path / "xrd" / f"experiment_type={NULL_PARTITION}" / "month=2024-11").exists()
+    assert (tmp_path / "pxrf" / "month=2025-01" / "part-0.parquet").exists()
+
+    rows = _read(tmp_path, "primary_results")
+    assert len(rows) == 6
+    hpht = sorted((r for r in rows if r["experiment_type"] == "HPHT"), key=lambda r: r["time_post_reaction_days"])
+    assert [r["final_ph"] for r in hpht] == [8.0, 8.0]
+    assert isinstance(hpht[0]["result_created_at"], datetime.datetime)
+
+    elements = _read(tmp_path, "icp_elements")
+    assert sorted({r["element"] for r in elements}) == ["fe", "li"] and len(elements) == 12
+    additives = _read(tmp_path, "additives")
+    assert additives[0]["compound_name"] == "Nickel chloride" and additives[0]["unit"] == "g"
+    assert sorted((r["mineral_name"], r["experiment_type"]) for r in _read(tmp_path, "xrd")) == [
+        ("Olivine", None), ("Quartz", "Serum")]
+
+    state = json.loads((tmp_path / "_snapshot_state.json").read_text())
+    assert state["datasets"]["primary_results"]["watermark"].startswith("2025-01-01")
+
+
+def test_incremental_run_rewrites_only_changed_rows(snapshot_db, tmp_path):
+    bind = snapshot_db.get_bind()
+    build_snapshot(tmp_path, bind=bind)
+    untouched = tmp_path / "primary_results" / "experiment_type=Serum" / "month=2025-04" / "part-0.parquet"
+    untouched_mtime = untouched.stat().st_mtime_ns
+
+    # Edit a scalar value, move experiment 1 to another type, delete experiment 3
+    scalar = snapshot_db.query(ScalarResults).join(ExperimentalResults).filter(
+        ExperimentalResults.experiment_fk == 1).first()
+    scalar.final_ph = 5.5
+    snapshot_db.query(ExperimentalConditions).filter_by(experiment_fk=1).one().experiment_type = "Autoclave"
+    snapshot_db.delete(snapshot_db.get(Experiment, 3))
+    snapshot_db.commit()
+
+    summaries = build_snapshot(tmp_path, datasets=["primary_results"], bind=bind)
+
+    summary = summaries["primary_results"]
+    assert summary["mode"] == "incremental"
+    assert summary["changed"] == 2 and summary["deleted"] == 2
+    assert untouched.stat().st_mtime_ns == untouched_mtime
+    assert not (tmp_path / "primary_results" / "experiment_type=HPHT").exists()
+    assert not (tmp_path / "primary_results" / "experiment_type=Other").exists()
+
+    rows = _read(tmp_path, "primary_results")
+    assert len(rows) == 4
+    moved = [r for r in rows if r["experiment_fk"] == 1]
+    assert {r["experiment_type"] for r in moved} == {"Autoclave"}
+    assert sorted(r["final_ph"] for r in moved) == [5.5, 8.0]
+
+
+def test_unknown_dataset_is_rejected(tmp_path, test_db):
+    with pytest.raises(ValueError):
+        build_snapshot(tmp_path, datasets=["nope"], bind=test_db.get_bind())
@@ -0,0 +1,130 @@
+import datetime
+
+import pytest
+
+from database import Experiment, ExperimentalResults, ScalarResults, SampleInfo, PXRFReading, ExperimentStatus
+from backend.api import resources
+from backend.api.resources import RESOURCES
+
+PAST = datetime.datetime(2025, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def api_db(test_db):
+    for n in range(1, 8):
+        exp = Experiment(experiment_id=f"HPHT_MH_{n:03d}", experiment_number=n, researcher="MH",
+                         status=ExperimentStatus.COMPLETED if n % 2 else ExperimentStatus.ONGOING, created_at=PAST)
+        test_db.add(exp)
+        test_db.flush()
+        for day in (7.0, 1.0):
+            result = ExperimentalResults(experiment_fk=exp.id, time_post_reaction_days=day,
+                                         time_post_reaction_bucket_days=day, description=f"Day {day}", created_at=PAST)
+            result.scalar_data = ScalarResults(final_ph=7.0 + day / 10, updated_at=PAST)
+            test_db.add(result)
+    test_db.add(SampleInfo(sample_id="ME00001", country="USA", state="ME", created_at=PAST))
+    test_db.add(PXRFReading(reading_no="1001", fe=3.2, ingested_at=PAST))
+    test_db.commit()
+    return test_db
+
+
+def test_keyset_pages_cover_collection_with_projection(api_db):
+    resource = RESOURCES["experiments"]
+    fields = resources.parse_fields(resource, "experiment_id,status")
+    assert fields == ["id", "experiment_id", "status"]
+
+    seen, cursor = [], None
+    while True:
+        page = resources.fetch_page(api_db, resource, fields, after=cursor, limit=3)
+        assert all(set(row) == {"id", "experiment_id", "status"} for row in page.rows)
+        seen.extend(row["id"] for row in page.rows)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == list(range(1, 8))
+    assert {row["status"] for row in resources.fetch_page(api_db, resource, fields).rows} == {"COMPLETED", "ONGOING"}
+
+    with pytest.raises(ValueError):
+        resources.parse_fields(resource, "experiment_id,nope")
+    with pytest.raises(ValueError):
+        resources.fetch_page(api_db, resource, after="not-a-cursor")
+
+
+def test_filters_are_coerced_and_series_is_time_ordered(api_db):
+    experiments = RESOURCES["experiments"]
+    filters = resources.parse_filters(experiments, {"status": "ongoing", "fields": "id"})
+    rows = resources.fetch_page(api_db, experiments, ["id"], filters).rows
+    assert [r["id"] for r in rows] == [2, 4, 6]
+    with pytest.raises(ValueError):
+        resources.parse_filters(experiments, {"status": "bogus"})
+
+    results = RESOURCES["results"]
+    series = resources.fetch_rows(api_db, results, ["result_id", "time_post_reaction_days", "final_ph"],
+                                  {"experiment_id": "HPHT_MH_002"}, order_by=["time_post_reaction_days"])
+    assert [r["time_post_reaction_days"] for r in series] == [1.0, 7.0]
+    assert series[0]["final_ph"] == pytest.approx(7.1)
+
+
+def test_collection_version_changes_on_update_insert_and_delete(api_db):
+    resource = RESOURCES["results"]
+    filters = {"experiment_id": "HPHT_MH_001"}
+    v1 = resources.collection_version(api_db, resource, filters)
+    etag = resources.make_etag(resource, v1, ["result_id"])
+    assert resources.etag_matches(f'"x", {etag[2:]}', etag)
+    assert resources.collection_version(api_db, resource, {"experiment_id": "HPHT_MH_002"}) != v1
+
+    scalar = api_db.query(ScalarResults).join(ExperimentalResults).filter(ExperimentalResults.experiment_fk == 1).first()
+    scalar.final_ph = 9.9
+    api_db.commit()
+    v2 = resources.collection_version(api_db, resource, filters)
+    assert v2 != v1
+
+    api_db.delete(api_db.query(ExperimentalResults).filter_by(experiment_fk=1).first())
+    api_db.commit()
+    v3 = resources.collection_version(api_db, resource, filters)
+    assert v3 != v2 and v3[0] == 1
+    assert not resources.etag_matches(etag, resources.make_etag(resource, v3, ["result_id"]))
+
+
+def test_http_endpoints(api_db, monkeypatch):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from database import get_db
+    from backend.api import routes
+    from backend.api.app import create_app
+
+    monkeypatch.setattr(routes, "API_TOKENS", {"secret": "instrument-1"})
+    app = create_app()
+    app.dependency_overrides[get_db] = lambda: api_db
+    client = TestClient(app)
+    auth = {"Authorization": "Bearer secret"}
+
+    assert client.get("/api/v1/experiments").status_code == 401
+
+    first = client.get("/api/v1/experiments", params={"limit": 5, "fields": "experiment_id"}, headers=auth)
+    assert first.status_code == 200
+    body = first.json()
+    assert len(body["data"]) == 5 and body["next_cursor"] and 'rel="next"' in first.headers["link"]
+
+    cached = client.get("/api/v1/experiments", params={"limit": 5, "fields": "experiment_id"},
+                        headers={**auth, "If-None-Match": first.headers["etag"]})
+    assert cached.status_code == 304
+
+    series = client.get("/api/v1/experiments/HPHT_MH_003/results", params={"fields": "time_post_reaction_days"},
+                        headers={**auth, "Accept-Encoding": "gzip"})
+    assert [r["time_post_reaction_days"] for r in series.json()["data"]] == [1.0, 7.0]
+    assert client.get("/api/v1/experiments/NOPE/results", headers=auth).status_code == 404
+    assert client.get("/api/v1/experiments", params={"fields": "nope"}, headers=auth).status_code == 400
+    assert client.get("/api/v1/uploads/nope", headers=auth).status_code in (404, 405)
+
+    ts = client.get("/api/v1/timeseries", params={"experiment_id": "HPHT_MH_001,HPHT_MH_002", "metrics": "final_ph",
+                                                  "time_axis": "bucket"}, headers=auth)
+    assert ts.json()["data"]["times"] == [1.0, 7.0] and len(ts.json()["data"]["values"]) == 2
+    assert client.get("/api/v1/timeseries", params={"experiment_id": "HPHT_MH_001", "metrics": "nope"},
+                      headers=auth).status_code == 400
+
+    comparison = client.get("/api/v1/comparison", params={"experiment_id": "HPHT_MH_002,HPHT_MH_001,NOPE"}, headers=auth)
+    body = comparison.json()
+    assert [r["experiment_id"] for r in body["data"]] == ["HPHT_MH_002", "HPHT_MH_001"]
+    assert body["missing_experiments"] == ["NOPE"] and body["data"][0]["final_ph [final]"] == pytest.approx(7.7)
+    xlsx = client.get("/api/v1/comparison", params={"experiment_id": "HPHT_MH_001", "format": "xlsx"}, headers=auth)
+    assert xlsx.status_code == 200 and xlsx.content[:2] == b"PK"
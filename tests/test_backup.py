@@ -12,7 +12,14 @@ from urllib.parse import urlparse
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.database_backup import create_archived_backup, update_public_db_copy, cleanup_old_backups
+from utils.database_backup import (
+    create_archived_backup,
+    update_public_db_copy,
+    cleanup_old_backups,
+    sqlite_online_backup,
+    verify_sqlite_database,
+    restore_database_backup,
+)
 from utils.scheduler import setup_backup_scheduler, shutdown_scheduler, create_backup_now, create_public_copy_now
 
 
@@ -275,7 +282,7 @@ def test_update_public_db_copy_no_env_var(mock_environ):
     result = update_public_db_copy()
     assert result is None
 
-@patch("utils.database_backup.shutil.copy2")
+@patch("utils.database_backup.sqlite_online_backup")
 def test_create_archived_backup_exception(mock_copy, mock_get_config, temp_dirs):
     """Test that create_archived_backup handles exceptions during copy."""
     # Mock the storage config
@@ -294,7 +301,7 @@ def test_create_archived_backup_exception(mock_copy, mock_get_config, temp_dirs)
         with pytest.raises(Exception):
             create_archived_backup()
 
-@patch("utils.database_backup.shutil.copy2")
+@patch("utils.database_backup.sqlite_online_backup")
 def test_update_public_db_copy_exception(mock_copy, mock_environ, temp_dirs):
     """Test that update_public_db_copy handles exceptions during copy."""
     # Mock the environment variables
@@ -303,3 +310,109 @@ def test_update_public_db_copy_exception(mock_copy, mock_environ, temp_dirs):
     # Call the function
     result = update_public_db_copy()
     assert result is None
+
+
+def test_online_backup_includes_wal_content(temp_dirs):
+    """Committed rows still in the -wal file are part of the backup."""
+    writer = sqlite3.connect(temp_dirs['db_path'])
+    writer.execute("PRAGMA journal_mode=WAL")
+    writer.execute("PRAGMA wal_autocheckpoint=0")
+    writer.executemany("INSERT INTO test (name) VALUES (?)", [(f"row_{i}",) for i in range(500)])
+    writer.commit()
+
+    dest = Path(temp_dirs['public_dir']) / "copy.db"
+    try:
+        sqlite_online_backup(temp_dirs['db_path'], dest, pages_per_step=1, step_sleep=0)
+    finally:
+        writer.close()
+
+    conn = sqlite3.connect(dest)
+    assert conn.execute("SELECT COUNT(*) FROM test").fetchone()[0] == 501
+    conn.close()
+    assert not Path(str(dest) + ".partial").exists()
+
+
+def test_online_backup_leaves_no_partial_file_on_failure(temp_dirs):
+    dest = Path(temp_dirs['public_dir']) / "copy.db"
+    with patch("utils.database_backup.verify_sqlite_database", side_effect=RuntimeError("corrupt")):
+        with pytest.raises(RuntimeError):
+            sqlite_online_backup(temp_dirs['db_path'], dest)
+    assert not dest.exists()
+    assert list(Path(temp_dirs['public_dir']).iterdir()) == []
+
+
+def test_verify_sqlite_database_rejects_garbage(temp_dirs):
+    bogus = Path(temp_dirs['public_dir']) / "bogus.db"
+    bogus.write_bytes(b"not a database" * 100)
+    with pytest.raises(Exception):
+        verify_sqlite_database(bogus)
+
+
+def test_restore_database_backup_overwrites_live_db(temp_dirs):
+    backup = Path(temp_dirs['public_dir']) / "backup.db"
+    sqlite_online_backup(temp_dirs['db_path'], backup)
+
+    conn = sqlite3.connect(temp_dirs['db_path'])
+    conn.execute("DELETE FROM test")
+    conn.commit()
+    conn.close()
+
+    restore_database_backup(backup, temp_dirs['db_path'])
+
+    conn = sqlite3.connect(temp_dirs['db_path'])
+    assert conn.execute("SELECT name FROM test").fetchall() == [("test_data",)]
+    conn.close()
+
+
+@pytest.fixture
+def publish_source(tmp_path, monkeypatch):
+    db_path = tmp_path / "experiments.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE experiments (id INTEGER PRIMARY KEY, experiment_id TEXT)")
+    conn.execute("CREATE TABLE modifications_log (id INTEGER PRIMARY KEY, note TEXT)")
+    conn.execute("CREATE TABLE helper_lookup (id INTEGER PRIMARY KEY, label TEXT)")
+    conn.execute(
+        "CREATE VIEW v_primary_experiment_results AS "
+        "SELECT e.experiment_id, h.label FROM experiments e LEFT JOIN helper_lookup h ON h.id = e.id"
+    )
+    conn.execute("CREATE VIEW v_private AS SELECT * FROM modifications_log")
+    conn.execute("INSERT INTO experiments (experiment_id) VALUES ('HPHT_001')")
+    conn.execute("INSERT INTO modifications_log (note) VALUES ('internal')")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr("utils.database_backup._get_source_db_path", lambda: db_path)
+    return db_path
+
+
+def test_update_public_db_copy_skips_unchanged_source(publish_source, tmp_path):
+    public_dir = tmp_path / "public"
+    first = Path(update_public_db_copy(str(public_dir)))
+    inode = first.stat().st_ino
+
+    # No changes: the published file is left untouched
+    assert update_public_db_copy(str(public_dir)) == str(first)
+    assert first.stat().st_ino == inode
+
+    conn = sqlite3.connect(publish_source)
+    conn.execute("INSERT INTO experiments (experiment_id) VALUES ('HPHT_002')")
+    conn.commit()
+    conn.close()
+
+    update_public_db_copy(str(public_dir))
+    assert first.stat().st_ino != inode
+    conn = sqlite3.connect(first)
+    assert conn.execute("SELECT COUNT(*) FROM experiments").fetchone()[0] == 2
+    conn.close()
+    assert not list(public_dir.glob(".*staging*"))
+
+
+def test_update_public_db_copy_publishes_slim_reporting_copy(publish_source, tmp_path):
+    public_dir = tmp_path / "public"
+    update_public_db_copy(str(public_dir), slim=True)
+
+    slim = public_dir / "experiments_reporting.db"
+    conn = sqlite3.connect(slim)
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")}
+    assert names == {"experiments", "helper_lookup", "v_primary_experiment_results"}
+    assert conn.execute("SELECT experiment_id FROM v_primary_experiment_results").fetchall() == [("HPHT_001",)]
+    conn.close()
@@ -0,0 +1,111 @@
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+import utils.backup_store as backup_store
+from utils.backup_store import BackupStore
+
+
+@pytest.fixture
+def source_db(tmp_path):
+    db_path = tmp_path / "experiments.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE test (id INTEGER PRIMARY KEY, payload TEXT)")
+    conn.executemany(
+        "INSERT INTO test (payload) VALUES (?)",
+        [(f"row-{i}-" + "x" * 200,) for i in range(2000)],
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Small chunks so a single-row edit touches only a fraction of the file
+    monkeypatch.setattr(backup_store, "PAGES_PER_CHUNK", 4)
+    return BackupStore(tmp_path / "store")
+
+
+def _rows(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT payload FROM test ORDER BY id").fetchall()
+    conn.close()
+    return rows
+
+
+def test_second_snapshot_only_stores_changed_chunks(store, source_db):
+    first = store.create_snapshot(source_db)
+    assert first["new_chunks"] == len(set(first["chunks"]))
+
+    conn = sqlite3.connect(source_db)
+    conn.execute("UPDATE test SET payload = 'edited' WHERE id = 1500")
+    conn.commit()
+    conn.close()
+
+    second = store.create_snapshot(source_db)
+    assert second["snapshot_id"] != first["snapshot_id"]
+    assert 0 < second["new_chunks"] < len(second["chunks"]) // 2
+    assert len(store.list_snapshots()) == 2
+
+
+def test_materialize_and_restore_to_point(store, source_db, tmp_path):
+    original = _rows(source_db)
+    first = store.create_snapshot(source_db)
+
+    conn = sqlite3.connect(source_db)
+    conn.execute("DELETE FROM test WHERE id > 10")
+    conn.commit()
+    conn.close()
+    store.create_snapshot(source_db)
+
+    exported = store.materialize(first["snapshot_id"], tmp_path / "exported.db")
+    assert _rows(exported) == original
+
+    store.restore(as_of=datetime.fromisoformat(first["created_at"]), db_path=source_db)
+    assert _rows(source_db) == original
+
+
+def test_corrupt_chunk_is_detected(store, source_db, tmp_path):
+    manifest = store.create_snapshot(source_db)
+    chunk = next(p for p in store.chunks_dir.glob("*/*") if p.name.startswith(manifest["chunks"][0]))
+    chunk.write_bytes(backup_store._compress(b"tampered")[1])
+
+    with pytest.raises(RuntimeError):
+        store.materialize(manifest["snapshot_id"], tmp_path / "out.db")
+    assert not (tmp_path / "out.db").exists()
+
+
+def test_retention_keeps_newest_per_bucket_and_collects_chunks(store, source_db):
+    store.create_snapshot(source_db)
+    manifests_dir = store.snapshots_dir
+
+    # Re-date snapshots: three in the same hour today, one per day for the previous week
+    base = json.loads(next(manifests_dir.glob("*.json")).read_text())
+    now = datetime.now().replace(minute=30)
+    stamps = [now - timedelta(minutes=m) for m in (0, 5, 10)]
+    stamps += [now - timedelta(days=d) for d in range(1, 8)]
+    for p in manifests_dir.glob("*.json"):
+        p.unlink()
+    for when in stamps:
+        sid = when.strftime(backup_store.SNAPSHOT_ID_FORMAT)
+        m = dict(base, snapshot_id=sid, created_at=when.isoformat())
+        (manifests_dir / f"{sid}.json").write_text(json.dumps(m))
+    orphan = store.chunks_dir / "zz" / ("f" * 64 + ".gz")
+    orphan.parent.mkdir(parents=True)
+    orphan.write_bytes(b"orphan")
+
+    removed = store.apply_retention(keep_hourly=2, keep_daily=3, keep_weekly=1)
+
+    remaining = [m["created_at"] for m in store.list_snapshots()]
+    # Hourly keeps now and 1 day ago (the next distinct hour); daily keeps
+    # now, 1 and 2 days ago; weekly keeps now. Older days go.
+    assert sorted(remaining) == sorted(
+        t.isoformat() for t in (now, now - timedelta(days=1), now - timedelta(days=2))
+    )
+    assert len(removed) == len(stamps) - 3
+    assert not orphan.exists()
+    assert store.materialize(store.list_snapshots()[-1]["snapshot_id"], Path(store.root) / "check.db")
@@ -0,0 +1,69 @@
+import copy
+import hashlib
+import json
+
+import pytest
+
+from utils import benchmarks, query_instrumentation as qi
+from utils.synthetic_db import build_cached_database
+
+
+def _results(**medians):
+    return {
+        "format": benchmarks.RESULTS_FORMAT, "scale": 1.0, "seed": 0, "repeat": 3,
+        "benchmarks": {name: {"median_ms": ms, "statements": 10} for name, ms in medians.items()},
+    }
+
+
+def test_compare_flags_regressions_past_threshold_and_noise_floor():
+    baseline = _results(slow=100.0, tiny=1.0, fast=100.0, gone=50.0)
+    current = _results(slow=130.0, tiny=2.0, fast=60.0, added=5.0)
+    current["benchmarks"]["queries"] = {"median_ms": 10.0, "statements": 30}
+    baseline["benchmarks"]["queries"] = {"median_ms": 10.0, "statements": 10}
+
+    rows = {r["name"]: r for r in benchmarks.compare_results(current, baseline, threshold=0.2, noise_floor_ms=5)}
+
+    assert rows["slow"]["status"] == "regression" and rows["slow"]["change"] == pytest.approx(0.3)
+    assert rows["tiny"]["status"] == "ok"  # +100% but below the noise floor
+    assert rows["fast"]["status"] == "improved"
+    assert rows["queries"]["status"] == "regression"  # same time, 3x the statements
+    assert rows["gone"]["status"] == "missing" and rows["added"]["status"] == "new"
+
+    other_scale = copy.deepcopy(current)
+    other_scale["scale"] = 10.0
+    with pytest.raises(ValueError):
+        benchmarks.compare_results(other_scale, baseline)
+
+
+def test_compare_command_exit_code(tmp_path, capsys):
+    baseline = benchmarks.save_results(_results(a=100.0), tmp_path / "baseline.json")
+    ok = benchmarks.save_results(_results(a=105.0), tmp_path / "ok.json")
+    slow = benchmarks.save_results(_results(a=200.0), tmp_path / "slow.json")
+
+    assert benchmarks.main(["compare", str(ok), str(baseline)]) == 0
+    assert benchmarks.main(["compare", str(slow), str(baseline)]) == 1
+    assert "FAILED: 1 regression(s): a" in capsys.readouterr().out
+    assert benchmarks.main(["compare", str(slow), str(tmp_path / "missing.json")]) == 2
+
+
+def test_suite_runs_on_synthetic_database_without_modifying_it(tmp_path, monkeypatch):
+    monkeypatch.setattr(qi, "SLOW_QUERY_LOG", tmp_path / "slow.log")
+    monkeypatch.setattr(qi, "_slow_logger", None)
+    source = build_cached_database(scale=0.02, seed=3, cache_dir=tmp_path)
+    digest = hashlib.sha256(source.read_bytes()).hexdigest()
+
+    results = benchmarks.run_suite(
+        scale=0.02, seed=3, repeat=2, cache_dir=tmp_path,
+        only=["pxrf_ingest", "cumulative_times_chain", "view_experiments_page", "primary_results_view"],
+    )
+
+    assert hashlib.sha256(source.read_bytes()).hexdigest() == digest
+    for name, result in results["benchmarks"].items():
+        assert result["runs"] == 2 and result["median_ms"] > 0, name
+        assert result["items"] > 0 and result["statements"] > 0, name
+    assert results["benchmarks"]["pxrf_ingest"]["items"] == benchmarks.PXRF_READINGS
+
+    saved = benchmarks.save_results(results, tmp_path / "latest.json")
+    assert benchmarks.load_results(saved) == json.loads(json.dumps(results))
+    with pytest.raises(ValueError):
+        benchmarks.run_suite(scale=0.02, seed=3, only=["nope"], cache_dir=tmp_path)
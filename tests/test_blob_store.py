@@ -0,0 +1,121 @@
+import os
+from datetime import timedelta
+
+import pytest
+
+import utils.storage as storage
+from database import SampleInfo, SamplePhotos, StoredBlob, ExternalAnalysis, AnalysisFiles
+from backend.services.blob_store import BlobStore, content_hash
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "get_storage_config", lambda: {
+        "type": "local", "base_path": str(tmp_path / "uploads"), "backup_directory": str(tmp_path / "backups"),
+    })
+    return tmp_path / "uploads"
+
+
+def _blob(db, sha):
+    db.expire_all()
+    return db.get(StoredBlob, sha)
+
+
+def test_identical_files_are_stored_once_and_released_on_last_delete(test_db, local_storage):
+    test_db.add_all([SampleInfo(sample_id="S1"), SampleInfo(sample_id="S2")])
+    test_db.commit()
+    data = b"%PDF-1.4 same report"
+    sha = content_hash(data)
+
+    photos = []
+    for sid in ("S1", "S2"):
+        blob = BlobStore.store(test_db, data, "report.PDF", mime_type="application/pdf")
+        photo = SamplePhotos(sample_id=sid, file_name="report.PDF", file_path=blob.file_path, blob_sha256=blob.sha256)
+        test_db.add(photo)
+        photos.append(photo)
+    test_db.commit()
+
+    stored = [p for p in local_storage.rglob("*") if p.is_file()]
+    assert [p.name for p in stored] == [f"{sha}.pdf"]
+    assert _blob(test_db, sha).ref_count == 2
+
+    test_db.delete(photos[0])
+    test_db.commit()
+    assert _blob(test_db, sha).ref_count == 1
+    assert stored[0].exists()
+
+    test_db.delete(photos[1])
+    test_db.commit()
+    assert _blob(test_db, sha) is None
+    assert not stored[0].exists()
+
+
+def test_rollback_keeps_released_blob(test_db, local_storage):
+    test_db.add(SampleInfo(sample_id="S1"))
+    test_db.commit()
+    blob = BlobStore.store(test_db, b"img", "a.jpg")
+    photo = SamplePhotos(sample_id="S1", file_path=blob.file_path, blob_sha256=blob.sha256)
+    test_db.add(photo)
+    test_db.commit()
+
+    test_db.delete(photo)
+    test_db.flush()
+    test_db.rollback()
+
+    assert _blob(test_db, blob.sha256).ref_count == 1
+    assert os.path.exists(blob.file_path)
+
+
+def test_cascade_delete_and_garbage_collection(test_db, local_storage):
+    test_db.add(SampleInfo(sample_id="S1"))
+    analysis = ExternalAnalysis(sample_id="S1", analysis_type="XRD")
+    test_db.add(analysis)
+    test_db.flush()
+    kept, orphan = BlobStore.store_many(test_db, [(b"pattern", "scan.xy", None), (b"unused", "x.bin", None)])
+    test_db.add(AnalysisFiles(external_analysis_id=analysis.id, file_path=kept.file_path, blob_sha256=kept.sha256))
+    test_db.commit()
+    kept_sha, orphan_sha, orphan_path = kept.sha256, orphan.sha256, orphan.file_path
+    assert _blob(test_db, kept_sha).ref_count == 1
+
+    # Deleting the analysis cascades to its files and releases the blob
+    test_db.delete(test_db.get(ExternalAnalysis, analysis.id))
+    test_db.commit()
+    assert _blob(test_db, kept_sha) is None
+
+    # The never-referenced blob is kept until it is old enough to collect
+    assert BlobStore.collect_garbage(test_db) == []
+    assert BlobStore.collect_garbage(test_db, min_age=timedelta(0)) == [orphan_sha]
+    test_db.commit()
+    assert _blob(test_db, orphan_sha) is None
+    assert not os.path.exists(orphan_path)
+
+
+def test_legacy_migration_keeps_originals_still_referenced(test_db, local_storage, monkeypatch):
+    import database.data_migrations.content_address_files_014 as migration
+
+    test_db.add(SampleInfo(sample_id="S1"))
+    shared = storage.save_file(b"shared photo", "shared.jpg", folder="sample_photos/S1", create_backup=False)
+    own = storage.save_file(b"own photo", "own.jpg", folder="sample_photos/S1", create_backup=False)
+    test_db.add_all([
+        SamplePhotos(sample_id="S1", file_path=shared),
+        SamplePhotos(sample_id="S1", file_path=shared),
+        SamplePhotos(sample_id="S1", file_path=own),
+    ])
+    test_db.commit()
+
+    # The second row sharing the path cannot be read and stays unconverted
+    reads = []
+
+    def flaky_get(path):
+        reads.append(path)
+        if path == shared and reads.count(shared) == 2:
+            raise OSError("transient read error")
+        return storage.get_file(path)
+
+    monkeypatch.setattr(migration, "get_file", flaky_get)
+    stats = migration.convert_legacy_files(test_db, dry_run=False)
+
+    assert (stats["converted"], stats["unreadable"], stats["kept_shared"]) == (2, 1, 1)
+    assert stats["originals"] == {own}
+    migration.remove_originals(stats["originals"])
+    assert os.path.exists(shared) and not os.path.exists(own)
@@ -0,0 +1,67 @@
+from sqlalchemy import event
+
+from database import SampleInfo, ExternalAnalysis, ElementalAnalysis, Analyte
+
+
+def _characterized(db, sample_id):
+    db.expire_all()
+    return db.get(SampleInfo, sample_id).characterized
+
+
+def test_flags_follow_xrd_and_titration_rows(test_db):
+    test_db.add_all([SampleInfo(sample_id=s) for s in ("S1", "S2", "S3")])
+    analyte = Analyte(analyte_symbol="FeO", unit="%")
+    test_db.add(analyte)
+    test_db.commit()
+
+    xrd = ExternalAnalysis(sample_id="S1", analysis_type="XRD")
+    titration_parent = ExternalAnalysis(sample_id="S2", analysis_type="Elemental")
+    test_db.add_all([xrd, titration_parent])
+    test_db.flush()
+    test_db.add(ElementalAnalysis(
+        external_analysis_id=titration_parent.id,
+        sample_id="S2",
+        analyte_id=analyte.id,
+        analyte_composition=1.0,
+    ))
+    test_db.commit()
+
+    assert _characterized(test_db, "S1") is True
+    assert _characterized(test_db, "S2") is True
+    assert _characterized(test_db, "S3") is False
+
+    # Moving the XRD analysis to another sample updates both samples
+    xrd = test_db.get(ExternalAnalysis, xrd.id)
+    xrd.sample_id = "S3"
+    test_db.commit()
+    assert _characterized(test_db, "S1") is False
+    assert _characterized(test_db, "S3") is True
+
+    # Deleting the last titration row clears the flag
+    for ea in test_db.query(ElementalAnalysis).filter_by(sample_id="S2").all():
+        test_db.delete(ea)
+    test_db.commit()
+    assert _characterized(test_db, "S2") is False
+
+
+def test_recompute_query_count_is_independent_of_sample_count(test_db):
+    sample_ids = [f"BULK_{i:03d}" for i in range(200)]
+    test_db.add_all([SampleInfo(sample_id=s) for s in sample_ids])
+    test_db.commit()
+
+    selects = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    engine = test_db.get_bind()
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        test_db.add_all([ExternalAnalysis(sample_id=s, analysis_type="XRD") for s in sample_ids])
+        test_db.commit()
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+
+    assert len(selects) < 10
+    assert all(_characterized(test_db, s) for s in sample_ids[:5])
@@ -0,0 +1,123 @@
+import io
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from sqlalchemy import event
+
+from database import (
+    Experiment, ExperimentalConditions, ExperimentalResults, ScalarResults, ICPResults,
+    ChemicalAdditive, Compound, ExperimentStatus,
+)
+from database.models.enums import AmountUnit
+from backend.services.comparison_matrix import build_comparison_matrix, export_comparison_matrix
+
+
+def _add_experiment(db, n, compounds, additives=(), results=()):
+    exp = Experiment(experiment_id=f"HPHT_MH_{n:03d}", experiment_number=n, researcher="MH",
+                     status=ExperimentStatus.COMPLETED)
+    db.add(exp)
+    db.flush()
+    conditions = ExperimentalConditions(experiment_id=exp.experiment_id, experiment_fk=exp.id,
+                                        rock_mass_g=10.0 * n, temperature_c=90.0, particle_size="<75",
+                                        catalyst="legacy")
+    db.add(conditions)
+    db.flush()
+    for order, (name, amount, unit) in enumerate(additives, start=1):
+        db.add(ChemicalAdditive(experiment_id=conditions.id, compound_id=compounds[name].id, amount=amount,
+                                unit=unit, addition_order=order))
+    for day, gpt, fe in results:
+        result = ExperimentalResults(experiment_fk=exp.id, time_post_reaction_days=day,
+                                     time_post_reaction_bucket_days=day, description=f"Day {day}")
+        if gpt is not None:
+            result.scalar_data = ScalarResults(grams_per_ton_yield=gpt)
+        if fe is not None:
+            result.icp_data = ICPResults(fe=fe)
+        db.add(result)
+    return exp
+
+
+@pytest.fixture
+def compounds(test_db):
+    compounds = {name: Compound(name=name) for name in ("Magnetite", "Sodium Bicarbonate")}
+    test_db.add_all(compounds.values())
+    test_db.flush()
+    return compounds
+
+
+def test_matrix_contents(test_db, compounds):
+    _add_experiment(test_db, 1, compounds,
+                    additives=[("Magnetite", 0.5, AmountUnit.GRAM), ("Sodium Bicarbonate", 20, AmountUnit.MILLIMOLAR)],
+                    results=[(1.0, 10.0, 3.0), (7.0, 40.0, None), (14.0, 25.0, None)])
+    _add_experiment(test_db, 2, compounds, additives=[("Magnetite", 1.0, AmountUnit.GRAM)],
+                    results=[(3.0, None, 8.0)])
+    _add_experiment(test_db, 3, compounds)
+    test_db.commit()
+
+    matrix, missing = build_comparison_matrix(test_db, ["HPHT_MH_003", "HPHT_MH_001", "NOPE", "HPHT_MH_002"])
+    assert missing == ["NOPE"]
+    assert matrix.index.tolist() == ["HPHT_MH_003", "HPHT_MH_001", "HPHT_MH_002"]
+
+    one = matrix.loc["HPHT_MH_001"]
+    assert one["status"] == "COMPLETED" and one["rock_mass_g"] == 10.0 and "catalyst" not in matrix.columns
+    assert one["additives_summary"] == "Magnetite 0.5 g; Sodium Bicarbonate 20 mM"
+    assert one["additive: Magnetite (g)"] == 0.5 and matrix.loc["HPHT_MH_002", "additive: Magnetite (g)"] == 1.0
+    assert one["last_timepoint_days"] == 14.0
+    assert one["grams_per_ton_yield [final]"] == 25.0 and one["grams_per_ton_yield [max]"] == 40.0
+    assert one["icp_fe_ppm [final]"] == 3.0 and matrix.loc["HPHT_MH_002", "icp_fe_ppm [final]"] == 8.0
+    assert "icp_si_ppm [final]" not in matrix.columns
+    assert pd.isna(matrix.loc["HPHT_MH_003", "additives_summary"])
+
+    with pytest.raises(ValueError):
+        build_comparison_matrix(test_db, ["HPHT_MH_001"], yield_metrics=["nope"])
+
+    parquet = pd.read_parquet(io.BytesIO(export_comparison_matrix(matrix, "parquet")))
+    assert parquet.index.tolist() == matrix.index.tolist()
+    assert parquet.loc["HPHT_MH_001", "particle_size"] == "<75"
+
+    sheet = load_workbook(io.BytesIO(export_comparison_matrix(matrix, "xlsx", transpose=True)))["Comparison"]
+    assert [c.value for c in sheet[1]][:4] == ["field", "HPHT_MH_003", "HPHT_MH_001", "HPHT_MH_002"]
+    with pytest.raises(ValueError):
+        export_comparison_matrix(matrix, "csv")
+
+
+def test_query_count_does_not_grow_with_experiments(test_db, compounds):
+    for n in range(1, 26):
+        _add_experiment(test_db, n, compounds, additives=[("Magnetite", n, AmountUnit.GRAM)],
+                        results=[(1.0, float(n), 1.0), (7.0, 2.0 * n, None)])
+    test_db.commit()
+
+    statements = []
+    engine = test_db.get_bind()
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        counts = []
+        for n in (2, 25):
+            statements.clear()
+            matrix, _ = build_comparison_matrix(test_db, [f"HPHT_MH_{i:03d}" for i in range(1, n + 1)])
+            assert len(matrix) == n
+            counts.append(len(statements))
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert counts[0] == counts[1] <= 6
+    assert matrix.loc["HPHT_MH_025", "grams_per_ton_yield [max]"] == 50.0
+
+
+def test_experiment_lookups_are_chunked(test_db, compounds, monkeypatch):
+    from functools import partial
+
+    from backend.services import comparison_matrix
+    from utils.batching import chunked
+
+    for n in range(1, 4):
+        _add_experiment(test_db, n, compounds, additives=[("Magnetite", n, AmountUnit.GRAM)],
+                        results=[(1.0, float(n), 1.0)])
+    test_db.commit()
+    ids = ["HPHT_MH_003", "HPHT_MH_001", "HPHT_MH_002"]
+    expected, _ = build_comparison_matrix(test_db, ids)
+
+    # One experiment per IN list: the matrix must match an unchunked lookup
+    monkeypatch.setattr(comparison_matrix, "chunked", partial(chunked, size=1))
+    matrix, _ = build_comparison_matrix(test_db, ids)
+    pd.testing.assert_frame_equal(matrix, expected)
@@ -0,0 +1,148 @@
+import csv
+import datetime
+import hashlib
+import io
+import json
+import os
+import time
+import zipfile
+
+import pytest
+import pyarrow.parquet as pq
+
+from database import Experiment, ExperimentalConditions
+from database.models.enums import ExperimentStatus
+from utils import database_export
+from utils.database_export import (
+    evict_stale_exports,
+    export_database,
+    export_database_excel,
+    new_export_path,
+    read_manifest,
+)
+from utils.export_schema_to_excel import export_schema_to_excel
+
+
+@pytest.fixture
+def populated_db(test_db):
+    for i in range(1, 8):
+        exp = Experiment(experiment_id=f"EXP_{i:03d}", experiment_number=i, status=ExperimentStatus.ONGOING)
+        exp.conditions = ExperimentalConditions(experiment_id=f"EXP_{i:03d}", temperature_c=20.0 + i)
+        test_db.add(exp)
+    test_db.commit()
+    return test_db
+
+
+def test_parquet_export_streams_every_table_in_chunks(populated_db, tmp_path):
+    out = tmp_path / "nested" / "export.zip"
+    seen = []
+
+    manifest = export_database(out, fmt="parquet", chunk_size=3, bind=populated_db.get_bind(),
+                               progress=lambda name, i, n: seen.append(name))
+
+    assert out.exists() and not out.with_name("export.zip.partial").exists()
+    entries = {t["name"]: t for t in manifest["tables"]}
+    assert entries["experiments"]["rows"] == 7
+    assert entries["scalar_results"]["rows"] == 0
+    assert seen == [t["name"] for t in manifest["tables"]]
+    assert read_manifest(out) == manifest
+
+    with zipfile.ZipFile(out) as zf:
+        data = zf.read("experiments.parquet")
+        assert hashlib.sha256(data).hexdigest() == entries["experiments"]["sha256"]
+        schema = json.loads(zf.read("schema.json"))
+        empty = pq.read_table(io.BytesIO(zf.read("scalar_results.parquet")))
+
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    assert parquet.metadata.num_row_groups == 3  # 3 + 3 + 1 rows
+    table = parquet.read()
+    assert table.column("experiment_id").to_pylist() == [f"EXP_{i:03d}" for i in range(1, 8)]
+    assert set(table.column("status").to_pylist()) == {ExperimentStatus.ONGOING.value}
+    assert str(table.schema.field("created_at").type) == "timestamp[us]"
+
+    # Empty tables keep their column types
+    assert empty.num_rows == 0
+    assert str(empty.schema.field("final_ph").type) == "double"
+    status_col = next(c for c in schema["experiments"] if c["name"] == "status")
+    assert status_col["export_type"] == "string"
+
+
+def test_csv_export_round_trip_and_table_filter(populated_db, tmp_path):
+    out = tmp_path / "export.zip"
+    manifest = export_database(out, fmt="csv", tables=["experiments", "experimental_results"],
+                               chunk_size=2, bind=populated_db.get_bind())
+
+    assert [t["name"] for t in manifest["tables"]] == ["experiments", "experimental_results"]
+    with zipfile.ZipFile(out) as zf:
+        raw = zf.read("experiments.csv")
+        assert hashlib.sha256(raw).hexdigest() == manifest["tables"][0]["sha256"]
+        rows = list(csv.DictReader(io.StringIO(raw.decode("utf-8"))))
+        header = zf.read("experimental_results.csv").decode("utf-8").splitlines()
+    assert len(rows) == 7
+    assert rows[0]["experiment_id"] == "EXP_001"
+    assert datetime.datetime.fromisoformat(rows[0]["created_at"])
+    assert len(header) == 1 and header[0].startswith("id,")
+
+
+def test_export_rejects_unknown_format_and_tables(test_db, tmp_path):
+    with pytest.raises(ValueError):
+        export_database(tmp_path / "x.zip", fmt="xlsx", bind=test_db.get_bind())
+    with pytest.raises(ValueError):
+        export_database(tmp_path / "x.zip", tables=["nope"], bind=test_db.get_bind())
+    assert not list(tmp_path.iterdir())
+
+
+def test_excel_export_writes_one_sheet_per_table(populated_db, tmp_path):
+    from openpyxl import load_workbook
+
+    out = tmp_path / "export.xlsx"
+    manifest = export_database_excel(out, tables=["experiments", "scalar_results"], chunk_size=3,
+                                     bind=populated_db.get_bind(), include_types=True)
+
+    assert [(t["name"], t["rows"]) for t in manifest["tables"]] == [("experiments", 7), ("scalar_results", 0)]
+    workbook = load_workbook(out, read_only=True)
+    rows = list(workbook["experiments"].iter_rows(values_only=True))
+    assert rows[0][:2] == ("id", "experiment_id")
+    assert rows[1][1].startswith("VARCHAR")
+    assert [r[1] for r in rows[2:]] == [f"EXP_{i:03d}" for i in range(1, 8)]
+    assert len(list(workbook["scalar_results"].iter_rows())) == 2
+    workbook.close()
+
+
+def test_excel_export_refuses_tables_over_the_sheet_limit(populated_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(database_export, "EXCEL_MAX_ROWS", 5)
+    with pytest.raises(ValueError, match="experiments"):
+        export_database_excel(tmp_path / "export.xlsx", bind=populated_db.get_bind())
+    assert not list(tmp_path.iterdir())
+
+
+def test_schema_workbook_includes_data_by_default(populated_db, tmp_path, monkeypatch):
+    from openpyxl import load_workbook
+
+    monkeypatch.setattr("database.database.engine", populated_db.get_bind())
+    out = tmp_path / "schema.xlsx"
+    assert export_schema_to_excel(out, include_data=True) == out
+
+    workbook = load_workbook(out, read_only=True)
+    assert len(list(workbook["experiments"].iter_rows())) == 2 + 7
+    workbook.close()
+
+
+def test_new_export_path_evicts_stale_exports(tmp_path):
+    stale = tmp_path / "database_export_old_parquet.zip"
+    fresh = tmp_path / "database_export_new_csv.zip"
+    unrelated = tmp_path / "notes.txt"
+    for path in (stale, fresh, unrelated):
+        path.write_bytes(b"x")
+    old = time.time() - 7 * 3600
+    os.utime(stale, (old, old))
+    os.utime(unrelated, (old, old))
+
+    first = new_export_path("xlsx", directory=tmp_path)
+    second = new_export_path("csv", directory=tmp_path)
+
+    assert not stale.exists() and fresh.exists() and unrelated.exists()
+    assert first.suffix == ".xlsx" and second.name.endswith("_csv.zip") and first != second
+    assert evict_stale_exports(tmp_path, max_age_hours=0) == 1
+    with pytest.raises(ValueError):
+        new_export_path("pdf", directory=tmp_path)
@@ -714,7 +714,68 @@ def test_snapshot_functionality():
                 pass  # Files still locked, skip cleanup
 
 
+
+
+class TestExperimentIDParsing:
+    """Tests for the shared, cached experiment ID parser and lineage index."""
+
+    def test_parts_are_cached_and_shared_across_call_sites(self):
+        from dataclasses import FrozenInstanceError
+        from database.lineage_utils import parse_experiment_id_parts
+        from backend.services.experiment_validation import extract_lineage_info, parse_experiment_id as validate_parse
+        from backend.services.experiment_type_service import infer_experiment_type_value
+
+        parts = parse_experiment_id_parts("  HPHT_MH_001_Desorption ")
+        assert parts is parse_experiment_id_parts("HPHT_MH_001_Desorption")
+        assert parts.lineage_key == ("HPHT_MH_001", None, "Desorption")
+        assert parts.type_prefix == "HPHT" and parts.is_derivation
+        with pytest.raises(FrozenInstanceError):
+            parts.base_id = "other"
+
+        assert extract_lineage_info("Serum_MH_101-3") == ("Serum_MH_101", 3, None)
+        assert extract_lineage_info("") == ("", None, None)
+        assert validate_parse("serum_MH_101_Annealing").treatment_variant == "Annealing"
+        assert infer_experiment_type_value("cf_001-2_Desorption") == "Core Flood"
+        assert infer_experiment_type_value(None) == "Other"
+
+    def test_lineage_index_matches_query_lookup(self):
+        from database.lineage_utils import LineageIndex
+
+        ids = ["IDX_MH_001", "IDX_MH_001-2", "IDX_MH_001-5", "IDX_MH_001-2_Desorption", "IDX_MH_001_Leach"]
+        experiments = [Experiment(experiment_id=exp_id, experiment_number=i) for i, exp_id in enumerate(ids)]
+        index = LineageIndex(experiments)
+
+        def parent_of(exp_id):
+            parent = index.find_parent(exp_id)
+            return parent.experiment_id if parent else None
+
+        assert parent_of("IDX_MH_001-2") == "IDX_MH_001"
+        assert parent_of("IDX_MH_001-4") == "IDX_MH_001-2"
+        assert parent_of("IDX_MH_001-9") == "IDX_MH_001-5"
+        assert parent_of("idx-mh-001-3_Desorption") is None
+        assert parent_of("IDX_MH_001-5_Desorption") == "IDX_MH_001-5"
+        assert parent_of("IDX_MH_001_Desorption") == "IDX_MH_001"
+        assert parent_of("IDX_MH_001") is None
+        assert parent_of("OTHER_MH_001-2") is None
+
+    def test_bulk_flush_links_parents_through_index(self, test_db):
+        from database.event_listeners import LINEAGE_INDEX_MIN_BATCH
+
+        base = Experiment(experiment_id="BULK_MH_001", experiment_number=1)
+        test_db.add(base)
+        test_db.commit()
+
+        runs = [
+            Experiment(experiment_id=f"BULK_MH_001-{n}", experiment_number=n)
+            for n in range(2, LINEAGE_INDEX_MIN_BATCH + 3)
+        ]
+        test_db.add_all(runs)
+        test_db.commit()
+
+        assert {run.parent_experiment_fk for run in runs} == {base.id}
+        assert {run.base_experiment_id for run in runs} == {"BULK_MH_001"}
+
+
 if __name__ == "__main__":
     # Run tests with pytest
     pytest.main([__file__, "-v", "-s"])
-
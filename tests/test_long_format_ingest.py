@@ -0,0 +1,155 @@
+import io
+import time
+
+import pandas as pd
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from database import Experiment, ExperimentalResults, ScalarResults
+from backend.services.bulk_uploads.long_format import long_format_upload_from_excel
+from backend.services.scalar_results_service import ScalarResultsService
+from backend.services.long_format_ingest import LongFormatIngestor
+
+
+@pytest.fixture
+def ingest_db(test_db):
+    for n in (1, 2):
+        test_db.add(Experiment(experiment_id=f"HPHT_MH_{n:03d}", experiment_number=n))
+    test_db.commit()
+    return test_db
+
+
+def _ingestor(db, **kwargs):
+    return LongFormatIngestor(session_factory=sessionmaker(bind=db.get_bind()), **kwargs)
+
+
+def _scalars(db, experiment_id):
+    rows = (db.query(ExperimentalResults.time_post_reaction_days, ScalarResults)
+            .join(Experiment, Experiment.id == ExperimentalResults.experiment_fk)
+            .join(ScalarResults, ScalarResults.result_id == ExperimentalResults.id)
+            .filter(Experiment.experiment_id == experiment_id)
+            .order_by(ExperimentalResults.time_post_reaction_days).all())
+    return {t: s for t, s in rows}
+
+
+def test_records_are_coalesced_per_timepoint_and_flushed_once(ingest_db):
+    ingestor = _ingestor(ingest_db, max_groups=100)
+    outcome = ingestor.submit([
+        {"experiment_id": "HPHT_MH_001", "time_post_reaction": 7, "metric": "final_ph", "value": 7.5},
+        {"experiment_id": "HPHT_MH_001", "time_post_reaction": 7, "metric": "h2_concentration", "value": 120},
+        {"experiment_id": "HPHT_MH_001", "time_post_reaction": 7.0, "metric": "final_ph", "value": 8.0},
+        {"experiment_id": "HPHT_MH_001", "time_post_reaction": 14, "metric": "final_ph", "value": 8.4},
+        {"experiment_id": "HPHT_MH_001", "time_post_reaction": 14, "metric": "nope", "value": 1},
+        {"experiment_id": "HPHT_MH_001", "time_post_reaction": "soon", "metric": "final_ph", "value": 1},
+        {"experiment_id": "HPHT_MH_001", "time_post_reaction": 14, "metric": "final_ph", "value": [1]},
+    ])
+    assert outcome["accepted"] == 4 and outcome["rejected"] == 3 and outcome["pending_groups"] == 2
+    assert outcome["errors"][0].startswith("Row 5: Unknown metric 'nope'")
+    assert _scalars(ingest_db, "HPHT_MH_001") == {}
+
+    summary = ingestor.flush()
+    assert (summary["groups"], summary["created"], summary["updated"], summary["errors"]) == (2, 2, 0, [])
+    assert ingestor.flush() is None
+
+    ingest_db.expire_all()
+    scalars = _scalars(ingest_db, "HPHT_MH_001")
+    assert scalars[7.0].final_ph == pytest.approx(8.0)
+    assert scalars[7.0].h2_concentration == pytest.approx(120)
+    assert scalars[7.0].h2_concentration_unit == "ppm"
+
+    # A later partial update keeps fields it does not mention
+    ingestor.submit([{"experiment_id": "HPHT_MH_001", "time_post_reaction": 7, "metric": "final_ph", "value": 9.0}])
+    assert ingestor.flush()["updated"] == 1
+    ingest_db.expire_all()
+    scalars = _scalars(ingest_db, "HPHT_MH_001")
+    assert scalars[7.0].final_ph == pytest.approx(9.0)
+    assert scalars[7.0].h2_concentration == pytest.approx(120)
+    assert ingestor.stats()["accepted"] == 5
+
+
+def test_failing_group_does_not_discard_the_batch(ingest_db):
+    ingestor = _ingestor(ingest_db)
+    ingestor.submit([
+        {"experiment_id": "HPHT_MH_002", "time_post_reaction": 1, "metric": "final_ph", "value": 7.0},
+        {"experiment_id": "MISSING_999", "time_post_reaction": 1, "metric": "final_ph", "value": 7.0},
+    ])
+    summary = ingestor.flush()
+    assert summary["created"] == 1 and summary["failed_groups"] == 1
+    assert "MISSING_999" in summary["errors"][0] or "not found" in summary["errors"][0]
+    ingest_db.expire_all()
+    assert list(_scalars(ingest_db, "HPHT_MH_002")) == [1.0]
+
+
+def test_failed_flush_leaves_no_rows_and_requeued_batch_is_written_once(ingest_db, monkeypatch):
+    failures = {"commit": 1, "write": 1}
+
+    class FlakySession(Session):
+        def commit(self):
+            if failures["commit"]:
+                failures["commit"] -= 1
+                raise OperationalError("COMMIT", {}, Exception("database is locked"))
+            super().commit()
+
+    create = ScalarResultsService.create_scalar_result_ex
+
+    def flaky_create(db, experiment_id, result_data):
+        upsert = create(db, experiment_id, result_data)
+        if experiment_id == "HPHT_MH_002" and failures["write"]:
+            failures["write"] -= 1
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        return upsert
+
+    monkeypatch.setattr(ScalarResultsService, "create_scalar_result_ex", staticmethod(flaky_create))
+    ingestor = LongFormatIngestor(session_factory=sessionmaker(bind=ingest_db.get_bind(), class_=FlakySession))
+    ingestor.submit([
+        {"experiment_id": "HPHT_MH_001", "time_post_reaction": 1, "metric": "final_ph", "value": 7.0},
+        {"experiment_id": "HPHT_MH_002", "time_post_reaction": 1, "metric": "final_ph", "value": 7.2},
+    ])
+
+    # A lock error inside a group and a failed commit both requeue the whole batch
+    for _ in range(2):
+        summary = ingestor.flush()
+        assert summary["requeued"] and ingestor.stats()["pending_groups"] == 2
+        assert ingest_db.query(ExperimentalResults).count() == 0
+
+    summary = ingestor.flush()
+    assert (summary["created"], summary["requeued"]) == (2, False)
+    assert ingestor.flush() is None
+    assert ingest_db.query(ExperimentalResults).count() == 2
+    assert ingest_db.query(ScalarResults).count() == 2
+
+
+def test_background_flush_on_size_and_age(ingest_db):
+    ingestor = _ingestor(ingest_db, max_groups=2, max_seconds=0.2).start()
+    try:
+        ingestor.submit([
+            {"experiment_id": "HPHT_MH_001", "time_post_reaction": t, "metric": "final_ph", "value": 7.0}
+            for t in (1, 2)
+        ])
+        ingestor.submit([{"experiment_id": "HPHT_MH_002", "time_post_reaction": 3, "metric": "final_ph", "value": 7.0}])
+        deadline = time.monotonic() + 5
+        while ingestor.stats()["created"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert ingestor.stats()["created"] == 3 and ingestor.stats()["pending_groups"] == 0
+    finally:
+        ingestor.stop()
+
+
+def test_excel_upload_semantics_unchanged(ingest_db):
+    df = pd.DataFrame([
+        ["HPHT_MH_002", 7, "final_ph", 7.5, None],
+        ["HPHT_MH_002", 7, "final_ph", 7.9, None],
+        [None, None, None, None, None],
+        ["HPHT_MH_002", 7, "ferrous_iron_yield", 12, "%"],
+        ["HPHT_MH_002", "x", "final_ph", 7.0, None],
+    ], columns=["Experiment ID*", "Time (days)*", "Metric*", "Value*", "Unit"])
+    buf = io.BytesIO()
+    df.to_excel(buf, sheet_name="Data", index=False)
+
+    created, updated, skipped, errors, feedbacks = long_format_upload_from_excel(ingest_db, buf.getvalue())
+    assert (created, updated, skipped) == (1, 0, 0)
+    assert errors == ["Row 6: Time (days) must be numeric, got 'x'."]
+    assert [(fb["row"], fb["status"]) for fb in feedbacks] == [(6, "error"), (2, "created")]
+    scalar = _scalars(ingest_db, "HPHT_MH_002")[7.0]
+    assert scalar.final_ph == pytest.approx(7.9) and scalar.ferrous_iron_yield == pytest.approx(12)
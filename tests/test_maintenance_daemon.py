@@ -0,0 +1,88 @@
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.file_lock import file_lock, read_lock_pid
+from utils.maintenance_daemon import (
+    JOBS,
+    MaintenanceDaemon,
+    read_status,
+    request_job,
+)
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    calls = []
+
+    def _ok():
+        calls.append("ok")
+        return "done"
+
+    def _boom():
+        calls.append("boom")
+        raise RuntimeError("disk full")
+
+    d = MaintenanceDaemon(
+        jobs={"ok": _ok, "boom": _boom},
+        intervals={"ok": timedelta(hours=1)},
+        state_dir=tmp_path,
+    )
+    d.calls = calls
+    return d
+
+
+def test_scheduled_job_runs_once_per_interval(daemon, tmp_path):
+    now = datetime.now()
+    assert daemon.run_pending(now) == ["ok"]
+    assert daemon.run_pending(now + timedelta(minutes=5)) == []
+    assert daemon.run_pending(now + timedelta(hours=2)) == ["ok"]
+
+    status = read_status(tmp_path)
+    assert status["pid"] == os.getpid()
+    assert status["jobs"]["ok"]["last_status"] == "succeeded"
+    assert status["jobs"]["ok"]["last_result"] == "done"
+
+
+def test_requested_jobs_run_and_failures_are_recorded(daemon, tmp_path, monkeypatch):
+    monkeypatch.setitem(JOBS, "boom", daemon.jobs["boom"])
+    request_job("boom", requested_by="tester", state_dir=tmp_path)
+    request_job("boom", state_dir=tmp_path)
+
+    ran = daemon.run_pending()
+    # Duplicate requests collapse into one run; the scheduled job still runs
+    assert ran == ["boom", "ok"]
+    assert daemon.calls == ["boom", "ok"]
+    assert daemon.pending_requests() == []
+
+    entry = read_status(tmp_path)["jobs"]["boom"]
+    assert entry["last_status"] == "failed"
+    assert entry["last_error"] == "disk full"
+    assert entry["trigger"] == "request"
+    assert entry["running"] is False
+
+
+def test_request_job_rejects_unknown_jobs(tmp_path):
+    with pytest.raises(ValueError):
+        request_job("format_disk", state_dir=tmp_path)
+
+
+def test_file_lock_is_single_instance(tmp_path):
+    lock = tmp_path / ".maintenance_lock"
+    with file_lock(lock):
+        assert read_lock_pid(lock) == os.getpid()
+        with pytest.raises(RuntimeError):
+            with file_lock(lock):
+                pass
+    assert not lock.exists()
+    assert read_lock_pid(lock) is None
+
+
+def test_optimize_job_runs_against_source_db(tmp_path, monkeypatch):
+    db_path = tmp_path / "experiments.db"
+    sqlite3.connect(db_path).close()
+    monkeypatch.setattr("utils.database_backup._get_source_db_path", lambda: db_path)
+
+    assert JOBS["optimize"]() == str(db_path)
@@ -0,0 +1,94 @@
+import csv
+import io
+
+import pytest
+
+from database import Experiment
+from utils import page_profiler, query_instrumentation
+
+
+@pytest.fixture
+def profile_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(page_profiler, "PROFILE_STORE", tmp_path / "profiles.jsonl")
+    monkeypatch.setattr(page_profiler, "PROFILE_DIR", tmp_path / "reports")
+    monkeypatch.setattr(page_profiler, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(page_profiler, "TRACE_MEMORY", True)
+    yield tmp_path
+    query_instrumentation.disable()
+    query_instrumentation.reset()
+
+
+def test_page_profile_records_wall_time_queries_and_memory(profile_store, test_db):
+    query_instrumentation.enable(test_db.get_bind())
+
+    with page_profiler.page_profile("View Experiments", user="a@addisenergy.com") as record:
+        test_db.query(Experiment).count()
+        test_db.query(Experiment).all()
+        blob = bytearray(2 * 1024 * 1024)
+        del blob
+
+    assert record["query_count"] == 2 and record["wall_ms"] >= 0
+    assert record["peak_memory_mb"] >= 1.5
+    assert page_profiler.load_records() == [record]
+
+    with pytest.raises(ValueError):
+        with page_profiler.page_profile("Bulk Uploads"):
+            raise ValueError("boom")
+    assert page_profiler.load_records(page="Bulk Uploads")[0]["error"] == "ValueError"
+
+
+def test_cprofile_report_and_csv_summary(profile_store):
+    with page_profiler.page_profile("Reactor Dashboard", profiler="cprofile") as record:
+        sum(range(1000))
+
+    assert record["profiler"] == "cprofile"
+    assert (profile_store / "reports").exists() and record["profile_path"].endswith(".prof")
+
+    for wall in (10.0, 30.0, 20.0):
+        page_profiler.append_record({"page": "View Experiments", "wall_ms": wall, "query_count": 4})
+    summary = page_profiler.summarize(page_profiler.load_records())
+    view = next(row for row in summary if row["page"] == "View Experiments")
+    assert view["renders"] == 3 and view["p50_ms"] == 20.0 and view["max_ms"] == 30.0
+
+    rows = list(csv.DictReader(io.StringIO(page_profiler.records_to_csv(page_profiler.load_records()).decode())))
+    assert len(rows) == 4 and rows[0]["page"] == "Reactor Dashboard"
+
+
+def test_store_is_trimmed_and_admin_flags(profile_store, monkeypatch):
+    monkeypatch.setattr(page_profiler, "MAX_RECORDS", 10)
+    trims = []
+    trim_store = page_profiler._trim_store
+    monkeypatch.setattr(page_profiler, "_trim_store", lambda: trims.append(1) or trim_store())
+    for i in range(25):
+        page_profiler.append_record({"page": "P", "wall_ms": float(i)})
+    records = page_profiler.load_records()
+    assert len(records) <= 12 and records[-1]["wall_ms"] == 24.0
+    assert len(trims) == 5  # once the store is 2 lines over the limit, not on every append
+
+    monkeypatch.setattr(page_profiler, "ADMIN_EMAILS", {"ops@addisenergy.com"})
+    assert page_profiler.is_profiler_admin({"email": "Ops@addisenergy.com"})
+    # The role claim is typed by users at registration, so it grants nothing
+    assert not page_profiler.is_profiler_admin({"email": "x@addisenergy.com", "role": "admin"})
+    assert not page_profiler.is_profiler_admin(None)
+    assert page_profiler.requested_profiler("1") == "pyinstrument"
+    assert page_profiler.requested_profiler("cProfile") == "cprofile"
+    assert page_profiler.requested_profiler("nope") is None
+
+
+def test_profiling_is_off_by_default_except_on_request(profile_store, monkeypatch):
+    monkeypatch.setattr(page_profiler, "PROFILING_ENABLED", False)
+    monkeypatch.setattr(page_profiler, "TRACE_MEMORY", False)
+    query_instrumentation.disable()
+    tracing = page_profiler.tracemalloc.is_tracing()
+
+    with page_profiler.page_profile("View Experiments") as record:
+        pass
+    assert "wall_ms" not in record and page_profiler.load_records() == []
+
+    with page_profiler.page_profile("View Experiments", profiler="cprofile") as record:
+        pass
+    assert record["profile_path"] and record["wall_ms"] >= 0
+    assert record["query_count"] is None and record["peak_memory_mb"] is None
+    assert not query_instrumentation.is_enabled()
+    assert page_profiler.tracemalloc.is_tracing() == tracing
+    assert page_profiler.summarize(page_profiler.load_records())[0]["avg_queries"] is None
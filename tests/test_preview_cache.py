@@ -0,0 +1,65 @@
+import io
+import os
+import time
+
+from PIL import Image
+
+from utils.preview_cache import PreviewCache, THUMBNAIL_SIZE
+
+
+def _jpeg(size=(2000, 1500), color=(200, 30, 30)):
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def test_thumbnail_is_rendered_once_then_served_from_disk(tmp_path):
+    cache = PreviewCache(tmp_path / "previews", max_bytes=10 * 1024 * 1024)
+    original = _jpeg()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return original
+
+    first = cache.thumbnail("ab" * 32, load, "photo.jpg")
+    second = cache.thumbnail("ab" * 32, load, "photo.jpg")
+
+    assert first == second and first.suffix == ".jpg"
+    assert len(loads) == 1
+    with Image.open(first) as img:
+        assert img.width <= THUMBNAIL_SIZE[0] and img.height <= THUMBNAIL_SIZE[1]
+    assert first.stat().st_size < len(original)
+
+
+def test_unpreviewable_files_are_remembered(tmp_path):
+    cache = PreviewCache(tmp_path / "previews")
+    loads = []
+
+    def load():
+        loads.append(1)
+        return b"Sample,Fe,Mg\nA,1,2\n"
+
+    assert cache.thumbnail("cd" * 32, load, "data.csv") is None
+    assert cache.thumbnail("cd" * 32, load, "data.csv") is None
+    assert len(loads) == 1
+
+
+def test_lru_eviction_keeps_recently_used_assets(tmp_path):
+    cache = PreviewCache(tmp_path / "previews")
+    keys = [f"{i:02d}" * 32 for i in range(6)]
+    paths = {}
+    for i, key in enumerate(keys):
+        paths[key] = cache.thumbnail(key, lambda i=i: _jpeg(color=(i * 40, 0, 0)), "p.jpg")
+        # Distinct mtimes without sleeping
+        os.utime(paths[key], (time.time() - 100 + i, time.time() - 100 + i))
+
+    # Use the oldest one again so it becomes the most recent
+    cache.thumbnail(keys[0], lambda: b"", "p.jpg")
+
+    per_file = paths[keys[1]].stat().st_size
+    cache.evict(target_bytes=cache.total_size() - per_file * 2)
+
+    assert paths[keys[0]].exists()
+    assert not paths[keys[1]].exists() and not paths[keys[2]].exists()
+    assert paths[keys[5]].exists()
@@ -0,0 +1,63 @@
+import pytest
+
+from database import Experiment
+from utils import query_instrumentation as qi
+
+
+@pytest.fixture
+def instrumented(test_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(qi, "SLOW_QUERY_LOG", tmp_path / "slow.log")
+    monkeypatch.setattr(qi, "_slow_logger", None)
+    qi.reset()
+    qi.enable(test_db.get_bind())
+    yield test_db
+    qi.disable()
+    slow = qi.logging.getLogger(f"{qi.__name__}.slow")
+    for handler in [h for h in slow.handlers if isinstance(h, qi.logging.FileHandler)]:
+        slow.removeHandler(handler)
+        handler.close()
+    qi.reset()
+
+
+def test_normalize_sql_collapses_literals_and_in_lists():
+    a = qi.normalize_sql("SELECT * FROM t WHERE id IN (?, ?, ?) AND name = 'x'  AND n = 5")
+    b = qi.normalize_sql("SELECT *\nFROM t WHERE id IN (?) AND name = 'it''s' AND n = 12")
+    assert a == b == "SELECT * FROM t WHERE id IN (?) AND name = ? AND n = ?"
+
+
+def test_scope_counts_statements_and_flags_n_plus_one(instrumented, monkeypatch):
+    db = instrumented
+    for i in range(1, 6):
+        db.add(Experiment(experiment_id=f"QI_{i:03d}", experiment_number=i))
+    db.commit()
+    monkeypatch.setattr(qi, "N_PLUS_ONE_THRESHOLD", 3)
+
+    with qi.query_scope("page:outer") as outer:
+        with qi.query_scope("page:View Experiments", top_n=2) as stats:
+            assert qi.current_tag() == "page:View Experiments"
+            for i in range(1, 6):  # classic N+1: one lookup per row
+                db.query(Experiment).filter(Experiment.experiment_id == f"QI_{i:03d}").first()
+
+    assert stats.statement_count == 5 and outer.statement_count == 5
+    assert len(stats.slowest) == 2 and stats.total_ms > 0
+    assert stats.repeated(threshold=3)[0][1] == 5
+    assert qi.current_tag() is None
+
+    summary = qi.get_summaries()["page:View Experiments"]
+    assert summary["units"] == 1 and summary["statements"] == 5 and summary["n_plus_one_units"] == 1
+    assert qi.recent_units("page:View Experiments")[0] is stats
+    assert "possible N+1: 5x" in (qi.SLOW_QUERY_LOG).read_text()
+
+
+def test_slow_statements_are_logged_and_disable_detaches(instrumented, monkeypatch):
+    db = instrumented
+    monkeypatch.setattr(qi, "SLOW_QUERY_MS", 0.0)
+    with qi.query_scope("upload:pxrf"):
+        db.query(Experiment).count()
+    assert "[upload:pxrf] slow query" in qi.SLOW_QUERY_LOG.read_text()
+
+    qi.disable()
+    with qi.query_scope("page:quiet") as stats:
+        db.query(Experiment).count()
+    assert stats.statement_count == 0
+    assert "page:quiet" not in qi.get_summaries()
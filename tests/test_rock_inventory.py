@@ -0,0 +1,38 @@
+import io
+
+import pandas as pd
+
+import utils.storage as storage
+from database import SampleInfo, SamplePhotos
+from backend.services.bulk_uploads.rock_inventory import RockInventoryService
+
+
+def _excel_bytes(rows):
+    buf = io.BytesIO()
+    pd.DataFrame(rows).to_excel(buf, index=False)
+    return buf.getvalue()
+
+
+def test_bulk_upsert_uploads_photos_for_new_and_existing_samples(test_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "get_storage_config", lambda: {
+        "type": "local", "base_path": str(tmp_path / "uploads"), "backup_directory": str(tmp_path / "backups"),
+    })
+    test_db.add(SampleInfo(sample_id="ROCK1"))
+    test_db.add(SamplePhotos(sample_id="ROCK1", file_name="rock_1.jpg", file_path="old", file_type="image/jpeg"))
+    test_db.commit()
+
+    rows = [{"sample_id": f"ROCK{i}", "locality": "Quarry"} for i in range(1, 31)]
+    images = [(f"photos/rock_{i}.jpg", f"img-{i}".encode(), "image/jpeg") for i in range(1, 31)]
+    images.append(("unknown.jpg", b"x", "image/jpeg"))
+
+    created, updated, attached, skipped, errors, warnings = RockInventoryService.bulk_upsert_samples(
+        test_db, _excel_bytes(rows), images
+    )
+    test_db.commit()
+
+    assert (created, updated, attached, skipped, errors) == (29, 1, 30, 0, [])
+    photos = {p.sample_id: p for p in test_db.query(SamplePhotos).all()}
+    assert len(photos) == 30
+    assert photos["ROCK1"].file_path != "old"
+    assert storage.get_file(photos["ROCK17"].file_path) == b"img-17"
+    assert photos["ROCK17"].blob_sha256 is not None
@@ -0,0 +1,126 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import utils.storage as storage
+from utils.storage import StorageBackend, register_backend
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _local_config(tmp_path):
+    return {"type": "local", "base_path": str(tmp_path / "uploads"), "backup_directory": str(tmp_path / "backups")}
+
+
+def test_import_does_not_load_cloud_sdks():
+    code = (
+        "import sys; import utils.storage, backend.services.bulk_uploads.pxrf_data; "
+        "print([m for m in ('boto3', 'google.cloud.storage', 'azure.storage.blob') if m in sys.modules])"
+    )
+    env = dict(os.environ, DATABASE_URL=os.environ.get("DATABASE_URL", "sqlite:///:memory:"))
+    out = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    assert out.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_local_round_trip_with_backup(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "get_storage_config", lambda: _local_config(tmp_path))
+
+    path = storage.save_file(b"payload", "a.txt", folder="photos/S1")
+    assert path == str((tmp_path / "uploads" / "photos" / "S1" / "a.txt").resolve())
+    assert (tmp_path / "backups" / "photos" / "S1" / "a.txt").read_bytes() == b"payload"
+    assert storage.get_file(path) == b"payload"
+
+    storage.delete_file(path)
+    assert not os.path.exists(path)
+
+
+def test_registered_backend_is_selected_by_type_and_path(tmp_path, monkeypatch):
+    saved = {}
+    register_backend("memory", StorageBackend(
+        save=lambda data, name, folder, config: saved.setdefault(f"mem://{folder}/{name}", data) and f"mem://{folder}/{name}",
+        get=lambda path, config: saved[path],
+        delete=lambda path, config: saved.pop(path),
+        owns=lambda path: path.startswith("mem://"),
+    ))
+    try:
+        monkeypatch.setattr(storage, "get_storage_config", lambda: {"type": "memory"})
+        path = storage.save_file(b"x", "f.bin", folder="results", create_backup=False)
+        assert path == "mem://results/f.bin"
+
+        # Paths are routed by prefix even after the configured type changes
+        monkeypatch.setattr(storage, "get_storage_config", lambda: _local_config(tmp_path))
+        assert storage.get_file(path) == b"x"
+        storage.delete_file(path)
+        assert saved == {}
+    finally:
+        storage._BACKENDS.pop("memory", None)
+
+
+@pytest.mark.parametrize("storage_type, expected", [
+    ("local", "local"), ("s3", "local"), ("gcs", "local"), ("azure", "azure"),
+])
+def test_unprefixed_paths_are_local_unless_azure_is_configured(storage_type, expected):
+    config = {"type": storage_type}
+    assert storage._backend_for_path("results/HPHT_001/report.pdf", config) is storage._BACKENDS[expected]
+    assert storage._backend_for_path("s3://bucket/results/report.pdf", config) is storage._BACKENDS["s3"]
+    assert storage._backend_for_path("gcs://bucket/results/report.pdf", config) is storage._BACKENDS["gcs"]
+
+
+def test_save_files_keeps_input_order_and_retries_transient_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "get_storage_config", lambda: _local_config(tmp_path))
+    monkeypatch.setattr(storage, "UPLOAD_RETRY_BACKOFF_SECONDS", 0)
+    real_save = storage.save_to_local
+    failures = {"f3.bin": 2}
+
+    def flaky_save(data, name, folder, config):
+        if failures.get(name):
+            failures[name] -= 1
+            raise ConnectionError("connection reset")
+        return real_save(data, name, folder, config)
+
+    monkeypatch.setattr(storage, "save_to_local", flaky_save)
+    files = [(f"data-{i}".encode(), f"f{i}.bin", f"photos/S{i % 3}") for i in range(20)]
+
+    paths = storage.save_files(files, create_backup=False, max_workers=4)
+
+    assert [os.path.basename(p) for p in paths] == [name for _, name, _ in files]
+    assert all(storage.get_file(p) == data for p, (data, _, _) in zip(paths, files))
+    assert failures["f3.bin"] == 0
+
+
+def test_save_files_reports_permanent_failures_per_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "get_storage_config", lambda: _local_config(tmp_path))
+    calls = []
+
+    def save(data, name, folder, config):
+        calls.append(name)
+        if name == "bad.bin":
+            raise ValueError("bad file")
+        return name
+
+    monkeypatch.setattr(storage, "save_to_local", save)
+    files = [(b"a", "ok.bin", "x"), (b"b", "bad.bin", "x")]
+
+    results = storage.save_files(files, create_backup=False, return_exceptions=True)
+    assert results[0] == "ok.bin" and isinstance(results[1], ValueError)
+    assert calls.count("bad.bin") == 1  # not retried
+
+    with pytest.raises(ValueError):
+        storage.save_files(files, create_backup=False)
+
+
+def test_cloud_clients_are_cached_per_config():
+    built = []
+    storage.clear_client_cache()
+    try:
+        first = storage._cached_client("fake", "cfg-a", lambda: built.append("a") or object())
+        again = storage._cached_client("fake", "cfg-a", lambda: built.append("a") or object())
+        other = storage._cached_client("fake", "cfg-b", lambda: built.append("b") or object())
+    finally:
+        storage.clear_client_cache()
+    assert first is again and first is not other
+    assert built == ["a", "b"]
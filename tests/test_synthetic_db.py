@@ -0,0 +1,71 @@
+import random
+import re
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from database import Experiment, ExperimentalResults, ICPResults, ExternalAnalysis, PXRFReading
+from database.lineage_utils import LineageIndex
+from utils.synthetic_db import (
+    ICP_ELEMENTS, build_cached_database, generate_experiment_ids, resolve_lineage, scaled_counts,
+)
+
+ID_PATTERN = re.compile(r"^(HPHT|Serum|CF|Autoclave)_[A-Z]{2}_\d{3}(-\d+)?(_[A-Za-z]+)?$")
+
+
+@pytest.fixture(scope="module")
+def small_db(tmp_path_factory):
+    return build_cached_database(scale=0.05, seed=7, cache_dir=tmp_path_factory.mktemp("synthetic"))
+
+
+def test_experiment_ids_follow_lineage_conventions():
+    ids = generate_experiment_ids(random.Random(1), 400)
+    assert len(ids) == len(set(ids)) == 400
+    assert all(ID_PATTERN.match(exp_id) for exp_id in ids)
+    assert any(re.search(r"-\d+_[A-Za-z]+$", exp_id) for exp_id in ids)  # e.g. HPHT_MH_001-2_Desorption
+
+    lineage = resolve_lineage(ids)
+    by_id = {row["id"]: row for row in lineage}
+    for row in lineage:
+        if row["parent_experiment_fk"] is not None:
+            assert row["parent_experiment_fk"] < row["id"]  # parents are generated first
+            assert by_id[row["parent_experiment_fk"]]["experiment_id"] != row["experiment_id"]
+
+
+def test_generated_database_is_production_shaped(small_db):
+    engine = create_engine(f"sqlite:///{small_db}")
+    db = sessionmaker(bind=engine)()
+    try:
+        experiments = db.query(Experiment).all()
+        assert len(experiments) == scaled_counts(0.05)["experiments"]
+
+        # Stored lineage matches what the app would resolve
+        index = LineageIndex(experiments)
+        for exp in experiments:
+            parent = index.find_parent(exp.experiment_id)
+            assert exp.parent_experiment_fk == (parent.id if parent else None)
+
+        icp = db.query(ICPResults).first()
+        assert sorted(icp.all_elements) == sorted(ICP_ELEMENTS) and len(ICP_ELEMENTS) == 30
+        assert icp.fe == icp.all_elements["fe"]
+
+        refs = [a.pxrf_reading_no for a in db.query(ExternalAnalysis).filter_by(analysis_type="pXRF")]
+        assert any("," in r for r in refs)
+        assert db.query(PXRFReading).filter(PXRFReading.fe.isnot(None)).count() > 0
+
+        assert db.query(ExperimentalResults).count() >= 8 * len(experiments)
+        assert db.execute(text("SELECT COUNT(*) FROM v_primary_experiment_results")).scalar() > 0
+        assert db.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_generation_is_deterministic(small_db, tmp_path):
+    again = build_cached_database(scale=0.05, seed=7, cache_dir=tmp_path)
+    query = "SELECT experiment_id, parent_experiment_fk FROM experiments ORDER BY id"
+    with sqlite3.connect(small_db) as a, sqlite3.connect(again) as b:
+        assert a.execute(query).fetchall() == b.execute(query).fetchall()
+    assert build_cached_database(scale=0.05, seed=7, cache_dir=tmp_path) == again
@@ -0,0 +1,112 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from database import Experiment, ExperimentalResults, ScalarResults, ICPResults
+from database.event_listeners import refresh_reporting_views
+from backend.services.time_series import get_time_series, METRICS
+
+
+def _result(exp, day, cumulative, ph=None, fe=None, primary=True):
+    result = ExperimentalResults(experiment_fk=exp.id, time_post_reaction_days=day,
+                                 time_post_reaction_bucket_days=round(day), cumulative_time_post_reaction_days=cumulative,
+                                 is_primary_timepoint_result=primary, description=f"Day {day}")
+    if ph is not None:
+        result.scalar_data = ScalarResults(final_ph=ph)
+    if fe is not None:
+        result.icp_data = ICPResults(fe=fe)
+    return result
+
+
+@pytest.fixture
+def series_db(test_db):
+    a = Experiment(experiment_id="HPHT_MH_001", experiment_number=1)
+    b = Experiment(experiment_id="HPHT_MH_002", experiment_number=2)
+    test_db.add_all([a, b])
+    test_db.flush()
+    test_db.add_all([
+        _result(a, 0.0, 10.0, ph=7.0, fe=1.0),
+        _result(a, 2.1, 12.1, ph=8.0),
+        _result(a, 4.0, 14.0, ph=9.0, fe=5.0),
+        # Non-primary result in the day-4 bucket: its ICP loses to the primary row
+        _result(a, 4.2, 14.2, fe=99.0, primary=False),
+        _result(b, 1.0, None, ph=6.0, fe=2.0),
+        _result(b, 3.0, None, ph=6.5),
+    ])
+    test_db.commit()
+    return test_db
+
+
+def test_union_grid_matches_reporting_view(series_db):
+    series = get_time_series(series_db, ["HPHT_MH_002", "HPHT_MH_001", "NOPE"], ["final_ph", "icp_fe_ppm"],
+                             time_axis="bucket")
+    assert series.experiment_ids == ["HPHT_MH_002", "HPHT_MH_001"] and series.missing_experiments == ["NOPE"]
+    assert series.times.tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert series.values.shape == (2, 2, 5)
+    np.testing.assert_array_equal(series.values[1, 0], [7.0, np.nan, 8.0, np.nan, 9.0])
+    np.testing.assert_array_equal(series.values[1, 1], [1.0, np.nan, np.nan, np.nan, 5.0])
+
+    refresh_reporting_views(series_db.get_bind())
+    view = pd.read_sql(text("SELECT experiment_id, time_post_reaction_bucket_days AS time, final_ph, icp_fe_ppm "
+                            "FROM v_primary_experiment_results"), series_db.get_bind())
+    frame = series.to_frame().pivot_table(index=["experiment_id", "time"], columns="metric", values="value")
+    expected = view.set_index(["experiment_id", "time"]).sort_index()
+    pd.testing.assert_frame_equal(frame.sort_index()[["final_ph", "icp_fe_ppm"]], expected,
+                                  check_names=False, check_dtype=False)
+
+
+def test_regular_grid_interpolation_and_axes(series_db):
+    linear = get_time_series(series_db, ["HPHT_MH_001"], ["final_ph"], grid=1.0)
+    assert linear.times.tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    np.testing.assert_allclose(linear.values[0, 0], [7.0, 7.0 + 1 / 2.1, 7.0 + 2 / 2.1, 8.0 + 0.9 / 1.9, 9.0])
+
+    held = get_time_series(series_db, ["HPHT_MH_001", "HPHT_MH_002"], ["final_ph"], grid=[0.5, 2.5, 5.0],
+                           interpolate="previous")
+    np.testing.assert_array_equal(held.values[:, 0], [[7.0, 8.0, np.nan], [np.nan, 6.0, np.nan]])
+
+    exact = get_time_series(series_db, ["HPHT_MH_002"], ["final_ph"], grid=1.0, interpolate="none")
+    np.testing.assert_array_equal(exact.values[0, 0], [6.0, np.nan, 6.5])
+
+    cumulative = get_time_series(series_db, ["HPHT_MH_001", "HPHT_MH_002"], ["final_ph"], time_axis="cumulative")
+    assert cumulative.times.tolist() == [10.0, 12.1, 14.0]
+    assert np.isnan(cumulative.values[1]).all()
+
+    with pytest.raises(ValueError):
+        get_time_series(series_db, ["HPHT_MH_001"], ["nope"])
+    with pytest.raises(ValueError):
+        get_time_series(series_db, ["HPHT_MH_001"], ["final_ph"], time_axis="wall")
+    assert {"icp_fe_ppm", "final_ph", "h2_micromoles"} <= set(METRICS) and "icp_dilution_factor_ppm" not in METRICS
+
+
+def test_downsampling_and_npz_payload(series_db):
+    fine = get_time_series(series_db, ["HPHT_MH_001"], ["final_ph"], grid=0.01)
+    assert fine.times.size == 401
+    coarse = get_time_series(series_db, ["HPHT_MH_001"], ["final_ph"], grid=0.01, max_points=4)
+    assert coarse.times.size == 4
+    assert coarse.values[0, 0, 0] == pytest.approx(np.mean(fine.values[0, 0, :100]))
+
+    payload = np.load(io.BytesIO(coarse.to_npz()))
+    assert payload["values"].dtype == np.float32 and payload["values"].shape == (1, 1, 4)
+    assert payload["experiment_ids"].tolist() == ["HPHT_MH_001"]
+    assert coarse.to_dict()["values"][0][0][0] == pytest.approx(coarse.values[0, 0, 0])
+
+
+def test_experiment_lookups_are_chunked(series_db, monkeypatch):
+    from functools import partial
+
+    from backend.services import time_series
+    from utils.batching import chunked
+
+    ids, metrics = ["HPHT_MH_002", "HPHT_MH_001"], ["final_ph", "icp_fe_ppm"]
+    expected = get_time_series(series_db, ids, metrics, time_axis="cumulative")
+    # One experiment per IN list: results must match an unchunked lookup
+    monkeypatch.setattr(time_series, "chunked", partial(chunked, size=1))
+    monkeypatch.setattr(time_series, "POINTS_CHUNK_SIZE", 1)
+    chunked_series = get_time_series(series_db, ids, metrics, time_axis="cumulative")
+
+    assert chunked_series.experiment_ids == expected.experiment_ids
+    np.testing.assert_array_equal(chunked_series.times, expected.times)
+    np.testing.assert_array_equal(chunked_series.values, expected.values)
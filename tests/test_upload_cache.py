@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+
+from backend.services.upload_cache import UploadPreviewCache, fingerprint
+
+
+@pytest.fixture
+def cache():
+    return UploadPreviewCache(max_entries=3, max_bytes=1000)
+
+
+def test_identical_bytes_are_parsed_once(cache):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"rows": [1, 2, 3]}
+
+    first = cache.get_or_compute("parser", 1, b"abc", compute)
+    second = cache.get_or_compute("parser", 1, b"abc", compute)
+
+    assert first == second == {"rows": [1, 2, 3]}
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_version_and_params_are_part_of_the_key(cache):
+    cache.get_or_compute("parser", 1, b"abc", lambda: "v1")
+    assert cache.get_or_compute("parser", 2, b"abc", lambda: "v2") == "v2"
+    assert cache.get_or_compute("parser", 1, b"abc", lambda: "h1", params={"header": 1}) == "h1"
+    assert cache.get_or_compute("other", 1, b"abc", lambda: "other") == "other"
+    assert cache.misses == 4
+
+
+def test_cached_values_are_isolated_from_callers(cache):
+    df = cache.get_or_compute("parser", 1, b"abc", lambda: pd.DataFrame({"a": [1, 2]}))
+    df["a"] = [9, 9]
+
+    again = cache.get_or_compute("parser", 1, b"abc", lambda: None)
+    assert again["a"].tolist() == [1, 2]
+
+
+def test_lru_eviction_by_entry_count(cache):
+    for payload in (b"a", b"b", b"c"):
+        cache.get_or_compute("parser", 1, payload, lambda p=payload: p)
+    # Touch "a" so "b" becomes least recently used
+    cache.get_or_compute("parser", 1, b"a", lambda: None)
+    cache.get_or_compute("parser", 1, b"d", lambda: b"d")
+
+    assert len(cache) == 3
+    assert cache.get_or_compute("parser", 1, b"b", lambda: "recomputed") == "recomputed"
+
+
+def test_lru_eviction_by_total_bytes(cache):
+    cache.get_or_compute("parser", 1, b"x" * 600, lambda: 1)
+    cache.get_or_compute("parser", 1, b"y" * 600, lambda: 2)
+
+    assert len(cache) == 1
+    assert cache.total_bytes == 600
+    # Files larger than the whole budget are never stored
+    cache.get_or_compute("parser", 1, b"z" * 2000, lambda: 3)
+    assert cache.total_bytes == 600
+
+
+def test_exceptions_are_not_cached(cache):
+    def boom():
+        raise ValueError("bad file")
+
+    with pytest.raises(ValueError):
+        cache.get_or_compute("parser", 1, b"abc", boom)
+    assert cache.get_or_compute("parser", 1, b"abc", lambda: "ok") == "ok"
+
+
+def test_invalidate_by_file_and_parser(cache):
+    cache.get_or_compute("p1", 1, b"abc", lambda: 1)
+    cache.get_or_compute("p2", 1, b"abc", lambda: 2)
+    cache.get_or_compute("p1", 1, b"def", lambda: 3)
+
+    assert cache.invalidate(file_bytes=b"abc", parser="p1") == 1
+    assert cache.invalidate(file_bytes=b"abc") == 1
+    assert len(cache) == 1
+    assert fingerprint(b"abc") == fingerprint(b"abc") != fingerprint(b"def")
@@ -0,0 +1,156 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from database import SampleInfo, UploadJob, UploadJobStatus
+from backend.services import upload_jobs
+from backend.services.upload_jobs import UploadJobHandler, UploadJobRunner, _outcome
+from utils.progress import track
+
+
+def _apply_create_samples(db, payload, progress, **options):
+    sample_ids = payload.decode().split(",")
+    progress(0.5, "Adding samples")
+    for sid in sample_ids:
+        db.add(SampleInfo(sample_id=sid))
+    return _outcome(created=len(sample_ids), feedbacks=[{"row": i + 2, "sample_id": s} for i, s in enumerate(sample_ids)])
+
+
+def _apply_with_errors(db, payload, progress, **options):
+    db.add(SampleInfo(sample_id="SHOULD_ROLL_BACK"))
+    return _outcome(errors=["Row 2: bad value"])
+
+
+def _apply_crash(db, payload, progress, **options):
+    raise RuntimeError("boom")
+
+
+_halfway = threading.Event()
+_release = threading.Event()
+
+
+def _apply_paused(db, payload, progress, **options):
+    for i in track(range(10), progress):
+        db.add(SampleInfo(sample_id=f"Paused_{i}"))
+        if i == 4:
+            _halfway.set()
+            _release.wait(timeout=30)
+    return _outcome(created=10)
+
+
+def _prepare_upper(file_bytes, progress, **options):
+    return file_bytes.upper()
+
+
+TEST_HANDLERS = {
+    "samples": UploadJobHandler("Samples", _apply_create_samples),
+    "samples_upper": UploadJobHandler("Samples (prepared)", _apply_create_samples, prepare=_prepare_upper),
+    "errors": UploadJobHandler("Errors", _apply_with_errors),
+    "crash": UploadJobHandler("Crash", _apply_crash),
+    "paused": UploadJobHandler("Paused", _apply_paused),
+}
+
+
+@pytest.fixture
+def runner(test_db):
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=test_db.get_bind())
+    job_runner = UploadJobRunner(session_factory=factory, max_workers=1, handlers=TEST_HANDLERS)
+    yield job_runner
+    job_runner.shutdown(wait=True)
+
+
+def test_successful_job_commits_and_persists_feedback(runner, test_db):
+    job_id = runner.submit("samples", b"Rock_A,Rock_B", file_name="samples.csv", submitted_by="tester")
+    job = runner.wait(job_id, timeout=30)
+
+    assert job.status == UploadJobStatus.SUCCEEDED.value
+    assert job.progress == 1.0
+    assert job.summary["created"] == 2
+    assert job.errors == []
+    assert [fb["sample_id"] for fb in job.feedbacks] == ["Rock_A", "Rock_B"]
+    assert job.started_at is not None and job.finished_at is not None
+    assert {s.sample_id for s in test_db.query(SampleInfo).all()} == {"Rock_A", "Rock_B"}
+
+
+def test_prepare_step_output_is_passed_to_apply(runner, test_db):
+    job = runner.wait(runner.submit("samples_upper", b"rock_c"), timeout=30)
+    assert job.status == UploadJobStatus.SUCCEEDED.value
+    assert test_db.query(SampleInfo).filter_by(sample_id="ROCK_C").count() == 1
+
+
+def test_job_with_errors_is_rolled_back(runner, test_db):
+    job = runner.wait(runner.submit("errors", b""), timeout=30)
+
+    assert job.status == UploadJobStatus.FAILED.value
+    assert job.errors == ["Row 2: bad value"]
+    assert test_db.query(SampleInfo).filter_by(sample_id="SHOULD_ROLL_BACK").count() == 0
+
+
+def test_crashing_job_is_marked_failed(runner):
+    job = runner.wait(runner.submit("crash", b""), timeout=30)
+    assert job.status == UploadJobStatus.FAILED.value
+    assert "boom" in job.message
+
+
+def test_unknown_upload_type_rejected(runner):
+    with pytest.raises(ValueError):
+        runner.submit("does_not_exist", b"")
+
+
+def test_only_jobs_of_exited_processes_marked_interrupted_on_startup(test_db):
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    owners = {
+        "legacy": (None, None),
+        "exited": (upload_jobs._HOST, exited.pid),
+        "live": (upload_jobs._HOST, os.getpid()),
+        "other_host": ("another-host", exited.pid),
+    }
+    for name, (host, pid) in owners.items():
+        test_db.add(UploadJob(upload_type=name, status=UploadJobStatus.RUNNING.value, progress=0.4,
+                              owner_host=host, owner_pid=pid))
+    test_db.commit()
+
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=test_db.get_bind())
+    api_runner = UploadJobRunner(session_factory=factory, max_workers=1, handlers=TEST_HANDLERS,
+                                 mark_interrupted=False)
+    assert {j.status for j in api_runner.list_jobs()} == {UploadJobStatus.RUNNING.value}
+    api_runner.shutdown(wait=True)
+
+    fresh_runner = UploadJobRunner(session_factory=factory, max_workers=1, handlers=TEST_HANDLERS)
+    try:
+        statuses = {j.upload_type: j.status for j in fresh_runner.list_jobs()}
+        assert statuses == {
+            "legacy": UploadJobStatus.INTERRUPTED.value,
+            "exited": UploadJobStatus.INTERRUPTED.value,
+            "live": UploadJobStatus.RUNNING.value,
+            "other_host": UploadJobStatus.RUNNING.value,
+        }
+    finally:
+        fresh_runner.shutdown(wait=True)
+
+
+def test_submitted_jobs_record_their_owner(runner):
+    job = runner.wait(runner.submit("samples", b"OWN_1"), timeout=30)
+    assert (job.owner_host, job.owner_pid) == (upload_jobs._HOST, os.getpid())
+
+
+def test_service_progress_is_visible_while_job_writes(runner):
+    job_id = runner.submit("paused", b"")
+    assert _halfway.wait(timeout=30)
+    try:
+        # Reported in memory while the job's write transaction is open
+        running = runner.get_job(job_id)
+        assert running.status == UploadJobStatus.RUNNING.value
+        assert running.message == "Processed 4/10 rows"
+        assert 0.4 < running.progress < 0.95
+        assert runner.list_jobs()[0].progress == running.progress
+    finally:
+        _release.set()
+
+    job = runner.wait(job_id, timeout=30)
+    assert job.status == UploadJobStatus.SUCCEEDED.value and job.progress == 1.0
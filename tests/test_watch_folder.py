@@ -0,0 +1,131 @@
+import datetime
+import hashlib
+import io
+import json
+import os
+import time
+
+import pandas as pd
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from database import PXRFReading, UploadJob
+from backend.services.upload_jobs import UploadJobRunner
+from utils.watch_folder import WatchFolderDaemon, detect_upload_type
+
+
+def _xlsx(rows, header=True):
+    df = pd.DataFrame(rows[1:], columns=rows[0]) if header else pd.DataFrame(rows)
+    buf = io.BytesIO()
+    df.to_excel(buf, index=False, header=header)
+    return buf.getvalue()
+
+
+def _pxrf_bytes(reading_no="2001"):
+    header = ["Reading No", "Fe", "Mg", "Si", "Ni", "Cu", "Mo", "Co", "Al", "Ca", "K", "Au"]
+    return _xlsx([header, [reading_no, 3.1, 1.2, 20.0, 0.1, 0.0, 0.0, 0.0, 5.0, 1.0, 0.5, 0.0]])
+
+
+def test_detect_upload_type_by_signature():
+    icp = b"Header Row 1\nHeader Row 2\nLabel,Element Label,Concentration,Intensity,Type\nX_MH_001_Day3_10x,Fe 238.204,1,2,SAMP\n"
+    assert detect_upload_type("run.csv", icp) == "icp"
+    assert detect_upload_type("readings.xlsx", _pxrf_bytes()) == "pxrf"
+    assert detect_upload_type("scan.xlsx", _xlsx([["Scan Number", "Sample ID", "Rwp", "Quartz [%]"],
+                                                  [1, "20250101_HPHT001_1", 3.2, 40.0]])) == "aeris_xrd"
+    actlabs = [["Report Number", "", ""], ["Report Date", "", ""], ["Sample ID", "FeO", "SiO2"],
+               ["", "%", "%"], ["Detection Limit", "0.01", "0.01"], ["Analysis Method: titration", "", ""],
+               ["Rock_1", 12.5, 45.0]]
+    assert detect_upload_type("report.xlsx", _xlsx(actlabs, header=False)) == "actlabs_titration"
+    csv = pd.DataFrame(actlabs).to_csv(index=False, header=False).encode()
+    assert detect_upload_type("report.csv", csv) == "actlabs_titration"
+    assert detect_upload_type("notes.xlsx", _xlsx([["Name", "Value"], ["a", 1]])) is None
+    assert detect_upload_type("broken.xlsx", b"PK\x03\x04garbage") is None
+
+
+@pytest.fixture
+def daemon(test_db, tmp_path):
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=test_db.get_bind())
+    runner = UploadJobRunner(session_factory=factory, max_workers=2, mark_interrupted=False)
+    watched = tmp_path / "exports"
+    watched.mkdir()
+    yield WatchFolderDaemon([watched], runner=runner, state_dir=tmp_path / "state", debounce_seconds=5)
+    runner.shutdown(wait=True)
+
+
+def test_debounce_dedupe_and_reports(daemon, test_db):
+    folder = daemon.folders[0]
+    first = folder / "readings.xlsx"
+    first.write_bytes(_pxrf_bytes())
+    (folder / "~$readings.xlsx").write_bytes(b"lock")
+    (folder / "notes.xlsx").write_bytes(_xlsx([["Name", "Value"], ["a", 1]]))
+    t0 = time.monotonic()
+    assert daemon.scan() == 2
+
+    # Not settled yet: the first pass records size/mtime, the debounce has not elapsed
+    assert daemon.ready_files(now=t0) == []
+    assert daemon.ready_files(now=t0 + 1) == []
+    # Rewritten while pending: its debounce restarts, the untouched file settles on time
+    first.write_bytes(_pxrf_bytes())
+    os.utime(first, (1, 1))
+    assert daemon.ready_files(now=t0 + 4) == []
+    ready = daemon.ready_files(now=t0 + 6)
+    assert [p.name for p in ready] == ["notes.xlsx"]
+    ready += daemon.ready_files(now=t0 + 10)
+    assert [p.name for p in ready] == ["notes.xlsx", "readings.xlsx"]
+
+    reports = {p.name: daemon.process(p) for p in ready}
+    assert reports["notes.xlsx"]["status"] == "unrecognised"
+    assert reports["readings.xlsx"]["status"] == "queued" and reports["readings.xlsx"]["upload_type"] == "pxrf"
+
+    job_id = reports["readings.xlsx"]["job_id"]
+    daemon.runner.wait(job_id, timeout=30)
+    finished = daemon.collect()
+    assert [r["status"] for r in finished] == ["succeeded"]
+    assert finished[0]["summary"]["created"] == 1
+    assert test_db.query(PXRFReading).filter_by(reading_no="2001").count() == 1
+
+    # A copy with identical content is skipped; the ledger persists across restarts
+    copy = folder / "readings (copy).xlsx"
+    copy.write_bytes(first.read_bytes())
+    restarted = WatchFolderDaemon(daemon.folders, runner=daemon.runner, state_dir=daemon.state_dir)
+    assert restarted.process(copy)["status"] == "duplicate"
+
+    written = sorted((daemon.state_dir / "reports").glob("*.json"))
+    statuses = sorted(json.loads(p.read_text())["status"] for p in written)
+    assert statuses == ["duplicate", "succeeded", "unrecognised"]
+    ledger = json.loads((daemon.state_dir / "ledger.json").read_text())
+    assert [e["status"] for e in ledger.values()] == ["succeeded"]
+
+
+def test_restart_settles_ledger_entries_left_queued(daemon, test_db):
+    finished_at = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    jobs = {status: UploadJob(upload_type="pxrf", status=status, finished_at=finished_at)
+            for status in ("succeeded", "interrupted")}
+    jobs["running"] = UploadJob(upload_type="pxrf", status="running", owner_pid=os.getpid())
+    test_db.add_all(jobs.values())
+    test_db.commit()
+
+    folder = daemon.folders[0]
+    ledger = {f"hash_{name}": {"file": str(folder / f"{name}.xlsx"), "upload_type": "pxrf",
+                               "job_id": job.id, "status": "queued"} for name, job in jobs.items()}
+    ledger["hash_missing"] = {"file": str(folder / "missing.xlsx"), "job_id": 9999, "status": "running"}
+    (daemon.state_dir / "ledger.json").parent.mkdir(parents=True, exist_ok=True)
+    (daemon.state_dir / "ledger.json").write_text(json.dumps(ledger))
+
+    restarted = WatchFolderDaemon(daemon.folders, runner=daemon.runner, state_dir=daemon.state_dir)
+
+    assert {k: e["status"] for k, e in restarted.ledger.items()} == {
+        "hash_succeeded": "succeeded", "hash_interrupted": "interrupted",
+    }
+    assert json.loads((daemon.state_dir / "ledger.json").read_text()) == restarted.ledger
+
+    # Content whose job never finished is ingested again instead of reported as a duplicate
+    retried = folder / "retried.xlsx"
+    retried.write_bytes(_pxrf_bytes("2002"))
+    digest = hashlib.sha256(retried.read_bytes()).hexdigest()
+    stale = {"file": str(retried), "upload_type": "pxrf", "job_id": 9999, "status": "queued"}
+    (daemon.state_dir / "ledger.json").write_text(json.dumps({digest: stale}))
+    restarted = WatchFolderDaemon(daemon.folders, runner=daemon.runner, state_dir=daemon.state_dir)
+    report = restarted.process(retried)
+    assert report["status"] == "queued"
+    assert restarted.runner.wait(report["job_id"], timeout=30).status == "succeeded"
@@ -0,0 +1,124 @@
+import datetime
+import functools
+import io
+
+import pandas as pd
+
+from database import Experiment, SampleInfo, ExternalAnalysis, XRDAnalysis
+from database.models import XRDPhase
+from database.models.enums import ExperimentStatus
+from backend.services.bulk_uploads import aeris_xrd, actlabs_xrd_report
+from backend.services.bulk_uploads.aeris_xrd import AerisXRDUploadService
+from backend.services.bulk_uploads.actlabs_xrd_report import XRDUploadService
+from utils.batching import chunked
+
+
+def _excel_bytes(rows):
+    buf = io.BytesIO()
+    pd.DataFrame(rows).to_excel(buf, index=False)
+    return buf.getvalue()
+
+
+def _add_experiment(db, experiment_id, number):
+    exp = Experiment(
+        experiment_id=experiment_id,
+        experiment_number=number,
+        date=datetime.date.today(),
+        status=ExperimentStatus.ONGOING,
+    )
+    db.add(exp)
+    db.commit()
+    return exp
+
+
+def _aeris_rows(quartz_first_scan, quartz_second_scan):
+    return [
+        {"Scan Number": 1, "Sample ID": "20260218_HPHT070-d19_01", "Rwp": 5.1,
+         "Quartz [%]": quartz_first_scan, "Calcite [%]": 10.0},
+        {"Scan Number": 2, "Sample ID": "20260218_HPHT070-d19_02", "Rwp": 4.9,
+         "Quartz [%]": quartz_second_scan, "Calcite [%]": None},
+        {"Scan Number": 3, "Sample ID": "20260218_NOPE999-d19_01", "Rwp": 4.9,
+         "Quartz [%]": 1.0, "Calcite [%]": 1.0},
+    ]
+
+
+def test_aeris_multi_scan_upload_then_reupload(test_db):
+    exp = _add_experiment(test_db, "HPHT_070", 70)
+
+    created, updated, skipped, errors = AerisXRDUploadService.bulk_upsert_from_excel(
+        test_db, _excel_bytes(_aeris_rows(40.0, 42.0))
+    )
+    test_db.commit()
+
+    # Second scan of the same (experiment, day, mineral) updates the first
+    assert (created, updated, skipped) == (2, 1, 0)
+    assert len(errors) == 1 and "NOPE999" in errors[0]
+    phases = {p.mineral_name: p for p in test_db.query(XRDPhase).all()}
+    assert set(phases) == {"Quartz", "Calcite"}
+    assert phases["Quartz"].amount == 42.0
+    assert phases["Quartz"].rwp == 4.9
+    assert phases["Quartz"].experiment_fk == exp.id
+    assert phases["Quartz"].experiment_id == "HPHT_070"
+    assert phases["Quartz"].time_post_reaction_days == 19
+
+    created, updated, skipped, errors = AerisXRDUploadService.bulk_upsert_from_excel(
+        test_db, _excel_bytes(_aeris_rows(30.0, 31.0)), overwrite_existing=False
+    )
+    test_db.commit()
+    assert (created, updated, skipped) == (0, 0, 3)
+    test_db.expire_all()
+    assert test_db.query(XRDPhase).filter_by(mineral_name="Quartz").one().amount == 42.0
+
+
+def test_actlabs_xrd_upload_creates_then_updates(test_db):
+    test_db.add_all([SampleInfo(sample_id="Rock_1"), SampleInfo(sample_id="Rock_2")])
+    test_db.commit()
+
+    rows = [
+        {"sample_id": "Rock_1", "Quartz": 60.0, "Olivine": 40.0},
+        {"sample_id": "Rock_2", "Quartz": 10.0, "Olivine": None},
+        {"sample_id": "Missing", "Quartz": 1.0, "Olivine": 1.0},
+    ]
+    result = XRDUploadService.bulk_upsert_from_excel(test_db, _excel_bytes(rows))
+    test_db.commit()
+    created_ext, updated_ext, created_json, updated_json, created_phase, updated_phase, skipped, errors = result
+    assert (created_ext, updated_ext, created_json, updated_json) == (2, 0, 2, 0)
+    assert (created_phase, updated_phase, skipped) == (3, 0, 0)
+    assert len(errors) == 1 and "Missing" in errors[0]
+
+    rows[0]["Quartz"] = 55.0
+    result = XRDUploadService.bulk_upsert_from_excel(test_db, _excel_bytes(rows[:1]))
+    test_db.commit()
+    assert result[:6] == (0, 1, 0, 1, 0, 2)
+
+    test_db.expire_all()
+    quartz = test_db.query(XRDPhase).filter_by(sample_id="Rock_1", mineral_name="Quartz").one()
+    assert quartz.amount == 55.0
+    ext = test_db.query(ExternalAnalysis).filter_by(sample_id="Rock_1", analysis_type="XRD").one()
+    assert quartz.external_analysis_id == ext.id
+    assert test_db.query(XRDAnalysis).filter_by(external_analysis_id=ext.id).one().mineral_phases == {
+        "quartz": 55.0, "olivine": 40.0,
+    }
+    assert test_db.get(SampleInfo, "Rock_1").characterized is True
+
+
+def test_xrd_lookups_are_chunked(test_db, monkeypatch):
+    # One ID per IN list: results must match an unchunked lookup
+    monkeypatch.setattr(aeris_xrd, "chunked", functools.partial(chunked, size=1))
+    monkeypatch.setattr(actlabs_xrd_report, "chunked", functools.partial(chunked, size=1))
+    for n in (70, 71, 72):
+        _add_experiment(test_db, f"HPHT_{n:03d}", n)
+    test_db.add_all([SampleInfo(sample_id=f"Rock_{n}") for n in range(3)])
+    test_db.commit()
+
+    aeris_rows = [{"Scan Number": n, "Sample ID": f"20260218_HPHT{n:03d}-d7_01", "Rwp": 5.0, "Quartz [%]": float(n)}
+                  for n in (70, 71, 72)]
+    assert AerisXRDUploadService.bulk_upsert_from_excel(test_db, _excel_bytes(aeris_rows))[:3] == (3, 0, 0)
+    actlabs_rows = [{"sample_id": f"Rock_{n}", "Quartz": 10.0 + n} for n in range(3)]
+    assert XRDUploadService.bulk_upsert_from_excel(test_db, _excel_bytes(actlabs_rows))[4:6] == (3, 0)
+    test_db.commit()
+
+    assert AerisXRDUploadService.bulk_upsert_from_excel(test_db, _excel_bytes(aeris_rows))[:3] == (0, 3, 0)
+    assert XRDUploadService.bulk_upsert_from_excel(test_db, _excel_bytes(actlabs_rows))[:6] == (0, 3, 0, 3, 0, 3)
+    test_db.commit()
+    assert test_db.query(XRDPhase).count() == 6
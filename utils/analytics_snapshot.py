@@ -0,0 +1,636 @@
+"""
+Analysis-ready Parquet snapshot of results for Power BI and notebooks.
+
+Builds flattened, typed Parquet datasets from the reporting view and the
+result tables so heavy analyst queries read files instead of competing with
+lab users for the production SQLite database:
+
+    primary_results   v_primary_experiment_results + experiment type/sample/status
+    conditions        one row per experiment: experiment + conditions + additive summary
+    additives         one row per chemical additive with compound details
+    icp               one row per ICP result (fixed element columns) with its timepoint
+    icp_elements      long format: one row per ICP result and element (all_elements JSON)
+    xrd               one row per XRD mineral phase (xrd_phases)
+    pxrf              one row per pXRF reading
+
+Layout (Hive-style partitions, readable with pyarrow.dataset, pandas,
+DuckDB, Spark or Power BI's folder connector)::
+
+    <root>/<dataset>/experiment_type=HPHT/month=2025-03/part-0.parquet
+    <root>/<dataset>/_keys.parquet          key -> partition index
+    <root>/_snapshot_state.json             watermark and column signature per dataset
+
+Experiment datasets are partitioned by experiment type and the month of the
+experiment date; pXRF readings are not tied to an experiment and are
+partitioned by ingest month only. Partition columns live in the directory
+names, not in the files.
+
+Incremental runs only re-read rows whose ``updated_at`` (or ``created_at`` for
+never-updated rows) on any contributing table is at or after the last run's
+watermark, plus rows that are new or have disappeared since (found by
+comparing keys with ``_keys.parquet``). Only the partitions those rows were
+in or move to are rewritten. A full rebuild runs when a dataset has no
+snapshot yet, its columns changed, ``--full`` is passed, or the last full
+build is older than FULL_REBUILD_INTERVAL (catches changes that bump no
+timestamp, e.g. a deleted additive).
+
+Usage (from project root):
+    python -m utils.analytics_snapshot
+    python -m utils.analytics_snapshot --full
+    python -m utils.analytics_snapshot --datasets primary_results icp --output D:/bi/snapshot
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+
+# Add project root so "database" and "config" resolve
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection, Engine
+
+from database import Experiment, ExperimentalConditions, ChemicalAdditive, ICPResults, XRDPhase, PXRFReading
+from utils.database_export import CHUNK_ROWS, arrow_type, export_type, to_export_value
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+SNAPSHOT_DIR = Path(os.environ.get("ANALYTICS_SNAPSHOT_DIR", PROJECT_ROOT / "analytics_snapshot"))
+STATE_FILE_NAME = "_snapshot_state.json"
+KEY_INDEX_NAME = "_keys.parquet"
+PART_FILE_NAME = "part-0.parquet"
+STATE_VERSION = 1
+
+CHANGED_AT = "source_updated_at"
+# Same marker pyarrow/Hive use for NULL partition values
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+FULL_REBUILD_INTERVAL = timedelta(days=7)
+# More unindexed keys than this and an incremental run rebuilds instead
+MAX_MISSING_KEYS = 10000
+
+
+# ---------------------------------------------------------------------------
+# Dataset definitions
+# ---------------------------------------------------------------------------
+
+class Dataset(NamedTuple):
+    name: str
+    key: str
+    columns: Callable[[Connection], List[Tuple[str, str, sa.types.TypeEngine]]]  # (SQL expr, name, type)
+    from_sql: str
+    changed_at: Tuple[str, ...]  # SQL timestamp expressions; the newest marks the row changed
+    partitions: Tuple[Tuple[str, str], ...]  # (SQL expr, partition name)
+
+
+def _model_columns(model, alias: str, rename: dict = None, skip: Iterable[str] = ()):
+    """Select-list entries for a model's columns. Enums (as their values) and JSON are exported as text."""
+    rename = rename or {}
+    skip = set(skip)
+    columns = []
+    for col in model.__table__.columns:
+        if col.name in skip:
+            continue
+        expr, col_type = f'{alias}."{col.name}"', col.type
+        if isinstance(col_type, sa.Enum) and col_type.enum_class is not None:
+            # Enums are stored by name; map in SQL so unknown legacy values pass through
+            cases = " ".join(f"WHEN '{m.name}' THEN '{m.value}'" for m in col_type.enum_class)
+            expr = f"CASE {expr} {cases} ELSE {expr} END"
+        if isinstance(col_type, (sa.Enum, sa.JSON)):
+            col_type = sa.String()
+        columns.append((expr, rename.get(col.name, col.name), col_type))
+    return columns
+
+
+def _stamp(alias: str, *columns: str) -> str:
+    columns = columns or ("updated_at", "created_at")
+    return f"COALESCE({', '.join(f'{alias}.{c}' for c in columns)}, '')"
+
+
+_EXPERIMENT_TYPE = ("ec.experiment_type", "experiment_type")
+_EXPERIMENT_MONTH = ("strftime('%Y-%m', COALESCE(e.date, e.created_at))", "month")
+_TIMESTAMPS = ("created_at", "updated_at")
+
+
+def _primary_results_columns(conn: Connection):
+    overrides = {"has_h2_measurement": sa.Boolean()}
+    columns = []
+    for col in sa.inspect(conn).get_columns("v_primary_experiment_results"):
+        col_type = overrides.get(col["name"], col["type"])
+        if isinstance(col_type, sa.types.NullType):
+            col_type = sa.String()
+        columns.append((f'v."{col["name"]}"', col["name"], col_type))
+    return columns + [
+        ('e."sample_id"', "sample_id", sa.String()),
+        ('e."status"', "experiment_status", sa.String()),
+        ('e."date"', "experiment_date", sa.DateTime()),
+    ]
+
+
+def _conditions_columns(conn: Connection):
+    return (
+        _model_columns(Experiment, "e", rename={"id": "experiment_fk", "date": "experiment_date"}, skip=_TIMESTAMPS)
+        + _model_columns(ExperimentalConditions, "ec", skip=(
+            "id", "experiment_id", "experiment_fk", "experiment_type", *_TIMESTAMPS))
+        + [
+            ("s.additives_summary", "additives_summary", sa.String()),
+            ("(SELECT COUNT(*) FROM chemical_additives a WHERE a.experiment_id = ec.id)", "additive_count", sa.Integer()),
+        ]
+    )
+
+
+def _additives_columns(conn: Connection):
+    return (
+        _model_columns(ChemicalAdditive, "a", rename={"id": "additive_id", "experiment_id": "conditions_id"},
+                       skip=_TIMESTAMPS)
+        + [
+            ("c.name", "compound_name", sa.String()),
+            ("c.formula", "compound_formula", sa.String()),
+            ("c.molecular_weight_g_mol", "molecular_weight_g_mol", sa.Float()),
+            ("e.id", "experiment_fk", sa.Integer()),
+            ("e.experiment_id", "experiment_id", sa.String()),
+        ]
+    )
+
+
+_RESULT_TIMEPOINT_COLUMNS = [
+    ("er.experiment_fk", "experiment_fk", sa.Integer()),
+    ("e.experiment_id", "experiment_id", sa.String()),
+    ("er.time_post_reaction_days", "time_post_reaction_days", sa.Float()),
+    ("er.time_post_reaction_bucket_days", "time_post_reaction_bucket_days", sa.Float()),
+    ("er.cumulative_time_post_reaction_days", "cumulative_time_post_reaction_days", sa.Float()),
+    ("er.is_primary_timepoint_result", "is_primary_timepoint_result", sa.Boolean()),
+]
+
+
+def _icp_columns(conn: Connection):
+    return (
+        _model_columns(ICPResults, "icp", rename={"id": "icp_result_id"},
+                       skip=("all_elements", "detection_limits", *_TIMESTAMPS))
+        + _RESULT_TIMEPOINT_COLUMNS
+    )
+
+
+def _icp_elements_columns(conn: Connection):
+    return [("icp.id", "icp_result_id", sa.Integer())] + _RESULT_TIMEPOINT_COLUMNS + [
+        ("j.key", "element", sa.String()),
+        ("CAST(j.value AS REAL)", "concentration_ppm", sa.Float()),
+    ]
+
+
+def _xrd_columns(conn: Connection):
+    return _model_columns(XRDPhase, "x", rename={"id": "xrd_phase_id"}, skip=_TIMESTAMPS)
+
+
+def _pxrf_columns(conn: Connection):
+    return _model_columns(PXRFReading, "p", skip=("updated_at",))
+
+
+_RESULT_JOINS = """
+    JOIN experimental_results er ON er.id = icp.result_id
+    JOIN experiments e ON e.id = er.experiment_fk
+    LEFT JOIN experimental_conditions ec ON ec.experiment_fk = e.id
+"""
+
+DATASETS: Dict[str, Dataset] = {d.name: d for d in (
+    Dataset(
+        name="primary_results",
+        key="result_id",
+        columns=_primary_results_columns,
+        from_sql="""v_primary_experiment_results v
+            JOIN experiments e ON e.id = v.experiment_fk
+            JOIN experimental_results er ON er.id = v.result_id
+            LEFT JOIN experimental_conditions ec ON ec.experiment_fk = e.id
+            LEFT JOIN scalar_results sr ON sr.id = v.scalar_result_id
+            LEFT JOIN icp_results icp ON icp.id = v.icp_result_id""",
+        changed_at=(_stamp("e"), _stamp("er"), _stamp("ec"), _stamp("sr", "updated_at"), _stamp("icp")),
+        partitions=(_EXPERIMENT_TYPE, _EXPERIMENT_MONTH),
+    ),
+    Dataset(
+        name="conditions",
+        key="experiment_fk",
+        columns=_conditions_columns,
+        from_sql="""experiments e
+            LEFT JOIN experimental_conditions ec ON ec.experiment_fk = e.id
+            LEFT JOIN v_experiment_additives_summary s ON s.experiment_id = e.experiment_id""",
+        changed_at=(
+            _stamp("e"), _stamp("ec"),
+            "COALESCE((SELECT MAX(COALESCE(a.updated_at, a.created_at)) FROM chemical_additives a"
+            " WHERE a.experiment_id = ec.id), '')",
+        ),
+        partitions=(_EXPERIMENT_TYPE, _EXPERIMENT_MONTH),
+    ),
+    Dataset(
+        name="additives",
+        key="additive_id",
+        columns=_additives_columns,
+        from_sql="""chemical_additives a
+            JOIN experimental_conditions ec ON ec.id = a.experiment_id
+            JOIN experiments e ON e.id = ec.experiment_fk
+            JOIN compounds c ON c.id = a.compound_id""",
+        changed_at=(_stamp("a"), _stamp("ec"), _stamp("e"), _stamp("c")),
+        partitions=(_EXPERIMENT_TYPE, _EXPERIMENT_MONTH),
+    ),
+    Dataset(
+        name="icp",
+        key="icp_result_id",
+        columns=_icp_columns,
+        from_sql=f"icp_results icp {_RESULT_JOINS}",
+        changed_at=(_stamp("icp"), _stamp("er"), _stamp("e"), _stamp("ec")),
+        partitions=(_EXPERIMENT_TYPE, _EXPERIMENT_MONTH),
+    ),
+    Dataset(
+        # Several rows per ICP result; the key identifies the group that is replaced together
+        name="icp_elements",
+        key="icp_result_id",
+        columns=_icp_elements_columns,
+        from_sql=f"icp_results icp {_RESULT_JOINS}"
+                 "    JOIN json_each(icp.all_elements) j ON j.type IN ('integer', 'real')",
+        changed_at=(_stamp("icp"), _stamp("er"), _stamp("e"), _stamp("ec")),
+        partitions=(_EXPERIMENT_TYPE, _EXPERIMENT_MONTH),
+    ),
+    Dataset(
+        name="xrd",
+        key="xrd_phase_id",
+        columns=_xrd_columns,
+        from_sql="""xrd_phases x
+            LEFT JOIN experiments e ON e.id = x.experiment_fk
+            LEFT JOIN experimental_conditions ec ON ec.experiment_fk = e.id""",
+        changed_at=(_stamp("x"), _stamp("e"), _stamp("ec")),
+        partitions=(
+            _EXPERIMENT_TYPE,
+            ("strftime('%Y-%m', COALESCE(e.date, x.measurement_date, x.created_at))", "month"),
+        ),
+    ),
+    Dataset(
+        name="pxrf",
+        key="reading_no",
+        columns=_pxrf_columns,
+        from_sql="pxrf_readings p",
+        changed_at=(_stamp("p", "updated_at", "ingested_at"),),
+        partitions=(("strftime('%Y-%m', p.ingested_at)", "month"),),
+    ),
+)}
+
+
+# ---------------------------------------------------------------------------
+# SQL and typing helpers
+# ---------------------------------------------------------------------------
+
+def _dataset_sql(dataset: Dataset, columns) -> str:
+    """SELECT with the data columns, then CHANGED_AT, then the partition columns."""
+    select = [f'{expr} AS "{name}"' for expr, name, _ in columns]
+    # Multi-argument MAX is scalar in SQLite; the extra '' keeps it scalar for one stamp
+    stamps = ", ".join(dataset.changed_at + ("''",))
+    select.append(f"NULLIF(MAX({stamps}), '') AS \"{CHANGED_AT}\"")
+    select += [f'{expr} AS "{name}"' for expr, name in dataset.partitions]
+    return f"SELECT {', '.join(select)} FROM {dataset.from_sql}"
+
+
+def _output_columns(columns) -> List[Tuple[str, sa.types.TypeEngine]]:
+    return [(name, col_type) for _, name, col_type in columns] + [(CHANGED_AT, sa.DateTime())]
+
+
+def _arrow_schema(output_columns):
+    import pyarrow as pa
+
+    return pa.schema([
+        pa.field(name, arrow_type(export_type(sa.Column(name, col_type))))
+        for name, col_type in output_columns
+    ])
+
+
+def _column_signature(schema) -> List[List[str]]:
+    return [[field.name, str(field.type)] for field in schema]
+
+
+def partition_path(dataset: Dataset, values: Tuple) -> str:
+    """Relative Hive-style partition directory for partition ``values``."""
+    return "/".join(
+        f"{name}={quote(str(value), safe='') if value not in (None, '') else NULL_PARTITION}"
+        for (_, name), value in zip(dataset.partitions, values)
+    )
+
+
+# ---------------------------------------------------------------------------
+# Files
+# ---------------------------------------------------------------------------
+
+def _write_atomic(table, path: Path) -> None:
+    import pyarrow.parquet as pq
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Dot-prefixed so readers listing the dataset skip it while it is written
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def _load_key_index(dataset_dir: Path) -> Dict:
+    import pyarrow.parquet as pq
+
+    path = dataset_dir / KEY_INDEX_NAME
+    if not path.exists():
+        return {}
+    table = pq.read_table(path)
+    return dict(zip(table.column("key").to_pylist(), table.column("partition").to_pylist()))
+
+
+def _save_key_index(dataset_dir: Path, index: Dict, key_type) -> None:
+    import pyarrow as pa
+
+    table = pa.table({
+        "key": pa.array(list(index.keys()), type=key_type),
+        "partition": pa.array(list(index.values()), type=pa.string()),
+    })
+    _write_atomic(table, dataset_dir / KEY_INDEX_NAME)
+
+
+def _rewrite_partition(dataset_dir: Path, part: str, schema, key: str, rows: List[tuple], drop_keys=None) -> int:
+    """
+    Replace a partition file with its rows minus ``drop_keys`` plus ``rows``.
+
+    Returns the partition's row count; an empty partition is removed.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    path = dataset_dir / part / PART_FILE_NAME
+    tables = []
+    if path.exists():
+        existing = pq.read_table(path, schema=schema)
+        if drop_keys is not None and len(drop_keys):
+            existing = existing.filter(pc.invert(pc.is_in(existing.column(key), value_set=drop_keys)))
+        tables.append(existing)
+    if rows:
+        arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+        tables.append(pa.Table.from_arrays(arrays, schema=schema))
+
+    combined = pa.concat_tables(tables) if tables else schema.empty_table()
+    if combined.num_rows == 0:
+        if path.exists():
+            path.unlink()
+            # Remove now-empty partition directories up to the dataset root
+            parent = path.parent
+            while parent != dataset_dir and not any(parent.iterdir()):
+                parent.rmdir()
+                parent = parent.parent
+        return 0
+    _write_atomic(combined.sort_by(key), path)
+    return combined.num_rows
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+def _read_state(root: Path) -> dict:
+    try:
+        state = json.loads((root / STATE_FILE_NAME).read_text())
+    except (OSError, ValueError):
+        return {"version": STATE_VERSION, "datasets": {}}
+    state.setdefault("datasets", {})
+    return state
+
+
+def _write_state(root: Path, state: dict) -> None:
+    root.mkdir(parents=True, exist_ok=True)
+    tmp = root / f".{STATE_FILE_NAME}.tmp"
+    tmp.write_text(json.dumps(state, indent=2, default=str))
+    os.replace(tmp, root / STATE_FILE_NAME)
+
+
+def _build_dataset(conn: Connection, dataset: Dataset, dataset_dir: Path, previous: dict,
+                   full: bool, chunk_size: int) -> Tuple[dict, dict]:
+    """Write one dataset (full or incremental). Returns (summary, new state entry)."""
+    import pyarrow as pa
+
+    columns = dataset.columns(conn)
+    output_columns = _output_columns(columns)
+    schema = _arrow_schema(output_columns)
+    sql = _dataset_sql(dataset, columns)
+    kinds = [export_type(sa.Column(name, col_type)) for name, col_type in output_columns]
+    key_pos = [name for name, _ in output_columns].index(dataset.key)
+    n_out = len(output_columns)
+
+    old_index = {} if full else _load_key_index(dataset_dir)
+    watermark = None if full else previous.get("watermark")
+
+    # One pass over keys and change stamps finds changed, new and vanished rows
+    current = {}
+    for key_value, stamp in conn.execute(sa.text(f'SELECT "{dataset.key}", "{CHANGED_AT}" FROM ({sql})')):
+        if key_value not in current or (stamp is not None and (current[key_value] or "") < stamp):
+            current[key_value] = stamp
+    deleted = set(old_index) - set(current)
+    missing = [k for k in current if k not in old_index]
+    if not full and len(missing) > MAX_MISSING_KEYS:
+        logger.info(f"{dataset.name}: {len(missing)} unindexed rows; rebuilding instead")
+        return _build_dataset(conn, dataset, dataset_dir, previous, True, chunk_size)
+
+    if full or watermark is None:
+        changed = set(current)
+    else:
+        # Rows stamped exactly at the watermark may have been written after the last
+        # pass (timestamps have one-second resolution); those already seen are skipped
+        seen = set(previous.get("watermark_keys") or [])
+        changed = set(missing) | {
+            k for k, stamp in current.items()
+            if stamp is not None and (stamp > watermark or (stamp == watermark and k not in seen))
+        }
+    stamps = [stamp for stamp in current.values() if stamp is not None]
+    new_watermark = max(stamps) if stamps else watermark
+    watermark_keys = [k for k, stamp in current.items() if stamp is not None and stamp == new_watermark]
+
+    order = ", ".join(f'"{name}"' for _, name in dataset.partitions) + f', "{dataset.key}"'
+    typed = [sa.column(name, col_type) for name, col_type in output_columns]
+    typed += [sa.column(name, sa.String()) for _, name in dataset.partitions]
+    if full:
+        query = sa.text(f"SELECT * FROM ({sql}) ORDER BY {order}")
+        params = {}
+    else:
+        query = sa.text(
+            f'SELECT * FROM ({sql}) WHERE "{CHANGED_AT}" > :watermark OR "{dataset.key}" IN :keys '
+            f"ORDER BY {order}"
+        ).bindparams(sa.bindparam("keys", expanding=True))
+        # Changed rows not caught by "> watermark": new keys and unseen rows at the watermark
+        keys = [k for k in changed if current[k] is None or current[k] <= watermark]
+        params = {"watermark": watermark, "keys": keys}
+    query = query.columns(*typed)
+
+    key_type = schema.field(dataset.key).type
+    drop_keys = changed | deleted
+    drop_array = pa.array(list(drop_keys), type=key_type)
+    # Partitions that lose rows: where changed rows used to be (e.g. experiment type edited) and deletions
+    affected = {old_index[k] for k in drop_keys if k in old_index}
+    # Changed keys are re-added by flush() wherever their rows are written
+    index = {k: part for k, part in old_index.items() if k not in drop_keys}
+    written = set()
+    late = set()  # rows changed between the key pass and the row pass
+
+    def flush(part, rows):
+        _rewrite_partition(dataset_dir, part, schema, dataset.key, rows, drop_array if old_index else None)
+        written.add(part)
+        for row in rows:
+            index[row[key_pos]] = part
+
+    # Rows arrive ordered by partition, so only one partition is held in memory at a time
+    result = conn.execution_options(yield_per=chunk_size).execute(query, params)
+    try:
+        group_part, group_rows = None, []
+        for chunk in result.partitions(chunk_size):
+            for row in chunk:
+                values = tuple(row)
+                record = tuple(to_export_value(v, kind) for v, kind in zip(values[:n_out], kinds))
+                part = partition_path(dataset, values[n_out:])
+                if part != group_part:
+                    if group_part is not None:
+                        flush(group_part, group_rows)
+                    group_part, group_rows = part, []
+                if record[key_pos] not in drop_keys:
+                    late.add(record[key_pos])
+                    drop_keys.add(record[key_pos])
+                    drop_array = pa.array(list(drop_keys), type=key_type)
+                group_rows.append(record)
+        if group_part is not None:
+            flush(group_part, group_rows)
+    finally:
+        result.close()
+
+    for part in sorted(affected - written):
+        flush(part, [])
+    # A late row that moved partition leaves a stale copy where it used to be
+    for part in sorted({old_index[k] for k in late if k in old_index and old_index[k] != index.get(k)}):
+        stale = [k for k in late if old_index.get(k) == part and index.get(k) != part]
+        _rewrite_partition(dataset_dir, part, schema, dataset.key, [], pa.array(stale, type=key_type))
+        affected.add(part)
+
+    _save_key_index(dataset_dir, index, key_type)
+    now = datetime.now(timezone.utc).isoformat()
+    entry = {
+        "watermark": new_watermark,
+        "watermark_keys": watermark_keys,
+        "columns": _column_signature(schema),
+        "rows": len(index),
+        "last_run": now,
+        "last_full_build": now if full else previous.get("last_full_build"),
+    }
+    summary = {
+        "mode": "full" if full else "incremental",
+        "changed": len(changed | late),
+        "deleted": len(deleted),
+        "partitions_written": len(written | affected),
+        "rows": len(index),
+    }
+    return summary, entry
+
+
+def _needs_full_build(dataset: Dataset, dataset_dir: Path, previous: Optional[dict], conn: Connection,
+                      full_rebuild_interval: Optional[timedelta]) -> bool:
+    if not previous or not dataset_dir.exists() or not (dataset_dir / KEY_INDEX_NAME).exists():
+        return True
+    if previous.get("columns") != _column_signature(_arrow_schema(_output_columns(dataset.columns(conn)))):
+        return True
+    if full_rebuild_interval is not None:
+        last_full = previous.get("last_full_build")
+        if not last_full or datetime.fromisoformat(last_full) < datetime.now(timezone.utc) - full_rebuild_interval:
+            return True
+    return False
+
+
+def build_snapshot(
+    root: str | Path = SNAPSHOT_DIR,
+    datasets: Optional[Iterable[str]] = None,
+    full: bool = False,
+    bind: Optional[Engine] = None,
+    chunk_size: int = CHUNK_ROWS,
+    full_rebuild_interval: Optional[timedelta] = FULL_REBUILD_INTERVAL,
+) -> Dict[str, dict]:
+    """
+    Build or incrementally update the analytics snapshot.
+
+    Args:
+        root: Snapshot directory
+        datasets: Dataset names to build (default: all, see DATASETS)
+        full: Rebuild every selected dataset from scratch
+        bind: Engine to read from (default: the application engine)
+        chunk_size: Rows fetched per chunk
+        full_rebuild_interval: Rebuild a dataset whose last full build is older
+            than this (None to never force one)
+
+    Returns:
+        dict: Per dataset: mode, changed, deleted, partitions_written, rows.
+    """
+    names = list(datasets) if datasets else list(DATASETS)
+    unknown = [n for n in names if n not in DATASETS]
+    if unknown:
+        raise ValueError(f"Unknown dataset(s): {', '.join(unknown)}. Available: {', '.join(DATASETS)}")
+    if bind is None:
+        from database.database import engine as bind
+
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    state = _read_state(root)
+    summaries = {}
+
+    with bind.connect() as conn:
+        for name in names:
+            dataset = DATASETS[name]
+            dataset_dir = root / name
+            previous = state["datasets"].get(name)
+            rebuild = full or _needs_full_build(dataset, dataset_dir, previous, conn, full_rebuild_interval)
+
+            if rebuild:
+                # Build next to the live dataset and swap, so readers never see a half-built one
+                building = root / f".{name}.building"
+                shutil.rmtree(building, ignore_errors=True)
+                summary, entry = _build_dataset(conn, dataset, building, previous or {}, True, chunk_size)
+                old = root / f".{name}.old"
+                shutil.rmtree(old, ignore_errors=True)
+                if dataset_dir.exists():
+                    os.replace(dataset_dir, old)
+                os.replace(building, dataset_dir)
+                shutil.rmtree(old, ignore_errors=True)
+            else:
+                summary, entry = _build_dataset(conn, dataset, dataset_dir, previous, False, chunk_size)
+
+            state["datasets"][name] = entry
+            _write_state(root, state)
+            summaries[name] = summary
+            logger.info(
+                f"Snapshot {name} ({summary['mode']}): {summary['changed']} changed, "
+                f"{summary['deleted']} deleted, {summary['partitions_written']} partition(s) written"
+            )
+
+    return summaries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the partitioned Parquet analytics snapshot.")
+    parser.add_argument("-o", "--output", default=str(SNAPSHOT_DIR),
+                        help=f"Snapshot directory (default: {SNAPSHOT_DIR})")
+    parser.add_argument("--datasets", nargs="+", choices=list(DATASETS), default=None,
+                        help="Only build these datasets")
+    parser.add_argument("--full", action="store_true", help="Rebuild from scratch instead of appending changes")
+    args = parser.parse_args()
+
+    summaries = build_snapshot(args.output, datasets=args.datasets, full=args.full)
+    for name, s in summaries.items():
+        print(f"{name:16s} {s['mode']:11s} changed={s['changed']:<7} deleted={s['deleted']:<5} "
+              f"partitions={s['partitions_written']:<4} rows={s['rows']}")
+
+
+if __name__ == "__main__":
+    main()
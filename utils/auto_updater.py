@@ -26,7 +26,6 @@ import argparse
 import subprocess
 from pathlib import Path
 from datetime import datetime
-from contextlib import contextmanager
 
 # ---------------------------------------------------------------------------
 # Path bootstrap – ensure project root is importable
@@ -37,6 +36,8 @@ os.chdir(PROJECT_ROOT)
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
+from utils.file_lock import file_lock
+
 # ---------------------------------------------------------------------------
 # Logging
 # ---------------------------------------------------------------------------
@@ -136,40 +137,12 @@ def _resolve_python_executable() -> str:
     )
 
 
-@contextmanager
 def _file_lock():
     """
-    Simple file-based lock to prevent concurrent update processes.
+    File-based lock to prevent concurrent update processes.
     The lock file stores the PID so stale locks can be detected.
     """
-    if LOCK_FILE.exists():
-        try:
-            stale_pid = int(LOCK_FILE.read_text().strip())
-            # On Windows, check if the process is still running
-            result = subprocess.run(
-                ["tasklist", "/FI", f"PID eq {stale_pid}"],
-                capture_output=True, text=True,
-            )
-            if str(stale_pid) in result.stdout:
-                raise RuntimeError(
-                    f"Another update process is already running (PID {stale_pid}). "
-                    f"If this is stale, delete {LOCK_FILE}"
-                )
-            else:
-                logger.warning(
-                    f"Removing stale lock file from PID {stale_pid} (process no longer running)"
-                )
-                LOCK_FILE.unlink()
-        except ValueError:
-            logger.warning("Lock file exists but contains invalid PID – removing")
-            LOCK_FILE.unlink()
-
-    LOCK_FILE.write_text(str(os.getpid()))
-    try:
-        yield
-    finally:
-        if LOCK_FILE.exists():
-            LOCK_FILE.unlink(missing_ok=True)
+    return file_lock(LOCK_FILE)
 
 
 def _has_local_changes() -> bool:
@@ -228,13 +201,12 @@ def create_pre_update_backup() -> str | None:
 def restore_backup(backup_path: str) -> None:
     """Restore a database backup file to the original database location."""
     try:
-        from config.config import DATABASE_URL
-        from utils.database_backup import _get_source_db_path
+        from utils.database_backup import _get_source_db_path, restore_database_backup
 
         db_path = _get_source_db_path()
         if db_path and backup_path:
             logger.warning(f"Restoring database from backup: {backup_path}")
-            shutil.copy2(backup_path, db_path)
+            restore_database_backup(backup_path, db_path)
             logger.info("Database restored successfully")
     except Exception as e:
         logger.error(f"CRITICAL: Failed to restore database backup: {e}")
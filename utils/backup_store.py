@@ -0,0 +1,369 @@
+"""
+Incremental, deduplicated backup store for the SQLite database.
+
+Each snapshot takes a consistent copy of the live database with the online
+backup API (see database_backup.sqlite_online_backup), splits it into
+fixed-size page chunks and stores every chunk once under its SHA-256 hash,
+compressed with zstd when the ``zstandard`` package is installed and gzip
+otherwise. A JSON manifest per snapshot lists the chunk hashes in order, so a
+snapshot only costs the chunks that changed since the previous one.
+
+Layout under the store root::
+
+    chunks/<hh>/<sha256>.zst|.gz   compressed chunk content
+    snapshots/<snapshot_id>.json   manifest (ordered chunk list + metadata)
+
+Snapshots can be restored by id or "as of" a point in time, and
+``apply_retention`` thins them to hourly/daily/weekly buckets before garbage
+collecting chunks no manifest references any more.
+"""
+import os
+import sys
+import gzip
+import json
+import hashlib
+import logging
+import sqlite3
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to sys.path to allow for absolute imports from the project root
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.database_backup import (
+    _get_source_db_path,
+    sqlite_online_backup,
+    verify_sqlite_database,
+    restore_database_backup,
+)
+from config.storage import get_storage_config
+
+try:
+    import zstandard
+except ImportError:  # optional dependency; gzip is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Pages per chunk. With SQLite's default 4 KiB pages this is 1 MiB chunks:
+# small enough that a few edited rows only re-store a few chunks.
+PAGES_PER_CHUNK = int(os.environ.get("BACKUP_STORE_PAGES_PER_CHUNK", "256"))
+
+SNAPSHOT_ID_FORMAT = "%Y%m%dT%H%M%S_%f"
+MANIFEST_VERSION = 1
+
+
+def _default_store_dir() -> Path:
+    config = get_storage_config()
+    if 'backup_directory' not in config:
+        raise ValueError("Backup directory not configured in storage config")
+    return Path(config['backup_directory']) / "store"
+
+
+def _compress(data: bytes) -> tuple:
+    if zstandard is not None:
+        return "zst", zstandard.ZstdCompressor(level=3).compress(data)
+    return "gz", gzip.compress(data, compresslevel=6)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zst":
+        if zstandard is None:
+            raise RuntimeError("Chunk is zstd-compressed but the 'zstandard' package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class BackupStore:
+    """Content-addressed snapshot store rooted at ``root``."""
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root is not None else _default_store_dir()
+        self.chunks_dir = self.root / "chunks"
+        self.snapshots_dir = self.root / "snapshots"
+
+    # ------------------------------------------------------------------
+    # Chunks
+    # ------------------------------------------------------------------
+
+    def _chunk_paths(self, digest: str) -> list:
+        base = self.chunks_dir / digest[:2]
+        return [base / f"{digest}.zst", base / f"{digest}.gz"]
+
+    def _has_chunk(self, digest: str) -> bool:
+        return any(p.exists() for p in self._chunk_paths(digest))
+
+    def _write_chunk(self, digest: str, data: bytes) -> int:
+        """Store a chunk if it is new; return the bytes written."""
+        if self._has_chunk(digest):
+            return 0
+        codec, payload = _compress(data)
+        path = self.chunks_dir / digest[:2] / f"{digest}.{codec}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(payload)
+        os.replace(tmp, path)
+        return len(payload)
+
+    def _read_chunk(self, digest: str) -> bytes:
+        for path in self._chunk_paths(digest):
+            if path.exists():
+                data = _decompress(path.suffix.lstrip("."), path.read_bytes())
+                if hashlib.sha256(data).hexdigest() != digest:
+                    raise RuntimeError(f"Chunk {digest} is corrupt")
+                return data
+        raise FileNotFoundError(f"Chunk {digest} missing from backup store")
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def create_snapshot(self, source_path=None, label: str = None) -> dict:
+        """
+        Snapshot the database and store only chunks not already present.
+
+        Args:
+            source_path (optional): Database to snapshot. Defaults to the DATABASE_URL file.
+            label (str, optional): Free-text note saved in the manifest.
+
+        Returns:
+            dict: The snapshot manifest.
+        """
+        if source_path is None:
+            source_path = _get_source_db_path()
+        source_path = Path(source_path)
+
+        self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+        created_at = datetime.now()
+        snapshot_id = created_at.strftime(SNAPSHOT_ID_FORMAT)
+
+        with tempfile.TemporaryDirectory(dir=self.root) as tmp_dir:
+            copy_path = Path(tmp_dir) / source_path.name
+            sqlite_online_backup(source_path, copy_path)
+
+            conn = sqlite3.connect(str(copy_path))
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            conn.close()
+            chunk_size = page_size * PAGES_PER_CHUNK
+
+            chunks = []
+            new_chunks = bytes_written = size = 0
+            whole = hashlib.sha256()
+            with open(copy_path, "rb") as f:
+                while True:
+                    data = f.read(chunk_size)
+                    if not data:
+                        break
+                    digest = hashlib.sha256(data).hexdigest()
+                    written = self._write_chunk(digest, data)
+                    if written:
+                        new_chunks += 1
+                        bytes_written += written
+                    whole.update(data)
+                    size += len(data)
+                    chunks.append(digest)
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "snapshot_id": snapshot_id,
+            "created_at": created_at.isoformat(),
+            "source": str(source_path),
+            "label": label,
+            "page_size": page_size,
+            "chunk_size": chunk_size,
+            "size": size,
+            "sha256": whole.hexdigest(),
+            "chunks": chunks,
+            "new_chunks": new_chunks,
+            "stored_bytes": bytes_written,
+        }
+        manifest_path = self.snapshots_dir / f"{snapshot_id}.json"
+        tmp = manifest_path.with_name(manifest_path.name + ".tmp")
+        tmp.write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp, manifest_path)
+
+        logger.info(
+            f"Snapshot {snapshot_id} stored: {len(chunks)} chunks, {new_chunks} new "
+            f"({bytes_written} bytes written)"
+        )
+        return manifest
+
+    def list_snapshots(self) -> list:
+        """Return all manifests, oldest first."""
+        if not self.snapshots_dir.exists():
+            return []
+        manifests = [json.loads(p.read_text()) for p in self.snapshots_dir.glob("*.json")]
+        return sorted(manifests, key=lambda m: m["created_at"])
+
+    def get_snapshot(self, snapshot_id: str) -> dict:
+        path = self.snapshots_dir / f"{snapshot_id}.json"
+        if not path.exists():
+            raise FileNotFoundError(f"Snapshot not found: {snapshot_id}")
+        return json.loads(path.read_text())
+
+    def snapshot_as_of(self, when: datetime) -> dict:
+        """Return the latest snapshot taken at or before ``when``."""
+        candidates = [m for m in self.list_snapshots() if datetime.fromisoformat(m["created_at"]) <= when]
+        if not candidates:
+            raise FileNotFoundError(f"No snapshot at or before {when.isoformat()}")
+        return candidates[-1]
+
+    def materialize(self, snapshot_id: str, dest_path) -> Path:
+        """
+        Rebuild a snapshot into a standalone database file at ``dest_path``.
+
+        The rebuilt file is checked against the manifest hash and with
+        PRAGMA integrity_check before being moved into place.
+        """
+        manifest = self.get_snapshot(snapshot_id)
+        dest_path = Path(dest_path)
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest_path.with_name(dest_path.name + ".partial")
+
+        whole = hashlib.sha256()
+        try:
+            with open(tmp, "wb") as f:
+                for digest in manifest["chunks"]:
+                    data = self._read_chunk(digest)
+                    whole.update(data)
+                    f.write(data)
+            if whole.hexdigest() != manifest["sha256"]:
+                raise RuntimeError(f"Snapshot {snapshot_id} failed checksum verification")
+            verify_sqlite_database(tmp)
+            os.replace(tmp, dest_path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        return dest_path
+
+    def restore(self, snapshot_id: str = None, as_of: datetime = None, db_path=None) -> Path:
+        """
+        Restore the live database to a snapshot, chosen by id or as of a point in time.
+
+        Args:
+            snapshot_id (str, optional): Snapshot to restore.
+            as_of (datetime, optional): Restore the latest snapshot at or before this time.
+            db_path (optional): Database to overwrite. Defaults to the DATABASE_URL file.
+
+        Returns:
+            Path: The restored database path.
+        """
+        if snapshot_id is None:
+            if as_of is None:
+                raise ValueError("Provide snapshot_id or as_of")
+            snapshot_id = self.snapshot_as_of(as_of)["snapshot_id"]
+
+        with tempfile.TemporaryDirectory(dir=self.root) as tmp_dir:
+            rebuilt = self.materialize(snapshot_id, Path(tmp_dir) / "restore.db")
+            logger.warning(f"Restoring database from snapshot {snapshot_id}")
+            return restore_database_backup(rebuilt, db_path)
+
+    # ------------------------------------------------------------------
+    # Retention
+    # ------------------------------------------------------------------
+
+    def apply_retention(self, keep_hourly: int = 24, keep_daily: int = 14, keep_weekly: int = 8) -> list:
+        """
+        Thin snapshots to the newest one per hour/day/ISO week for the most
+        recent ``keep_*`` buckets of each kind, then delete unreferenced chunks.
+
+        The newest snapshot is always kept.
+
+        Returns:
+            list: The snapshot ids that were removed.
+        """
+        manifests = list(reversed(self.list_snapshots()))  # newest first
+        if not manifests:
+            return []
+
+        keep = {manifests[0]["snapshot_id"]}
+        for limit, bucket in (
+            (keep_hourly, lambda d: (d.year, d.month, d.day, d.hour)),
+            (keep_daily, lambda d: (d.year, d.month, d.day)),
+            (keep_weekly, lambda d: d.isocalendar()[:2]),
+        ):
+            seen = set()
+            for m in manifests:
+                key = bucket(datetime.fromisoformat(m["created_at"]))
+                if key in seen:
+                    continue
+                if len(seen) >= limit:
+                    break
+                seen.add(key)
+                keep.add(m["snapshot_id"])
+
+        removed = []
+        for m in manifests:
+            if m["snapshot_id"] not in keep:
+                (self.snapshots_dir / f"{m['snapshot_id']}.json").unlink()
+                removed.append(m["snapshot_id"])
+                logger.info(f"Removed snapshot: {m['snapshot_id']}")
+
+        if removed:
+            self.collect_garbage()
+        return removed
+
+    def collect_garbage(self) -> int:
+        """Delete chunk files no manifest references; return how many were removed."""
+        referenced = set()
+        for m in self.list_snapshots():
+            referenced.update(m["chunks"])
+
+        removed = 0
+        if self.chunks_dir.exists():
+            for path in self.chunks_dir.glob("*/*"):
+                if path.name.split(".")[0] not in referenced:
+                    path.unlink()
+                    removed += 1
+        logger.info(f"Backup store garbage collection removed {removed} chunks")
+        return removed
+
+    def total_size(self) -> int:
+        """Bytes used by stored chunks and manifests."""
+        if not self.root.exists():
+            return 0
+        return sum(p.stat().st_size for p in self.root.rglob("*") if p.is_file())
+
+
+def create_snapshot_now(keep_hourly: int = 24, keep_daily: int = 14, keep_weekly: int = 8):
+    """Take a snapshot and apply retention; returns the manifest or None on failure."""
+    try:
+        store = BackupStore()
+        manifest = store.create_snapshot()
+        store.apply_retention(keep_hourly=keep_hourly, keep_daily=keep_daily, keep_weekly=keep_weekly)
+        return manifest
+    except Exception as e:
+        logger.error(f"Failed to create backup snapshot: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Incremental SQLite backup store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("snapshot", help="Take a snapshot and apply retention")
+    sub.add_parser("list", help="List snapshots")
+    restore_p = sub.add_parser("restore", help="Restore the live database")
+    restore_p.add_argument("--id", dest="snapshot_id")
+    restore_p.add_argument("--as-of", help="ISO timestamp, e.g. 2026-10-18T09:00")
+    export_p = sub.add_parser("export", help="Rebuild a snapshot into a standalone file")
+    export_p.add_argument("snapshot_id")
+    export_p.add_argument("dest")
+    args = parser.parse_args()
+
+    store = BackupStore()
+    if args.command == "snapshot":
+        create_snapshot_now()
+    elif args.command == "list":
+        for m in store.list_snapshots():
+            print(f"{m['snapshot_id']}  {m['size']:>12} bytes  {m['new_chunks']:>5} new chunks  {m.get('label') or ''}")
+    elif args.command == "restore":
+        as_of = datetime.fromisoformat(args.as_of) if args.as_of else None
+        store.restore(snapshot_id=args.snapshot_id, as_of=as_of)
+    elif args.command == "export":
+        store.materialize(args.snapshot_id, args.dest)
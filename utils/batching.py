@@ -0,0 +1,23 @@
+"""
+Batching helpers for set-based queries.
+
+SQLite caps the number of bound parameters per statement (999 on older
+builds), so ``IN (...)`` lists built from user uploads are split into
+chunks of ``IN_CHUNK_SIZE`` values::
+
+    for chunk in chunked(sample_ids):
+        rows += db.query(...).filter(SampleInfo.sample_id.in_(chunk)).all()
+"""
+from typing import Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+# Keep IN (...) lists below SQLite's bound-parameter limit
+IN_CHUNK_SIZE = 500
+
+
+def chunked(values: Iterable[T], size: int = IN_CHUNK_SIZE) -> Iterator[List[T]]:
+    """Yield ``values`` as lists of at most ``size`` items."""
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
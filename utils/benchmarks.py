@@ -0,0 +1,645 @@
+"""
+Benchmark suite for the ingest, lineage and read paths, run against the
+synthetic databases from :mod:`utils.synthetic_db`.
+
+Covered:
+
+==============================  ==============================================================
+benchmark                       what is timed
+==============================  ==============================================================
+icp_parse_pivot                 ``ICPService.parse_and_process_icp_file`` (CSV → wide rows)
+icp_bulk_create                 ``ICPService.bulk_create_icp_results`` + commit
+scalar_bulk_create              ``ScalarResultsService.bulk_create_scalar_results_ex`` + commit
+new_experiments_upload          ``NewExperimentsUploadService.bulk_upsert_from_excel`` + commit
+pxrf_ingest                     ``PXRFUploadService.ingest_from_bytes`` + commit
+cumulative_times_chain          ``update_cumulative_times_for_chain`` on the longest chains
+view_experiments_page           ``get_all_experiments`` (first page, and with a search term)
+view_samples_page               ``get_all_samples_with_pxrf_averages`` (first page, and filtered)
+primary_results_view            full read of ``v_primary_experiment_results`` into pandas
+==============================  ==============================================================
+
+Payloads (files, rows) are built once per benchmark from the source database
+and are the same size at every scale, so the numbers show how the cost of a
+fixed-size operation grows with the amount of existing data. Benchmarks that
+write get a fresh copy of the database for every timed run; read benchmarks
+share one copy and get one untimed warm-up run. Each timed run also records
+the number of SQL statements issued (via :mod:`utils.query_instrumentation`).
+
+Results are written as JSON. A results file saved as the *baseline* for a
+scale can later be compared against a new run; ``compare`` exits non-zero
+when a benchmark's median time or statement count grew by more than the
+threshold. Baselines are machine-specific: record and compare them on the
+same hardware.
+
+The same benchmarks run under pytest-benchmark from ``tests/benchmarks``
+(``pytest tests/benchmarks --benchmark-only``), which adds
+``--benchmark-save`` / ``--benchmark-compare-fail`` for timings; the CLI
+below needs no extra dependency and also gates on statement counts.
+
+CLI:
+    python -m utils.benchmarks run --scale 1 --save-baseline
+    python -m utils.benchmarks run --scale 10x --only icp_bulk_create pxrf_ingest
+    python -m utils.benchmarks compare benchmarks/latest_1x.json --threshold 0.15
+"""
+
+import io
+import os
+import gc
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import platform
+import statistics
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+# ---------------------------------------------------------------------------
+# Path bootstrap – ensure project root is importable
+# ---------------------------------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from utils import query_instrumentation
+from utils.synthetic_db import build_cached_database, ICP_ELEMENTS
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+RESULTS_FORMAT = 1
+BENCHMARK_DIR = Path(os.environ.get("BENCHMARK_DIR", PROJECT_ROOT / "benchmarks"))
+DEFAULT_REPEAT = int(os.environ.get("BENCHMARK_REPEAT", "5"))
+# A benchmark regresses when its median (or statement count) grows by more
+# than this fraction of the baseline...
+DEFAULT_THRESHOLD = float(os.environ.get("BENCHMARK_THRESHOLD", "0.20"))
+# ...and, for timings, by at least this many milliseconds (timer noise)
+NOISE_FLOOR_MS = float(os.environ.get("BENCHMARK_NOISE_FLOOR_MS", "5"))
+
+# Payload sizes (identical at every scale)
+ICP_SAMPLES = 200
+ICP_LINES_PER_ELEMENT = 2
+SCALAR_ROWS = 200
+NEW_EXPERIMENTS = 100
+PXRF_READINGS = 300
+CHAINS = 10
+PAGE_SIZE = 50
+PAYLOAD_SEED = 1234
+
+ICP_DAYS = [1, 3, 7, 14, 21, 28, 45, 60]
+ICP_DILUTIONS = [5, 10, 20]
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+@dataclass(frozen=True)
+class Benchmark:
+    """One timed operation.
+
+    ``prepare(session)`` builds the payload from the source database (not
+    timed); ``run(ctx, payload)`` is timed and returns the number of items it
+    processed, which is stored with the result as a sanity check.
+    """
+    name: str
+    prepare: Callable[[Any], Any]
+    run: Callable[[SimpleNamespace, Any], int]
+    writes: bool
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, writes: bool = False, prepare: Optional[Callable[[Any], Any]] = None):
+    """Register the decorated ``run(ctx, payload)`` function as a benchmark."""
+    def decorator(run):
+        BENCHMARKS[name] = Benchmark(name=name, prepare=prepare or (lambda session: None), run=run, writes=writes)
+        return run
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Payloads
+# ---------------------------------------------------------------------------
+def _experiment_ids(session, count: int) -> List[str]:
+    rows = session.execute(text("SELECT experiment_id FROM experiments ORDER BY id")).scalars().all()
+    rng = random.Random(PAYLOAD_SEED)
+    return rng.sample(rows, min(count, len(rows)))
+
+
+def _to_excel(sheets: Dict[str, pd.DataFrame]) -> bytes:
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        for sheet, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet, index=False)
+    return buffer.getvalue()
+
+
+def build_icp_csv(experiment_ids: List[str], seed: int = PAYLOAD_SEED) -> bytes:
+    """Instrument export in the long format ``parse_and_process_icp_file`` expects."""
+    rng = random.Random(seed)
+    lines = ["ICP-OES Export", "Method: Synthetic benchmark", "Label,Element Label,Concentration,Intensity,Type"]
+    for exp_id in experiment_ids:
+        label = f"{exp_id}_Day{rng.choice(ICP_DAYS)}_{rng.choice(ICP_DILUTIONS)}x"
+        for element in ICP_ELEMENTS:
+            for _ in range(ICP_LINES_PER_ELEMENT):
+                wavelength = round(rng.uniform(180, 800), 3)
+                lines.append(f"{label},{element.capitalize()} {wavelength},"
+                             f"{rng.uniform(0.01, 50):.4f},{rng.uniform(50, 50000):.1f},SAMP")
+        if rng.random() < 0.1:
+            lines.append("Blank,Fe 238.204,0.01,40,BLK")
+            lines.append("Standard 1,Fe 238.204,100.0,5000,STD")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _prepare_icp_csv(session) -> bytes:
+    return build_icp_csv(_experiment_ids(session, ICP_SAMPLES))
+
+
+def _prepare_icp_rows(session) -> List[Dict]:
+    from backend.services.icp_service import ICPService
+    processed, _errors = ICPService.parse_and_process_icp_file(_prepare_icp_csv(session))
+    return processed
+
+
+def _prepare_scalar_rows(session) -> List[Dict]:
+    rng = random.Random(PAYLOAD_SEED)
+    rows = []
+    for exp_id in _experiment_ids(session, SCALAR_ROWS):
+        rows.append({
+            "experiment_id": exp_id,
+            "time_post_reaction": float(rng.choice(ICP_DAYS)),
+            "final_ph": round(rng.uniform(6, 11), 2),
+            "final_conductivity_mS_cm": round(rng.uniform(0.5, 30), 2),
+            "gross_ammonium_concentration_mM": round(rng.uniform(0, 40), 3),
+            "background_ammonium_concentration_mM": round(rng.uniform(0, 2), 3),
+            "sampling_volume_mL": 5.0,
+        })
+    return rows
+
+
+def _prepare_new_experiments_workbook(session) -> bytes:
+    rng = random.Random(PAYLOAD_SEED)
+    compounds = session.execute(text("SELECT name FROM compounds ORDER BY id")).scalars().all()
+    sample_ids = session.execute(text("SELECT sample_id FROM sample_info ORDER BY sample_id")).scalars().all()
+    experiments, conditions, additives = [], [], []
+    # "BM" initials never occur in synthetic data; every fourth row is a
+    # sequential run of the previous experiment so parent lookups are exercised
+    exp_id = None
+    for n in range(1, NEW_EXPERIMENTS + 1):
+        exp_id = f"{exp_id}-2" if n % 4 == 0 else f"{rng.choice(['HPHT', 'Serum'])}_BM_{n:03d}"
+        experiments.append({
+            "experiment_id": exp_id,
+            "sample_id": rng.choice(sample_ids) if sample_ids else None,
+            "date": datetime(2025, 1, 1).date().isoformat(),
+            "status": "ONGOING",
+            "initial_note": "Benchmark upload",
+        })
+        conditions.append({
+            "experiment_id": exp_id,
+            "rock_mass_g": round(rng.uniform(1, 20), 2),
+            "water_volume_mL": round(rng.uniform(50, 500), 1),
+            "temperature_c": rng.choice([25, 90, 200, 250]),
+        })
+        for compound in rng.sample(compounds, min(rng.randint(0, 2), len(compounds))):
+            additives.append({
+                "experiment_id": exp_id,
+                "compound": compound,
+                "amount": round(rng.uniform(0.1, 10), 3),
+                "unit": "g",
+            })
+    return _to_excel({
+        "experiments": pd.DataFrame(experiments),
+        "conditions": pd.DataFrame(conditions),
+        "additives": pd.DataFrame(additives, columns=["experiment_id", "compound", "amount", "unit"]),
+    })
+
+
+def _prepare_pxrf_workbook(session) -> bytes:
+    from frontend.config.variable_config import PXRF_ELEMENT_COLUMNS
+
+    rng = random.Random(PAYLOAD_SEED)
+    existing = session.execute(text("SELECT reading_no FROM pxrf_readings ORDER BY reading_no")).scalars().all()
+    # Half updates of existing readings, half new ones
+    reading_nos = rng.sample(existing, min(PXRF_READINGS // 2, len(existing)))
+    reading_nos += [f"BM{n:05d}" for n in range(PXRF_READINGS - len(reading_nos))]
+    rows = []
+    for reading_no in reading_nos:
+        row = {"Reading No": reading_no}
+        for column in PXRF_ELEMENT_COLUMNS:
+            row[column] = "<LOD" if rng.random() < 0.05 else round(rng.uniform(0, 40), 3)
+        rows.append(row)
+    return _to_excel({"Sheet1": pd.DataFrame(rows)})
+
+
+def _prepare_longest_chains(session) -> List[int]:
+    return session.execute(text("""
+        SELECT MIN(id) FROM experiments
+        WHERE base_experiment_id IS NOT NULL
+        GROUP BY base_experiment_id
+        ORDER BY COUNT(*) DESC, MIN(id)
+        LIMIT :n
+    """), {"n": CHAINS}).scalars().all()
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+@benchmark("icp_parse_pivot", prepare=_prepare_icp_csv)
+def _bench_icp_parse(ctx, csv_bytes):
+    from backend.services.icp_service import ICPService
+    processed, _errors = ICPService.parse_and_process_icp_file(csv_bytes)
+    return len(processed)
+
+
+@benchmark("icp_bulk_create", writes=True, prepare=_prepare_icp_rows)
+def _bench_icp_bulk_create(ctx, processed):
+    from backend.services.icp_service import ICPService
+    results, _errors = ICPService.bulk_create_icp_results(ctx.session, processed)
+    ctx.session.commit()
+    return len(results)
+
+
+@benchmark("scalar_bulk_create", writes=True, prepare=_prepare_scalar_rows)
+def _bench_scalar_bulk_create(ctx, rows):
+    from backend.services.scalar_results_service import ScalarResultsService
+    # The service fills in descriptions in place; keep the payload reusable
+    results, _errors, _feedback = ScalarResultsService.bulk_create_scalar_results_ex(
+        ctx.session, [dict(row) for row in rows])
+    ctx.session.commit()
+    return len(results)
+
+
+@benchmark("new_experiments_upload", writes=True, prepare=_prepare_new_experiments_workbook)
+def _bench_new_experiments(ctx, workbook):
+    from backend.services.bulk_uploads.new_experiments import NewExperimentsUploadService
+    created, updated, _skipped, _errors, _warnings, _info = NewExperimentsUploadService.bulk_upsert_from_excel(
+        ctx.session, workbook)
+    ctx.session.commit()
+    return created + updated
+
+
+@benchmark("pxrf_ingest", writes=True, prepare=_prepare_pxrf_workbook)
+def _bench_pxrf_ingest(ctx, workbook):
+    from backend.services.bulk_uploads.pxrf_data import PXRFUploadService
+    inserted, updated, _skipped, _errors = PXRFUploadService.ingest_from_bytes(
+        ctx.session, workbook, update_existing=True)
+    ctx.session.commit()
+    return inserted + updated
+
+
+@benchmark("cumulative_times_chain", writes=True, prepare=_prepare_longest_chains)
+def _bench_cumulative_times(ctx, experiment_fks):
+    from backend.services.result_merge_utils import update_cumulative_times_for_chain
+    for experiment_fk in experiment_fks:
+        update_cumulative_times_for_chain(ctx.session, experiment_fk)
+    ctx.session.commit()
+    return len(experiment_fks)
+
+
+@contextmanager
+def _page_sessions(module, engine) -> Iterator[None]:
+    """Point a page module's ``SessionLocal`` at the benchmark database."""
+    original = module.SessionLocal
+    module.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    try:
+        yield
+    finally:
+        module.SessionLocal = original
+
+
+@benchmark("view_experiments_page")
+def _bench_view_experiments(ctx, _payload):
+    from frontend.components import view_experiments
+    with _page_sessions(view_experiments, ctx.engine):
+        first_page, _total = view_experiments.get_all_experiments(page=1, per_page=PAGE_SIZE)
+        searched, _total = view_experiments.get_all_experiments(page=1, per_page=PAGE_SIZE, search_term="MH")
+    return len(first_page) + len(searched)
+
+
+@benchmark("view_samples_page")
+def _bench_view_samples(ctx, _payload):
+    from frontend.components import view_samples
+    with _page_sessions(view_samples, ctx.engine):
+        first_page, _total = view_samples.get_all_samples_with_pxrf_averages(page=1, per_page=PAGE_SIZE)
+        filtered, _total = view_samples.get_all_samples_with_pxrf_averages(
+            page=1, per_page=PAGE_SIZE, location_filter="ME, ON")
+    return len(first_page) + len(filtered)
+
+
+@benchmark("primary_results_view")
+def _bench_primary_results_view(ctx, _payload):
+    with ctx.engine.connect() as conn:
+        df = pd.read_sql(text("SELECT * FROM v_primary_experiment_results"), conn)
+    return len(df)
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+@contextmanager
+def working_copy(source: Path, workdir: Path) -> Iterator[SimpleNamespace]:
+    """Copy ``source`` into ``workdir`` and open an engine and session on it."""
+    path = Path(tempfile.mkstemp(suffix=".db", dir=workdir)[1])
+    shutil.copyfile(source, path)
+    engine = create_engine(f"sqlite:///{path}")
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    query_instrumentation.enable(engine)
+    try:
+        yield SimpleNamespace(engine=engine, session=session, path=path)
+    finally:
+        session.close()
+        query_instrumentation.disable(engine)
+        engine.dispose()
+        path.unlink()
+
+
+def _timed(bench: Benchmark, ctx: SimpleNamespace, payload) -> Dict[str, Any]:
+    gc.collect()
+    with query_instrumentation.query_scope(f"bench:{bench.name}") as stats:
+        start = time.perf_counter()
+        items = bench.run(ctx, payload)
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+    return {"ms": elapsed_ms, "statements": stats.statement_count, "items": items}
+
+
+def run_benchmark(bench: Benchmark, source: Path, repeat: int = DEFAULT_REPEAT) -> Dict[str, Any]:
+    """
+    Time one benchmark against the database file ``source`` (never modified).
+
+    Returns:
+        Dict with median/min/max/stdev in ms, runs, statements and items.
+    """
+    with tempfile.TemporaryDirectory(prefix="bench_") as workdir:
+        workdir = Path(workdir)
+        with working_copy(source, workdir) as ctx:
+            payload = bench.prepare(ctx.session)
+            ctx.session.rollback()
+            if not bench.writes:
+                _timed(bench, ctx, payload)  # warm-up
+                samples = [_timed(bench, ctx, payload) for _ in range(repeat)]
+        if bench.writes:
+            samples = []
+            for _ in range(repeat):
+                with working_copy(source, workdir) as fresh:
+                    samples.append(_timed(bench, fresh, payload))
+
+    timings = [s["ms"] for s in samples]
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "stdev_ms": round(statistics.stdev(timings), 3) if len(timings) > 1 else 0.0,
+        "runs": len(timings),
+        "statements": max(s["statements"] for s in samples),
+        "items": samples[-1]["items"],
+    }
+
+
+def _environment() -> Dict[str, str]:
+    import sqlalchemy
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": str(os.cpu_count()),
+        "sqlalchemy": sqlalchemy.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def run_suite(
+    scale: float = 1.0,
+    seed: int = 0,
+    only: Optional[Iterable[str]] = None,
+    repeat: int = DEFAULT_REPEAT,
+    cache_dir: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """
+    Run the selected benchmarks on the synthetic database for (scale, seed).
+
+    Args:
+        scale: Synthetic database size relative to production
+        seed: Synthetic database seed
+        only: Benchmark names to run (default: all)
+        repeat: Timed runs per benchmark
+        cache_dir: Where synthetic databases are cached (default: SYNTHETIC_DB_CACHE)
+
+    Returns:
+        Results document (see :func:`save_results`).
+    """
+    names = list(only) if only else list(BENCHMARKS)
+    unknown = sorted(set(names) - set(BENCHMARKS))
+    if unknown:
+        raise ValueError(f"Unknown benchmark(s): {', '.join(unknown)}")
+    if repeat < 1:
+        raise ValueError("repeat must be at least 1")
+
+    source = build_cached_database(scale, seed, cache_dir=cache_dir)
+    results = {}
+    for name in names:
+        logger.info(f"Running {name} ({repeat}x, scale {scale:g})")
+        results[name] = run_benchmark(BENCHMARKS[name], source, repeat=repeat)
+    return {
+        "format": RESULTS_FORMAT,
+        "scale": scale,
+        "seed": seed,
+        "repeat": repeat,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": _environment(),
+        "benchmarks": results,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Baselines
+# ---------------------------------------------------------------------------
+def baseline_path(scale: float, directory: Optional[Path] = None) -> Path:
+    return Path(directory or BENCHMARK_DIR) / f"baseline_{scale:g}x.json"
+
+
+def latest_path(scale: float, directory: Optional[Path] = None) -> Path:
+    return Path(directory or BENCHMARK_DIR) / f"latest_{scale:g}x.json"
+
+
+def save_results(results: Dict[str, Any], path: Path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    return path
+
+
+def load_results(path: Path) -> Dict[str, Any]:
+    results = json.loads(Path(path).read_text(encoding="utf-8"))
+    if results.get("format") != RESULTS_FORMAT:
+        raise ValueError(f"{path}: unsupported results format {results.get('format')!r}")
+    return results
+
+
+def compare_results(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+    noise_floor_ms: float = NOISE_FLOOR_MS,
+) -> List[Dict[str, Any]]:
+    """
+    Compare two results documents benchmark by benchmark.
+
+    A benchmark is a ``regression`` when its median grew by more than
+    ``threshold`` (fraction of the baseline) *and* by at least
+    ``noise_floor_ms``, or when its statement count grew by more than
+    ``threshold``. It is ``improved`` when the median shrank by the same
+    margins. Benchmarks only in one document are ``new`` or ``missing``.
+
+    Returns:
+        One row per benchmark with baseline/current median and statements,
+        the relative change and the status.
+    """
+    if current.get("scale") != baseline.get("scale") or current.get("seed") != baseline.get("seed"):
+        raise ValueError(
+            f"Results are for scale {current.get('scale')} seed {current.get('seed')}, baseline is for "
+            f"scale {baseline.get('scale')} seed {baseline.get('seed')}"
+        )
+
+    cur_benchmarks = current.get("benchmarks", {})
+    base_benchmarks = baseline.get("benchmarks", {})
+    rows = []
+    for name in list(base_benchmarks) + [n for n in cur_benchmarks if n not in base_benchmarks]:
+        base, cur = base_benchmarks.get(name), cur_benchmarks.get(name)
+        row = {
+            "name": name,
+            "baseline_ms": base["median_ms"] if base else None,
+            "current_ms": cur["median_ms"] if cur else None,
+            "baseline_statements": base.get("statements") if base else None,
+            "current_statements": cur.get("statements") if cur else None,
+            "change": None,
+        }
+        if base is None:
+            row["status"] = "new"
+        elif cur is None:
+            row["status"] = "missing"
+        else:
+            delta_ms = cur["median_ms"] - base["median_ms"]
+            row["change"] = delta_ms / base["median_ms"] if base["median_ms"] else 0.0
+            statements_grew = (
+                row["baseline_statements"] is not None and row["current_statements"] is not None
+                and row["current_statements"] > row["baseline_statements"] * (1 + threshold)
+            )
+            if (row["change"] > threshold and delta_ms >= noise_floor_ms) or statements_grew:
+                row["status"] = "regression"
+            elif row["change"] < -threshold and -delta_ms >= noise_floor_ms:
+                row["status"] = "improved"
+            else:
+                row["status"] = "ok"
+        rows.append(row)
+    return rows
+
+
+def _format_ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:,.1f}"
+
+
+def print_results(results: Dict[str, Any]) -> None:
+    print(f"\nScale {results['scale']:g}x, seed {results['seed']}, {results['repeat']} run(s) each")
+    print(f"  {'benchmark':<26} {'median ms':>11} {'min ms':>10} {'stdev':>8} {'queries':>8} {'items':>7}")
+    for name, r in results["benchmarks"].items():
+        print(f"  {name:<26} {_format_ms(r['median_ms']):>11} {_format_ms(r['min_ms']):>10} "
+              f"{_format_ms(r['stdev_ms']):>8} {r['statements']:>8} {r['items']:>7}")
+
+
+def print_comparison(rows: List[Dict[str, Any]], threshold: float) -> None:
+    print(f"\nComparison against baseline (threshold {threshold:.0%})")
+    print(f"  {'benchmark':<26} {'baseline ms':>12} {'current ms':>11} {'change':>8} {'queries':>11}  status")
+    for row in rows:
+        change = "-" if row["change"] is None else f"{row['change']:+.1%}"
+        queries = f"{row['baseline_statements'] if row['baseline_statements'] is not None else '-'}" \
+                  f"→{row['current_statements'] if row['current_statements'] is not None else '-'}"
+        print(f"  {row['name']:<26} {_format_ms(row['baseline_ms']):>12} {_format_ms(row['current_ms']):>11} "
+              f"{change:>8} {queries:>11}  {row['status']}")
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+def _parse_scale(value: str) -> float:
+    return float(value.lower().rstrip("x"))
+
+
+def _compare_files(current_path: Path, baseline_file: Optional[Path], threshold: float, noise_floor_ms: float) -> int:
+    current = load_results(current_path)
+    baseline_file = baseline_file or baseline_path(current["scale"])
+    if not Path(baseline_file).exists():
+        print(f"No baseline at {baseline_file}; record one with 'run --save-baseline'")
+        return 2
+    rows = compare_results(current, load_results(baseline_file), threshold=threshold, noise_floor_ms=noise_floor_ms)
+    print_comparison(rows, threshold)
+    regressions = [row["name"] for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"\nFAILED: {len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ingest and read paths on synthetic databases")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_p = sub.add_parser("run", help="Run benchmarks and write a results file")
+    run_p.add_argument("--scale", type=_parse_scale, default=1.0, help="Synthetic database scale, e.g. 1, 10x, 100")
+    run_p.add_argument("--seed", type=int, default=0, help="Synthetic database seed (default: 0)")
+    run_p.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+    run_p.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per benchmark")
+    run_p.add_argument("--output", type=Path, help="Results file (default: BENCHMARK_DIR/latest_<scale>x.json)")
+    run_p.add_argument("--save-baseline", action="store_true", help="Also save the results as the baseline for this scale")
+    run_p.add_argument("--compare", action="store_true", help="Compare against the saved baseline afterwards")
+    run_p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed relative slowdown")
+    run_p.add_argument("--noise-floor-ms", type=float, default=NOISE_FLOOR_MS, help="Ignore slowdowns smaller than this")
+
+    cmp_p = sub.add_parser("compare", help="Compare a results file against a baseline; exit 1 on regressions")
+    cmp_p.add_argument("results", type=Path, help="Results file from 'run'")
+    cmp_p.add_argument("baseline", type=Path, nargs="?", help="Baseline file (default: BENCHMARK_DIR/baseline_<scale>x.json)")
+    cmp_p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed relative slowdown")
+    cmp_p.add_argument("--noise-floor-ms", type=float, default=NOISE_FLOOR_MS, help="Ignore slowdowns smaller than this")
+
+    sub.add_parser("list", help="List the available benchmarks")
+
+    args = parser.parse_args(list(argv) if argv is not None else None)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.command == "list":
+        for name, bench in BENCHMARKS.items():
+            print(f"{name}{' (writes)' if bench.writes else ''}")
+        return 0
+
+    if args.command == "compare":
+        return _compare_files(args.results, args.baseline, args.threshold, args.noise_floor_ms)
+
+    results = run_suite(scale=args.scale, seed=args.seed, only=args.only, repeat=args.repeat)
+    print_results(results)
+    output = save_results(results, args.output or latest_path(args.scale))
+    print(f"\nWrote {output}")
+    if args.save_baseline:
+        print(f"Saved baseline {save_results(results, baseline_path(args.scale))}")
+    if args.compare and not args.save_baseline:
+        return _compare_files(output, None, args.threshold, args.noise_floor_ms)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,12 @@
 import os
-import shutil
+import re
+import json
+import hashlib
 import logging
+import sqlite3
 import sys
+import time
+import threading
 from datetime import datetime
 from pathlib import Path
 from urllib.parse import urlparse
@@ -18,6 +23,42 @@ from config.storage import get_storage_config
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Online backup pacing: copy this many pages per step, then sleep so writers
+# in the app are never blocked for the duration of a full copy.
+BACKUP_PAGES_PER_STEP = int(os.environ.get("BACKUP_PAGES_PER_STEP", "1024"))
+BACKUP_STEP_SLEEP_SECONDS = float(os.environ.get("BACKUP_STEP_SLEEP_SECONDS", "0.05"))
+
+# Also publish a slimmed reporting-only copy next to the full public copy
+PUBLIC_DATABASE_SLIM = os.environ.get("PUBLIC_DATABASE_SLIM", "false").lower() in ("1", "true", "yes")
+
+# Objects kept in the slimmed public copy. Tables referenced by these views are
+# kept automatically, so the views keep working.
+REPORTING_VIEWS = (
+    "v_primary_experiment_results",
+    "v_experiment_additives_summary",
+    "v_experimental_results_with_modifications",
+)
+REPORTING_TABLES = (
+    "experiments",
+    "experimental_conditions",
+    "experimental_results",
+    "scalar_results",
+    "icp_results",
+    "chemical_additives",
+    "compounds",
+    "sample_info",
+    "external_analyses",
+    "elemental_analysis",
+    "analytes",
+    "pxrf_readings",
+    "xrd_phases",
+)
+
+# Change detection for update_public_db_copy: a long-lived connection to the
+# source whose PRAGMA data_version moves whenever another connection commits.
+_publish_lock = threading.Lock()
+_publish_watch = {"path": None, "conn": None, "data_version": None}
+
 
 def _get_source_db_path() -> Path:
     """Parse DATABASE_URL and return the path to the source SQLite database."""
@@ -39,6 +80,109 @@ def _get_source_db_path() -> Path:
     return db_path
 
 
+def verify_sqlite_database(db_path) -> None:
+    """
+    Run PRAGMA integrity_check against a SQLite file.
+
+    Raises:
+        RuntimeError: If SQLite reports anything other than 'ok'.
+    """
+    conn = sqlite3.connect(str(db_path))
+    try:
+        rows = [r[0] for r in conn.execute("PRAGMA integrity_check").fetchall()]
+    finally:
+        conn.close()
+    if rows != ["ok"]:
+        raise RuntimeError(f"Integrity check failed for {db_path}: {'; '.join(rows[:5])}")
+
+
+def sqlite_online_backup(
+    source_path,
+    dest_path,
+    pages_per_step: int = None,
+    step_sleep: float = None,
+    verify: bool = True,
+    atomic: bool = True,
+) -> Path:
+    """
+    Copy a live SQLite database with the online backup API.
+
+    Unlike a file copy this reads a transactionally consistent snapshot,
+    includes content still sitting in the -wal file, and never produces a torn
+    copy. Pages are copied in steps with a short sleep in between so the app
+    can keep writing while a backup is in progress.
+
+    Args:
+        source_path: Database to copy from.
+        dest_path: Destination database file.
+        pages_per_step (int, optional): Pages per backup step. Defaults to BACKUP_PAGES_PER_STEP.
+        step_sleep (float, optional): Seconds to sleep between steps. Defaults to BACKUP_STEP_SLEEP_SECONDS.
+        verify (bool): Run PRAGMA integrity_check on the result.
+        atomic (bool): Write to a temporary sibling and move it into place once
+            complete. Pass False to copy straight into an existing database
+            (e.g. restoring over the live file, where SQLite handles locking).
+
+    Returns:
+        Path: The destination path.
+    """
+    pages_per_step = pages_per_step or BACKUP_PAGES_PER_STEP
+    step_sleep = BACKUP_STEP_SLEEP_SECONDS if step_sleep is None else step_sleep
+
+    dest_path = Path(dest_path)
+    target_path = dest_path.with_name(dest_path.name + ".partial") if atomic else dest_path
+    if atomic and target_path.exists():
+        target_path.unlink()
+
+    def _pace(status, remaining, total):
+        if remaining and step_sleep > 0:
+            time.sleep(step_sleep)
+
+    source = sqlite3.connect(str(source_path))
+    target = sqlite3.connect(str(target_path))
+    try:
+        source.backup(target, pages=pages_per_step, progress=_pace)
+    except Exception:
+        target.close()
+        source.close()
+        if atomic and target_path.exists():
+            target_path.unlink()
+        raise
+    target.close()
+    source.close()
+
+    try:
+        if verify:
+            verify_sqlite_database(target_path)
+        if atomic:
+            os.replace(target_path, dest_path)
+    except Exception:
+        if atomic and target_path.exists():
+            target_path.unlink()
+        raise
+
+    return dest_path
+
+
+def restore_database_backup(backup_path, db_path=None) -> Path:
+    """
+    Restore a backup over the live database using the online backup API.
+
+    The backup is integrity-checked first; the restore then goes through
+    SQLite so open connections and the -wal file stay consistent.
+
+    Args:
+        backup_path: Backup file to restore from.
+        db_path (optional): Database to overwrite. Defaults to the DATABASE_URL file.
+
+    Returns:
+        Path: The restored database path.
+    """
+    if db_path is None:
+        db_path = _get_source_db_path()
+    verify_sqlite_database(backup_path)
+    return sqlite_online_backup(backup_path, db_path, atomic=False)
+
+
 def create_archived_backup(backup_dir: str = None) -> str:
     """
     Creates a timestamped backup of the database file in the archive directory.
@@ -66,12 +210,13 @@ def create_archived_backup(backup_dir: str = None) -> str:
         backup_path = Path(backup_dir)
         backup_path.mkdir(parents=True, exist_ok=True)
         
-        timestamp = datetime.now().strftime("%Y%m%d")
+        # Include the time so several backups on the same day do not overwrite each other
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_filename = f"{source_path.stem}_backup_{timestamp}{source_path.suffix}"
         backup_filepath = backup_path / backup_filename
         
         # Create the backup
-        shutil.copy2(source_path, backup_filepath)
+        sqlite_online_backup(source_path, backup_filepath)
         
         logger.info(f"Database archive backup created successfully at: {backup_filepath}")
         return str(backup_filepath)
@@ -81,14 +226,87 @@ def create_archived_backup(backup_dir: str = None) -> str:
         raise
 
 
-def update_public_db_copy(public_dir: str = None) -> str:
+def _file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _publish_state_path(public_db_path: Path) -> Path:
+    return public_db_path.with_name(public_db_path.name + ".publish.json")
+
+
+def _read_publish_state(public_db_path: Path) -> dict:
+    try:
+        return json.loads(_publish_state_path(public_db_path).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _source_data_version(source_path: Path) -> int:
+    """Return PRAGMA data_version for the source as seen by the watch connection."""
+    if _publish_watch["path"] != str(source_path):
+        if _publish_watch["conn"] is not None:
+            _publish_watch["conn"].close()
+        _publish_watch.update(
+            path=str(source_path),
+            conn=sqlite3.connect(str(source_path), check_same_thread=False),
+            data_version=None,
+        )
+    return _publish_watch["conn"].execute("PRAGMA data_version").fetchone()[0]
+
+
+def _build_slim_copy(full_copy: Path, slim_path: Path) -> None:
     """
-    Copies the database to a public location, overwriting any existing file.
+    Publish a reporting-only copy: keep REPORTING_VIEWS, REPORTING_TABLES and any
+    table those views read from, drop everything else, then VACUUM.
+    """
+    staging = slim_path.with_name(f".{slim_path.name}.staging")
+    sqlite_online_backup(full_copy, staging, verify=False)
+    conn = sqlite3.connect(str(staging))
+    try:
+        objects = conn.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE type IN ('table', 'view') "
+            "AND name NOT LIKE 'sqlite_%'"
+        ).fetchall()
+        tables = {name for kind, name, _sql in objects if kind == "table"}
+        keep = set(REPORTING_VIEWS) | (set(REPORTING_TABLES) & tables)
+        for kind, name, sql in objects:
+            if kind == "view" and name in REPORTING_VIEWS:
+                keep.update(t for t in tables if re.search(rf"\b{re.escape(t)}\b", sql or ""))
+
+        for kind, name, _sql in objects:
+            if kind == "view" and name not in keep:
+                conn.execute(f'DROP VIEW "{name}"')
+        for kind, name, _sql in objects:
+            if kind == "table" and name not in keep:
+                conn.execute(f'DROP TABLE "{name}"')
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    verify_sqlite_database(staging)
+    os.replace(staging, slim_path)
+
+
+def update_public_db_copy(public_dir: str = None, force: bool = False, slim: bool = None) -> str:
+    """
+    Publishes a copy of the database to a public location for read-only consumers.
     
-    This copy is intended for public access and consumption.
+    Publishing is change-aware and atomic:
+    - Skipped when the source's PRAGMA data_version has not moved since the
+      last publish from this process, or when the fresh copy's content hash
+      matches the one already published.
+    - The copy is staged with the online backup API and moved into place with
+      os.replace, so readers (e.g. Power BI) never open a half-written file.
     
     Args:
         public_dir (str, optional): The public directory. If None, uses PUBLIC_DATABASE env var.
+        force (bool): Publish even if nothing changed.
+        slim (bool, optional): Also publish ``<name>_reporting.db`` containing only
+            reporting tables and views. Defaults to PUBLIC_DATABASE_SLIM.
 
     Returns:
         str: Path to the public copy, or None on failure.
@@ -105,16 +323,49 @@ def update_public_db_copy(public_dir: str = None) -> str:
         if not public_dir:
             logger.warning("PUBLIC_DATABASE environment variable not set, skipping public copy")
             return None
+
+        if slim is None:
+            slim = PUBLIC_DATABASE_SLIM
             
         public_path = Path(public_dir)
         public_path.mkdir(parents=True, exist_ok=True)
         
-        # Create the public copy path, overwriting if it exists
         public_db_path = public_path / source_path.name
-        
-        # Create the public copy
-        shutil.copy2(source_path, public_db_path)
-        
+        slim_db_path = public_path / f"{source_path.stem}_reporting{source_path.suffix}"
+
+        with _publish_lock:
+            outputs_exist = public_db_path.exists() and (not slim or slim_db_path.exists())
+            data_version = _source_data_version(source_path)
+            if not force and outputs_exist and data_version == _publish_watch["data_version"]:
+                logger.info("Public database copy is up to date (data_version unchanged), skipping")
+                return str(public_db_path)
+
+            staging = public_path / f".{public_db_path.name}.staging"
+            sqlite_online_backup(source_path, staging)
+            digest = _file_sha256(staging)
+
+            if not force and outputs_exist and _read_publish_state(public_db_path).get("sha256") == digest:
+                staging.unlink()
+                _publish_watch["data_version"] = data_version
+                logger.info("Public database copy is up to date (content unchanged), skipping")
+                return str(public_db_path)
+
+            try:
+                if slim:
+                    _build_slim_copy(staging, slim_db_path)
+                os.replace(staging, public_db_path)
+            finally:
+                if staging.exists():
+                    staging.unlink()
+
+            _publish_state_path(public_db_path).write_text(json.dumps({
+                "sha256": digest,
+                "published_at": datetime.now().isoformat(),
+                "source": str(source_path),
+                "slim": bool(slim),
+            }))
+            _publish_watch["data_version"] = data_version
+
         logger.info(f"Public database copy created successfully at: {public_db_path}")
         return str(public_db_path)
         
@@ -0,0 +1,535 @@
+"""
+Streaming full-database export to Parquet, CSV or Excel.
+
+Every table registered on ``Base.metadata`` is read in fixed-size chunks and
+written straight into a single ``.zip`` archive, so memory use is bounded by
+the chunk size rather than the size of the database (and there is no
+1,048,576-row limit as with Excel).
+
+Small databases can still be exported to an Excel workbook (one sheet per
+table) with :func:`export_database_excel`; it is streamed through a
+write-only workbook and refuses tables that would not fit on a sheet.
+
+Archive layout::
+
+    manifest.json          format, creation time, alembic revision, and per
+                           table: file name, row count, bytes, SHA-256
+    schema.json            per table: column name, SQL type, export type,
+                           nullable, primary key
+    <table>.parquet        one file per table, one row group per chunk
+      - or -
+    <table>.csv            UTF-8 with header row
+
+Parquet files are written with Snappy compression (readable by pandas,
+Power BI and DuckDB) and stored uncompressed in the zip; CSV entries are
+deflated. Column types come from the SQLAlchemy models, so empty tables and
+all-NULL columns are still typed correctly. JSON columns are exported as JSON
+text and enums as their values.
+
+Exports prepared for download (the sidebar's *Export Database*) are written
+to ``EXPORT_DIR`` via :func:`new_export_path`, which also deletes exports
+older than ``EXPORT_MAX_AGE_HOURS`` so abandoned sessions do not fill the
+temp directory.
+
+Usage (from project root):
+    python -m utils.database_export
+    python -m utils.database_export --format csv --output exports/db.zip
+    python -m utils.database_export --format xlsx --output exports/db.xlsx
+    python -m utils.database_export --tables experiments scalar_results
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import enum
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+import uuid
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+# Add project root so "database" and "config" resolve
+_project_root = Path(__file__).resolve().parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection, Engine
+
+from database import Base
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+EXPORT_FORMATS = {
+    "parquet": "Parquet (.parquet per table)",
+    "csv": "CSV (.csv per table)",
+}
+EXCEL_FORMAT = "xlsx"
+DOWNLOAD_FORMATS = {
+    **EXPORT_FORMATS,
+    EXCEL_FORMAT: "Excel (.xlsx, small databases only)",
+}
+EXCEL_MAX_ROWS = 1_048_576  # rows per worksheet, header rows included
+CHUNK_ROWS = int(os.environ.get("DATABASE_EXPORT_CHUNK_ROWS", "50000"))
+EXPORT_DIR = Path(os.environ.get("DATABASE_EXPORT_DIR", Path(tempfile.gettempdir()) / "database_exports"))
+EXPORT_MAX_AGE_HOURS = float(os.environ.get("DATABASE_EXPORT_MAX_AGE_HOURS", "6"))
+PARQUET_COMPRESSION = "snappy"
+MANIFEST_VERSION = 1
+
+_HASH_BLOCK = 1024 * 1024
+
+
+# ---------------------------------------------------------------------------
+# Column typing
+# ---------------------------------------------------------------------------
+
+def export_type(column: sa.Column) -> str:
+    """Export type name for a model column (also used as the Arrow type)."""
+    col_type = column.type
+    if isinstance(col_type, sa.JSON):
+        return "json"
+    if isinstance(col_type, sa.Enum):
+        return "string"
+    if isinstance(col_type, sa.Boolean):
+        return "bool"
+    if isinstance(col_type, sa.Integer):
+        return "int64"
+    if isinstance(col_type, (sa.Float, sa.Numeric)):
+        return "float64"
+    if isinstance(col_type, sa.DateTime):
+        return "timestamp"
+    if isinstance(col_type, sa.Date):
+        return "date"
+    if isinstance(col_type, sa.LargeBinary):
+        return "binary"
+    return "string"
+
+
+def to_export_value(value, kind: str):
+    """Convert a value returned by SQLAlchemy into its exported form."""
+    if value is None:
+        return None
+    if kind == "json":
+        return json.dumps(value, default=str)
+    if isinstance(value, enum.Enum):
+        return str(value.value)
+    if kind == "timestamp" and isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+    if kind == "timestamp" and isinstance(value, str):
+        # SQLite rows written outside the ORM can hold unparsed text
+        return datetime.fromisoformat(value)
+    if kind == "string" and not isinstance(value, str):
+        return str(value)
+    return value
+
+
+def arrow_type(kind: str):
+    import pyarrow as pa
+
+    return {
+        "bool": pa.bool_(),
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "timestamp": pa.timestamp("us"),
+        "date": pa.date32(),
+        "binary": pa.binary(),
+        "json": pa.string(),
+        "string": pa.string(),
+    }[kind]
+
+
+def table_schema(table: sa.Table) -> List[dict]:
+    """Column descriptions written to schema.json."""
+    return [
+        {
+            "name": col.name,
+            "sql_type": str(col.type),
+            "export_type": export_type(col),
+            "nullable": bool(col.nullable),
+            "primary_key": bool(col.primary_key),
+        }
+        for col in table.columns
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def get_export_tables(names: Optional[Iterable[str]] = None) -> List[sa.Table]:
+    """Tables to export, in dependency order; optionally restricted to ``names``."""
+    tables = list(Base.metadata.sorted_tables)
+    if names:
+        wanted = set(names)
+        unknown = wanted - {t.name for t in tables}
+        if unknown:
+            raise ValueError(f"Unknown table(s): {', '.join(sorted(unknown))}")
+        tables = [t for t in tables if t.name in wanted]
+    return tables
+
+
+def iter_table_chunks(conn: Connection, table: sa.Table, chunk_size: int = CHUNK_ROWS):
+    """
+    Yield lists of converted row tuples, at most ``chunk_size`` rows each.
+
+    Rows are ordered by primary key so repeated exports are comparable.
+    """
+    kinds = [export_type(col) for col in table.columns]
+    stmt = sa.select(table)
+    if table.primary_key.columns:
+        stmt = stmt.order_by(*table.primary_key.columns)
+    result = conn.execution_options(yield_per=chunk_size).execute(stmt)
+    try:
+        for rows in result.partitions(chunk_size):
+            yield [
+                tuple(to_export_value(value, kind) for value, kind in zip(row, kinds))
+                for row in rows
+            ]
+    finally:
+        result.close()
+
+
+def _alembic_revision(conn: Connection) -> Optional[str]:
+    if not sa.inspect(conn).has_table("alembic_version"):
+        return None
+    return conn.execute(sa.text("SELECT version_num FROM alembic_version")).scalar()
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+class _HashingWriter(io.RawIOBase):
+    """Binary write-through wrapper that hashes and counts what passes through."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.sha256 = hashlib.sha256()
+        self.bytes_written = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._raw.write(data)
+        self.sha256.update(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+
+def _write_csv_entry(zf: zipfile.ZipFile, arcname: str, conn: Connection, table: sa.Table, chunk_size: int) -> dict:
+    rows_written = 0
+    with zf.open(arcname, "w", force_zip64=True) as raw:
+        hashed = _HashingWriter(raw)
+        text = io.TextIOWrapper(io.BufferedWriter(hashed, _HASH_BLOCK), encoding="utf-8", newline="")
+        writer = csv.writer(text)
+        writer.writerow([col.name for col in table.columns])
+        for chunk in iter_table_chunks(conn, table, chunk_size):
+            writer.writerows(chunk)
+            rows_written += len(chunk)
+        text.flush()
+        text.detach().flush()
+    return {"rows": rows_written, "bytes": hashed.bytes_written, "sha256": hashed.sha256.hexdigest()}
+
+
+def _write_parquet_entry(zf: zipfile.ZipFile, arcname: str, conn: Connection, table: sa.Table,
+                         chunk_size: int, work_dir: Path) -> dict:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = list(table.columns)
+    schema = pa.schema([
+        pa.field(col.name, arrow_type(export_type(col)), nullable=not col.primary_key)
+        for col in columns
+    ])
+    # Parquet writers need a seekable target, so each table is staged on disk first
+    staged = work_dir / arcname
+    rows_written = 0
+    with pq.ParquetWriter(staged, schema, compression=PARQUET_COMPRESSION) as writer:
+        for chunk in iter_table_chunks(conn, table, chunk_size):
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows_written += len(chunk)
+        if rows_written == 0:
+            writer.write_table(schema.empty_table())
+
+    sha = hashlib.sha256()
+    with open(staged, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            sha.update(block)
+    size = staged.stat().st_size
+    zf.write(staged, arcname, compress_type=zipfile.ZIP_STORED)
+    staged.unlink()
+    return {"rows": rows_written, "bytes": size, "sha256": sha.hexdigest()}
+
+
+def export_database(
+    output_path: str | Path,
+    fmt: str = "parquet",
+    tables: Optional[Iterable[str]] = None,
+    chunk_size: int = CHUNK_ROWS,
+    bind: Optional[Engine] = None,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+) -> dict:
+    """
+    Stream every table into a zip archive of Parquet or CSV files.
+
+    Args:
+        output_path: Destination ``.zip`` file (parent directories are created)
+        fmt: "parquet" or "csv"
+        tables: Table names to export (default: all model tables)
+        chunk_size: Rows read and written per chunk
+        bind: Engine to read from (default: the application engine)
+        progress: Called as ``progress(table_name, index, total)`` before each table
+
+    Returns:
+        dict: The manifest written to ``manifest.json``.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    if bind is None:
+        from database.database import engine as bind
+
+    export_tables = get_export_tables(tables)
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    partial = output_path.with_name(f"{output_path.name}.partial")
+
+    manifest = {
+        "manifest_version": MANIFEST_VERSION,
+        "format": fmt,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "dialect": bind.dialect.name,
+        "alembic_revision": None,
+        "chunk_rows": chunk_size,
+        "tables": [],
+    }
+    schema = {t.name: table_schema(t) for t in export_tables}
+
+    try:
+        with zipfile.ZipFile(partial, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf, \
+                tempfile.TemporaryDirectory(prefix="db_export_") as work_dir, \
+                bind.connect() as conn:
+            manifest["alembic_revision"] = _alembic_revision(conn)
+            for index, table in enumerate(export_tables):
+                if progress:
+                    progress(table.name, index, len(export_tables))
+                arcname = f"{table.name}.{fmt}"
+                if fmt == "parquet":
+                    entry = _write_parquet_entry(zf, arcname, conn, table, chunk_size, Path(work_dir))
+                else:
+                    entry = _write_csv_entry(zf, arcname, conn, table, chunk_size)
+                manifest["tables"].append({"name": table.name, "file": arcname, **entry})
+                logger.info(f"Exported {entry['rows']} row(s) from {table.name}")
+
+            zf.writestr("schema.json", json.dumps(schema, indent=2))
+            zf.writestr("manifest.json", json.dumps(manifest, indent=2))
+        os.replace(partial, output_path)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+
+    return manifest
+
+
+def excel_sheet_name(table_name: str) -> str:
+    """Excel sheet names: max 31 chars; cannot contain \\ / * ? : [ ]"""
+    return re.sub(r'[\/*?:\[\]\\]', "_", table_name)[:31]
+
+
+def _to_excel_value(value):
+    if isinstance(value, bytes):
+        return value.hex()
+    if isinstance(value, str):
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+        return ILLEGAL_CHARACTERS_RE.sub("", value)
+    return value
+
+
+def export_database_excel(
+    output_path: str | Path,
+    tables: Optional[Iterable[str]] = None,
+    chunk_size: int = CHUNK_ROWS,
+    bind: Optional[Engine] = None,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+    include_types: bool = False,
+) -> dict:
+    """
+    Stream every table into an Excel workbook with one sheet per table.
+
+    Row counts are checked up front; if any table has more rows than fit on
+    a sheet nothing is written and a ValueError tells the caller to use the
+    Parquet or CSV export instead.
+
+    Args:
+        output_path: Destination ``.xlsx`` file (parent directories are created)
+        tables: Table names to export (default: all model tables)
+        chunk_size: Rows read and written per chunk
+        bind: Engine to read from (default: the application engine)
+        progress: Called as ``progress(table_name, index, total)`` before each table
+        include_types: Add a second header row with the SQL type of each column
+
+    Returns:
+        dict: Format, creation time and per table: name, sheet, row count.
+    """
+    from openpyxl import Workbook
+
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    if bind is None:
+        from database.database import engine as bind
+
+    export_tables = get_export_tables(tables)
+    header_rows = 2 if include_types else 1
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    partial = output_path.with_name(f"{output_path.name}.partial")
+
+    manifest = {
+        "format": EXCEL_FORMAT,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "tables": [],
+    }
+
+    try:
+        with bind.connect() as conn:
+            counts = {
+                t.name: conn.execute(sa.select(sa.func.count()).select_from(t)).scalar_one()
+                for t in export_tables
+            }
+            too_large = [name for name, n in counts.items() if n + header_rows > EXCEL_MAX_ROWS]
+            if too_large:
+                raise ValueError(
+                    f"Too many rows for an Excel sheet in: {', '.join(too_large)}. "
+                    "Use the Parquet or CSV export instead."
+                )
+
+            workbook = Workbook(write_only=True)
+            for index, table in enumerate(export_tables):
+                if progress:
+                    progress(table.name, index, len(export_tables))
+                sheet = workbook.create_sheet(excel_sheet_name(table.name))
+                sheet.append([col.name for col in table.columns])
+                if include_types:
+                    sheet.append([str(col.type) for col in table.columns])
+                rows_written = 0
+                for chunk in iter_table_chunks(conn, table, chunk_size):
+                    for row in chunk:
+                        sheet.append([_to_excel_value(value) for value in row])
+                    rows_written += len(chunk)
+                manifest["tables"].append({"name": table.name, "sheet": sheet.title, "rows": rows_written})
+                logger.info(f"Exported {rows_written} row(s) from {table.name}")
+            workbook.save(partial)
+        os.replace(partial, output_path)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+
+    return manifest
+
+
+def export_file(output_path: str | Path, fmt: str = "parquet", **kwargs) -> dict:
+    """Export to a zip archive or, for ``fmt="xlsx"``, an Excel workbook."""
+    if fmt == EXCEL_FORMAT:
+        return export_database_excel(output_path, **kwargs)
+    return export_database(output_path, fmt=fmt, **kwargs)
+
+
+def export_file_name(fmt: str) -> str:
+    """Download file name for an export in ``fmt``."""
+    return "database_export.xlsx" if fmt == EXCEL_FORMAT else f"database_export_{fmt}.zip"
+
+
+# ---------------------------------------------------------------------------
+# Managed export directory
+# ---------------------------------------------------------------------------
+
+def evict_stale_exports(directory: Optional[Path] = None, max_age_hours: float = EXPORT_MAX_AGE_HOURS) -> int:
+    """
+    Delete exports in ``directory`` older than ``max_age_hours``.
+
+    Returns:
+        int: Number of files removed.
+    """
+    directory = Path(directory or EXPORT_DIR)
+    if not directory.is_dir():
+        return 0
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    for path in directory.glob("database_export_*"):
+        try:
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            continue  # evicted concurrently by another session
+    if removed:
+        logger.info(f"Removed {removed} stale database export(s) from {directory}")
+    return removed
+
+
+def new_export_path(fmt: str, directory: Optional[Path] = None) -> Path:
+    """Unique path for a new export in ``EXPORT_DIR``, evicting stale exports first."""
+    if fmt not in DOWNLOAD_FORMATS:
+        raise ValueError(f"Unsupported export format '{fmt}'. Use one of: {', '.join(DOWNLOAD_FORMATS)}")
+    directory = Path(directory or EXPORT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    evict_stale_exports(directory)
+    suffix = ".xlsx" if fmt == EXCEL_FORMAT else f"_{fmt}.zip"
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return directory / f"database_export_{stamp}_{uuid.uuid4().hex[:8]}{suffix}"
+
+
+def read_manifest(archive_path: str | Path) -> dict:
+    """Return the manifest of an export archive."""
+    with zipfile.ZipFile(archive_path) as zf:
+        return json.loads(zf.read("manifest.json"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Export the whole database to Parquet or CSV (zip archive) or to an Excel workbook.")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Output path (default: database_export_<timestamp>_<format>.zip, or .xlsx)")
+    parser.add_argument("-f", "--format", choices=list(DOWNLOAD_FORMATS), default="parquet",
+                        help="File format per table (default: parquet)")
+    parser.add_argument("--tables", nargs="+", default=None, help="Only export these tables")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                        help=f"Rows per chunk (default: {CHUNK_ROWS})")
+    args = parser.parse_args()
+
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    output = args.output or (
+        f"database_export_{stamp}.xlsx" if args.format == EXCEL_FORMAT
+        else f"database_export_{stamp}_{args.format}.zip"
+    )
+    manifest = export_file(
+        output,
+        fmt=args.format,
+        tables=args.tables,
+        chunk_size=args.chunk_rows,
+        progress=lambda name, i, n: print(f"[{i + 1}/{n}] {name}"),
+    )
+    total_rows = sum(t["rows"] for t in manifest["tables"])
+    print(f"Wrote {len(manifest['tables'])} tables ({total_rows:,} rows) to {output}")
+
+
+if __name__ == "__main__":
+    main()
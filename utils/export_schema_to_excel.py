@@ -1,19 +1,23 @@
 """
 Export all database tables (from database.models) to a single Excel file with one
 sheet per table. Each sheet contains a header row with all column names; optional
-second row with SQL types. No data rows by default; use include_data=True to dump
-current table contents.
+second row with SQL types.
+
+With include_data=True the table contents are streamed below the headers
+(data_format "xlsx", the default). Excel stops at 1,048,576 rows per sheet, so
+larger databases are refused; use data_format "parquet" or "csv" to stream the
+data into an archive next to the workbook instead (see utils.database_export).
 
 Usage (from project root):
     python -m utils.export_schema_to_excel
     python -m utils.export_schema_to_excel --output my_schema.xlsx
     python -m utils.export_schema_to_excel --include-data
+    python -m utils.export_schema_to_excel --include-data --data-format parquet
 """
 from __future__ import annotations
 
 import argparse
 import os
-import re
 import sys
 from pathlib import Path
 
@@ -23,18 +27,16 @@ if str(_project_root) not in sys.path:
     sys.path.insert(0, str(_project_root))
 
 import pandas as pd
-from sqlalchemy import text
 
 # Import database so Base.metadata is populated with all models from database.models
 from database import Base
-from database.database import engine
-
-
-# Excel sheet names: max 31 chars; cannot contain \ / * ? : [ ]
-def _excel_sheet_name(table_name: str) -> str:
-    invalid = re.compile(r'[\/*?:\[\]\\]')
-    name = invalid.sub("_", table_name)
-    return name[:31] if len(name) > 31 else name
+from utils.database_export import (
+    DOWNLOAD_FORMATS,
+    EXCEL_FORMAT,
+    excel_sheet_name,
+    export_database,
+    export_database_excel,
+)
 
 
 def get_tables_from_metadata():
@@ -42,25 +44,40 @@ def get_tables_from_metadata():
     return list(Base.metadata.tables.values())
 
 
+def data_archive_path(output_path: str | Path, data_format: str) -> Path:
+    """Archive written next to the workbook when data is included."""
+    output_path = Path(output_path)
+    return output_path.with_name(f"{output_path.stem}_data_{data_format}.zip")
+
+
 def export_schema_to_excel(
     output_path: str | Path,
     include_data: bool = False,
     include_types: bool = True,
-) -> None:
+    data_format: str = EXCEL_FORMAT,
+) -> Path | None:
     """
     Write one Excel file with one sheet per table. Each sheet has:
     - Row 1: column names (headers)
     - Row 2 (optional): SQL type for each column
-    - Remaining rows (optional): table data if include_data is True
 
     Parameters
     ----------
     output_path : str or Path
         Path to the output .xlsx file.
     include_data : bool
-        If True, query each table and append rows to the sheet.
+        If True, also export all table data.
     include_types : bool
         If True, add a second header row with column types.
+    data_format : str
+        "xlsx" writes the rows into the workbook itself (ValueError if a table
+        does not fit on a sheet); "parquet" or "csv" streams them into a zip
+        archive next to the workbook (``<stem>_data_<format>.zip``).
+
+    Returns
+    -------
+    Path or None
+        The file holding the data if include_data is True.
     """
     output_path = Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -69,34 +86,37 @@ def export_schema_to_excel(
     if not tables:
         raise RuntimeError("No tables found on Base.metadata. Ensure database.models are imported.")
 
+    if include_data and data_format == EXCEL_FORMAT:
+        manifest = export_database_excel(
+            output_path, tables=[t.name for t in tables], include_types=include_types
+        )
+        total_rows = sum(t["rows"] for t in manifest["tables"])
+        print(f"Wrote {len(tables)} sheets ({total_rows:,} rows) to {output_path}")
+        return output_path
+
     with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
         for table in tables:
             name = table.name
-            sheet_name = _excel_sheet_name(name)
+            sheet_name = excel_sheet_name(name)
             columns = [c.name for c in table.c]
             type_map = {c.name: str(c.type) for c in table.c}
 
-            if include_data:
-                with engine.connect() as conn:
-                    result = conn.execute(text(f'SELECT * FROM "{name}"'))
-                    rows = result.fetchall()
-                    result.close()
-                df = pd.DataFrame(rows, columns=columns)
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-                if include_types:
-                    ws = writer.sheets[sheet_name]
-                    ws.insert_rows(2)
-                    for col_idx, col_name in enumerate(columns, start=1):
-                        ws.cell(row=2, column=col_idx, value=type_map.get(col_name, ""))
-            else:
-                df = pd.DataFrame(columns=columns)
-                if include_types:
-                    type_row = [type_map.get(c, "") for c in columns]
-                    df.loc[0] = type_row
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
+            df = pd.DataFrame(columns=columns)
+            if include_types:
+                type_row = [type_map.get(c, "") for c in columns]
+                df.loc[0] = type_row
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
 
     print(f"Wrote {len(tables)} sheets to {output_path}")
 
+    if not include_data:
+        return None
+    archive = data_archive_path(output_path, data_format)
+    manifest = export_database(archive, fmt=data_format)
+    total_rows = sum(t["rows"] for t in manifest["tables"])
+    print(f"Wrote {total_rows:,} rows to {archive}")
+    return archive
+
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Export database schema (and optionally data) to Excel.")
@@ -108,7 +128,14 @@ def main() -> None:
     parser.add_argument(
         "--include-data",
         action="store_true",
-        help="Include current table data in each sheet",
+        help="Also export current table data",
+    )
+    parser.add_argument(
+        "--data-format",
+        choices=list(DOWNLOAD_FORMATS),
+        default=EXCEL_FORMAT,
+        help="Where --include-data writes rows: xlsx = into the workbook (databases under the "
+             "sheet limit), parquet/csv = zip archive next to the workbook (default: xlsx)",
     )
     parser.add_argument(
         "--no-types",
@@ -120,6 +147,7 @@ def main() -> None:
         output_path=args.output,
         include_data=args.include_data,
         include_types=not args.no_types,
+        data_format=args.data_format,
     )
 
 
@@ -0,0 +1,69 @@
+"""
+PID-stamped lock files for single-instance background processes
+(auto-updater, maintenance daemon).
+"""
+import os
+import logging
+import subprocess
+from pathlib import Path
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def pid_running(pid: int) -> bool:
+    """Return True if a process with this PID is alive."""
+    if os.name == "nt":
+        result = subprocess.run(
+            ["tasklist", "/FI", f"PID eq {pid}"],
+            capture_output=True, text=True,
+        )
+        return str(pid) in result.stdout
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_lock_pid(lock_file: Path):
+    """Return the PID stored in a lock file if that process is still alive, else None."""
+    try:
+        pid = int(Path(lock_file).read_text().strip())
+    except (OSError, ValueError):
+        return None
+    return pid if pid_running(pid) else None
+
+
+@contextmanager
+def file_lock(lock_file: Path):
+    """
+    Simple file-based lock to prevent concurrent processes.
+    The lock file stores the PID so stale locks can be detected.
+    """
+    lock_file = Path(lock_file)
+    if lock_file.exists():
+        try:
+            stale_pid = int(lock_file.read_text().strip())
+            if pid_running(stale_pid):
+                raise RuntimeError(
+                    f"Another process is already running (PID {stale_pid}). "
+                    f"If this is stale, delete {lock_file}"
+                )
+            else:
+                logger.warning(
+                    f"Removing stale lock file from PID {stale_pid} (process no longer running)"
+                )
+                lock_file.unlink()
+        except ValueError:
+            logger.warning("Lock file exists but contains invalid PID – removing")
+            lock_file.unlink()
+
+    lock_file.write_text(str(os.getpid()))
+    try:
+        yield
+    finally:
+        if lock_file.exists():
+            lock_file.unlink(missing_ok=True)
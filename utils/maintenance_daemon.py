@@ -0,0 +1,301 @@
+"""
+Maintenance daemon for the Experiment Tracking application.
+
+A single long-running process (guarded by a PID lock file) that owns all
+database housekeeping so the Streamlit app never does it on page loads:
+
+    backup         timestamped full backup + cleanup of old backups
+    snapshot       incremental snapshot in the deduplicated backup store
+    public_copy    change-aware publish of the public (Power BI) copy
+    refresh_views  recreate the reporting views
+    analytics_snapshot  append changed rows to the Parquet analytics snapshot
+    optimize       PRAGMA optimize on the live database
+
+Jobs run on their own interval (see JOB_INTERVALS). The UI triggers a job
+out of band with ``request_job``, which drops a request file the daemon picks
+up on its next poll, and reads progress back with ``read_status``.
+
+Usage:
+    python -m utils.maintenance_daemon                 - Run the daemon
+    python -m utils.maintenance_daemon --run public_copy  - Run one job now and exit
+    python -m utils.maintenance_daemon --request backup   - Queue a job for the daemon
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import logging
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta
+
+# ---------------------------------------------------------------------------
+# Path bootstrap – ensure project root is importable
+# ---------------------------------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.file_lock import file_lock, read_lock_pid
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+LOCK_FILE = PROJECT_ROOT / ".maintenance_lock"
+STATE_DIR = PROJECT_ROOT / ".maintenance"
+POLL_SECONDS = int(os.environ.get("MAINTENANCE_POLL_SECONDS", "15"))
+
+JOB_INTERVALS = {
+    "backup": timedelta(hours=24),
+    "snapshot": timedelta(hours=1),
+    "public_copy": timedelta(hours=12),
+    "refresh_views": timedelta(hours=24),
+    "analytics_snapshot": timedelta(hours=6),
+    "optimize": timedelta(hours=6),
+}
+
+# ---------------------------------------------------------------------------
+# Jobs
+# ---------------------------------------------------------------------------
+
+def _job_backup():
+    from utils.database_backup import create_archived_backup, cleanup_old_backups
+
+    backup_path = create_archived_backup()
+    cleanup_old_backups(keep_last_n=30)
+    return backup_path
+
+
+def _job_snapshot():
+    from utils.backup_store import BackupStore
+
+    store = BackupStore()
+    manifest = store.create_snapshot()
+    store.apply_retention()
+    return manifest["snapshot_id"]
+
+
+def _job_public_copy():
+    from utils.database_backup import update_public_db_copy
+
+    public_path = update_public_db_copy()
+    if public_path is None and os.environ.get("PUBLIC_DATABASE"):
+        raise RuntimeError("Public database copy failed; see log for details")
+    return public_path
+
+
+def _job_refresh_views():
+    from database.event_listeners import refresh_reporting_views
+
+    refresh_reporting_views()
+    return "views refreshed"
+
+
+def _job_analytics_snapshot():
+    from utils.analytics_snapshot import build_snapshot
+
+    summaries = build_snapshot()
+    return ", ".join(f"{name}: {s['changed']} changed/{s['deleted']} deleted" for name, s in summaries.items())
+
+
+def _job_optimize():
+    from utils.database_backup import _get_source_db_path
+
+    db_path = _get_source_db_path()
+    if not db_path:
+        return None
+    conn = sqlite3.connect(str(db_path))
+    try:
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+    return str(db_path)
+
+
+JOBS = {
+    "backup": _job_backup,
+    "snapshot": _job_snapshot,
+    "public_copy": _job_public_copy,
+    "refresh_views": _job_refresh_views,
+    "analytics_snapshot": _job_analytics_snapshot,
+    "optimize": _job_optimize,
+}
+
+# ---------------------------------------------------------------------------
+# State shared with the UI (plain files, so no DB access is needed)
+# ---------------------------------------------------------------------------
+
+def _requests_dir(state_dir: Path) -> Path:
+    return state_dir / "requests"
+
+
+def _write_json(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2, default=str))
+    os.replace(tmp, path)
+
+
+def read_status(state_dir: Path = STATE_DIR) -> dict:
+    """Return the daemon status (heartbeat and last run per job)."""
+    try:
+        return json.loads((state_dir / "status.json").read_text())
+    except (OSError, ValueError):
+        return {"jobs": {}}
+
+
+def daemon_running(lock_file: Path = LOCK_FILE):
+    """Return the daemon PID if it is running, else None."""
+    return read_lock_pid(lock_file)
+
+
+def request_job(job: str, requested_by: str = None, state_dir: Path = STATE_DIR) -> Path:
+    """
+    Ask the daemon to run ``job`` on its next poll.
+
+    Returns:
+        Path: The request file.
+
+    Raises:
+        ValueError: If ``job`` is not a known job name.
+    """
+    if job not in JOBS:
+        raise ValueError(f"Unknown maintenance job: {job}")
+    now = datetime.now()
+    path = _requests_dir(state_dir) / f"{now.strftime('%Y%m%dT%H%M%S_%f')}_{job}.json"
+    _write_json(path, {"job": job, "requested_at": now.isoformat(), "requested_by": requested_by})
+    logger.info(f"Queued maintenance job '{job}'")
+    return path
+
+
+class MaintenanceDaemon:
+    """Runs due and requested jobs; one instance per machine via the lock file."""
+
+    def __init__(self, jobs: dict = None, intervals: dict = None, state_dir: Path = STATE_DIR):
+        self.jobs = jobs if jobs is not None else JOBS
+        self.intervals = intervals if intervals is not None else JOB_INTERVALS
+        self.state_dir = Path(state_dir)
+        self.status = read_status(self.state_dir)
+        self.status.setdefault("jobs", {})
+
+    def _save_status(self) -> None:
+        self.status["pid"] = os.getpid()
+        self.status["heartbeat"] = datetime.now().isoformat()
+        _write_json(self.state_dir / "status.json", self.status)
+
+    def run_job(self, name: str, trigger: str = "schedule") -> bool:
+        """Run one job, recording the outcome in the status file. Returns success."""
+        entry = self.status["jobs"].setdefault(name, {})
+        entry.update(last_started=datetime.now().isoformat(), running=True, trigger=trigger)
+        self._save_status()
+        logger.info(f"Running maintenance job '{name}' ({trigger})")
+        try:
+            result = self.jobs[name]()
+            entry.update(last_status="succeeded", last_result=result, last_error=None)
+            logger.info(f"Maintenance job '{name}' finished: {result}")
+            return True
+        except Exception as e:
+            entry.update(last_status="failed", last_error=str(e))
+            logger.error(f"Maintenance job '{name}' failed: {e}")
+            return False
+        finally:
+            entry.update(last_finished=datetime.now().isoformat(), running=False)
+            self._save_status()
+
+    def due_jobs(self, now: datetime = None) -> list:
+        now = now or datetime.now()
+        due = []
+        for name, interval in self.intervals.items():
+            last = self.status["jobs"].get(name, {}).get("last_finished")
+            if last is None or now - datetime.fromisoformat(last) >= interval:
+                due.append(name)
+        return due
+
+    def pending_requests(self) -> list:
+        """Return (path, job) for queued requests, oldest first."""
+        req_dir = _requests_dir(self.state_dir)
+        if not req_dir.exists():
+            return []
+        pending = []
+        for path in sorted(req_dir.glob("*.json")):
+            try:
+                pending.append((path, json.loads(path.read_text())["job"]))
+            except (OSError, ValueError, KeyError):
+                logger.warning(f"Discarding unreadable maintenance request: {path}")
+                path.unlink(missing_ok=True)
+        return pending
+
+    def run_pending(self, now: datetime = None) -> list:
+        """Run queued requests, then scheduled jobs that are due. Returns job names run."""
+        ran = []
+        for path, job in self.pending_requests():
+            path.unlink(missing_ok=True)
+            if job not in self.jobs:
+                logger.warning(f"Ignoring request for unknown maintenance job: {job}")
+                continue
+            if job not in ran:
+                self.run_job(job, trigger="request")
+                ran.append(job)
+        for job in self.due_jobs(now):
+            if job not in ran:
+                self.run_job(job)
+                ran.append(job)
+        self._save_status()
+        return ran
+
+    def serve_forever(self, poll_seconds: int = POLL_SECONDS) -> None:
+        logger.info(f"Maintenance daemon started (PID {os.getpid()}, poll every {poll_seconds}s)")
+        while True:
+            try:
+                self.run_pending()
+            except Exception as e:
+                logger.error(f"Unexpected error in maintenance loop: {e}")
+            time.sleep(poll_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Experiment Tracking maintenance daemon")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--run", choices=sorted(JOBS), help="Run one job now and exit")
+    group.add_argument("--request", choices=sorted(JOBS), help="Queue a job for the running daemon")
+    parser.add_argument("--poll", type=int, default=POLL_SECONDS, help="Seconds between polls")
+    args = parser.parse_args()
+
+    log_dir = PROJECT_ROOT / "logs"
+    log_dir.mkdir(exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[
+            logging.FileHandler(log_dir / "maintenance_daemon.log"),
+            logging.StreamHandler(),
+        ],
+    )
+
+    if args.request:
+        request_job(args.request, requested_by="cli")
+        if not daemon_running():
+            logger.warning("Maintenance daemon is not running; the request will wait until it starts")
+        return 0
+
+    if args.run:
+        return 0 if MaintenanceDaemon().run_job(args.run, trigger="cli") else 1
+
+    try:
+        with file_lock(LOCK_FILE):
+            MaintenanceDaemon().serve_forever(poll_seconds=args.poll)
+    except RuntimeError as e:
+        logger.error(str(e))
+        return 1
+    except KeyboardInterrupt:
+        logger.info("Maintenance daemon stopped by user")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
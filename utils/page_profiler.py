@@ -0,0 +1,342 @@
+"""
+Per-render page profiling for the Streamlit app.
+
+``app.py`` wraps each page's ``render_*`` call in :func:`page_profile`. Page
+profiling is opt-in: with ``PAGE_PROFILING=true`` every render is recorded
+with
+
+- wall time;
+- number of SQL statements and time spent in them (engine events via
+  :mod:`utils.query_instrumentation`, which is enabled on first use);
+- peak traced Python memory, only with ``PAGE_PROFILE_TRACE_MEMORY=true``
+  (``tracemalloc`` is process-wide and slows every allocation, and renders
+  from concurrent sessions can inflate each other's peak).
+
+Records are appended to a rolling JSON Lines store (``PAGE_PROFILE_STORE``,
+trimmed to the newest ``PAGE_PROFILE_MAX_RECORDS``) that the admin sidebar
+overlay summarizes per page and exports as CSV.
+
+Independently of ``PAGE_PROFILING``, an admin (an email listed in
+``PAGE_PROFILER_ADMINS``) can add ``?profile=pyinstrument`` or
+``?profile=cprofile`` to the URL to run a full profiler over the next
+renders; those renders are recorded too, with SQL counts only if query
+instrumentation is already on. pyinstrument is an optional dependency;
+without it ``profile=pyinstrument`` falls back to cProfile. Reports are
+written to ``PAGE_PROFILE_DIR``.
+"""
+
+import io
+import os
+import re
+import sys
+import csv
+import json
+import time
+import pstats
+import logging
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# ---------------------------------------------------------------------------
+# Path bootstrap – ensure project root is importable
+# ---------------------------------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils import query_instrumentation
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+PROFILING_ENABLED = os.environ.get("PAGE_PROFILING", "false").lower() in ("1", "true", "yes")
+TRACE_MEMORY = os.environ.get("PAGE_PROFILE_TRACE_MEMORY", "false").lower() in ("1", "true", "yes")
+PROFILE_STORE = Path(os.environ.get("PAGE_PROFILE_STORE", PROJECT_ROOT / "logs" / "page_profiles.jsonl"))
+PROFILE_DIR = Path(os.environ.get("PAGE_PROFILE_DIR", PROJECT_ROOT / "logs" / "profiles"))
+MAX_RECORDS = int(os.environ.get("PAGE_PROFILE_MAX_RECORDS", "5000"))
+# Rewrite the store once it holds this many more lines than MAX_RECORDS
+TRIM_SLACK = 0.2
+
+PROFILE_QUERY_PARAM = "profile"
+PROFILERS = ("pyinstrument", "cprofile")
+# Users whose email is listed in PAGE_PROFILER_ADMINS see the overlay and may
+# use ?profile= (the Firebase role claim is free text typed at registration)
+ADMIN_EMAILS = {
+    e.strip().lower() for e in os.environ.get("PAGE_PROFILER_ADMINS", "").split(",") if e.strip()
+}
+
+CSV_FIELDS = [
+    "recorded_at", "page", "user", "wall_ms", "query_count", "query_ms",
+    "peak_memory_mb", "profiler", "profile_path", "error",
+]
+
+_store_lock = threading.Lock()
+# Lines per store file, counted once and then tracked by append_record
+_store_lines: Dict[Path, int] = {}
+
+
+def is_profiler_admin(user: Optional[Dict]) -> bool:
+    """Whether the logged-in ``st.session_state.user`` may see profiling data."""
+    if not user:
+        return False
+    return (user.get("email") or "").lower() in ADMIN_EMAILS
+
+
+def requested_profiler(value: Optional[str]) -> Optional[str]:
+    """
+    Map a ``?profile=`` query-string value to a profiler name.
+
+    Args:
+        value: Raw query parameter ("1", "true", "pyinstrument", "cprofile", ...)
+
+    Returns:
+        "pyinstrument", "cprofile" or None when profiling was not requested.
+    """
+    if not value:
+        return None
+    value = str(value).strip().lower()
+    if value in PROFILERS:
+        return value
+    if value in ("1", "true", "yes", "on"):
+        return "pyinstrument"
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+def _count_lines(path: Path) -> int:
+    if not path.exists():
+        return 0
+    with open(path, "rb") as f:
+        return sum(block.count(b"\n") for block in iter(lambda: f.read(1024 * 1024), b""))
+
+
+def _trim_store() -> int:
+    lines = PROFILE_STORE.read_text(encoding="utf-8").splitlines(keepends=True)[-MAX_RECORDS:]
+    tmp = PROFILE_STORE.with_suffix(".tmp")
+    tmp.write_text("".join(lines), encoding="utf-8")
+    os.replace(tmp, PROFILE_STORE)
+    return len(lines)
+
+
+def append_record(record: Dict) -> None:
+    """
+    Append one render record to the rolling store.
+
+    The store is only read back (and rewritten with the newest
+    ``MAX_RECORDS``) once it has grown ``TRIM_SLACK`` past the limit, so a
+    render normally costs a single appended line.
+    """
+    with _store_lock:
+        PROFILE_STORE.parent.mkdir(parents=True, exist_ok=True)
+        if PROFILE_STORE not in _store_lines:
+            _store_lines[PROFILE_STORE] = _count_lines(PROFILE_STORE)
+        with open(PROFILE_STORE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+        _store_lines[PROFILE_STORE] += 1
+        if _store_lines[PROFILE_STORE] > MAX_RECORDS * (1 + TRIM_SLACK):
+            _store_lines[PROFILE_STORE] = _trim_store()
+
+
+def load_records(limit: Optional[int] = None, page: Optional[str] = None) -> List[Dict]:
+    """
+    Read render records, oldest first.
+
+    Args:
+        limit: Keep only the newest ``limit`` records (after filtering)
+        page: Only records for this page
+
+    Returns:
+        List of record dicts
+    """
+    with _store_lock:
+        if not PROFILE_STORE.exists():
+            return []
+        lines = PROFILE_STORE.read_text(encoding="utf-8").splitlines()
+    records = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue  # torn write
+        if page is None or record.get("page") == page:
+            records.append(record)
+    return records[-limit:] if limit else records
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(records: List[Dict]) -> List[Dict]:
+    """Per-page render statistics, slowest pages (by p95 wall time) first."""
+    by_page: Dict[str, List[Dict]] = {}
+    for record in records:
+        by_page.setdefault(record.get("page") or "?", []).append(record)
+
+    rows = []
+    for page, items in by_page.items():
+        walls = [r["wall_ms"] for r in items]
+        queries = [r["query_count"] for r in items if r.get("query_count") is not None]
+        peaks = [r["peak_memory_mb"] for r in items if r.get("peak_memory_mb") is not None]
+        rows.append({
+            "page": page,
+            "renders": len(items),
+            "p50_ms": round(_percentile(walls, 50), 1),
+            "p95_ms": round(_percentile(walls, 95), 1),
+            "max_ms": round(max(walls), 1),
+            "avg_queries": round(sum(queries) / len(queries), 1) if queries else None,
+            "max_queries": max(queries) if queries else None,
+            "max_peak_mb": round(max(peaks), 2) if peaks else None,
+        })
+    rows.sort(key=lambda r: r["p95_ms"], reverse=True)
+    return rows
+
+
+def records_to_csv(records: List[Dict]) -> bytes:
+    """Render records as CSV (UTF-8) for download."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(records)
+    return buffer.getvalue().encode("utf-8")
+
+
+# ---------------------------------------------------------------------------
+# Profilers
+# ---------------------------------------------------------------------------
+def _report_path(page: str, suffix: str) -> Path:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", page).strip("_").lower() or "page"
+    return PROFILE_DIR / f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{slug}{suffix}"
+
+
+class _CProfileRun:
+    name = "cprofile"
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self, page: str) -> Path:
+        self._profile.disable()
+        path = _report_path(page, ".prof")
+        self._profile.dump_stats(str(path))
+        # Human-readable top functions next to the binary stats
+        text = io.StringIO()
+        pstats.Stats(self._profile, stream=text).sort_stats("cumulative").print_stats(40)
+        path.with_suffix(".txt").write_text(text.getvalue(), encoding="utf-8")
+        return path
+
+
+class _PyinstrumentRun:
+    name = "pyinstrument"
+
+    def __init__(self):
+        from pyinstrument import Profiler
+        self._profiler = Profiler(async_mode="disabled")
+
+    def start(self):
+        self._profiler.start()
+
+    def stop(self, page: str) -> Path:
+        self._profiler.stop()
+        path = _report_path(page, ".html")
+        path.write_text(self._profiler.output_html(), encoding="utf-8")
+        return path
+
+
+def _make_profiler(name: Optional[str]):
+    if name == "pyinstrument":
+        try:
+            return _PyinstrumentRun()
+        except ImportError:
+            logger.info("pyinstrument is not installed; profiling with cProfile instead")
+            return _CProfileRun()
+    if name == "cprofile":
+        return _CProfileRun()
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Render hook
+# ---------------------------------------------------------------------------
+@contextmanager
+def page_profile(page: str, profiler: Optional[str] = None, user: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Profile one page render and append the result to the store.
+
+    Nothing is measured or stored unless ``PAGE_PROFILING`` is on or a
+    profiler was requested for this render.
+
+    Args:
+        page: Page name as shown in the sidebar
+        profiler: "pyinstrument", "cprofile" or None for timing only
+        user: Email of the user the page was rendered for
+
+    Yields:
+        The record dict; it is filled in when the block exits.
+    """
+    record: Dict = {"page": page, "user": user, "profiler": None, "profile_path": None, "error": None}
+    if not PROFILING_ENABLED and not profiler:
+        yield record
+        return
+
+    if PROFILING_ENABLED:
+        try:
+            query_instrumentation.enable()
+        except Exception as e:
+            logger.warning(f"Query counting unavailable for page profiling: {e}")
+    count_queries = query_instrumentation.is_enabled()
+
+    trace_memory = TRACE_MEMORY
+    if trace_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    run = _make_profiler(profiler)
+    start = time.perf_counter()
+    try:
+        with query_instrumentation.query_scope(f"page:{page}") as stats:
+            if run is not None:
+                run.start()
+            try:
+                yield record
+            finally:
+                if run is not None:
+                    record["profiler"] = run.name
+                    try:
+                        record["profile_path"] = str(run.stop(page))
+                    except Exception as e:
+                        logger.error(f"Could not write {run.name} report for {page}: {e}")
+    except Exception as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["recorded_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        record["wall_ms"] = round((time.perf_counter() - start) * 1000.0, 2)
+        record["query_count"] = stats.statement_count if count_queries else None
+        record["query_ms"] = round(stats.total_ms, 2) if count_queries else None
+        record["peak_memory_mb"] = None
+        if trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            record["peak_memory_mb"] = round(max(0, peak - baseline) / (1024 * 1024), 3)
+        try:
+            append_record(record)
+        except OSError as e:
+            logger.error(f"Could not store page profile for {page}: {e}")
@@ -0,0 +1,253 @@
+"""
+Derived-asset cache: downscaled thumbnails and first-page previews.
+
+Detail pages show a small JPEG/PNG rendered once per stored file instead of
+fetching and sending the full-size original on every Streamlit rerun. Assets
+are keyed by the file's content hash (``StoredBlob.sha256``; legacy files use
+a key derived from their path) and kept on local disk with LRU eviction
+(least recently *used*, tracked through the asset's mtime).
+
+Images are rendered with Pillow (first frame of multi-page TIFF/GIF). PDF
+first pages are rendered when the optional ``pypdfium2`` package is
+installed; otherwise PDFs simply have no preview.
+
+Files that cannot be previewed get a small marker so the original is not
+fetched again on the next render.
+"""
+
+import io
+import os
+import sys
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+# ---------------------------------------------------------------------------
+# Path bootstrap – ensure project root is importable
+# ---------------------------------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+CACHE_DIR = Path(os.environ.get("PREVIEW_CACHE_DIR", PROJECT_ROOT / ".preview_cache"))
+MAX_CACHE_BYTES = int(float(os.environ.get("PREVIEW_CACHE_MAX_MB", "512")) * 1024 * 1024)
+# Evict down to this fraction of the limit so eviction doesn't run on every write
+EVICT_TO_FRACTION = 0.9
+
+THUMBNAIL_SIZE = (320, 320)
+PREVIEW_SIZE = (1280, 1280)
+JPEG_QUALITY = 85
+
+_NO_PREVIEW_SUFFIX = ".none"
+
+
+def legacy_cache_key(file_path: str) -> str:
+    """Cache key for files stored before content addressing (no blob hash)."""
+    try:
+        st = os.stat(file_path)
+        ident = f"{file_path}|{st.st_size}|{st.st_mtime_ns}"
+    except OSError:
+        ident = file_path  # Cloud URL or missing file
+    return hashlib.sha256(ident.encode("utf-8")).hexdigest()
+
+
+def _render_pdf_first_page(data: bytes, size: Tuple[int, int]):
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        return None
+    pdf = pdfium.PdfDocument(data)
+    try:
+        page = pdf[0]
+        width, height = page.get_size()
+        scale = min(size[0] / width, size[1] / height) if width and height else 1.0
+        return page.render(scale=max(scale, 0.1)).to_pil()
+    finally:
+        pdf.close()
+
+
+def render_first_page(data: bytes, file_name: Optional[str], size: Tuple[int, int]):
+    """
+    Render the first page/frame of ``data`` scaled to fit ``size``.
+
+    Returns:
+        PIL.Image.Image or None: None if the format cannot be previewed.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    ext = os.path.splitext(file_name or "")[1].lower()
+    if ext == ".pdf" or data[:5] == b"%PDF-":
+        try:
+            img = _render_pdf_first_page(data, size)
+        except Exception as e:
+            logger.warning(f"Could not render PDF preview for {file_name}: {e}")
+            return None
+        if img is not None:
+            img.thumbnail(size)
+        return img
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.seek(0)
+            # JPEG can decode at a reduced scale directly, which is much faster
+            img.draft("RGB", size)
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail(size)
+            img.load()
+            return img
+    except (UnidentifiedImageError, OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+class PreviewCache:
+    """Thumbnails and previews on disk, keyed by content hash, LRU-evicted."""
+
+    def __init__(self, root: Path = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._approx_size = None  # Bytes on disk; computed on first write
+
+    # -- paths ---------------------------------------------------------------
+
+    def _base(self, key: str, kind: str, size: Tuple[int, int]) -> Path:
+        return self.root / key[:2] / f"{key}_{kind}_{size[0]}x{size[1]}"
+
+    def _existing(self, base: Path) -> Optional[Path]:
+        for suffix in (".jpg", ".png", _NO_PREVIEW_SUFFIX):
+            path = base.with_suffix(suffix)
+            if path.exists():
+                return path
+        return None
+
+    # -- public API ----------------------------------------------------------
+
+    def get(
+        self,
+        key: str,
+        load: Callable[[], bytes],
+        file_name: Optional[str] = None,
+        kind: str = "thumb",
+        size: Tuple[int, int] = THUMBNAIL_SIZE,
+    ) -> Optional[Path]:
+        """
+        Return the cached asset for ``key``, rendering it from ``load()`` on a miss.
+
+        Args:
+            key: Content hash of the original file
+            load: Returns the original bytes; only called on a cache miss
+            file_name: Original file name (used to detect the format)
+            kind: Asset name ("thumb" or "preview")
+            size: Bounding box in pixels
+
+        Returns:
+            Path or None: Image file to display, or None if not previewable.
+        """
+        base = self._base(key, kind, size)
+        path = self._existing(base)
+        if path is None:
+            path = self._render(base, load(), file_name, size)
+        else:
+            self._touch(path)
+        if path is None or path.suffix == _NO_PREVIEW_SUFFIX:
+            return None
+        return path
+
+    def thumbnail(self, key: str, load: Callable[[], bytes], file_name: Optional[str] = None) -> Optional[Path]:
+        return self.get(key, load, file_name, kind="thumb", size=THUMBNAIL_SIZE)
+
+    def preview(self, key: str, load: Callable[[], bytes], file_name: Optional[str] = None) -> Optional[Path]:
+        return self.get(key, load, file_name, kind="preview", size=PREVIEW_SIZE)
+
+    def warm(self, key: str, data: bytes, file_name: Optional[str] = None) -> None:
+        """Render the thumbnail and preview now (e.g. right after an upload)."""
+        for kind, size in (("thumb", THUMBNAIL_SIZE), ("preview", PREVIEW_SIZE)):
+            base = self._base(key, kind, size)
+            if self._existing(base) is None:
+                self._render(base, data, file_name, size)
+
+    def total_size(self) -> int:
+        return sum(p.stat().st_size for p in self.root.glob("*/*") if p.is_file())
+
+    def evict(self, target_bytes: Optional[int] = None) -> int:
+        """Delete least recently used assets until the cache fits. Returns files removed."""
+        target = int(self.max_bytes * EVICT_TO_FRACTION) if target_bytes is None else target_bytes
+        entries = []
+        for p in self.root.glob("*/*"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, p in sorted(entries, key=lambda e: e[0]):
+            if total <= target:
+                break
+            try:
+                p.unlink()
+                total -= size
+                removed += 1
+            except OSError:
+                continue
+        with self._lock:
+            self._approx_size = total
+        if removed:
+            logger.info(f"Preview cache evicted {removed} file(s); {total / 1024 / 1024:.1f} MB remain")
+        return removed
+
+    # -- internals -----------------------------------------------------------
+
+    def _touch(self, path: Path) -> None:
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    def _render(self, base: Path, data: bytes, file_name: Optional[str], size: Tuple[int, int]) -> Optional[Path]:
+        try:
+            img = render_first_page(data, file_name, size)
+        except Exception as e:
+            logger.warning(f"Preview rendering failed for {file_name}: {e}")
+            img = None
+
+        base.parent.mkdir(parents=True, exist_ok=True)
+        if img is None:
+            path, payload = base.with_suffix(_NO_PREVIEW_SUFFIX), b""
+        else:
+            buf = io.BytesIO()
+            if img.mode in ("RGBA", "LA", "P"):
+                path = base.with_suffix(".png")
+                img.save(buf, format="PNG", optimize=True)
+            else:
+                path = base.with_suffix(".jpg")
+                img.convert("RGB").save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+            payload = buf.getvalue()
+
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(payload)
+        os.replace(tmp, path)
+        self._account(len(payload))
+        return path
+
+    def _account(self, added: int) -> None:
+        with self._lock:
+            if self._approx_size is None:
+                self._approx_size = self.total_size()
+            else:
+                self._approx_size += added
+            over = self._approx_size > self.max_bytes
+        if over:
+            self.evict()
+
+
+# Shared instance used by the detail pages and upload paths
+preview_cache = PreviewCache()
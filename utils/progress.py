@@ -0,0 +1,72 @@
+"""
+Row-level progress reporting for long-running bulk services.
+
+Bulk upload services accept an optional ``progress(fraction, message)``
+callback (see :mod:`backend.services.upload_jobs`) and wrap their main row
+loop with :func:`track`::
+
+    for idx, row in track(df.iterrows(), progress, total=len(df)):
+        ...
+
+The callback is invoked about every ``PROGRESS_STEP`` of the work (plus once
+at the end), so a 50 000-row file does not turn into 50 000 status updates.
+With ``progress=None`` the items are yielded unchanged. Services made of
+several passes hand each pass a :func:`scaled` slice of the callback.
+"""
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+ProgressCallback = Callable[[float, str], None]
+
+PROGRESS_STEP = 0.02
+
+
+def track(
+    items: Iterable[T],
+    progress: Optional[ProgressCallback],
+    total: Optional[int] = None,
+    label: str = "rows",
+) -> Iterator[T]:
+    """
+    Yield ``items`` while reporting ``done / total`` to ``progress``.
+
+    Args:
+        items: Rows, records or chunks being processed
+        progress: Callback receiving a fraction in [0, 1] and a short message
+        total: Number of items (defaults to ``len(items)``)
+        label: Noun used in the message ("Processed 120/400 rows")
+    """
+    if progress is None:
+        yield from items
+        return
+    if total is None:
+        total = len(items)  # type: ignore[arg-type]
+    if not total:
+        yield from items
+        return
+
+    step = max(1, int(total * PROGRESS_STEP))
+    done = 0
+    for item in items:
+        yield item
+        done += 1
+        if done % step == 0 or done == total:
+            progress(min(1.0, done / total), f"Processed {done}/{total} {label}")
+
+
+def scaled(progress: Optional[ProgressCallback], start: float, end: float) -> Optional[ProgressCallback]:
+    """Map a sub-step's [0, 1] progress onto [start, end] of the caller's range."""
+    if progress is None:
+        return None
+
+    def report(fraction: float, message: str) -> None:
+        progress(start + (end - start) * fraction, message)
+
+    return report
+
+
+def report(progress: Optional[ProgressCallback], fraction: float, message: str) -> None:
+    """Report a milestone of a set-based service (no-op without a callback)."""
+    if progress is not None:
+        progress(fraction, message)
@@ -0,0 +1,299 @@
+"""
+Opt-in SQL instrumentation: statement counts, timings and N+1 detection.
+
+Hooks SQLAlchemy's ``before_cursor_execute`` / ``after_cursor_execute`` engine
+events and attributes every statement to the innermost active *unit of work*,
+a :func:`query_scope` tagged with the page or upload service that issued it::
+
+    enable()                                   # or QUERY_INSTRUMENTATION=1
+    with query_scope("page:View Experiments") as stats:
+        render_view_experiments()
+    stats.statement_count, stats.total_ms, stats.slowest, stats.repeated
+
+Scopes nest (statements count towards every enclosing scope) and are tracked
+per thread/context, so Streamlit sessions and background upload jobs do not
+mix their numbers.
+
+For each finished scope:
+
+- statements slower than ``QUERY_SLOW_MS`` are appended to the slow-query log
+  file (``QUERY_SLOW_LOG``) as they happen;
+- statements whose *normalized* SQL (literals and IN-lists collapsed) repeats
+  more than ``QUERY_N_PLUS_ONE_THRESHOLD`` times are flagged as likely N+1
+  patterns and written to the same log;
+- totals are folded into a per-tag summary (:func:`get_summaries`) and the
+  scope itself is kept in a short history (:func:`recent_units`).
+
+When instrumentation is disabled no listeners are attached, so the only cost
+of ``query_scope`` is creating an empty stats object.
+"""
+
+import os
+import re
+import sys
+import time
+import heapq
+import logging
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# ---------------------------------------------------------------------------
+# Path bootstrap – ensure project root is importable
+# ---------------------------------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+ENABLED_BY_DEFAULT = os.environ.get("QUERY_INSTRUMENTATION", "false").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.environ.get("QUERY_SLOW_MS", "250"))
+SLOW_QUERY_LOG = Path(os.environ.get("QUERY_SLOW_LOG", PROJECT_ROOT / "logs" / "slow_queries.log"))
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("QUERY_N_PLUS_ONE_THRESHOLD", "20"))
+TOP_N = int(os.environ.get("QUERY_TOP_N", "10"))
+HISTORY_SIZE = 200
+
+_STATEMENT_PREVIEW_CHARS = 2000
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_NAMED_PARAM = re.compile(r"(?:%\(\w+\)s|:\w+)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    Reduce a statement to its shape so repeated executions group together.
+
+    String and numeric literals and bound parameters become ``?`` and
+    ``IN (?, ?, ...)`` lists collapse to ``IN (?)``.
+    """
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _NAMED_PARAM.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _IN_LIST.sub("IN (?)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+@dataclass
+class QueryStats:
+    """Statements recorded for one unit of work (page render, upload job, ...)."""
+    tag: str
+    top_n: int = TOP_N
+    statement_count: int = 0
+    total_ms: float = 0.0
+    started_at: float = field(default_factory=time.time)
+    wall_ms: float = 0.0
+    by_shape: Counter = field(default_factory=Counter)
+    # min-heap of (ms, seq, statement) holding the top_n slowest statements
+    _slowest: List[Tuple[float, int, str]] = field(default_factory=list, repr=False)
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.statement_count += 1
+        self.total_ms += elapsed_ms
+        self.by_shape[normalize_sql(statement)] += 1
+        entry = (elapsed_ms, self.statement_count, statement[:_STATEMENT_PREVIEW_CHARS])
+        if len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, entry)
+        elif elapsed_ms > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    @property
+    def slowest(self) -> List[Tuple[float, str]]:
+        """The top-N slowest statements as (ms, statement), slowest first."""
+        return [(ms, sql) for ms, _, sql in sorted(self._slowest, reverse=True)]
+
+    def repeated(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Normalized statements executed more than ``threshold`` times (likely N+1)."""
+        if threshold is None:
+            threshold = N_PLUS_ONE_THRESHOLD
+        return [(sql, n) for sql, n in self.by_shape.most_common() if n > threshold]
+
+    def as_dict(self) -> Dict:
+        return {
+            "tag": self.tag,
+            "statements": self.statement_count,
+            "query_ms": round(self.total_ms, 2),
+            "wall_ms": round(self.wall_ms, 2),
+            "distinct_statements": len(self.by_shape),
+            "slowest": [{"ms": round(ms, 2), "sql": sql} for ms, sql in self.slowest],
+            "repeated": [{"sql": sql, "count": n} for sql, n in self.repeated()],
+        }
+
+
+# ---------------------------------------------------------------------------
+# State
+# ---------------------------------------------------------------------------
+_active_scopes: ContextVar[Tuple[QueryStats, ...]] = ContextVar("query_scopes", default=())
+_state_lock = threading.Lock()
+_instrumented_engines: List = []
+_history: deque = deque(maxlen=HISTORY_SIZE)
+_summaries: Dict[str, Dict] = {}
+_slow_logger: Optional[logging.Logger] = None
+
+
+def _get_slow_logger() -> logging.Logger:
+    """File logger for slow statements and N+1 reports (created on first use)."""
+    global _slow_logger
+    if _slow_logger is None:
+        slow = logging.getLogger(f"{__name__}.slow")
+        log_path = str(SLOW_QUERY_LOG.resolve())
+        if not any(getattr(h, "baseFilename", None) == log_path for h in slow.handlers):
+            SLOW_QUERY_LOG.parent.mkdir(parents=True, exist_ok=True)
+            handler = logging.FileHandler(SLOW_QUERY_LOG, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+            slow.addHandler(handler)
+        slow.setLevel(logging.INFO)
+        slow.propagate = False
+        _slow_logger = slow
+    return _slow_logger
+
+
+# ---------------------------------------------------------------------------
+# Engine events
+# ---------------------------------------------------------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start_time")
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000.0
+    scopes = _active_scopes.get()
+    for stats in scopes:
+        stats.record(statement, elapsed_ms)
+    if elapsed_ms >= SLOW_QUERY_MS:
+        tag = scopes[-1].tag if scopes else "untagged"
+        _get_slow_logger().warning(
+            f"[{tag}] slow query {elapsed_ms:.1f} ms: "
+            f"{_WHITESPACE.sub(' ', statement)[:_STATEMENT_PREVIEW_CHARS]} | params={str(parameters)[:200]}"
+        )
+
+
+def is_enabled() -> bool:
+    return bool(_instrumented_engines)
+
+
+def enable(engine=None) -> None:
+    """Attach the timing listeners to ``engine`` (the app engine by default). Idempotent."""
+    from sqlalchemy import event
+
+    if engine is None:
+        from database import engine
+    with _state_lock:
+        if engine in _instrumented_engines:
+            return
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        _instrumented_engines.append(engine)
+    logger.info(f"Query instrumentation enabled (slow >= {SLOW_QUERY_MS:g} ms, N+1 > {N_PLUS_ONE_THRESHOLD})")
+
+
+def disable(engine=None) -> None:
+    """Detach the listeners from ``engine``, or from every instrumented engine."""
+    from sqlalchemy import event
+
+    with _state_lock:
+        if engine is None:
+            engines = list(_instrumented_engines)
+        else:
+            engines = [engine] if engine in _instrumented_engines else []
+        for instrumented in engines:
+            _instrumented_engines.remove(instrumented)
+            event.remove(instrumented, "before_cursor_execute", _before_cursor_execute)
+            event.remove(instrumented, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------------------------------------------------------------------------
+# Units of work
+# ---------------------------------------------------------------------------
+def _finish(stats: QueryStats) -> None:
+    repeated = stats.repeated()
+    if repeated:
+        slow = _get_slow_logger()
+        for sql, count in repeated:
+            slow.warning(f"[{stats.tag}] possible N+1: {count}x {sql[:_STATEMENT_PREVIEW_CHARS]}")
+        logger.warning(
+            f"{stats.tag}: {len(repeated)} statement shape(s) repeated more than "
+            f"{N_PLUS_ONE_THRESHOLD}x (worst {repeated[0][1]}x); see {SLOW_QUERY_LOG}"
+        )
+
+    with _state_lock:
+        _history.append(stats)
+        summary = _summaries.setdefault(stats.tag, {
+            "units": 0, "statements": 0, "query_ms": 0.0, "max_statements": 0, "n_plus_one_units": 0,
+        })
+        summary["units"] += 1
+        summary["statements"] += stats.statement_count
+        summary["query_ms"] += stats.total_ms
+        summary["max_statements"] = max(summary["max_statements"], stats.statement_count)
+        summary["n_plus_one_units"] += bool(repeated)
+
+
+@contextmanager
+def query_scope(tag: str, top_n: int = TOP_N) -> Iterator[QueryStats]:
+    """
+    Attribute statements executed inside the block to ``tag``.
+
+    Args:
+        tag: Unit-of-work label, e.g. ``"page:View Experiments"`` or ``"upload:icp"``
+        top_n: How many of the slowest statements to keep
+
+    Yields:
+        The QueryStats being filled; it is complete once the block exits.
+    """
+    stats = QueryStats(tag=tag, top_n=top_n)
+    token = _active_scopes.set(_active_scopes.get() + (stats,))
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats.wall_ms = (time.perf_counter() - start) * 1000.0
+        _active_scopes.reset(token)
+        if is_enabled():
+            _finish(stats)
+
+
+def current_tag() -> Optional[str]:
+    """Tag of the innermost active scope, if any."""
+    scopes = _active_scopes.get()
+    return scopes[-1].tag if scopes else None
+
+
+def get_summaries() -> Dict[str, Dict]:
+    """Per-tag totals since start-up (units, statements, query_ms, max_statements, n_plus_one_units)."""
+    with _state_lock:
+        return {tag: dict(summary) for tag, summary in _summaries.items()}
+
+
+def recent_units(tag: Optional[str] = None) -> List[QueryStats]:
+    """Most recently finished units of work, newest first, optionally filtered by tag."""
+    with _state_lock:
+        units = list(_history)
+    return [u for u in reversed(units) if tag is None or u.tag == tag]
+
+
+def reset() -> None:
+    """Forget all summaries and history."""
+    with _state_lock:
+        _history.clear()
+        _summaries.clear()
+
+
+if ENABLED_BY_DEFAULT:
+    try:
+        enable()
+    except Exception as e:  # never break app start-up over instrumentation
+        logger.error(f"Could not enable query instrumentation: {e}")
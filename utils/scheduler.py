@@ -3,6 +3,7 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
 from .database_backup import create_archived_backup, cleanup_old_backups, update_public_db_copy
+from .backup_store import create_snapshot_now
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,7 +16,8 @@ def setup_backup_scheduler(
     backup_interval_hours=24,
     cleanup_interval_days=1,
     public_copy_interval_hours=12,
-    keep_backups=30
+    keep_backups=30,
+    snapshot_interval_hours=None
 ):
     """
     Set up periodic database backups.
@@ -25,6 +27,8 @@ def setup_backup_scheduler(
         cleanup_interval_days (int): Days between cleanup of old backups
         public_copy_interval_hours (int): Hours between public copies
         keep_backups (int): Number of backups to keep
+        snapshot_interval_hours (int, optional): Hours between incremental
+            snapshots in the deduplicated backup store; disabled when None
     
     Returns:
         BackgroundScheduler: The initialized scheduler
@@ -39,7 +43,7 @@ def setup_backup_scheduler(
     elif scheduler.running:
         # If scheduler is already running, remove any existing backup jobs
         for job in scheduler.get_jobs():
-            if job.id in ['database_backup', 'backup_cleanup', 'public_database_copy']:
+            if job.id in ['database_backup', 'backup_cleanup', 'public_database_copy', 'backup_snapshot']:
                 scheduler.remove_job(job.id)
                 logger.info(f"Removed existing job: {job.id}")
     
@@ -73,6 +77,17 @@ def setup_backup_scheduler(
     )
     logger.info(f"Scheduled public database copy job (every {public_copy_interval_hours} hours)")
     
+    # Schedule incremental snapshots (retention is applied after each one)
+    if snapshot_interval_hours:
+        scheduler.add_job(
+            func=lambda: create_snapshot_now(),
+            trigger=IntervalTrigger(hours=snapshot_interval_hours),
+            id='backup_snapshot',
+            name=f'Incremental backup snapshot every {snapshot_interval_hours} hours',
+            replace_existing=True
+        )
+        logger.info(f"Scheduled incremental backup snapshot job (every {snapshot_interval_hours} hours)")
+    
     # Start the scheduler if it's not already running
     if not scheduler.running:
         scheduler.start()
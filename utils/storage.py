@@ -1,117 +1,247 @@
+"""
+File storage for uploads (photos, result files, analysis reports).
+
+Backends are kept in a registry keyed by ``STORAGE_TYPE`` ("local", "s3",
+"gcs", "azure"). Cloud SDKs are imported inside the backend functions, so
+importing this module - which every upload service and most frontend pages
+do - never pays for boto3, google-cloud-storage or azure-storage-blob unless
+that backend is actually used.
+
+Additional backends can be added with ``register_backend``.
+"""
+
 import os
-import shutil
-import boto3
-from google.cloud import storage
-from azure.storage.blob import BlobServiceClient, BlobClient
+import time
+import logging
+import threading
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, NamedTuple, Optional, Tuple
+
 from config.storage import get_storage_config
 
+logger = logging.getLogger(__name__)
+
+# Bulk uploads (save_files)
+UPLOAD_WORKERS = int(os.environ.get("STORAGE_UPLOAD_WORKERS", "8"))
+UPLOAD_RETRIES = int(os.environ.get("STORAGE_UPLOAD_RETRIES", "3"))
+UPLOAD_RETRY_BACKOFF_SECONDS = 0.5
+
+# Errors that will not go away by retrying the same upload
+_PERMANENT_ERRORS = (ValueError, TypeError, KeyError, ImportError, PermissionError,
+                     FileNotFoundError, IsADirectoryError, NotADirectoryError)
+
+
+class StorageBackend(NamedTuple):
+    """Functions implementing one storage type.
+
+    ``owns`` decides whether a stored path/URL belongs to this backend, so
+    files saved under one backend can still be read or deleted after the
+    configured type changes. Paths no backend owns are local files, unless
+    the configured backend sets ``resolves_relative_paths`` (Azure accepts
+    bare blob names).
+    """
+    save: Callable
+    get: Callable
+    delete: Callable
+    owns: Optional[Callable[[str], bool]] = None
+    resolves_relative_paths: bool = False
+
+
+_BACKENDS = {}
+
+
+def register_backend(name, backend):
+    """Register (or replace) the storage backend used for ``STORAGE_TYPE == name``."""
+    _BACKENDS[name] = backend
+
+
+def get_backend(name):
+    """Return the backend registered under ``name``, falling back to local storage."""
+    return _BACKENDS.get(name, _BACKENDS["local"])
+
+
+def _backend_for_path(file_path, config):
+    """Pick the backend that owns ``file_path``; unowned paths are local files."""
+    for backend in _BACKENDS.values():
+        if backend.owns is not None and backend.owns(file_path):
+            return backend
+    configured = get_backend(config["type"])
+    if configured.resolves_relative_paths:
+        return configured
+    return _BACKENDS["local"]
+
+
+def _require(module_name, backend_name):
+    """Import a cloud SDK on first use, with a clear error if it is missing."""
+    try:
+        return importlib.import_module(module_name)
+    except ImportError as e:
+        raise ImportError(
+            f"Storage backend '{backend_name}' requires the '{module_name}' package: {e}"
+        ) from e
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _cached_client(kind, key, factory):
+    """Return the per-process client for ``(kind, key)``, creating it once.
+
+    SDK clients are thread-safe and expensive to build (credential loading,
+    connection pools), so one is shared by every upload in the process.
+    """
+    cache_key = (kind, key)
+    client = _clients.get(cache_key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(cache_key)
+            if client is None:
+                client = factory()
+                _clients[cache_key] = client
+    return client
+
+
+def clear_client_cache():
+    """Drop cached SDK clients (e.g. after credentials change)."""
+    with _clients_lock:
+        _clients.clear()
+
+
 def save_file(file_data, file_name, folder="general", create_backup=True):
     """Save a file to the configured storage system.
-    
+
     Args:
         file_data: The binary data of the file to save
         file_name: The name of the file
         folder: The folder within the storage system to save the file
         create_backup: Whether to create a backup copy in the backup directory
-        
+
     Returns:
         str: Path or URL to the saved file
     """
     config = get_storage_config()
-    
+
     # Save file to primary storage
-    if config["type"] == "s3":
-        primary_path = save_to_s3(file_data, file_name, folder, config)
-    elif config["type"] == "gcs":
-        primary_path = save_to_gcs(file_data, file_name, folder, config)
-    elif config["type"] == "azure":
-        primary_path = save_to_azure(file_data, file_name, folder, config)
-    else:
-        primary_path = save_to_local(file_data, file_name, folder, config)
-    
+    primary_path = get_backend(config["type"]).save(file_data, file_name, folder, config)
+
     # Create backup if requested
     if create_backup:
         backup_path = save_to_backup(file_data, file_name, folder, config)
-    
+
     return primary_path
 
+def _save_with_retry(file_data, file_name, folder, create_backup, retries):
+    attempt = 0
+    while True:
+        try:
+            return save_file(file_data, file_name, folder=folder, create_backup=create_backup)
+        except _PERMANENT_ERRORS:
+            raise
+        except Exception as e:
+            attempt += 1
+            if attempt > retries:
+                raise
+            delay = UPLOAD_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1))
+            logger.warning(f"Upload of {folder}/{file_name} failed ({e}); retry {attempt}/{retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+def save_files(files: Iterable[Tuple[bytes, str, str]], create_backup=True, max_workers=None,
+               retries=None, return_exceptions=False) -> List:
+    """Save many files concurrently to the configured storage system.
+
+    Args:
+        files: Iterable of (file_data, file_name, folder) tuples
+        create_backup: Whether to create a backup copy of each file
+        max_workers: Upload threads (default STORAGE_UPLOAD_WORKERS)
+        retries: Retries per file for transient failures (default STORAGE_UPLOAD_RETRIES)
+        return_exceptions: If True, a file that still fails after its retries
+            yields its exception in the result list instead of raising
+
+    Returns:
+        list: Path or URL for each file, in input order
+
+    Raises:
+        Exception: The first failure (in input order) when return_exceptions is False;
+            all other uploads are still allowed to finish.
+    """
+    files = list(files)
+    if not files:
+        return []
+    retries = UPLOAD_RETRIES if retries is None else retries
+    workers = max(1, min(max_workers or UPLOAD_WORKERS, len(files)))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="storage-upload") as pool:
+        futures = [
+            pool.submit(_save_with_retry, data, name, folder, create_backup, retries)
+            for data, name, folder in files
+        ]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+
+    if not return_exceptions:
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+    return results
+
 def get_file(file_path):
     """Retrieve a file from the configured storage system."""
     config = get_storage_config()
-    
-    if file_path.startswith("s3://"):
-        return get_from_s3(file_path, config)
-    elif file_path.startswith("gcs://"):
-        return get_from_gcs(file_path, config)
-    elif file_path.startswith("https://") and "blob.core.windows.net" in file_path:
-        return get_from_azure(file_path, config)
-    elif config["type"] == "azure":
-        print("Warning: Retrieving Azure file based on config type and relative path. Storing full URL is recommended.")
-        return get_from_azure(file_path, config)
-    else:
-        return get_from_local(file_path, config)
+    return _backend_for_path(file_path, config).get(file_path, config)
 
 def delete_file(file_path):
     """Delete a file from the configured storage system."""
     config = get_storage_config()
-    
-    if file_path.startswith("s3://"):
-        delete_from_s3(file_path, config)
-    elif file_path.startswith("gcs://"):
-        delete_from_gcs(file_path, config)
-    elif file_path.startswith("https://") and "blob.core.windows.net" in file_path:
-        delete_from_azure(file_path, config)
-    elif config["type"] == "azure":
-        print("Warning: Deleting Azure file based on config type and relative path. Storing full URL is recommended.")
-        delete_from_azure(file_path, config)
-    else:
-        delete_from_local(file_path, config)
+    _backend_for_path(file_path, config).delete(file_path, config)
+
+def _s3_client(config):
+    def factory():
+        boto3 = _require("boto3", "s3")
+        return boto3.client(
+            's3',
+            aws_access_key_id=config['aws_access_key_id'],
+            aws_secret_access_key=config['aws_secret_access_key'],
+            region_name=config['region']
+        )
+    key = (config['aws_access_key_id'], config['aws_secret_access_key'], config['region'])
+    return _cached_client("s3", key, factory)
 
 def save_to_s3(file_data, file_name, folder, config):
     """Save a file to AWS S3."""
-    s3_client = boto3.client(
-        's3',
-        aws_access_key_id=config['aws_access_key_id'],
-        aws_secret_access_key=config['aws_secret_access_key'],
-        region_name=config['region']
-    )
-    
+    s3_client = _s3_client(config)
+
     key = f"{folder}/{file_name}"
     s3_client.put_object(
         Bucket=config['bucket'],
         Key=key,
         Body=file_data
     )
-    
+
     return f"s3://{config['bucket']}/{key}"
 
 def get_from_s3(file_path, config):
     """Retrieve a file from AWS S3."""
-    s3_client = boto3.client(
-        's3',
-        aws_access_key_id=config['aws_access_key_id'],
-        aws_secret_access_key=config['aws_secret_access_key'],
-        region_name=config['region']
-    )
-    
+    s3_client = _s3_client(config)
+
     # Remove s3:// prefix if present
     key = file_path.replace(f"s3://{config['bucket']}/", "")
     response = s3_client.get_object(
         Bucket=config['bucket'],
         Key=key
     )
-    
+
     return response['Body'].read()
 
 def delete_from_s3(file_path, config):
     """Delete a file from AWS S3."""
-    s3_client = boto3.client(
-        's3',
-        aws_access_key_id=config['aws_access_key_id'],
-        aws_secret_access_key=config['aws_secret_access_key'],
-        region_name=config['region']
-    )
-    
+    s3_client = _s3_client(config)
+
     # Remove s3:// prefix if present
     key = file_path.replace(f"s3://{config['bucket']}/", "")
     s3_client.delete_object(
@@ -119,47 +249,66 @@ def delete_from_s3(file_path, config):
         Key=key
     )
 
+def _gcs_bucket(config):
+    def factory():
+        storage = _require("google.cloud.storage", "gcs")
+        return storage.Client.from_service_account_json(config['credentials_path'])
+    storage_client = _cached_client("gcs", config['credentials_path'], factory)
+    return storage_client.bucket(config['bucket'])
+
 def save_to_gcs(file_data, file_name, folder, config):
     """Save a file to Google Cloud Storage."""
-    storage_client = storage.Client.from_service_account_json(config['credentials_path'])
-    bucket = storage_client.bucket(config['bucket'])
-    
+    bucket = _gcs_bucket(config)
+
     key = f"{folder}/{file_name}"
     blob = bucket.blob(key)
     blob.upload_from_string(file_data)
-    
+
     return f"gcs://{config['bucket']}/{key}"
 
 def get_from_gcs(file_path, config):
     """Retrieve a file from Google Cloud Storage."""
-    storage_client = storage.Client.from_service_account_json(config['credentials_path'])
-    bucket = storage_client.bucket(config['bucket'])
-    
+    bucket = _gcs_bucket(config)
+
     # Remove gcs:// prefix if present
     key = file_path.replace(f"gcs://{config['bucket']}/", "")
     blob = bucket.blob(key)
-    
+
     return blob.download_as_bytes()
 
 def delete_from_gcs(file_path, config):
     """Delete a file from Google Cloud Storage."""
-    storage_client = storage.Client.from_service_account_json(config['credentials_path'])
-    bucket = storage_client.bucket(config['bucket'])
-    
+    bucket = _gcs_bucket(config)
+
     # Remove gcs:// prefix if present
     key = file_path.replace(f"gcs://{config['bucket']}/", "")
     blob = bucket.blob(key)
     blob.delete()
 
+def _is_azure_url(file_path):
+    return file_path.startswith("https://") and "blob.core.windows.net" in file_path
+
+def _azure_blob_client(file_path, config):
+    """Blob client from a full blob URL, or from a blob name in the configured container."""
+    blob = _require("azure.storage.blob", "azure")
+    if _is_azure_url(file_path):
+        return blob.BlobClient.from_blob_url(file_path)
+    if 'connection_string' not in config or 'container' not in config:
+        raise ValueError("Azure storage config missing connection_string or container")
+    blob_service_client = _cached_client(
+        "azure", config['connection_string'],
+        lambda: blob.BlobServiceClient.from_connection_string(config['connection_string']),
+    )
+    return blob_service_client.get_blob_client(container=config['container'], blob=file_path)
+
 def save_to_azure(file_data, file_name, folder, config):
     """Save file_data to Azure Blob Storage."""
     try:
         if 'connection_string' not in config or 'container' not in config:
              raise ValueError("Azure storage config missing connection_string or container")
 
-        blob_service_client = BlobServiceClient.from_connection_string(config['connection_string'])
         blob_name = f"{folder.strip('/')}/{file_name.strip('/')}"
-        blob_client = blob_service_client.get_blob_client(container=config['container'], blob=blob_name)
+        blob_client = _azure_blob_client(blob_name, config)
 
         print(f"Uploading to Azure Blob Storage: Container='{config['container']}', Blob='{blob_name}'")
         blob_client.upload_blob(file_data, overwrite=True)
@@ -174,13 +323,9 @@ def save_to_azure(file_data, file_name, folder, config):
 def get_from_azure(file_path, config):
     """Retrieve a file from Azure Blob Storage using its URL or blob name."""
     try:
-        if file_path.startswith("https://") and "blob.core.windows.net" in file_path:
-             blob_client = BlobClient.from_blob_url(file_path)
-        else:
-            if 'connection_string' not in config or 'container' not in config:
-                 raise ValueError("Azure storage config missing connection_string or container")
-            blob_service_client = BlobServiceClient.from_connection_string(config['connection_string'])
-            blob_client = blob_service_client.get_blob_client(container=config['container'], blob=file_path)
+        if not _is_azure_url(file_path):
+            print("Warning: Retrieving Azure file based on config type and relative path. Storing full URL is recommended.")
+        blob_client = _azure_blob_client(file_path, config)
 
         print(f"Downloading from Azure Blob: {blob_client.container_name}/{blob_client.blob_name}")
         download_stream = blob_client.download_blob()
@@ -195,13 +340,9 @@ def get_from_azure(file_path, config):
 def delete_from_azure(file_path, config):
     """Delete a file from Azure Blob Storage using its URL or blob name."""
     try:
-        if file_path.startswith("https://") and "blob.core.windows.net" in file_path:
-            blob_client = BlobClient.from_blob_url(file_path)
-        else:
-             if 'connection_string' not in config or 'container' not in config:
-                 raise ValueError("Azure storage config missing connection_string or container")
-             blob_service_client = BlobServiceClient.from_connection_string(config['connection_string'])
-             blob_client = blob_service_client.get_blob_client(container=config['container'], blob=file_path)
+        if not _is_azure_url(file_path):
+            print("Warning: Deleting Azure file based on config type and relative path. Storing full URL is recommended.")
+        blob_client = _azure_blob_client(file_path, config)
 
         print(f"Deleting from Azure Blob: {blob_client.container_name}/{blob_client.blob_name}")
         blob_client.delete_blob(delete_snapshots="include")
@@ -215,12 +356,12 @@ def save_to_local(file_data, file_name, folder, config):
     """Save a file to local storage."""
     folder_path = os.path.join(config['base_path'], folder)
     os.makedirs(folder_path, exist_ok=True)
-    
+
     file_path = os.path.join(folder_path, file_name)
     absolute_file_path = os.path.abspath(os.path.normpath(file_path))
     with open(absolute_file_path, 'wb') as f:
         f.write(file_data)
-    
+
     return absolute_file_path
 
 def get_from_local(file_path, config):
@@ -238,7 +379,7 @@ def save_to_backup(file_data, file_name, folder, config):
     if 'backup_directory' not in config:
         print("Warning: Backup directory not configured, skipping backup")
         return None
-    
+
     raw_backup_dir = config['backup_directory']
 
     cleaned_backup_dir = raw_backup_dir
@@ -247,17 +388,45 @@ def save_to_backup(file_data, file_name, folder, config):
             cleaned_backup_dir = cleaned_backup_dir[2:-1]
         elif cleaned_backup_dir.startswith("r'") and cleaned_backup_dir.endswith("'"):
             cleaned_backup_dir = cleaned_backup_dir[2:-1]
-    
+
     normalized_backup_config_dir = os.path.normpath(cleaned_backup_dir)
-        
+
     backup_folder_path = os.path.join(normalized_backup_config_dir, folder)
     os.makedirs(backup_folder_path, exist_ok=True)
-    
+
     backup_file_path = os.path.join(backup_folder_path, file_name)
     absolute_backup_file_path = os.path.abspath(os.path.normpath(backup_file_path))
 
     with open(absolute_backup_file_path, 'wb') as f:
         f.write(file_data)
-    
+
     print(f"Backup created at: {absolute_backup_file_path}")
-    return absolute_backup_file_path 
\ No newline at end of file
+    return absolute_backup_file_path
+
+
+# Backends resolve their functions through module globals at call time so
+# tests (and callers) can still patch e.g. ``utils.storage.save_to_s3``.
+register_backend("local", StorageBackend(
+    save=lambda *a: save_to_local(*a),
+    get=lambda *a: get_from_local(*a),
+    delete=lambda *a: delete_from_local(*a),
+))
+register_backend("s3", StorageBackend(
+    save=lambda *a: save_to_s3(*a),
+    get=lambda *a: get_from_s3(*a),
+    delete=lambda *a: delete_from_s3(*a),
+    owns=lambda path: path.startswith("s3://"),
+))
+register_backend("gcs", StorageBackend(
+    save=lambda *a: save_to_gcs(*a),
+    get=lambda *a: get_from_gcs(*a),
+    delete=lambda *a: delete_from_gcs(*a),
+    owns=lambda path: path.startswith("gcs://"),
+))
+register_backend("azure", StorageBackend(
+    save=lambda *a: save_to_azure(*a),
+    get=lambda *a: get_from_azure(*a),
+    delete=lambda *a: delete_from_azure(*a),
+    owns=_is_azure_url,
+    resolves_relative_paths=True,
+))
@@ -0,0 +1,626 @@
+"""
+Seeded generator for production-shaped synthetic databases.
+
+Builds a SQLite database with the same schema, views and data shape as the
+lab database so benchmarks and regression tests have something realistic to
+run against. Output is fully determined by ``(scale, seed)``.
+
+At ``scale=1`` the database is roughly today's production size; benchmarks
+use 1×, 10× and 100×:
+
+==================  ========  =========  ==========
+table               1×        10×        100×
+==================  ========  =========  ==========
+experiments         1,000     10,000     100,000
+results             ~20,000   ~200,000   ~2,000,000
+icp_results         ~12,000   ~120,000   ~1,200,000
+sample_info         300       3,000      30,000
+pxrf_readings       900       9,000      90,000
+==================  ========  =========  ==========
+
+What is generated:
+
+- experiment families ``<Type>_<Initials>_<NNN>`` with sequential runs
+  (``-2``, ``-3``, occasionally skipping a number) and treatment variants
+  (``HPHT_MH_001-2_Desorption``); ``base_experiment_id`` and
+  ``parent_experiment_fk`` are resolved with :class:`database.lineage_utils.LineageIndex`
+  exactly as the app resolves them, and cumulative times follow the chain;
+- conditions (experiment type inferred from the ID prefix), notes and 0–3
+  chemical additives per experiment;
+- timepoint results with scalar data (yields computed as in ``ScalarResults``)
+  and ICP data for 30 elements (fixed columns plus ``all_elements`` JSON);
+- rock samples with pXRF readings referenced through comma-joined
+  ``pxrf_reading_no`` strings (with the odd missing reading), elemental
+  analyses, and XRD phases for both samples and experiments (Aeris time series).
+
+Rows are written with Core batch inserts (no ORM listeners), so 100× builds
+take minutes rather than hours. :func:`build_cached_database` keeps built
+files in ``SYNTHETIC_DB_CACHE`` so suites only pay for generation once.
+
+CLI:
+    python -m utils.synthetic_db --scale 10 --seed 42 --output synthetic_10x.db
+"""
+
+import os
+import sys
+import json
+import random
+import logging
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable, List, Optional
+
+# ---------------------------------------------------------------------------
+# Path bootstrap – ensure project root is importable
+# ---------------------------------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.engine import Engine
+
+from database import (
+    Base, Experiment, ExperimentNotes, ExperimentalConditions, ExperimentalResults,
+    ScalarResults, ICPResults, SampleInfo, ExternalAnalysis, PXRFReading, Analyte,
+    ElementalAnalysis, XRDPhase, Compound, ChemicalAdditive, ExperimentStatus, AmountUnit,
+)
+from database.event_listeners import refresh_reporting_views
+from database.lineage_utils import LineageIndex, parse_experiment_id_parts
+from backend.services.experiment_type_service import infer_experiment_type_value
+from frontend.config.variable_config import ICP_FIXED_ELEMENT_FIELDS, PXRF_ELEMENT_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+GENERATOR_VERSION = 1
+CACHE_DIR = Path(os.environ.get("SYNTHETIC_DB_CACHE", PROJECT_ROOT / ".synthetic_db"))
+BATCH_ROWS = 5000
+STANDARD_SCALES = (1, 10, 100)
+
+# Row counts at scale 1 (roughly today's production database)
+BASE_COUNTS = {
+    "experiments": 1000,
+    "samples": 300,
+    "pxrf_readings": 900,
+}
+RESULTS_PER_EXPERIMENT = (8, 32)          # uniform range, mean 20
+SCALAR_FRACTION = 0.9
+ICP_FRACTION = 0.6
+H2_FRACTION = 0.3
+NON_PRIMARY_FRACTION = 0.04               # duplicate timepoints (not the primary result)
+BRINE_MODIFICATION_FRACTION = 0.03
+SAMPLE_XRD_FRACTION = 0.25
+SAMPLE_ELEMENTAL_FRACTION = 0.4
+SAMPLE_PXRF_FRACTION = 0.7
+MISSING_PXRF_REF_FRACTION = 0.05
+EXPERIMENT_XRD_FRACTION = 0.15
+
+EXPERIMENT_TYPES = [("HPHT", 0.45), ("Serum", 0.35), ("CF", 0.1), ("Autoclave", 0.1)]
+RESEARCHERS = {"MH": "Maria Hill", "JW": "James Wu", "AK": "Anna Kim", "DR": "Dev Rao", "LS": "Lena Silva"}
+TREATMENTS = ["Desorption", "Leach", "Rinse", "Anneal"]
+# Extra sequential runs per family: 0, 1, 2, 3
+SEQUENTIAL_WEIGHTS = [0.5, 0.25, 0.15, 0.1]
+TREATMENT_FRACTION = 0.15
+SKIPPED_SEQUENCE_FRACTION = 0.05
+
+TIMEPOINTS = [0, 1, 2, 3, 5, 7, 10, 14, 21, 28, 35, 42, 49, 56, 63, 70, 84, 98, 112,
+              126, 140, 168, 196, 224, 252, 280, 308, 336, 364, 392, 420, 448]
+ICP_ELEMENTS = list(ICP_FIXED_ELEMENT_FIELDS) + ["k", "li", "na"]  # 30 elements
+MINERALS = ["Quartz", "Olivine", "Serpentine", "Magnetite", "Brucite", "Calcite",
+            "Pyroxene", "Talc", "Chlorite", "Dolomite", "Hematite", "Plagioclase"]
+ANALYTES = [("SiO2", "%"), ("FeO", "%"), ("MgO", "%"), ("Al2O3", "%"), ("CaO", "%"),
+            ("Na2O", "%"), ("K2O", "%"), ("NiO", "ppm"), ("Cr2O3", "ppm"), ("LOI", "%"),
+            ("Co", "ppm"), ("Cu", "ppm")]
+COMPOUND_NAMES = [
+    ("Nickel chloride", "NiCl2", 129.6), ("Sodium bicarbonate", "NaHCO3", 84.0),
+    ("Sodium nitrate", "NaNO3", 85.0), ("Ammonium chloride", "NH4Cl", 53.5),
+    ("Magnesium chloride", "MgCl2", 95.2), ("Sodium chloride", "NaCl", 58.4),
+    ("Iron(II) sulfate", "FeSO4", 151.9), ("Copper sulfate", "CuSO4", 159.6),
+    ("Cobalt chloride", "CoCl2", 129.8), ("Citric acid", "C6H8O7", 192.1),
+]
+ADDITIVE_UNITS = [AmountUnit.GRAM, AmountUnit.MILLIGRAM, AmountUnit.MILLIMOLAR,
+                  AmountUnit.PPM, AmountUnit.PERCENT_OF_ROCK]
+STATES = [("ME", "USA"), ("VT", "USA"), ("CA", "USA"), ("ON", "Canada"), ("QC", "Canada"), ("WA", "Australia")]
+ROCK_TYPES = ["Peridotite", "Dunite", "Serpentinite", "Basalt", "Gabbro", "Harzburgite"]
+
+EPOCH = datetime(2023, 1, 1)
+
+
+def scaled_counts(scale: float) -> Dict[str, int]:
+    """Target row counts for the independent tables at ``scale``."""
+    if scale <= 0:
+        raise ValueError("scale must be positive")
+    return {name: max(1, int(round(count * scale))) for name, count in BASE_COUNTS.items()}
+
+
+class _BatchWriter:
+    """Buffers rows per table and writes them with executemany inserts."""
+
+    def __init__(self, conn, batch_rows: int = BATCH_ROWS):
+        self.conn = conn
+        self.batch_rows = batch_rows
+        self.buffers: Dict[str, List[dict]] = {}
+        self.tables = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, model, row: dict) -> None:
+        name = model.__tablename__
+        self.tables[name] = model.__table__
+        buffer = self.buffers.setdefault(name, [])
+        buffer.append(row)
+        if len(buffer) >= self.batch_rows:
+            self.flush(name)
+
+    def flush(self, name: Optional[str] = None) -> None:
+        for table_name in ([name] if name else list(self.buffers)):
+            rows = self.buffers.get(table_name)
+            if rows:
+                # executemany needs the same keys in every row
+                keys = {key for row in rows for key in row}
+                unknown = keys - set(self.tables[table_name].c.keys())
+                if unknown:
+                    # Core silently ignores unknown keys; catch typos and ORM attribute names
+                    raise ValueError(f"Unknown columns for {table_name}: {sorted(unknown)}")
+                rows = [{key: row.get(key) for key in keys} for row in rows]
+                self.conn.execute(insert(self.tables[table_name]), rows)
+                self.counts[table_name] = self.counts.get(table_name, 0) + len(rows)
+                self.buffers[table_name] = []
+
+
+def _weighted(rng: random.Random, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights, k=1)[0]
+
+
+def _timestamp(rng: random.Random, days: float = 900) -> datetime:
+    return EPOCH + timedelta(days=rng.uniform(0, days), seconds=rng.randint(0, 86399))
+
+
+# ---------------------------------------------------------------------------
+# Experiment IDs and lineage
+# ---------------------------------------------------------------------------
+def generate_experiment_ids(rng: random.Random, count: int) -> List[str]:
+    """
+    Experiment IDs grouped in lineage families, parents always before children.
+
+    Each family is a base ID, 0–3 sequential runs (occasionally skipping a
+    number) and sometimes a treatment variant of one member.
+    """
+    ids: List[str] = []
+    next_index: Dict[tuple, int] = {}
+    while len(ids) < count:
+        exp_type = _weighted(rng, EXPERIMENT_TYPES)
+        initials = rng.choice(list(RESEARCHERS))
+        index = next_index.get((exp_type, initials), 1)
+        next_index[(exp_type, initials)] = index + 1
+
+        base = f"{exp_type}_{initials}_{index:03d}"
+        family = [base]
+        seq = 1
+        for _ in range(rng.choices(range(len(SEQUENTIAL_WEIGHTS)), weights=SEQUENTIAL_WEIGHTS)[0]):
+            seq += 2 if rng.random() < SKIPPED_SEQUENCE_FRACTION else 1
+            family.append(f"{base}-{seq}")
+        if rng.random() < TREATMENT_FRACTION:
+            family.append(f"{rng.choice(family)}_{rng.choice(TREATMENTS)}")
+        ids.extend(family)
+    return ids[:count]
+
+
+def resolve_lineage(experiment_ids: List[str]) -> List[dict]:
+    """
+    (id, experiment_id, base_experiment_id, parent id) for each experiment,
+    computed the same way as update_experiment_lineage().
+    """
+    stubs = [SimpleNamespace(id=i, experiment_id=exp_id) for i, exp_id in enumerate(experiment_ids, start=1)]
+    index = LineageIndex(stubs)
+    lineage = []
+    for stub in stubs:
+        parts = parse_experiment_id_parts(stub.experiment_id)
+        parent = index.find_parent(stub.experiment_id) if parts.is_derivation else None
+        lineage.append({
+            "id": stub.id,
+            "experiment_id": stub.experiment_id,
+            "base_experiment_id": parts.base_id if parts.is_derivation else (parts.base_id or stub.experiment_id),
+            "parent_experiment_fk": parent.id if parent is not None else None,
+        })
+    return lineage
+
+
+# ---------------------------------------------------------------------------
+# Table generators
+# ---------------------------------------------------------------------------
+def _write_samples(rng: random.Random, writer: _BatchWriter, counts: Dict[str, int]) -> List[str]:
+    sample_ids = []
+    for n in range(1, counts["samples"] + 1):
+        state, country = rng.choice(STATES)
+        sample_id = f"{state}{n:05d}"
+        sample_ids.append(sample_id)
+        writer.add(SampleInfo, {
+            "sample_id": sample_id,
+            "rock_classification": rng.choice(ROCK_TYPES),
+            "state": state,
+            "country": country,
+            "locality": f"Site {rng.randint(1, 60)}",
+            "latitude": round(rng.uniform(-45, 60), 5),
+            "longitude": round(rng.uniform(-125, 150), 5),
+            "description": f"Synthetic {country} sample {n}",
+            "characterized": False,
+            "created_at": _timestamp(rng),
+        })
+    writer.flush()
+
+    # pXRF readings, referenced from pXRF external analyses as comma-joined lists
+    reading_nos = [str(1000 + n) for n in range(counts["pxrf_readings"])]
+    for reading_no in reading_nos:
+        row = {"reading_no": reading_no, "ingested_at": _timestamp(rng)}
+        for element in PXRF_ELEMENT_COLUMNS:
+            row[element] = round(rng.lognormvariate(0, 1.2) * (20 if element in ("Fe", "Si", "Mg") else 1), 4)
+        writer.add(PXRFReading, row)
+
+    analysis_id = 0
+    characterized = set()
+    reading_iter = iter(reading_nos)
+    analytes = list(range(1, len(ANALYTES) + 1))
+    for symbol_id, (symbol, unit) in enumerate(ANALYTES, start=1):
+        writer.add(Analyte, {"id": symbol_id, "analyte_symbol": symbol, "unit": unit})
+
+    for sample_id in sample_ids:
+        if rng.random() < SAMPLE_PXRF_FRACTION:
+            refs = [r for r in (next(reading_iter, None) for _ in range(rng.randint(1, 4))) if r]
+            if rng.random() < MISSING_PXRF_REF_FRACTION:
+                refs.append(str(900000 + rng.randint(0, 99999)))  # reading never ingested
+            if refs:
+                analysis_id += 1
+                writer.add(ExternalAnalysis, {
+                    "id": analysis_id, "sample_id": sample_id, "analysis_type": "pXRF",
+                    "analysis_date": _timestamp(rng), "laboratory": "In-house",
+                    "pxrf_reading_no": rng.choice([", ", ","]).join(refs),
+                    "created_at": _timestamp(rng),
+                })
+                characterized.add(sample_id)
+        if rng.random() < SAMPLE_ELEMENTAL_FRACTION:
+            analysis_id += 1
+            writer.add(ExternalAnalysis, {
+                "id": analysis_id, "sample_id": sample_id, "analysis_type": "Elemental",
+                "analysis_date": _timestamp(rng), "laboratory": "ActLabs", "created_at": _timestamp(rng),
+            })
+            for analyte_id in rng.sample(analytes, rng.randint(6, len(analytes))):
+                writer.add(ElementalAnalysis, {
+                    "external_analysis_id": analysis_id, "sample_id": sample_id,
+                    "analyte_id": analyte_id, "analyte_composition": round(rng.uniform(0.01, 45), 3),
+                })
+            characterized.add(sample_id)
+        if rng.random() < SAMPLE_XRD_FRACTION:
+            analysis_id += 1
+            writer.add(ExternalAnalysis, {
+                "id": analysis_id, "sample_id": sample_id, "analysis_type": "XRD",
+                "analysis_date": _timestamp(rng), "laboratory": "ActLabs", "created_at": _timestamp(rng),
+            })
+            for mineral, amount in _phase_amounts(rng):
+                writer.add(XRDPhase, {
+                    "sample_id": sample_id, "external_analysis_id": analysis_id,
+                    "mineral_name": mineral, "amount": amount, "created_at": _timestamp(rng),
+                })
+            characterized.add(sample_id)
+    writer.flush()
+
+    for chunk_start in range(0, len(sample_ids), 500):
+        chunk = [s for s in sample_ids[chunk_start:chunk_start + 500] if s in characterized]
+        if chunk:
+            writer.conn.execute(
+                SampleInfo.__table__.update().where(SampleInfo.sample_id.in_(chunk)).values(characterized=True)
+            )
+    return sample_ids
+
+
+def _phase_amounts(rng: random.Random) -> List[tuple]:
+    minerals = rng.sample(MINERALS, rng.randint(3, 6))
+    weights = [rng.random() + 0.05 for _ in minerals]
+    total = sum(weights)
+    return [(m, round(100 * w / total, 2)) for m, w in zip(minerals, weights)]
+
+
+def _write_compounds(rng: random.Random, writer: _BatchWriter) -> List[tuple]:
+    compounds = []
+    for compound_id, (name, formula, mw) in enumerate(COMPOUND_NAMES, start=1):
+        writer.add(Compound, {
+            "id": compound_id, "name": name, "formula": formula, "molecular_weight_g_mol": mw,
+            "preferred_unit": AmountUnit.PPM if name.startswith("Nickel") else AmountUnit.MILLIMOLAR,
+            "created_at": _timestamp(rng),
+        })
+        compounds.append((compound_id, mw))
+    writer.flush()
+    return compounds
+
+
+def _write_experiments(
+    rng: random.Random,
+    writer: _BatchWriter,
+    counts: Dict[str, int],
+    sample_ids: List[str],
+    compounds: List[tuple],
+    progress: Optional[Callable[[str, float], None]] = None,
+) -> None:
+    lineage = resolve_lineage(generate_experiment_ids(rng, counts["experiments"]))
+    max_time: Dict[int, float] = {}
+    offsets: Dict[int, float] = {}
+    result_id = 0
+
+    for n, exp in enumerate(lineage, start=1):
+        exp_pk = exp["id"]
+        exp_id = exp["experiment_id"]
+        started = _timestamp(rng)
+        researcher = RESEARCHERS[exp_id.split("_")[1]] if exp_id.count("_") >= 2 else None
+        writer.add(Experiment, {
+            **exp,
+            "experiment_number": exp_pk,
+            "sample_id": rng.choice(sample_ids) if sample_ids and rng.random() < 0.85 else None,
+            "researcher": researcher,
+            "date": started,
+            "status": ExperimentStatus.COMPLETED if rng.random() < 0.8 else ExperimentStatus.ONGOING,
+            "created_at": started,
+        })
+        writer.add(ExperimentNotes, {
+            "experiment_id": exp_id, "experiment_fk": exp_pk,
+            "note_text": f"Synthetic run {exp_id}", "created_at": started,
+        })
+
+        rock_mass = round(rng.uniform(1, 50), 2)
+        water_volume = round(rng.uniform(10, 500), 1)
+        # Conditions share the experiment's primary key so additives can point at them directly
+        writer.add(ExperimentalConditions, {
+            "id": exp_pk, "experiment_id": exp_id, "experiment_fk": exp_pk,
+            "experiment_type": infer_experiment_type_value(exp_id),
+            "particle_size": rng.choice(["<75", "75-150", ">150", "100"]),
+            "initial_ph": round(rng.uniform(5.5, 10.5), 2),
+            "rock_mass_g": rock_mass, "water_volume_mL": water_volume,
+            "water_to_rock_ratio": round(water_volume / rock_mass, 3),
+            "temperature_c": rng.choice([25.0, 90.0, 150.0, 200.0, 250.0]),
+            "reactor_number": rng.randint(1, 16),
+            "feedstock": rng.choice(["Nitrogen", "Nitrate", "Blank"]),
+            "stir_speed_rpm": rng.choice([None, 200.0, 400.0]),
+            "room_temp_pressure_psi": round(rng.uniform(0, 500), 1),
+            "created_at": started,
+        })
+        for compound_id, mw in rng.sample(compounds, rng.randint(0, 3)):
+            unit = rng.choice(ADDITIVE_UNITS)
+            amount = round(rng.uniform(0.01, 50), 3)
+            mass = amount if unit is AmountUnit.GRAM else amount / 1000 if unit is AmountUnit.MILLIGRAM else None
+            writer.add(ChemicalAdditive, {
+                "experiment_id": exp_pk, "compound_id": compound_id, "amount": amount, "unit": unit,
+                "mass_in_grams": mass, "moles_added": mass / mw if mass is not None else None,
+                "created_at": started,
+            })
+
+        # Cumulative time continues from the parent chain (see get_ancestor_time_offset)
+        parent = exp["parent_experiment_fk"]
+        offset = offsets[parent] + max_time.get(parent, 0.0) if parent else 0.0
+        offsets[exp_pk] = offset
+        n_results = rng.randint(*RESULTS_PER_EXPERIMENT)
+        times = TIMEPOINTS[:n_results] if n_results <= len(TIMEPOINTS) else TIMEPOINTS
+        icp_run = rng.random() < ICP_FRACTION / 0.9  # ICP is measured for most timepoints of some runs
+
+        for day in times:
+            day_value = float(day) + rng.choice([0.0, 0.0, 0.0, 0.1, -0.1]) if day else 0.0
+            max_time[exp_pk] = max(max_time.get(exp_pk, 0.0), day_value)
+            copies = 2 if rng.random() < NON_PRIMARY_FRACTION else 1
+            for copy in range(copies):
+                result_id += 1
+                measured = started + timedelta(days=day_value)
+                brine = "Added 5 mL brine" if rng.random() < BRINE_MODIFICATION_FRACTION else None
+                writer.add(ExperimentalResults, {
+                    "id": result_id, "experiment_fk": exp_pk,
+                    "time_post_reaction_days": day_value,
+                    "time_post_reaction_bucket_days": float(round(day_value)),
+                    "cumulative_time_post_reaction_days": offset + day_value,
+                    "is_primary_timepoint_result": copy == 0,
+                    "description": f"Day {day}",
+                    "brine_modification_description": brine,
+                    "has_brine_modification": brine is not None,
+                    "created_at": measured,
+                })
+                if rng.random() < SCALAR_FRACTION:
+                    writer.add(ScalarResults, _scalar_row(rng, result_id, rock_mass, water_volume, day_value, measured))
+                if icp_run and rng.random() < 0.9:
+                    writer.add(ICPResults, _icp_row(rng, result_id, exp_id, day, measured))
+
+        if progress and n % 1000 == 0:
+            progress("experiments", n / len(lineage))
+
+    for exp in lineage:
+        if rng.random() < EXPERIMENT_XRD_FRACTION:
+            for day in sorted(rng.sample([0, 7, 14, 28, 56, 84], rng.randint(3, 5))):
+                for mineral, amount in _phase_amounts(rng):
+                    writer.add(XRDPhase, {
+                        "experiment_fk": exp["id"], "experiment_id": exp["experiment_id"],
+                        "time_post_reaction_days": day, "measurement_date": EPOCH + timedelta(days=day),
+                        "rwp": round(rng.uniform(2, 12), 2), "mineral_name": mineral, "amount": amount,
+                        "created_at": _timestamp(rng),
+                    })
+    writer.flush()
+
+
+def _scalar_row(rng, result_id, rock_mass, water_volume, day, measured) -> dict:
+    gross = round(rng.lognormvariate(1.0, 0.8) * (1 + day / 60), 3)
+    sampling = rng.choice([None, 1.0, 2.0, 5.0])
+    volume = sampling if sampling else water_volume
+    # Same formula as ScalarResults.calculate_yields (background 0.3 mM, NH4+ 18.04 g/mol)
+    ammonia_g = max(0.0, gross - 0.3) / 1000 * volume / 1000 * 18.04
+    row = {
+        "result_id": result_id,
+        "final_ph": round(rng.uniform(6, 11), 2),
+        "gross_ammonium_concentration_mM": gross,
+        "background_ammonium_concentration_mM": 0.3,
+        "ammonium_quant_method": rng.choice(["NMR", "Colorimetric Assay"]),
+        "grams_per_ton_yield": 1_000_000 * ammonia_g / rock_mass,
+        "final_conductivity_mS_cm": round(rng.uniform(0.1, 40), 2),
+        "final_nitrate_concentration_mM": round(rng.uniform(0, 50), 2),
+        "sampling_volume_mL": sampling,
+        "measurement_date": measured,
+        "updated_at": measured,
+    }
+    if rng.random() < H2_FRACTION:
+        ppm = round(rng.uniform(10, 50000), 1)
+        gas_ml = round(rng.uniform(1, 20), 2)
+        pressure = round(rng.uniform(0.1, 2.0), 3)
+        # PV = nRT at 25 °C: n(H2) = ppm·1e-6 · P·V / RT
+        micromoles = ppm * 1e-6 * (pressure * 1e6) * (gas_ml * 1e-6) / (8.314 * 298.15) * 1e6
+        row.update({
+            "h2_concentration": ppm, "h2_concentration_unit": "ppm", "gas_sampling_volume_ml": gas_ml,
+            "gas_sampling_pressure_MPa": pressure, "h2_micromoles": micromoles,
+            "h2_mass_ug": micromoles * 2.016, "h2_grams_per_ton_yield": micromoles * 2.016 / rock_mass,
+        })
+    return row
+
+
+def _icp_row(rng, result_id, exp_id, day, measured) -> dict:
+    elements = {el: round(rng.lognormvariate(0, 1.5), 4) for el in ICP_ELEMENTS}
+    row = {el: elements[el] for el in ICP_FIXED_ELEMENT_FIELDS}
+    row.update({
+        "result_id": result_id,
+        "all_elements": elements,
+        "dilution_factor": rng.choice([1.0, 10.0, 100.0]),
+        "measurement_date": measured,
+        "instrument_used": "ICP-OES",
+        "raw_label": f"{exp_id} Day {day}",
+        "created_at": measured,
+    })
+    return row
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+def generate_database(
+    bind: Engine,
+    scale: float = 1.0,
+    seed: int = 0,
+    progress: Optional[Callable[[str, float], None]] = None,
+) -> Dict[str, int]:
+    """
+    Create the schema on ``bind`` and fill it with synthetic data.
+
+    Args:
+        bind: Engine for an empty database
+        scale: Size relative to today's production database (1, 10, 100, ...)
+        seed: Random seed; the same (scale, seed) always produces the same data
+        progress: Optional callback(stage, fraction)
+
+    Returns:
+        Row counts per table
+    """
+    counts = scaled_counts(scale)
+    rng = random.Random(f"{seed}:{scale}")
+    Base.metadata.create_all(bind)
+
+    with bind.begin() as conn:
+        writer = _BatchWriter(conn)
+        sample_ids = _write_samples(rng, writer, counts)
+        if progress:
+            progress("samples", 1.0)
+        compounds = _write_compounds(rng, writer)
+        _write_experiments(rng, writer, counts, sample_ids, compounds, progress)
+
+    refresh_reporting_views(bind=bind)
+    _stamp_alembic_head(bind)
+    if progress:
+        progress("views", 1.0)
+    return dict(sorted(writer.counts.items()))
+
+
+def _stamp_alembic_head(bind: Engine) -> None:
+    """Record the current migration head so the app accepts the generated file."""
+    try:
+        from alembic.config import Config
+        from alembic.script import ScriptDirectory
+        head = ScriptDirectory.from_config(Config(str(PROJECT_ROOT / "alembic.ini"))).get_current_head()
+    except Exception as e:
+        logger.warning(f"Could not determine alembic head: {e}")
+        return
+    with bind.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32) NOT NULL PRIMARY KEY)"))
+        conn.execute(text("DELETE FROM alembic_version"))
+        conn.execute(text("INSERT INTO alembic_version (version_num) VALUES (:v)"), {"v": head})
+
+
+def cached_database_path(scale: float, seed: int = 0, cache_dir: Optional[Path] = None) -> Path:
+    """Where build_cached_database() keeps the file for (scale, seed)."""
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    return cache_dir / f"synthetic_{scale:g}x_seed{seed}_v{GENERATOR_VERSION}.db"
+
+
+def build_database_file(path: Path, scale: float = 1.0, seed: int = 0, progress=None) -> Dict[str, int]:
+    """Generate a synthetic SQLite file at ``path`` (replaced atomically)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + ".partial")
+    if partial.exists():
+        partial.unlink()
+    engine = create_engine(f"sqlite:///{partial}")
+    try:
+        with engine.begin() as conn:
+            # Bulk-load settings; the file is rebuilt from scratch on failure anyway
+            conn.execute(text("PRAGMA journal_mode=OFF"))
+            conn.execute(text("PRAGMA synchronous=OFF"))
+        counts = generate_database(engine, scale=scale, seed=seed, progress=progress)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+    finally:
+        engine.dispose()
+    os.replace(partial, path)
+    path.with_suffix(".json").write_text(json.dumps({
+        "scale": scale, "seed": seed, "generator_version": GENERATOR_VERSION, "rows": counts,
+    }, indent=2), encoding="utf-8")
+    return counts
+
+
+def build_cached_database(scale: float = 1.0, seed: int = 0, cache_dir: Optional[Path] = None, force: bool = False) -> Path:
+    """
+    Return a synthetic database file for (scale, seed), generating it on first use.
+
+    Callers that write to the database should copy the file first.
+    """
+    path = cached_database_path(scale, seed, cache_dir)
+    if force or not path.exists():
+        logger.info(f"Generating synthetic database {path.name}")
+        build_database_file(path, scale=scale, seed=seed)
+    return path
+
+
+def _parse_scale(value: str) -> float:
+    return float(value.lower().rstrip("x"))
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a production-shaped synthetic database")
+    parser.add_argument("--scale", type=_parse_scale, default=1.0, help="Size relative to production, e.g. 1, 10x, 100")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--output", type=Path, help="Output .db path (default: cached file in SYNTHETIC_DB_CACHE)")
+    parser.add_argument("--force", action="store_true", help="Regenerate even if the cached file exists")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    def progress(stage, fraction):
+        logger.info(f"{stage}: {fraction:.0%}")
+
+    if args.output:
+        counts = build_database_file(args.output, scale=args.scale, seed=args.seed, progress=progress)
+        path = args.output
+    else:
+        path = build_cached_database(args.scale, args.seed, force=args.force)
+        counts = json.loads(path.with_suffix(".json").read_text())["rows"]
+    for table, n in counts.items():
+        print(f"  {table:<28} {n:>10,}")
+    print(f"Wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
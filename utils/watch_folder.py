@@ -0,0 +1,477 @@
+"""
+Watch-folder daemon that ingests instrument exports as they are saved.
+
+Instrument PCs (or a synced share) drop their exports into one or more
+folders. The daemon watches them with ``watchdog`` and, for every new or
+changed file:
+
+1. waits until the file has stopped changing (size and mtime stable for
+   ``WATCH_FOLDER_DEBOUNCE_SECONDS``) and can be opened, so half-written
+   exports are never read;
+2. hashes the content (SHA-256) and skips it if the same bytes were already
+   ingested or are still queued -- re-saves, copies and renames of a file are
+   not ingested twice;
+3. detects the file type from its content (see ``detect_upload_type``):
+
+   =====================  =================================================
+   upload type            signature
+   =====================  =================================================
+   ``icp``                CSV with ``Label`` and ``Element Label`` columns
+   ``pxrf``               Excel header with ``Reading No`` + pXRF elements
+   ``aeris_xrd``          Excel header with ``Sample ID`` and ``Rwp``
+   ``actlabs_titration``  ActLabs report (``Report Number`` / ``Analyte
+                          Symbol`` / ``Analysis Method`` header rows)
+   =====================  =================================================
+
+4. submits it to an upload job runner (:mod:`backend.services.upload_jobs`),
+   i.e. the same service code, rollback-on-error rule and ``upload_jobs``
+   history as uploads from the Bulk Uploads page, on a pool of
+   ``WATCH_FOLDER_WORKERS`` threads;
+5. writes a JSON report per file to ``.watch_folder/reports/`` (detected
+   type, hash, job id, status, counts, errors).
+
+The content-hash ledger (``.watch_folder/ledger.json``) survives restarts.
+On start-up the folders are scanned once, so files saved while the daemon
+was down are picked up. Content whose previous ingest failed is retried
+when the file is saved again or the daemon restarts. Entries a killed daemon
+left queued/running are settled on start-up from the ``upload_jobs`` row:
+the runner marks that process's unfinished jobs interrupted, and content
+whose job is interrupted, unfinished or missing is retried.
+
+Usage:
+    python -m utils.watch_folder D:\\exports\\icp D:\\exports\\pxrf   - Watch folders
+    python -m utils.watch_folder --once D:\\exports\\icp              - Ingest what is there and exit
+
+Folders default to ``WATCH_FOLDERS`` (``os.pathsep``-separated).
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+# ---------------------------------------------------------------------------
+# Path bootstrap – ensure project root is importable
+# ---------------------------------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+LOCK_FILE = PROJECT_ROOT / ".watch_folder_lock"
+STATE_DIR = PROJECT_ROOT / ".watch_folder"
+WATCH_FOLDERS = [p for p in os.environ.get("WATCH_FOLDERS", "").split(os.pathsep) if p.strip()]
+DEBOUNCE_SECONDS = float(os.environ.get("WATCH_FOLDER_DEBOUNCE_SECONDS", "10"))
+WORKERS = int(os.environ.get("WATCH_FOLDER_WORKERS", "2"))
+POLL_SECONDS = float(os.environ.get("WATCH_FOLDER_POLL_SECONDS", "2"))
+MAX_FILE_MB = float(os.environ.get("WATCH_FOLDER_MAX_FILE_MB", "50"))
+SUBMITTED_BY = "watch-folder"
+
+WATCHED_SUFFIXES = {".csv", ".txt", ".xlsx", ".xls"}
+# Editor lock files and partial downloads/copies
+IGNORED_PREFIXES = ("~$", ".")
+IGNORED_SUFFIXES = {".tmp", ".part", ".crdownload"}
+
+TERMINAL_STATUSES = {"succeeded", "failed", "interrupted"}
+# Ledger statuses that make identical content a duplicate
+DEDUPE_STATUSES = {"queued", "running", "succeeded"}
+
+# ---------------------------------------------------------------------------
+# Signature detection
+# ---------------------------------------------------------------------------
+_XLSX_MAGIC = b"PK\x03\x04"
+_XLS_MAGIC = b"\xd0\xcf\x11\xe0"
+_PXRF_ELEMENTS = {"fe", "mg", "si", "ni", "cu", "mo", "co", "al", "ca", "k", "au"}
+_ACTLABS_MARKERS = ("report number", "report date", "analyte symbol", "analysis method")
+
+
+def _norm(value: Any) -> str:
+    return "" if pd.isna(value) else str(value).strip().strip('"').lower()
+
+
+def _detect_from_rows(rows: List[List[str]]) -> Optional[str]:
+    """Classify a table from its first rows (normalised cell strings)."""
+    first_cells = [row[0] for row in rows if row]
+    if sum(any(cell.startswith(m) for m in _ACTLABS_MARKERS) for cell in first_cells) >= 2:
+        return "actlabs_titration"
+    for row in rows:
+        cells = set(row)
+        if "label" in cells and "element label" in cells:
+            return "icp"
+        if "reading no" in cells and len(cells & _PXRF_ELEMENTS) >= 3:
+            return "pxrf"
+        if ({"sample id", "sample_id"} & cells) and "rwp" in cells:
+            return "aeris_xrd"
+    return None
+
+
+def detect_upload_type(file_name: str, file_bytes: bytes, max_rows: int = 15) -> Optional[str]:
+    """
+    Return the upload type for an instrument export, or None if unrecognised.
+
+    Only the first ``max_rows`` rows are read; the extension is a fallback
+    for choosing the reader, the content decides the type.
+    """
+    if file_bytes.startswith(_XLSX_MAGIC) or file_bytes.startswith(_XLS_MAGIC):
+        try:
+            df = pd.read_excel(io.BytesIO(file_bytes), header=None, nrows=max_rows)
+        except Exception as e:
+            logger.debug(f"{file_name}: not a readable workbook ({e})")
+            return None
+        rows = [[_norm(v) for v in row] for row in df.itertuples(index=False)]
+        return _detect_from_rows(rows)
+
+    try:
+        text = file_bytes[:64 * 1024].decode("utf-8-sig")
+    except UnicodeDecodeError:
+        text = file_bytes[:64 * 1024].decode("latin-1")
+    rows = []
+    for line in text.splitlines()[:max_rows]:
+        delimiter = "\t" if line.count("\t") > line.count(",") else ","
+        rows.append([_norm(cell) for cell in line.split(delimiter)])
+    return _detect_from_rows(rows)
+
+
+# ---------------------------------------------------------------------------
+# State (plain JSON files, like the maintenance daemon)
+# ---------------------------------------------------------------------------
+
+def _write_json(path: Path, data: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2, default=str))
+    os.replace(tmp, path)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _is_candidate(path: Path) -> bool:
+    name = path.name
+    return (
+        path.suffix.lower() in WATCHED_SUFFIXES
+        and not name.startswith(IGNORED_PREFIXES)
+        and path.suffix.lower() not in IGNORED_SUFFIXES
+    )
+
+
+class WatchFolderDaemon:
+    """Debounces file events, dedupes by content hash and feeds the upload job runner."""
+
+    def __init__(
+        self,
+        folders: Iterable[Path],
+        runner=None,
+        state_dir: Path = STATE_DIR,
+        debounce_seconds: float = DEBOUNCE_SECONDS,
+        workers: int = WORKERS,
+        recursive: bool = False,
+    ):
+        self.folders = [Path(f) for f in folders]
+        self.state_dir = Path(state_dir)
+        self.debounce_seconds = debounce_seconds
+        self.recursive = recursive
+        if runner is None:
+            from backend.services.upload_jobs import UploadJobRunner
+            # Marks jobs of a previous daemon process that was killed mid-ingest
+            runner = UploadJobRunner(max_workers=workers)
+        self.runner = runner
+
+        self._lock = threading.Lock()
+        # path -> (last change seen at, (size, mtime) at that time)
+        self._pending: Dict[Path, Tuple[float, Optional[Tuple[int, float]]]] = {}
+        # job id -> report being filled in
+        self._jobs: Dict[int, Dict[str, Any]] = {}
+        self.ledger: Dict[str, Dict[str, Any]] = self._load_ledger()
+        self._recover_ledger()
+
+    # -- ledger and reports ---------------------------------------------------
+
+    @property
+    def ledger_path(self) -> Path:
+        return self.state_dir / "ledger.json"
+
+    def _load_ledger(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            return json.loads(self.ledger_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _save_ledger(self) -> None:
+        _write_json(self.ledger_path, self.ledger)
+
+    def _recover_ledger(self) -> None:
+        """
+        Settle entries a previous run left queued/running (it stopped before
+        ``collect`` saw the job finish). Finished jobs record their final
+        status; entries whose job is missing or unfinished are dropped so the
+        content is ingested again.
+        """
+        changed = False
+        for digest, entry in list(self.ledger.items()):
+            if entry.get("status") in TERMINAL_STATUSES:
+                continue
+            job = self.runner.get_job(entry["job_id"]) if entry.get("job_id") is not None else None
+            if job is not None and job.status in TERMINAL_STATUSES:
+                entry.update(status=job.status,
+                             finished_at=job.finished_at.isoformat() if job.finished_at else None)
+            else:
+                logger.info(f"{entry.get('file')}: job {entry.get('job_id')} did not finish; will retry")
+                del self.ledger[digest]
+            changed = True
+        if changed:
+            self._save_ledger()
+
+    def _write_report(self, report: Dict[str, Any]) -> Path:
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S_%f")
+        path = self.state_dir / "reports" / f"{stamp}_{Path(report['file']).name}.json"
+        _write_json(path, report)
+        level = logging.WARNING if report["status"] in ("failed", "unrecognised", "error") else logging.INFO
+        logger.log(level, f"{report['file']}: {report['status']}"
+                          + (f" ({report.get('message')})" if report.get("message") else ""))
+        return path
+
+    # -- event intake -----------------------------------------------------------
+
+    def note(self, path) -> None:
+        """Record that ``path`` was created or modified (called from watchdog's thread)."""
+        path = Path(path)
+        if not _is_candidate(path):
+            return
+        with self._lock:
+            self._pending[path] = (time.monotonic(), None)
+
+    def scan(self) -> int:
+        """Queue every candidate file already in the watched folders."""
+        count = 0
+        for folder in self.folders:
+            if not folder.is_dir():
+                logger.warning(f"Watch folder does not exist: {folder}")
+                continue
+            for path in (folder.rglob("*") if self.recursive else folder.iterdir()):
+                if path.is_file() and _is_candidate(path):
+                    self.note(path)
+                    count += 1
+        return count
+
+    def ready_files(self, now: Optional[float] = None) -> List[Path]:
+        """
+        Return pending files whose size and mtime have not changed for the
+        debounce period and that can be opened for reading.
+        """
+        now = time.monotonic() if now is None else now
+        ready = []
+        with self._lock:
+            for path, (changed_at, last_stat) in list(self._pending.items()):
+                try:
+                    st = path.stat()
+                except OSError:
+                    del self._pending[path]  # deleted or moved away before it settled
+                    continue
+                stat = (st.st_size, st.st_mtime)
+                if stat != last_stat:
+                    self._pending[path] = (now if last_stat is not None else changed_at, stat)
+                    continue
+                if now - changed_at < self.debounce_seconds or st.st_size == 0:
+                    continue
+                try:
+                    with open(path, "rb"):
+                        pass
+                except OSError:
+                    continue  # still locked by the writer (Windows)
+                del self._pending[path]
+                ready.append(path)
+        return ready
+
+    # -- ingest -----------------------------------------------------------------
+
+    def process(self, path: Path) -> Dict[str, Any]:
+        """Hash, dedupe, detect and submit one settled file. Returns its report."""
+        report: Dict[str, Any] = {"file": str(path), "detected_at": datetime.now().isoformat()}
+        try:
+            data = path.read_bytes()
+        except OSError as e:
+            report.update(status="error", message=f"Could not read file: {e}")
+            self._write_report(report)
+            return report
+        digest = _sha256(data)
+        report.update(sha256=digest, size=len(data))
+
+        previous = self.ledger.get(digest)
+        if previous and previous.get("status") in DEDUPE_STATUSES:
+            report.update(status="duplicate", upload_type=previous.get("upload_type"),
+                          job_id=previous.get("job_id"),
+                          message=f"same content as {previous.get('file')} ({previous.get('status')})")
+            self._write_report(report)
+            return report
+
+        if len(data) > MAX_FILE_MB * 1024 * 1024:
+            report.update(status="error", message=f"File exceeds {MAX_FILE_MB:g} MB")
+            self._write_report(report)
+            return report
+
+        upload_type = detect_upload_type(path.name, data)
+        report["upload_type"] = upload_type
+        if upload_type is None:
+            report.update(status="unrecognised", message="No known instrument export signature")
+            self._write_report(report)
+            return report
+
+        job_id = self.runner.submit(upload_type, data, file_name=path.name, submitted_by=SUBMITTED_BY)
+        report.update(status="queued", job_id=job_id)
+        self.ledger[digest] = {"file": str(path), "upload_type": upload_type, "job_id": job_id,
+                               "status": "queued", "queued_at": report["detected_at"]}
+        self._save_ledger()
+        with self._lock:
+            self._jobs[job_id] = report
+        logger.info(f"{path}: queued as {upload_type} job {job_id}")
+        return report
+
+    def collect(self) -> List[Dict[str, Any]]:
+        """Write reports for jobs that have finished. Returns those reports."""
+        with self._lock:
+            job_ids = list(self._jobs)
+        finished = []
+        for job_id in job_ids:
+            job = self.runner.get_job(job_id)
+            if job is None or job.status not in TERMINAL_STATUSES:
+                continue
+            with self._lock:
+                report = self._jobs.pop(job_id)
+            report.update(
+                status=job.status,
+                message=job.message,
+                summary=job.summary,
+                errors=job.errors or [],
+                warnings=job.warnings or [],
+                finished_at=job.finished_at.isoformat() if job.finished_at else None,
+            )
+            entry = self.ledger.get(report["sha256"])
+            if entry is not None and entry.get("job_id") == job_id:
+                entry.update(status=job.status, finished_at=report["finished_at"])
+            self._write_report(report)
+            finished.append(report)
+        if finished:
+            self._save_ledger()
+        return finished
+
+    def run_once(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Process settled files and collect finished jobs. Returns reports written for new files."""
+        reports = [self.process(path) for path in self.ready_files(now)]
+        self.collect()
+        return reports
+
+    @property
+    def busy(self) -> bool:
+        with self._lock:
+            return bool(self._pending or self._jobs)
+
+    def drain(self, timeout: float = 600, poll_seconds: float = 0.5) -> None:
+        """Run until nothing is pending or in flight (used by ``--once``)."""
+        deadline = time.monotonic() + timeout
+        while self.busy and time.monotonic() < deadline:
+            self.run_once()
+            if self.busy:
+                time.sleep(poll_seconds)
+
+    def serve_forever(self, poll_seconds: float = POLL_SECONDS) -> None:
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+
+        daemon = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_created(self, event):
+                if not event.is_directory:
+                    daemon.note(event.src_path)
+
+            def on_modified(self, event):
+                if not event.is_directory:
+                    daemon.note(event.src_path)
+
+            def on_moved(self, event):
+                if not event.is_directory:
+                    daemon.note(event.dest_path)
+
+        observer = Observer()
+        for folder in self.folders:
+            if folder.is_dir():
+                observer.schedule(_Handler(), str(folder), recursive=self.recursive)
+        observer.start()
+        queued = self.scan()
+        logger.info(f"Watch-folder daemon started (PID {os.getpid()}), watching "
+                    f"{', '.join(str(f) for f in self.folders)}; {queued} existing file(s) queued for checking")
+        try:
+            while True:
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logger.error(f"Unexpected error in watch-folder loop: {e}", exc_info=True)
+                time.sleep(poll_seconds)
+        finally:
+            observer.stop()
+            observer.join(timeout=10)
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Ingest instrument exports dropped into watch folders")
+    parser.add_argument("folders", nargs="*", default=WATCH_FOLDERS,
+                        help="Folders to watch (default: WATCH_FOLDERS)")
+    parser.add_argument("--once", action="store_true", help="Ingest the files present now, wait for the jobs and exit")
+    parser.add_argument("--recursive", action="store_true", help="Also watch subfolders")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SECONDS,
+                        help=f"Seconds a file must stay unchanged before ingest (default: {DEBOUNCE_SECONDS:g})")
+    parser.add_argument("--workers", type=int, default=WORKERS, help=f"Ingest worker threads (default: {WORKERS})")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    log_dir = PROJECT_ROOT / "logs"
+    log_dir.mkdir(exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[
+            logging.FileHandler(log_dir / "watch_folder.log"),
+            logging.StreamHandler(),
+        ],
+    )
+    if not args.folders:
+        parser.error("no folders given and WATCH_FOLDERS is not set")
+
+    try:
+        with file_lock(LOCK_FILE):
+            daemon = WatchFolderDaemon(args.folders, debounce_seconds=args.debounce,
+                                       workers=args.workers, recursive=args.recursive)
+            if args.once:
+                daemon.debounce_seconds = 0
+                daemon.scan()
+                daemon.drain()
+                return 0
+            daemon.serve_forever()
+    except RuntimeError as e:
+        logger.error(str(e))
+        return 1
+    except KeyboardInterrupt:
+        logger.info("Watch-folder daemon stopped by user")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())